@@ -6,6 +6,7 @@ from core.models import Visit
 from django.utils.dateparse import parse_date
 from products.models import Product
 from transactions.models import Transaction
+from transactions.rollups import rollups_in_range, type_totals
 from products.serializers import ProductSerializer, TopProductSerializer
 from transactions.serializers import TransactionSerializer
 from django.db.models import Sum, Case, When, F, DecimalField, Q, IntegerField
@@ -191,10 +192,11 @@ class ConversionRateDataView(APIView):
                 timestamp__range=[start_date, end_date]
             ).count()
 
-            conversions = Transaction.objects.filter(
-                date__range=[start_date, end_date],
+            conversions = rollups_in_range(
+                start_date.date(), end_date.date()
+            ).filter(
                 status='completed'
-            ).count()
+            ).aggregate(total=Sum('transaction_count'))['total'] or 0
 
             if total_visitors > 0:
                 conversion_rate = (conversions / total_visitors) * 100
@@ -249,20 +251,10 @@ class NetProfitDataView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            revenue = Transaction.objects.filter(
-                date__range=[start_date, end_date],
-                transaction_type='income'
-            ).aggregate(total_revenue=Sum('amount'))['total_revenue'] or 0
-
-            cogs = Transaction.objects.filter(
-                date__range=[start_date, end_date],
-                transaction_type='cost_of_services'
-            ).aggregate(total_cogs=Sum('amount'))['total_cogs'] or 0
-
-            operating_expenses = Transaction.objects.filter(
-                date__range=[start_date, end_date],
-                transaction_type='expense'
-            ).aggregate(total_expenses=Sum('amount'))['total_expenses'] or 0
+            totals = type_totals(start_date.date(), end_date.date())
+            revenue = totals.get('income', 0)
+            cogs = totals.get('cost_of_services', 0)
+            operating_expenses = totals.get('expense', 0)
 
             net_profit = revenue - cogs - operating_expenses
 
@@ -413,14 +405,14 @@ class CashFlowView(APIView):
             start_datetime = make_aware(datetime.combine(start_date, time.min))
             end_datetime = make_aware(datetime.combine(end_date, time.max))
 
-            cash_flow = Transaction.objects.filter(
-                date__range=[start_datetime, end_datetime]
+            cash_flow = rollups_in_range(
+                start_datetime.date(), end_datetime.date()
+            ).values(
+                trunc_date=F('date')
             ).annotate(
-                trunc_date=TruncDate('date')
-            ).values('trunc_date').annotate(
                 balance=Sum(Case(
-                    When(transaction_type='income', then=F('amount')),
-                    When(transaction_type__in=['expense', 'cost_of_services'], then=-F('amount')),
+                    When(transaction_type='income', then=F('total_amount')),
+                    When(transaction_type__in=['expense', 'cost_of_services'], then=-F('total_amount')),
                     output_field=DecimalField()
                 ))
             ).order_by('trunc_date')
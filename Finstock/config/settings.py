@@ -91,10 +91,21 @@ LOGGING = {
             'handlers': ['file', 'console'],
             'level': 'DEBUG',
             'propagate': True,
+        },
+        # One JSON line per sampled or slow request
+        'core.requests': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': False,
         }
     }
 }
 
+# Request logging: the share of requests logged, and the threshold above
+# which a request is always logged
+REQUEST_LOG_SAMPLE_RATE = 0.01
+REQUEST_LOG_SLOW_MS = 1000
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -146,6 +157,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestLoggingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -0,0 +1,303 @@
+"""
+Set-based creation of many orders in one request.
+
+``ingest_orders`` produces the same rows as creating each order through
+``OrderSerializer.create`` (order, items, stock adjustments, a paid invoice
+with its items, a receipt and, for shipped or delivered orders, an income
+transaction) with a fixed number of queries per batch instead of several
+per item:
+
+* all products are locked with one ``SELECT ... FOR UPDATE`` and stock is
+  checked against the whole batch, so earlier orders in the batch consume
+  stock before later ones are checked;
+* every table is written with ``bulk_create`` and product stock with one
+  ``UPDATE`` per product through the stock ledger;
+* order and invoice totals are computed once in Python;
+* QR images are not rendered here. The rows are saved without them and the
+  images are produced later, outside the request.
+
+Orders that fail validation are reported by their index in the request and
+skipped; the rest of the batch is still written.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from invoices.models import Invoice, InvoiceItem
+from products.models import Product
+from receipts.models import Receipt
+from stock_adjustments import ledger
+from stock_adjustments.models import StockAdjustment
+from transactions import rollups
+from transactions.models import Transaction
+from users.constants import PermissionConstants
+from .models import Customer, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+BULK_ORDER_MAX = getattr(settings, 'BULK_ORDER_MAX', 500)
+BULK_CREATE_BATCH_SIZE = 500
+FULFILLED_STATUSES = ('shipped', 'delivered')
+
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+
+class BulkOrderSerializer(serializers.Serializer):
+    """
+    Shape-only validation for one order. Products, customers and stock are
+    checked for the whole batch at once in ``ingest_orders``.
+    """
+    customer_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Order._meta.get_field('status').choices, required=False)
+    is_paid = serializers.BooleanField(required=False, default=False)
+    special_instructions = serializers.CharField(required=False, allow_blank=True, default='')
+    transaction_category = serializers.ChoiceField(
+        choices=Order._meta.get_field('transaction_category').choices, required=False, default='income'
+    )
+    items = BulkOrderItemSerializer(many=True, allow_empty=False)
+
+
+class PendingOrder:
+    """An order that passed validation, with the rows to be written for it."""
+
+    def __init__(self, index, data, customer, lines):
+        self.index = index
+        self.data = data
+        self.customer = customer
+        # (product, quantity, unit_price)
+        self.lines = lines
+        self.order = None
+        self.invoice = None
+
+    @property
+    def total(self):
+        return sum((quantity * unit_price for _, quantity, unit_price in self.lines), Decimal('0'))
+
+    @property
+    def invoice_total(self):
+        # InvoiceItem.save always bills at the product's list price
+        return sum((quantity * product.price for product, quantity, _ in self.lines), Decimal('0'))
+
+
+def _validate_shapes(orders_data):
+    valid, errors = [], []
+    for index, data in enumerate(orders_data):
+        serializer = BulkOrderSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    return valid, errors
+
+
+def _check_permissions(user, data):
+    if 'status' in data and not user.has_role_permission(PermissionConstants.ORDER_EDIT):
+        return {'status': 'You are not authorized to change order status.'}
+    if data.get('status') in FULFILLED_STATUSES and not user.has_role_permission(PermissionConstants.TRANSACTION_CREATE):
+        return {'status': 'You do not have permission to create transactions for fulfilled orders.'}
+    return None
+
+
+def _plan(valid, products, customers, user):
+    """
+    Check customers, products and stock for every order, consuming stock in
+    request order. Returns the orders to write and per-order errors.
+    """
+    remaining = {product_id: product.stock for product_id, product in products.items()}
+    pending, errors = [], []
+
+    for index, data in valid:
+        order_errors = _check_permissions(user, data) or {}
+
+        customer = customers.get(data['customer_id'])
+        if customer is None:
+            order_errors['customer_id'] = f"Customer with id {data['customer_id']} does not exist."
+
+        requested = defaultdict(int)
+        item_errors = []
+        for item in data['items']:
+            product = products.get(item['product'])
+            if product is None:
+                item_errors.append(f"Product with id {item['product']} does not exist.")
+                continue
+            requested[product.pk] += item['quantity']
+        for product_id, quantity in requested.items():
+            if remaining[product_id] < quantity:
+                product = products[product_id]
+                item_errors.append(
+                    f"Insufficient stock for product {product.name}. "
+                    f"Available: {remaining[product_id]}, Requested: {quantity}"
+                )
+        if item_errors:
+            order_errors['items'] = item_errors
+
+        if order_errors:
+            errors.append({'index': index, 'errors': order_errors})
+            continue
+
+        for product_id, quantity in requested.items():
+            remaining[product_id] -= quantity
+        lines = [
+            (products[item['product']], item['quantity'], item.get('unit_price') or products[item['product']].price)
+            for item in data['items']
+        ]
+        pending.append(PendingOrder(index, data, customer, lines))
+
+    return pending, errors
+
+
+def _write(pending, user):
+    now = timezone.now()
+    today = timezone.localdate()
+
+    # Invoices first: their invoice_number is generated here, which lets us
+    # read back their ids on backends where bulk_create does not return them
+    invoices = [
+        Invoice(
+            user=user,
+            customer=entry.customer,
+            issue_date=today,
+            due_date=today + timedelta(days=30),
+            # Order creation always issues a receipt, which marks the invoice paid
+            status='paid',
+            total_amount=entry.invoice_total,
+            invoice_number=uuid.uuid4()
+        )
+        for entry in pending
+    ]
+    Invoice.objects.bulk_create(invoices, batch_size=BULK_CREATE_BATCH_SIZE)
+    invoice_ids = dict(Invoice.objects.filter(
+        invoice_number__in=[invoice.invoice_number for invoice in invoices]
+    ).values_list('invoice_number', 'id'))
+    for entry, invoice in zip(pending, invoices):
+        invoice.pk = invoice_ids[invoice.invoice_number]
+        entry.invoice = invoice
+
+    orders = [
+        Order(
+            user=user,
+            sales_rep=user,
+            customer=entry.customer,
+            order_date=now,
+            status=entry.data.get('status', 'pending'),
+            is_paid=entry.data['is_paid'],
+            special_instructions=entry.data['special_instructions'],
+            transaction_category=entry.data['transaction_category'],
+            # Items are bulk-created below without their save() deltas
+            total_amount=entry.total,
+            invoice=entry.invoice
+        )
+        for entry in pending
+    ]
+    Order.objects.bulk_create(orders, batch_size=BULK_CREATE_BATCH_SIZE)
+    order_ids = dict(Order.objects.filter(invoice_id__in=invoice_ids.values()).values_list('invoice_id', 'id'))
+    for entry, order in zip(pending, orders):
+        order.pk = order_ids[entry.invoice.pk]
+        entry.order = order
+
+    order_items, invoice_items, adjustments = [], [], []
+    for entry in pending:
+        for product, quantity, unit_price in entry.lines:
+            order_items.append(OrderItem(order=entry.order, product=product, quantity=quantity, unit_price=unit_price))
+            invoice_items.append(InvoiceItem(
+                invoice=entry.invoice, product=product, description=product.name,
+                quantity=quantity, unit_price=product.price
+            ))
+            adjustments.append(StockAdjustment(
+                product=product,
+                quantity=-quantity,
+                adjusted_by=user,
+                adjustment_type='REMOVE',
+                reason=f"Order #{entry.order.pk} - Item: {product.name}"
+            ))
+    OrderItem.objects.bulk_create(order_items, batch_size=BULK_CREATE_BATCH_SIZE)
+    InvoiceItem.objects.bulk_create(invoice_items, batch_size=BULK_CREATE_BATCH_SIZE)
+    # One stock UPDATE per product for the whole batch
+    ledger.record_adjustments(adjustments, batch_size=BULK_CREATE_BATCH_SIZE)
+
+    Receipt.objects.bulk_create([
+        Receipt(
+            user=user,
+            invoice=entry.invoice,
+            amount_paid=entry.invoice.total_amount,
+            payment_date=today,
+            payment_method='online',
+            notes=f"Automatically generated receipt for Order #{entry.order.pk}"
+        )
+        for entry in pending
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+
+    fulfilled = [
+        Transaction(
+            order=entry.order,
+            customer=entry.customer,
+            transaction_type='income',
+            amount=entry.total,
+            date=today,
+            payment_method='other',
+            status='completed',
+            category='income',
+            created_by=user
+        )
+        for entry in pending if entry.order.status in FULFILLED_STATUSES
+    ]
+    if fulfilled:
+        Transaction.objects.bulk_create(fulfilled, batch_size=BULK_CREATE_BATCH_SIZE)
+        # bulk_create skips the rollup signals
+        deltas = defaultdict(lambda: [Decimal('0.00'), 0])
+        for row in fulfilled:
+            entry = deltas[rollups.rollup_key(row)]
+            entry[0] += row.amount
+            entry[1] += 1
+        rollups.apply_deltas(deltas)
+
+
+def ingest_orders(orders_data, user):
+    """
+    Create every valid order in ``orders_data``. Returns ``(created, errors)``
+    where ``created`` lists ``{'index', 'order_id', 'invoice_id', 'total'}``
+    and ``errors`` lists ``{'index', 'errors'}``.
+    """
+    valid, errors = _validate_shapes(orders_data)
+    if not valid:
+        return [], errors
+
+    product_ids = {item['product'] for _, data in valid for item in data['items']}
+    customer_ids = {data['customer_id'] for _, data in valid}
+
+    with transaction.atomic():
+        # Lock in primary key order so concurrent batches cannot deadlock
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+        }
+        customers = Customer.objects.in_bulk(customer_ids)
+
+        pending, plan_errors = _plan(valid, products, customers, user)
+        errors.extend(plan_errors)
+        if pending:
+            _write(pending, user)
+
+    errors.sort(key=lambda error: error['index'])
+    created = [
+        {
+            'index': entry.index,
+            'order_id': entry.order.pk,
+            'invoice_id': entry.invoice.pk,
+            'total': str(entry.total),
+        }
+        for entry in pending
+    ]
+    logger.info(f"Bulk ingested {len(created)} orders for {user.username}, {len(errors)} rejected")
+    return created, errors
@@ -0,0 +1,322 @@
+"""
+In-memory trigram index for product and customer lookup.
+
+Product and customer search used ``icontains`` filters, which MySQL runs as
+leading-wildcard ``LIKE`` scans over the whole table, and callers that needed
+one product took an arbitrary ``first()`` match. The indexes here map each
+trigram of a row's searchable text to the rows containing it:
+
+* ``product_index``: name, SKU, barcode and category name.
+* ``customer_index``: first name, last name and email.
+
+A query is split into trigrams the same way (words padded as in pg_trgm, so
+``"lap"`` yields ``"  l"``, ``" la"``, ``"lap"`` and ``"ap "``) and each row is
+scored by the share of the query's trigrams it contains; rows containing the
+whole query as a substring score 1. Ties are broken by trigram similarity
+with the row's text, which favours shorter, closer names. Rows scoring below
+``LOOKUP_INDEX_MIN_SCORE`` are not returned, so typos still match but
+unrelated rows do not.
+
+The index holds primary keys only. ``TrigramIndex.filter`` applies the
+matches to a queryset, so permission filters, ``is_active`` checks and
+deleted rows are still decided by the database, before the result limit.
+
+Each process builds its index on first use and keeps it current:
+
+* ``post_save``/``post_delete`` receivers in ``core.signals`` refresh the
+  changed rows of an index that has been built.
+* Every ``LOOKUP_INDEX_SYNC_INTERVAL`` seconds a search first re-reads rows
+  modified since the last sync, which picks up writes from other processes
+  (the Rasa action server, other web workers).
+* The index is rebuilt after ``LOOKUP_INDEX_MAX_AGE`` seconds, which also
+  picks up category renames made elsewhere.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_INDEX_SYNC_INTERVAL = getattr(settings, 'LOOKUP_INDEX_SYNC_INTERVAL', 30)
+LOOKUP_INDEX_MAX_AGE = getattr(settings, 'LOOKUP_INDEX_MAX_AGE', 60 * 60)
+LOOKUP_INDEX_MIN_SCORE = getattr(settings, 'LOOKUP_INDEX_MIN_SCORE', 0.3)
+# Matches returned to list endpoints, best first
+LOOKUP_INDEX_MAX_RESULTS = getattr(settings, 'LOOKUP_INDEX_MAX_RESULTS', 100)
+# Candidates ranked exactly per requested result
+CANDIDATES_PER_RESULT = 20
+# Growth of the match window while a filtered queryset rejects matches
+OVERFETCH_FACTOR = 4
+LOAD_CHUNK_SIZE = 2000
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+Match = namedtuple('Match', ['pk', 'score'])
+
+
+def normalize(text):
+    """Lower case words separated by single spaces."""
+    return _SEPARATORS.sub(' ', str(text).lower()).strip()
+
+
+def trigrams(text):
+    """The set of trigrams of ``text``, each word padded with two leading and one trailing space."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class Catalog:
+    """
+    Postings for one snapshot of an index. Rows live in dense slots; an
+    update appends a new slot and marks the old one dead, so postings are
+    append-only and never need to be searched for removals.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.pks = []
+        self.texts = []
+        self.sizes = array('i')
+        self.alive = bytearray()
+        self.slots = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self, pk, text):
+        self.remove(pk)
+        slot = len(self.pks)
+        grams = trigrams(text)
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('i')
+            posting.append(slot)
+        self.pks.append(pk)
+        self.texts.append(text)
+        self.sizes.append(len(grams))
+        self.alive.append(1)
+        self.slots[pk] = slot
+
+    def remove(self, pk):
+        slot = self.slots.pop(pk, None)
+        if slot is not None:
+            self.alive[slot] = 0
+            self.pks[slot] = self.texts[slot] = None
+            self.dead += 1
+
+    def compacted(self):
+        """A copy without dead slots."""
+        catalog = Catalog()
+        for pk, slot in self.slots.items():
+            catalog.add(pk, self.texts[slot])
+        return catalog
+
+    def match(self, query, limit, min_score):
+        grams = trigrams(query)
+        postings = [np.frombuffer(self.postings[gram], dtype=np.intc) for gram in grams if gram in self.postings]
+        if not postings:
+            return []
+
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.pks))
+        counts *= np.frombuffer(self.alive, dtype=np.uint8)
+        candidates = np.flatnonzero(counts >= max(1, math.ceil(len(grams) * min_score)))
+        keep = limit * CANDIDATES_PER_RESULT
+        if len(candidates) > keep:
+            candidates = candidates[np.argpartition(-counts[candidates], keep)[:keep]]
+
+        needle = normalize(query)
+        ranked = []
+        for slot in candidates.tolist():
+            hits = int(counts[slot])
+            score = 1.0 if needle in self.texts[slot] else hits / len(grams)
+            similarity = hits / (len(grams) + self.sizes[slot] - hits)
+            ranked.append((-score, -similarity, self.pks[slot]))
+        ranked.sort()
+        return [Match(pk, -score) for score, _, pk in ranked[:limit]]
+
+
+class TrigramIndex:
+    """
+    A lazily built, incrementally refreshed trigram index over one model.
+    Subclasses name the model, the searchable ``fields`` and the
+    ``modified_field`` used to find rows changed by other processes.
+    """
+    fields = ()
+    modified_field = None
+
+    def __init__(self, sync_interval=LOOKUP_INDEX_SYNC_INTERVAL, max_age=LOOKUP_INDEX_MAX_AGE,
+                 min_score=LOOKUP_INDEX_MIN_SCORE):
+        self.sync_interval = sync_interval
+        self.max_age = max_age
+        self.min_score = min_score
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.clear()
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def clear(self):
+        """Forget the index; the next search rebuilds it."""
+        with self.lock:
+            self.catalog = Catalog()
+            self.built_at = self.synced_at = None
+            self.watermark = None
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def build(self):
+        """Load every row into a fresh catalog and swap it in."""
+        started = time.perf_counter()
+        catalog = Catalog()
+        watermark = None
+        built_at = time.monotonic()
+        rows = self.get_queryset().values_list('pk', self.modified_field, *self.fields)
+        for pk, modified, *values in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            catalog.add(pk, self.document(values))
+            if modified is not None and (watermark is None or modified > watermark):
+                watermark = modified
+        with self.lock:
+            self.catalog = catalog
+            self.watermark = watermark
+            self.built_at = self.synced_at = built_at
+        logger.info(
+            f"Built {type(self).__name__} with {len(catalog)} rows in "
+            f"{(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def sync(self):
+        """Re-read the rows modified since the last build or sync."""
+        synced_at = time.monotonic()
+        rows = self.get_queryset()
+        if self.watermark is not None:
+            rows = rows.filter(**{f'{self.modified_field}__gte': self.watermark})
+        self._apply(rows, advance_watermark=True)
+        self.synced_at = synced_at
+
+    def refresh(self, pks):
+        """Re-read ``pks``, dropping rows that no longer exist. A no-op until the index is built."""
+        if not self.is_built:
+            return
+        pks = list(pks)
+        found = self._apply(self.get_queryset().filter(pk__in=pks))
+        with self.lock:
+            for pk in set(pks) - found:
+                self.catalog.remove(pk)
+
+    def remove(self, pk):
+        with self.lock:
+            self.catalog.remove(pk)
+
+    def ensure_current(self):
+        now = time.monotonic()
+        if self.built_at is not None and now - self.built_at < self.max_age:
+            if now - self.synced_at >= self.sync_interval:
+                with self.build_lock:
+                    if time.monotonic() - self.synced_at >= self.sync_interval:
+                        self.sync()
+            return
+        with self.build_lock:
+            if self.built_at is None or time.monotonic() - self.built_at >= self.max_age:
+                self.build()
+
+    def search(self, query, limit=10, min_score=None):
+        """The best ``limit`` matches for ``query`` as ``Match(pk, score)``, best first."""
+        if not query or not normalize(query):
+            return []
+        self.ensure_current()
+        with self.lock:
+            return self.catalog.match(query, limit, self.min_score if min_score is None else min_score)
+
+    def filter(self, queryset, query, limit=LOOKUP_INDEX_MAX_RESULTS, min_score=None):
+        """
+        ``queryset`` restricted to its best ``limit`` matches for ``query``
+        and ordered best first. Matches the queryset excludes (inactive or
+        out of scope rows) do not use up the limit: more are fetched until
+        ``limit`` rows survive or the matches run out.
+        """
+        fetch = limit
+        allowed = set()
+        checked = set()
+        while True:
+            matches = self.search(query, limit=fetch, min_score=min_score)
+            unchecked = [match.pk for match in matches if match.pk not in checked]
+            allowed.update(queryset.filter(pk__in=unchecked).order_by().values_list('pk', flat=True))
+            checked.update(unchecked)
+            survivors = [match for match in matches if match.pk in allowed]
+            if len(survivors) >= limit or len(matches) < fetch:
+                return rank_queryset(queryset, survivors[:limit])
+            fetch *= OVERFETCH_FACTOR
+
+    def document(self, values):
+        return normalize(' '.join(str(value) for value in values if value))
+
+    def _apply(self, rows, advance_watermark=False):
+        """
+        Index ``rows``; returns the primary keys seen. Only a sync advances
+        the watermark: a refresh of locally saved rows must not skip older
+        changes made by other processes.
+        """
+        seen = set()
+        watermark = self.watermark
+        updates = []
+        for pk, modified, *values in rows.values_list('pk', self.modified_field, *self.fields):
+            updates.append((pk, self.document(values)))
+            seen.add(pk)
+            if modified is not None and (watermark is None or modified > watermark):
+                watermark = modified
+        with self.lock:
+            for pk, text in updates:
+                self.catalog.add(pk, text)
+            if advance_watermark:
+                self.watermark = watermark
+            if self.catalog.dead > max(len(self.catalog), 1000):
+                self.catalog = self.catalog.compacted()
+        return seen
+
+
+def rank_queryset(queryset, matches):
+    """``queryset`` limited to ``matches`` in their order."""
+    if not matches:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=match.pk, then=Value(position)) for position, match in enumerate(matches)],
+        output_field=IntegerField()
+    )
+    return queryset.filter(pk__in=[match.pk for match in matches]).order_by(rank)
+
+
+class ProductIndex(TrigramIndex):
+    fields = ('name', 'sku', 'barcode', 'category__name')
+    modified_field = 'modified_at'
+
+    def get_queryset(self):
+        from products.models import Product
+        return Product.objects.all()
+
+
+class CustomerIndex(TrigramIndex):
+    fields = ('first_name', 'last_name', 'email')
+    modified_field = 'modified'
+
+    def get_queryset(self):
+        from .models import Customer
+        return Customer.objects.all()
+
+
+product_index = ProductIndex()
+customer_index = CustomerIndex()
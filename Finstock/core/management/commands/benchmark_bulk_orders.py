@@ -0,0 +1,83 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from core.bulk_orders import ingest_orders
+from core.models import Customer
+from core.serializers import OrderSerializer
+from products.models import Product
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-order creation with bulk ingestion; every write is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='User to create the orders as')
+        parser.add_argument('--orders', type=int, default=100, help='Orders per run')
+        parser.add_argument('--items', type=int, default=3, help='Items per order')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        customer = Customer.objects.first()
+        products = list(Product.objects.filter(stock__gte=options['orders']).order_by('pk')[:options['items']])
+        if customer is None or len(products) < options['items']:
+            raise CommandError(
+                f"Need a customer and {options['items']} products with at least {options['orders']} in stock"
+            )
+
+        payload = [
+            {
+                'customer_id': customer.pk,
+                'items': [
+                    {'product': product.pk, 'quantity': 1, 'unit_price': str(product.price)}
+                    for product in products
+                ],
+            }
+            for _ in range(options['orders'])
+        ]
+
+        self.stdout.write(f"{options['orders']} orders x {options['items']} items as {user.username}")
+        self._report('per-order serializer', lambda: self._legacy(payload, user))
+        self._report('bulk ingest', lambda: ingest_orders(payload, user))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _legacy(self, payload, user):
+        request = APIRequestFactory().post('/')
+        request.user = user
+        for data in payload:
+            serializer = OrderSerializer(data=data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=user, sales_rep=user)
+
+    def _report(self, label, func):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), connection.execute_wrapper(count):
+                func()
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(
+            f'  {label:<22} {elapsed:7.2f}s {queries:>7} queries'
+        )
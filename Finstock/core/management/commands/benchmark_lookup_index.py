@@ -0,0 +1,79 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.lookup_index import ProductIndex
+from products.models import Category, Product
+
+ADJECTIVES = ['wireless', 'compact', 'premium', 'portable', 'smart', 'classic', 'heavy duty', 'ultra', 'mini', 'pro']
+NOUNS = ['laptop', 'mouse', 'keyboard', 'monitor', 'speaker', 'charger', 'cable', 'router', 'printer', 'headset',
+         'tablet', 'camera', 'drill', 'lamp', 'kettle', 'blender', 'backpack', 'jacket', 'bottle', 'notebook']
+QUERIES = ['wireless mouse', 'laptp', 'smart kettle 7', 'heavy duty drill', 'SKU-004217', 'headset', 'portable charger x']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare product lookups through the trigram index with icontains LIKE scans; every write is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Products in the synthetic catalog')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--limit', type=int, default=10, help='Matches fetched per lookup')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _run(self, options):
+        rng = random.Random(0)
+        categories = [Category.objects.create(name=f'Benchmark {noun}') for noun in NOUNS[:8]]
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.randint(1, 99)}',
+                    sku=f'SKU-{i:06d}', barcode=f'BENCH{i:08d}', price=10, stock=rng.randint(0, 500),
+                    category=rng.choice(categories)
+                )
+                for i in range(options['products'])
+            ],
+            batch_size=5000
+        )
+
+        index = ProductIndex()
+        started = time.perf_counter()
+        index.build()
+        self.stdout.write(f"{options['products']} products, index built in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(f"  {'query':<22} {'LIKE ms':>9} {'index ms':>9}")
+
+        limit = options['limit']
+        for query in QUERIES:
+            like = self._time(options['repeat'], lambda: list(
+                Product.objects.filter(
+                    Q(name__icontains=query) | Q(description__icontains=query) | Q(sku__icontains=query)
+                ).values_list('pk', flat=True)[:limit]
+            ))
+            indexed = self._time(options['repeat'], lambda: list(
+                index.filter(Product.objects.all(), query, limit=limit).values_list('pk', flat=True)
+            ))
+            self.stdout.write(f'  {query:<22} {like:9.2f} {indexed:9.2f}')
+
+    @staticmethod
+    def _time(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
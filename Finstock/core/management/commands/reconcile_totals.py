@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core import totals
+from core.models import Order, OrderItem
+from invoices.models import Invoice, InvoiceItem
+
+TOTALLED_MODELS = (
+    ('order', Order, OrderItem, 'order'),
+    ('invoice', Invoice, InvoiceItem, 'invoice'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare stored order and invoice totals with the sum of their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Recompute mismatched totals from their items')
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        for label, parent_model, item_model, parent_field in TOTALLED_MODELS:
+            discrepancies = totals.find_discrepancies(parent_model, item_model, parent_field)
+            mismatched += len(discrepancies)
+            for pk, stored, computed in discrepancies:
+                self.stdout.write(f"{label.capitalize()} {pk}: stored {stored:.2f}, items {computed:.2f}")
+
+            if discrepancies and options['fix']:
+                updated = totals.reconcile(parent_model, item_model, parent_field, pks=[row[0] for row in discrepancies])
+                self.stdout.write(self.style.SUCCESS(f"Recomputed {updated} {label} totals"))
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Stored totals match their items'))
+        elif not options['fix']:
+            self.stdout.write(self.style.WARNING(f"{mismatched} totals differ from their items"))
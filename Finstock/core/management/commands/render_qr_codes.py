@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import qr_pipeline
+
+
+class Command(BaseCommand):
+    help = 'Render missing or outdated QR code images in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help=f"Model to render, e.g. products.Product; repeatable. Defaults to all of: {', '.join(qr_pipeline.QR_MODELS)}"
+        )
+        parser.add_argument('--force', action='store_true', help='Re-render even when the payload is unchanged')
+        parser.add_argument('--missing-only', action='store_true', help='Only rows without an image')
+        parser.add_argument('--batch-size', type=int, default=qr_pipeline.QR_RENDER_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=qr_pipeline.QR_RENDER_WORKERS,
+            help='Render processes; 0 renders in this process'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['models'] or list(qr_pipeline.QR_MODELS)
+        unknown = [label for label in labels if label not in qr_pipeline.QR_MODELS]
+        if unknown:
+            raise CommandError(f"Unknown QR model(s): {', '.join(unknown)}")
+
+        pool = qr_pipeline.create_pool(options['workers'])
+        try:
+            for label in labels:
+                self._render_model(label, options, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS('QR rendering complete'))
+
+    def _render_model(self, label, options, pool):
+        queryset = qr_pipeline.qr_queryset(label)
+        if options['missing_only']:
+            field = queryset.model.QR_FIELD
+            queryset = queryset.filter(**{f'{field}__in': ['', None]})
+
+        total = queryset.count()
+        self.stdout.write(f"{label}: {total} rows")
+        done = rendered = skipped = 0
+        last_pk = 0
+        started = time.perf_counter()
+
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            batch_rendered, batch_skipped = qr_pipeline.render_instances(batch, force=options['force'], pool=pool)
+            done += len(batch)
+            rendered += batch_rendered
+            skipped += batch_skipped
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {done}/{total} ({done * 100 // max(total, 1)}%) "
+                f"rendered {rendered}, unchanged {skipped}, {done / elapsed:,.0f} rows/s"
+            )
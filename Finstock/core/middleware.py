@@ -1,15 +1,23 @@
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
-from django.utils import timezone
-from .models import Visit
-from django_user_agents.utils import get_user_agent
+from contextlib import ExitStack
+from . import visits
+import json
 import logging
+import random
+import time
 
 logger = logging.getLogger(__name__)
+request_logger = logging.getLogger('core.requests')
 
 
 class VisitTrackingMiddleware(MiddlewareMixin):
     """
     Middleware to track unique visits to the application.
+
+    Visits are queued in ``core.visits.visit_buffer`` and written in batches
+    by a background thread, so requests never wait on the visits table.
     """
     def process_request(self, request):
         try:
@@ -17,29 +25,85 @@ class VisitTrackingMiddleware(MiddlewareMixin):
             if request.path.startswith('/admin/') or request.path.startswith('/static/') or request.path.startswith('/media/'):
                 return
 
-            # Get user agent
-            user_agent_obj = get_user_agent(request)
-
-            # Create or update visit record
-            try:
-                Visit.create_visit(request, user_agent_obj)
-            except Exception as e:
-                logger.error(f"Error tracking visit: {str(e)}")
+            visits.visit_buffer.add(visits.visit_record(request))
 
         except Exception as e:
             logger.error(f"Unexpected error in visit tracking: {str(e)}")
 
 
 class RequestLoggingMiddleware:
+    """
+    Logs one JSON line per request with its timing breakdown:
+    database query count and time, response rendering (serialization) time
+    and total time.
+
+    Only a sample of requests is logged (``REQUEST_LOG_SAMPLE_RATE``).
+    Requests slower than ``REQUEST_LOG_SLOW_MS`` and server errors are always
+    logged, at WARNING. Nothing is formatted for requests that are not
+    logged, and request bodies and headers are never logged.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 0.01)
+        self.slow_ms = getattr(settings, 'REQUEST_LOG_SLOW_MS', 1000)
 
     def __call__(self, request):
-        logger.info(f"Incoming Request: {request.method} {request.path}")
-        logger.info(f"Request Data: {request.POST}")
-        logger.info(f"Request Headers: {request.headers}")
-        
-        response = self.get_response(request)
-        
-        logger.info(f"Response Status: {response.status_code}")
+        timing = RequestTiming()
+        request._request_timing = timing
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.record_query))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        slow = total_ms >= self.slow_ms
+        failed = response.status_code >= 500
+        if slow or failed or random.random() < self.sample_rate:
+            level = logging.WARNING if slow or failed else logging.INFO
+            if request_logger.isEnabledFor(level):
+                request_logger.log(level, '%s', timing.as_json(request, response, total_ms, slow))
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        timing = getattr(request, '_request_timing', None)
+        if timing is not None:
+            timing.render_started = time.perf_counter()
+            response.add_post_render_callback(timing.record_render)
         return response
+
+
+class RequestTiming:
+    """Per-request counters filled in by ``RequestLoggingMiddleware``."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_started = None
+        self.render_seconds = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def record_render(self, response):
+        self.render_seconds = time.perf_counter() - self.render_started
+
+    def as_json(self, request, response, total_ms, slow):
+        user = getattr(request, 'user', None)
+        return json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'db_queries': self.queries,
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'serialize_ms': round(self.render_seconds * 1000, 2),
+            'total_ms': round(total_ms, 2),
+            'slow': slow,
+        }, separators=(',', ':'))
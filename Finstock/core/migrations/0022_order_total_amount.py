@@ -0,0 +1,40 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_total_amount(apps, schema_editor):
+    Order = apps.get_model('core', 'Order')
+    OrderItem = apps.get_model('core', 'OrderItem')
+    output = models.DecimalField(max_digits=10, decimal_places=2)
+    line = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=output)
+    totals = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum(line))
+        .values('total')
+    )
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(totals, output_field=output), Value(Decimal('0.00')), output_field=output)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_order_qr_scanned_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(populate_total_amount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_order_order_status_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['modified'], name='order_modified_idx'),
+        ),
+    ]
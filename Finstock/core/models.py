@@ -1,5 +1,6 @@
 from django.db import models
 from django.db import transaction
+from stock_adjustments import ledger as stock_ledger
 from stock_adjustments.models import StockAdjustment
 from django.db.models.signals import post_save
 from django.core.exceptions import ValidationError
@@ -7,13 +8,10 @@ from django.dispatch import receiver
 from products.models import Product
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Sum, F
-from django.db.models.functions import Coalesce
-from decimal import Decimal
-import hashlib
 import uuid
 import logging
 from core.utils.currency import currency_formatter
+from core import totals
 
 logger = logging.getLogger(__name__)
 
@@ -123,6 +121,7 @@ class Order(TimeStampedModel):
         ('cancelled', 'Cancelled')
     ], default='pending')
     is_paid = models.BooleanField(default=False)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     shipping_address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, related_name='shipping_orders')
     billing_address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, related_name='billing_orders')
     special_instructions = models.TextField(blank=True)
@@ -137,6 +136,16 @@ class Order(TimeStampedModel):
         ('cost_of_services', 'Cost of Services'),
     ], default='income')
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the order list (-order_date, -id)
+            models.Index(fields=['order_date', 'id'], name='order_date_id_idx'),
+            # Fulfilled orders in a date range (top products, sales reports)
+            models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+            # Latest change for the report and chatbot data watermarks
+            models.Index(fields=['modified'], name='order_modified_idx'),
+        ]
+
     def add_scanned_item(self, product_data, quantity=1):
         """Add item scanned via QR code to the order"""
         if not self.qr_scanned_items:
@@ -175,12 +184,8 @@ class Order(TimeStampedModel):
 
     @property
     def total_price(self):
-        logger.info(f"Calculating total price for order {self.id}")
-        total = self.items.aggregate(
-            total=Coalesce(Sum(F('quantity') * F('unit_price')), Decimal('0'))
-        )['total']
-        logger.info(f"Final calculated total price for order {self.id}: {total}")
-        return total
+        # Maintained from item changes by core.totals
+        return self.total_amount
 
     def create_invoice(self):
         from invoices.models import Invoice, InvoiceItem
@@ -215,8 +220,7 @@ class Order(TimeStampedModel):
 
                 logger.info(f"Created invoice item {invoice_item.id} for order item {order_item.id}")
 
-            invoice.update_total_amount()
-            logger.info(f"Updated total amount for invoice {invoice.id}: {invoice.total_amount}")
+            logger.info(f"Total amount for invoice {invoice.id}: {invoice.total_amount}")
 
             self.invoice = invoice
             self.save(update_fields=['invoice'])
@@ -294,6 +298,10 @@ class Order(TimeStampedModel):
         update_fields = kwargs.get('update_fields')
         is_internal_update = update_fields is not None and 'invoice' in update_fields and len(update_fields) == 1
         
+        if not is_new and not args and kwargs.get('update_fields') is None:
+            # total_amount is maintained by item deltas; never write back a stale copy
+            kwargs['update_fields'] = totals.fields_without_total(self)
+
         # Save the order
         super().save(*args, **kwargs)
 
@@ -325,48 +333,56 @@ class Order(TimeStampedModel):
             self._increase_stock()
 
     def _adjust_stock(self, adjustment_type):
-        for item in self.items.all():
+        adjustments = []
+        for item in self.items.select_related('product'):
             if adjustment_type == 'REMOVE':
                 if item.product.stock < item.quantity:
                     raise ValidationError(f"Insufficient stock for product {item.product.name}")
 
-            StockAdjustment.objects.create(
+            adjustments.append(StockAdjustment(
                 product=item.product,
                 quantity=item.quantity,
                 adjusted_by=self.customer.user,
                 adjustment_type=adjustment_type,
                 reason=f"Order {self.id} status changed to {self.status}"
-            )
+            ))
+        stock_ledger.record_adjustments(adjustments)
 
     def _decrease_stock(self):
-        for item in self.items.all():
+        adjustments = []
+        for item in self.items.select_related('product'):
             if item.product.stock < item.quantity:
                 raise ValidationError(f"Insufficient stock for product {item.product.name}")
             
-            StockAdjustment.objects.create(
+            adjustments.append(StockAdjustment(
                 product=item.product,
                 quantity=-item.quantity,
                 adjusted_by=self.customer.user if self.customer.user else None,
                 adjustment_type='REMOVE',
                 reason=f"Order {self.id} status changed to {self.status}"
-            )
+            ))
+        stock_ledger.record_adjustments(adjustments)
 
     def _increase_stock(self):
-        for item in self.items.all():
-            StockAdjustment.objects.create(
+        adjustments = []
+        for item in self.items.select_related('product'):
+            adjustments.append(StockAdjustment(
                 product=item.product,
                 quantity=item.quantity,
                 adjusted_by=self.customer.user if self.customer.user else None,
                 adjustment_type='ADD',
                 reason=f"Order {self.id} status changed from {self.previous_status} to {self.status}"
-            )
+            ))
+        stock_ledger.record_adjustments(adjustments)
 
 @receiver(post_save, sender=Order)
 def order_post_save(sender, instance, created, **kwargs):
     pass
 
 
-class OrderItem(models.Model):
+class OrderItem(totals.TotalTrackingItem, models.Model):
+    TOTAL_PARENT = 'order'
+
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, related_name='order_items', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
@@ -383,9 +399,11 @@ class OrderItem(models.Model):
 
     def total_price(self):
         total = self.quantity * self.unit_price
-        logger.debug(f"Calculated total price for order item {self.id}: {total} (quantity: {self.quantity}, unit_price: {self.unit_price})")
+        logger.debug("Calculated total price for order item %s: %s", self.id, total)
         return total
 
+totals.connect(OrderItem)
+
 class Promotion(models.Model):
     code = models.CharField(max_length=50, unique=True)
     description = models.TextField()
@@ -492,18 +510,16 @@ class Visit(models.Model):
         """
         Class method to create a visit record with consistent logic
         """
-        # Generate session ID
-        unique_string = (
-            f"{request.META.get('HTTP_USER_AGENT', '')}"
-            f"{request.META.get('REMOTE_ADDR', '')}"
-            f"{timezone.now().isoformat()}"
-        )
-        session_id = hashlib.sha256(unique_string.encode()).hexdigest()[:64]
+        from .visits import session_hash
 
         # Get user info and IP
         user = request.user if request.user.is_authenticated else None
         ip_address = cls.get_client_ip(request)
 
+        # Stable per session, so the recent visit check below can match
+        session_key = getattr(getattr(request, 'session', None), 'session_key', None) or (user.pk if user else '')
+        session_id = session_hash(request.META.get('HTTP_USER_AGENT', ''), ip_address, session_key)
+
         # Extract additional metadata
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         referrer_url = request.META.get('HTTP_REFERER', '')
@@ -0,0 +1,155 @@
+"""
+QR images rendered on request from each model's ``qr_payload()``.
+
+Nothing is written to storage: rendered bytes are kept in a small in-process
+LRU keyed by payload hash, format and size, and responses carry an ETag
+built from the same key so clients and caches revalidate with a 304 instead
+of downloading the image again.
+"""
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from PIL import Image
+
+from .qr_pipeline import payload_hash
+
+QR_IMAGE_CACHE_SIZE = getattr(settings, 'QR_IMAGE_CACHE_SIZE', 1024)
+QR_IMAGE_DEFAULT_SIZE = getattr(settings, 'QR_IMAGE_DEFAULT_SIZE', 300)
+QR_IMAGE_MIN_SIZE = 64
+QR_IMAGE_MAX_SIZE = 1024
+# Payloads include customer names and amounts, so shared caches are opt-in
+QR_IMAGE_CACHE_CONTROL = getattr(settings, 'QR_IMAGE_CACHE_CONTROL', {'private': True, 'max_age': 60 * 60 * 24})
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+_SVG_SIZE = re.compile(rb'width="[^"]*" height="[^"]*"')
+
+
+class LRUCache:
+    """A thread-safe mapping that drops the least recently used entry when full."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                return None
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+_cache = LRUCache(QR_IMAGE_CACHE_SIZE)
+
+
+def _qr_image(payload, image_factory=None):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        image_factory=image_factory,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.make_image()
+
+
+def render_image(payload, image_format, size):
+    """Encode ``payload`` as a ``size`` x ``size`` PNG or SVG."""
+    if image_format == 'svg':
+        svg = _qr_image(payload, qrcode.image.svg.SvgPathImage).to_string()
+        # The viewBox keeps the drawing scalable; only the outer size changes
+        return _SVG_SIZE.sub(f'width="{size}" height="{size}"'.encode(), svg, count=1)
+
+    img = _qr_image(payload).get_image().convert('1')
+    img = img.resize((size, size), Image.NEAREST)
+    buffer = BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def get_image(payload, image_format='png', size=QR_IMAGE_DEFAULT_SIZE):
+    """The image bytes for ``payload``, rendering only on an LRU miss."""
+    key = (payload_hash(payload), image_format, size)
+    image = _cache.get(key)
+    if image is None:
+        image = render_image(payload, image_format, size)
+        _cache.set(key, image)
+    return image
+
+
+def image_etag(digest, image_format, size):
+    return f'"{digest[:32]}-{image_format}-{size}"'
+
+
+def parse_size(value):
+    """The requested pixel size, clamped to the supported range."""
+    try:
+        size = int(value) if value else QR_IMAGE_DEFAULT_SIZE
+    except (TypeError, ValueError):
+        raise ValueError("size must be an integer")
+    return max(QR_IMAGE_MIN_SIZE, min(size, QR_IMAGE_MAX_SIZE))
+
+
+def qr_image_response(request, payload, image_format, size, last_modified=None, filename='qr'):
+    """
+    Serve ``payload`` as a QR image, answering conditional requests with 304
+    before anything is rendered when the client's copy is current.
+    """
+    etag = image_etag(payload_hash(payload), image_format, size)
+    last_modified = last_modified.timestamp() if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        image = get_image(payload, image_format, size)
+        response = HttpResponse(image, content_type=CONTENT_TYPES[image_format])
+        response['Content-Disposition'] = f'inline; filename="{filename}.{image_format}"'
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, **QR_IMAGE_CACHE_CONTROL)
+    response['Vary'] = 'Authorization, Cookie'
+    return response
+
+
+def qr_image_url(request, instance, kind, image_format='png'):
+    """
+    URL of ``instance``'s QR image: the stored file when one was rendered,
+    otherwise the on-request endpoint. Absolute when ``request`` is given.
+    """
+    if instance.qr_code:
+        url = instance.qr_code.url
+    else:
+        url = reverse('qr-image', args=[kind, instance.pk, image_format])
+    return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,257 @@
+"""
+Deferred QR code rendering.
+
+Models that carry a QR image no longer render it inside ``save()``. They call
+``enqueue(instance)`` and the configured executor renders it later:
+
+* ``DeferredQRRenderExecutor`` (default) does nothing. QR images are served
+  from ``core.qr_images`` straight from the payload, so stored files are only
+  produced by ``manage.py render_qr_codes`` or on first read through
+  ``ensure_qr`` for callers that need a file.
+* ``BackgroundQRRenderExecutor`` collects primary keys after the transaction
+  commits and renders them in batches on a background thread, handing the
+  CPU-bound PNG encoding to a small process pool.
+* ``SynchronousQRRenderExecutor`` renders inline, as ``save()`` used to.
+  Intended for tests and scripts.
+
+Each render stores a SHA-256 of the encoded payload in ``qr_code_hash``, so
+saves that leave the payload unchanged do not re-render. Readers that need
+the file call ``ensure_qr(instance)``, which renders a missing image on the
+spot and stores it.
+
+A QR model provides ``QR_FIELD`` (the image field name), ``QR_SELECT_RELATED``,
+``qr_payload()``, ``qr_filename(digest)`` and a ``qr_code_hash`` field, and
+may provide ``qr_render_updates()`` for extra columns written with the image.
+``qr_filename`` may ignore the digest to keep one file name per row.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import qrcode
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QR_RENDER_EXECUTOR = 'core.qr_pipeline.DeferredQRRenderExecutor'
+QR_RENDER_WORKERS = getattr(settings, 'QR_RENDER_WORKERS', 2)
+QR_RENDER_BATCH_SIZE = getattr(settings, 'QR_RENDER_BATCH_SIZE', 200)
+# How long the background thread waits after the first submission so that
+# saves made close together are rendered as one batch
+QR_RENDER_BATCH_DELAY = getattr(settings, 'QR_RENDER_BATCH_DELAY', 0.5)
+
+QR_MODELS = (
+    'products.Product',
+    'stock_adjustments.StockAdjustment',
+    'invoices.Invoice',
+    'receipts.Receipt',
+    'transactions.TransactionQRCode',
+)
+
+
+def payload_hash(payload):
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_png(payload):
+    """Encode ``payload`` as a QR PNG. Runs in pool worker processes."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _store(instance, digest, png):
+    field = getattr(instance, instance.QR_FIELD)
+    # Delete first so that models with a fixed file name keep it
+    if field.name:
+        field.storage.delete(field.name)
+    field.save(instance.qr_filename(digest), ContentFile(png), save=False)
+
+    instance.qr_code_hash = digest
+    updates = {instance.QR_FIELD: field.name, 'qr_code_hash': digest}
+    if hasattr(instance, 'qr_render_updates'):
+        updates.update(instance.qr_render_updates())
+    # update() rather than save(): saving would enqueue the instance again
+    type(instance).objects.filter(pk=instance.pk).update(**updates)
+
+
+def render_instances(instances, force=False, pool=None):
+    """
+    Render and store QR images for ``instances``, skipping those whose
+    payload hash matches the stored image unless ``force`` is set.
+    Returns ``(rendered, skipped)``.
+    """
+    jobs = []
+    skipped = 0
+    for instance in instances:
+        payload = instance.qr_payload()
+        digest = payload_hash(payload)
+        if not force and instance.qr_code_hash == digest and getattr(instance, instance.QR_FIELD).name:
+            skipped += 1
+            continue
+        jobs.append((instance, payload, digest))
+
+    if not jobs:
+        return 0, skipped
+
+    payloads = [payload for _, payload, _ in jobs]
+    if pool is not None and len(jobs) > 1:
+        images = pool.map(render_png, payloads, chunksize=max(1, len(payloads) // (QR_RENDER_WORKERS * 4)))
+    else:
+        images = map(render_png, payloads)
+
+    for (instance, _, digest), png in zip(jobs, images):
+        _store(instance, digest, png)
+    return len(jobs), skipped
+
+
+def qr_queryset(label):
+    model = apps.get_model(label)
+    return model.objects.select_related(*model.QR_SELECT_RELATED).order_by('pk')
+
+
+def render_pending(label, pks, force=False, pool=None, batch_size=QR_RENDER_BATCH_SIZE):
+    """Load and render the ``label`` rows with primary keys ``pks``."""
+    pks = sorted(pks)
+    rendered = skipped = 0
+    for start in range(0, len(pks), batch_size):
+        batch = list(qr_queryset(label).filter(pk__in=pks[start:start + batch_size]))
+        batch_rendered, batch_skipped = render_instances(batch, force=force, pool=pool)
+        rendered += batch_rendered
+        skipped += batch_skipped
+    return rendered, skipped
+
+
+def ensure_qr(instance):
+    """
+    The instance's QR image field, rendering it first if the file is missing.
+    """
+    field = getattr(instance, instance.QR_FIELD)
+    if field.name and field.storage.exists(field.name):
+        return field
+    logger.info(f"Rendering missing QR code for {instance._meta.label} {instance.pk} on demand")
+    render_instances([instance], force=True)
+    return getattr(instance, instance.QR_FIELD)
+
+
+def create_pool(max_workers=QR_RENDER_WORKERS):
+    """
+    A process pool for ``render_png``. Workers are spawned rather than
+    forked, so they never inherit the parent's database connections.
+    """
+    if max_workers < 1:
+        return None
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class QRRenderExecutor:
+    """
+    Executors decide when and where enqueued QR images are rendered.
+    ``schedule`` is called from ``save()``, inside the caller's transaction.
+    """
+
+    def schedule(self, instance):
+        raise NotImplementedError
+
+
+class SynchronousQRRenderExecutor(QRRenderExecutor):
+    """Renders inline, inside ``save()``. Intended for tests and scripts."""
+
+    def schedule(self, instance):
+        render_instances([instance])
+
+
+class DeferredQRRenderExecutor(QRRenderExecutor):
+    """
+    Leaves images for ``manage.py render_qr_codes`` and on-demand rendering.
+    """
+
+    def schedule(self, instance):
+        pass
+
+
+class BackgroundQRRenderExecutor(QRRenderExecutor):
+    """
+    Renders committed rows in batches on a daemon thread inside the web
+    process, with PNG encoding spread over a process pool.
+    """
+
+    def __init__(self, max_workers=QR_RENDER_WORKERS, batch_delay=QR_RENDER_BATCH_DELAY):
+        self.max_workers = max_workers
+        self.batch_delay = batch_delay
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pool = None
+
+    def schedule(self, instance):
+        label, pk = instance._meta.label, instance.pk
+        transaction.on_commit(lambda: self.submit(label, pk))
+
+    def submit(self, label, pk):
+        with self.lock:
+            self.pending.setdefault(label, set()).add(pk)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='qr-render', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.batch_delay)
+            self.wakeup.clear()
+            with self.lock:
+                pending, self.pending = self.pending, {}
+
+            close_old_connections()
+            if self.pool is None:
+                self.pool = create_pool(self.max_workers)
+            for label, pks in pending.items():
+                try:
+                    rendered, skipped = render_pending(label, pks, pool=self.pool)
+                    logger.info(f"Rendered {rendered} {label} QR codes, {skipped} unchanged")
+                except Exception as e:
+                    logger.error(f"Background QR rendering for {label} failed: {str(e)}", exc_info=True)
+            close_old_connections()
+
+
+_executor = None
+_executor_path = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    The process-wide executor named by ``settings.QR_RENDER_EXECUTOR``.
+    """
+    global _executor, _executor_path
+    path = getattr(settings, 'QR_RENDER_EXECUTOR', DEFAULT_QR_RENDER_EXECUTOR)
+    with _executor_lock:
+        if _executor is None or _executor_path != path:
+            _executor = import_string(path)()
+            _executor_path = path
+        return _executor
+
+
+def enqueue(instance):
+    """Schedule a QR render for a saved ``instance``."""
+    get_executor().schedule(instance)
@@ -3,6 +3,7 @@ from django.db import transaction
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.core.exceptions import ObjectDoesNotExist
 from products.models import Product
+from stock_adjustments import ledger
 from stock_adjustments.models import StockAdjustment
 from products.serializers import ProductSerializer
 from transactions.serializers import TransactionSerializer
@@ -23,7 +24,7 @@ logger = logging.getLogger(__name__)
 
 class ProductPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
     def to_internal_value(self, data):
-        logger.debug(f"Attempting to fetch product with id: {data}")
+        logger.debug("Attempting to fetch product with id: %s", data)
         try:
             return self.get_queryset().get(pk=data)
         except ObjectDoesNotExist:
@@ -110,7 +111,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return value
 
     def to_internal_value(self, data):
-        logger.debug(f"OrderItemSerializer to_internal_value called with data: {data}")
+        logger.debug("OrderItemSerializer to_internal_value called with data: %s", data)
         product_data = data.get('product')
         if isinstance(product_data, dict):
             data['product'] = product_data.get('id')
@@ -142,7 +143,7 @@ class OrderSerializer(serializers.ModelSerializer):
         queryset=Customer.objects.all(), source='customer'
     )
     items = OrderItemSerializer(many=True)
-    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(source='total_amount', max_digits=10, decimal_places=2, read_only=True)
     previous_status = serializers.CharField(read_only=True)
     invoice = InvoiceSerializer(read_only=True)
     sales_rep = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -171,7 +172,7 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'sales_rep', 'qr_scanned_items']
 
     def to_internal_value(self, data):
-        logger.debug(f"OrderSerializer to_internal_value called with data: {data}")
+        logger.debug("OrderSerializer to_internal_value called with data: %s", data)
         return super().to_internal_value(data)
 
     def validate(self, attrs):
@@ -203,11 +204,8 @@ class OrderSerializer(serializers.ModelSerializer):
                     'status': 'You are not authorized to change order status.'
                 })
 
-    def get_total_price(self, obj):
-        return sum(item.quantity * item.unit_price for item in obj.items.all())
-
     def validate_items(self, value):
-        logger.debug(f"OrderSerializer validate_items called with value: {value}")
+        logger.debug("OrderSerializer validate_items called with value: %s", value)
         return value
 
     @transaction.atomic
@@ -220,19 +218,23 @@ class OrderSerializer(serializers.ModelSerializer):
         logger.info(f"Initial order {order.id} created")
 
         total_amount = Decimal('0')
+        adjustments = []
     
         for item_data in items_data:
             order_item = OrderItem.objects.create(order=order, **item_data)
             total_amount += order_item.quantity * order_item.unit_price
 
-            StockAdjustment.objects.create(
+            adjustments.append(StockAdjustment(
                 product=order_item.product,
                 quantity=-order_item.quantity,
                 adjusted_by=user,
                 adjustment_type='REMOVE',
                 reason=f"Order #{order.id} - Item: {order_item.product.name}"
-            )
-            logger.info(f"Created stock adjustment for order {order.id}, item {order_item.product.name}")
+            ))
+
+        # One stock UPDATE per product for the whole order
+        ledger.record_adjustments(adjustments)
+        logger.info(f"Created {len(adjustments)} stock adjustments for order {order.id}")
 
         # Create invoice in this transaction
         invoice = order.create_invoice()
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Order
+from .models import Customer, Order
+from .lookup_index import customer_index, product_index
+from products.models import Category, Product
 from decimal import Decimal
 from transactions.models import Transaction
 from django.db import transaction
@@ -70,3 +72,30 @@ def create_transaction_from_order(order):
     except Exception as e:
         logger.error(f"Failed to create transaction for order {order.id}: {str(e)}")
         raise
+
+
+@receiver(post_save, sender=Product)
+def product_index_post_save(sender, instance, **kwargs):
+    product_index.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_index_post_delete(sender, instance, **kwargs):
+    product_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def category_index_post_save(sender, instance, created, **kwargs):
+    # Products are indexed under their category name
+    if not created and product_index.is_built:
+        product_index.refresh(Product.objects.filter(category=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Customer)
+def customer_index_post_save(sender, instance, **kwargs):
+    customer_index.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Customer)
+def customer_index_post_delete(sender, instance, **kwargs):
+    customer_index.remove(instance.pk)
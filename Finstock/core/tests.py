@@ -1,5 +1,34 @@
-from django.test import TestCase
-from .models import Address
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+
+from invoices.models import Invoice, InvoiceItem
+from products.models import Category, Product
+from receipts.models import Receipt
+from reports.models import Report, ReportAccessLog
+from stock_adjustments.models import StockAdjustment
+from transactions.models import Transaction, TransactionDailyRollup
+from users.constants import PermissionConstants
+from users.models import Permission, Role
+from . import lookup_index, qr_images, qr_pipeline, visits
+from .middleware import VisitTrackingMiddleware
+from .models import Address, Customer, Order, OrderItem, Visit
+from .utils.currency import currency_formatter
+from .utils.query_plans import full_table_scans
 
 
 class AddressModelTest(TestCase):
@@ -21,3 +50,746 @@ class AddressModelTest(TestCase):
         self.assertEqual(self.address.state, 'Anystate')
         self.assertEqual(self.address.postal_code, '12345')
         self.assertEqual(self.address.country, 'Anycountry')
+
+
+class BulkOrderIngestTest(TestCase):
+    """
+    Tests that bulk order creation writes the same rows as the per-order
+    path, checks stock across the whole batch and reports bad orders.
+    """
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='rep', password='testpass123')
+        role = Role.objects.create(name='Sales Representative')
+        for name in (PermissionConstants.ORDER_CREATE, PermissionConstants.ORDER_EDIT,
+                     PermissionConstants.TRANSACTION_CREATE):
+            role.permissions.add(Permission.objects.create(name=name))
+        self.user.roles.add(role)
+
+        category = Category.objects.create(name='Hardware')
+        self.widget = Product.objects.create(
+            name='Widget', sku='W-1', price=Decimal('10.00'), stock=5, category=category
+        )
+        self.gadget = Product.objects.create(
+            name='Gadget', sku='G-1', price=Decimal('4.50'), stock=100, category=category
+        )
+        self.customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('order-bulk')
+
+    def order(self, **overrides):
+        data = {
+            'customer_id': self.customer.pk,
+            'items': [
+                {'product': self.widget.pk, 'quantity': 2},
+                {'product': self.gadget.pk, 'quantity': 3},
+            ],
+        }
+        data.update(overrides)
+        return data
+
+    def test_creates_orders_with_related_rows(self):
+        response = self.client.post(self.url, [self.order(), self.order(status='delivered')], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual(response.data['created'][0]['total'], '33.50')
+
+        order = Order.objects.get(pk=response.data['created'][1]['order_id'])
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(order.invoice.total_amount, Decimal('33.50'))
+        self.assertEqual(order.invoice.status, 'paid')
+        self.assertEqual(order.invoice.items.count(), 2)
+        self.assertEqual(Receipt.objects.get(invoice=order.invoice).amount_paid, Decimal('33.50'))
+        self.assertEqual(Transaction.objects.get(order=order).amount, Decimal('33.50'))
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(StockAdjustment.objects.filter(reason__startswith=f"Order #{order.pk} ").count(), 2)
+
+        rollup = TransactionDailyRollup.objects.get(transaction_type='income', status='completed')
+        self.assertEqual(rollup.total_amount, Decimal('33.50'))
+
+        self.widget.refresh_from_db()
+        self.gadget.refresh_from_db()
+        self.assertEqual(self.widget.stock, 1)
+        self.assertEqual(self.gadget.stock, 94)
+
+    def test_stock_is_consumed_across_the_batch(self):
+        payload = [self.order(), self.order(), self.order()]
+        response = self.client.post(self.url, {'orders': payload}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([entry['index'] for entry in response.data['created']], [0, 1])
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+        self.assertIn('Insufficient stock for product Widget', response.data['errors'][0]['errors']['items'][0])
+        self.widget.refresh_from_db()
+        self.assertEqual(self.widget.stock, 1)
+
+    def test_invalid_orders_are_reported_by_index(self):
+        payload = [
+            self.order(customer_id=999999),
+            self.order(items=[{'product': 999999, 'quantity': 1}]),
+            self.order(items=[]),
+        ]
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([entry['index'] for entry in response.data['errors']], [0, 1, 2])
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, [self.order(status='delivered')], format='json')
+        self.widget.stock = 1000
+        self.widget.save()
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, [self.order(status='delivered') for _ in range(20)], format='json')
+
+        self.assertEqual(Order.objects.count(), 21)
+        self.assertLessEqual(len(large.captured_queries), len(small.captured_queries) + 2)
+
+    def test_requires_create_permission(self):
+        outsider = get_user_model().objects.create_user(username='outsider', password='testpass123')
+        self.client.force_authenticate(outsider)
+        response = self.client.post(self.url, [self.order()], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderTotalsTest(TestCase):
+    """
+    Tests that stored order and invoice totals follow item changes and that
+    list endpoints serve them without aggregating items per row.
+    """
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_superuser(username='admin', password='testpass123', email='admin@example.com')
+        category = Category.objects.create(name='Hardware')
+        self.widget = Product.objects.create(
+            name='Widget', sku='W-1', price=Decimal('10.00'), stock=500, category=category
+        )
+        self.gadget = Product.objects.create(
+            name='Gadget', sku='G-1', price=Decimal('4.50'), stock=500, category=category
+        )
+        self.customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self):
+        order = Order.objects.create(user=self.user, sales_rep=self.user, customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.widget, quantity=2, unit_price=Decimal('10.00'))
+        OrderItem.objects.create(order=order, product=self.gadget, quantity=3, unit_price=Decimal('4.50'))
+        return order
+
+    def create_invoice(self):
+        invoice = Invoice.objects.create(user=self.user, customer=self.customer, issue_date=date.today(), due_date=date.today())
+        InvoiceItem.objects.create(invoice=invoice, product=self.widget, quantity=2)
+        InvoiceItem.objects.create(invoice=invoice, product=self.gadget, quantity=3)
+        return invoice
+
+    def test_order_total_follows_item_changes(self):
+        order = self.create_order()
+        self.assertEqual(order.total_price, Decimal('33.50'))
+
+        item = order.items.get(product=self.widget)
+        item.quantity = 5
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('63.50'))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('13.50'))
+
+        order.items.all().delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('0.00'))
+
+    def test_invoice_total_follows_item_changes(self):
+        invoice = self.create_invoice()
+        self.assertEqual(invoice.total_amount, Decimal('33.50'))
+
+        invoice.items.get(product=self.gadget).delete()
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.total_amount, Decimal('20.00'))
+
+    def test_stale_parent_save_keeps_total(self):
+        order = self.create_order()
+        stale = Order.objects.get(pk=order.pk)
+        OrderItem.objects.create(order=order, product=self.widget, quantity=1, unit_price=Decimal('10.00'))
+
+        stale.special_instructions = 'Leave at the door'
+        stale.save()
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('43.50'))
+        self.assertEqual(order.special_instructions, 'Leave at the door')
+
+    def test_adding_items_does_not_aggregate(self):
+        invoice = self.create_invoice()
+        with CaptureQueriesContext(connection) as queries:
+            InvoiceItem.objects.create(invoice=invoice, product=self.widget, quantity=1)
+
+        self.assertFalse([q for q in queries.captured_queries if 'SUM(' in q['sql'].upper()])
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.total_amount, Decimal('43.50'))
+
+    def assert_list_without_aggregates(self, url, create):
+        create()
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for _ in range(5):
+            create()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse([q for q in small.captured_queries + large.captured_queries if 'SUM(' in q['sql'].upper()])
+        return response
+
+    def test_order_list_reads_stored_totals(self):
+        response = self.assert_list_without_aggregates(reverse('order-list'), self.create_order)
+        self.assertEqual(response.data['results'][0]['total_price'], currency_formatter.format_currency(Decimal('33.50')))
+
+    def test_invoice_list_reads_stored_totals(self):
+        response = self.assert_list_without_aggregates(reverse('invoice-list'), self.create_invoice)
+        self.assertEqual(response.data['results'][0]['total_amount'], '33.50')
+
+    def test_reconcile_totals_repairs_drift(self):
+        order = self.create_order()
+        invoice = self.create_invoice()
+        Order.objects.filter(pk=order.pk).update(total_amount=Decimal('1.00'))
+        Invoice.objects.filter(pk=invoice.pk).update(total_amount=Decimal('2.00'))
+
+        out = StringIO()
+        call_command('reconcile_totals', stdout=out)
+        self.assertIn(f'Order {order.pk}: stored 1.00, items 33.50', out.getvalue())
+        self.assertIn('2 totals differ', out.getvalue())
+
+        call_command('reconcile_totals', '--fix', stdout=StringIO())
+        order.refresh_from_db()
+        invoice.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('33.50'))
+        self.assertEqual(invoice.total_amount, Decimal('33.50'))
+
+        out = StringIO()
+        call_command('reconcile_totals', stdout=out)
+        self.assertIn('Stored totals match their items', out.getvalue())
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Tests that ``?cursor=`` walks the order list by keyset without counting
+    or skipping rows, and that page-number requests are unchanged.
+    """
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_superuser(username='admin', password='testpass123', email='admin@example.com')
+        customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+        # Groups of orders share an order_date, so pages split ties on id
+        base = timezone.now()
+        for i in range(25):
+            Order.objects.create(
+                user=self.user, sales_rep=self.user, customer=customer,
+                order_date=base - timedelta(days=i // 4)
+            )
+        self.expected = list(Order.objects.order_by('-order_date', '-id').values_list('id', flat=True))
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('order-list')
+
+    def test_cursor_pages_cover_every_row_once(self):
+        seen = []
+        url = f'{self.url}?cursor=&page_size=7'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+            self.assertFalse([q for q in queries.captured_queries if 'OFFSET' in q['sql'].upper()])
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get(f'{self.url}?cursor=&page_size=5').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+
+        self.assertEqual([row['id'] for row in back['results']], self.expected[:5])
+        self.assertEqual([row['id'] for row in second['results']], self.expected[5:10])
+
+    def test_totals_are_opt_in(self):
+        response = self.client.get(f'{self.url}?cursor=&include_total=exact')
+        self.assertEqual(response.data['count'], 25)
+
+        response = self.client.get(f'{self.url}?cursor=&include_total=approximate')
+        self.assertEqual(response.data['count'], 25)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_unchanged(self):
+        response = self.client.get(f'{self.url}?page=2&page_size=10&ordering=-order_date')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class QueryPlanTest(TestCase):
+    """
+    Tests that the hot filters used by analytics, reports and the chatbot
+    are answered from an index rather than a full table scan.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='planner', password='testpass123')
+        category = Category.objects.create(name='Hardware')
+        cls.product = Product.objects.create(
+            name='Widget', sku='W-1', price=Decimal('10.00'), stock=5, category=category
+        )
+        customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+        today = date.today()
+        for i in range(30):
+            day = today - timedelta(days=i)
+            order = Order.objects.create(user=cls.user, sales_rep=cls.user, customer=customer, status='pending')
+            OrderItem.objects.create(order=order, product=cls.product, quantity=1, unit_price=Decimal('10.00'))
+            Transaction.objects.create(
+                transaction_type='income' if i % 3 else 'expense', amount=Decimal('10.00'), date=day,
+                payment_method='cash', status='completed' if i % 2 else 'pending', category='income'
+            )
+            StockAdjustment.objects.create(product=cls.product, quantity=1, adjustment_type='ADD', adjustment_date=day)
+        cls.report = Report.objects.create(name='Monthly', created_by=cls.user)
+        ReportAccessLog.objects.create(report=cls.report, user=cls.user, action='view')
+        cls.start, cls.end = today - timedelta(days=7), today
+
+    def assert_uses_index(self, queryset):
+        self.assertEqual(full_table_scans(queryset), [], str(queryset.query))
+
+    def test_transaction_filters(self):
+        period = Transaction.objects.filter(date__range=[self.start, self.end])
+        self.assert_uses_index(period.filter(transaction_type='income'))
+        self.assert_uses_index(period.filter(status='completed'))
+        self.assert_uses_index(period.order_by('-date', '-id'))
+
+    def test_detects_full_scan(self):
+        self.assertEqual(full_table_scans(Transaction.objects.filter(payment_method='cash')), ['transactions_transaction'])
+
+    def test_order_filters(self):
+        period = Order.objects.filter(order_date__range=[timezone.now() - timedelta(days=7), timezone.now()])
+        self.assert_uses_index(period)
+        self.assert_uses_index(period.filter(status__in=['delivered', 'shipped']))
+
+    def test_stock_adjustments_for_product(self):
+        self.assert_uses_index(StockAdjustment.objects.filter(
+            product=self.product, adjustment_date__range=[self.start, self.end]
+        ))
+
+    def test_report_access_history(self):
+        self.assert_uses_index(ReportAccessLog.objects.filter(report=self.report).order_by('-accessed_at'))
+
+    def test_low_stock_products(self):
+        self.assert_uses_index(Product.objects.filter(
+            is_active=True, stock__lt=F('low_stock_threshold')
+        ).values('id', 'stock', 'low_stock_threshold'))
+
+    def test_report_aggregation_queries(self):
+        self.assert_uses_index(TransactionDailyRollup.objects.filter(date__range=[self.start, self.end]))
+        self.assert_uses_index(OrderItem.objects.filter(
+            order__order_date__range=[timezone.now() - timedelta(days=7), timezone.now()],
+            order__status__in=['delivered', 'shipped']
+        ))
+
+    def test_data_watermark_queries(self):
+        self.assert_uses_index(Transaction.objects.order_by('-modified').values_list('modified', flat=True)[:1])
+        self.assert_uses_index(Order.objects.order_by('-modified').values_list('modified', flat=True)[:1])
+        self.assert_uses_index(Product.objects.order_by('-modified_at').values_list('modified_at', flat=True)[:1])
+
+
+class VisitTrackingTest(TestCase):
+    """
+    Tests that visits are buffered without database access during the
+    request, deduplicated per session and written in one batch.
+    """
+    CHROME = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.buffer = visits.VisitBuffer(maxsize=3, flush_records=100, flush_interval=60)
+        patcher = mock.patch.object(visits, 'visit_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = VisitTrackingMiddleware(lambda request: None)
+
+    def request(self, path='/api/orders/', ip='10.0.0.1'):
+        request = self.factory.get(path, HTTP_USER_AGENT=self.CHROME, REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return request
+
+    def test_requests_do_not_touch_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.middleware.process_request(self.request())
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual(len(self.buffer.records), 1)
+
+    def test_repeat_requests_in_a_session_are_recorded_once(self):
+        self.middleware.process_request(self.request('/api/orders/'))
+        self.middleware.process_request(self.request('/api/products/'))
+        self.middleware.process_request(self.request('/api/orders/', ip='10.0.0.2'))
+
+        self.assertEqual(len(self.buffer.records), 2)
+
+    def test_flush_writes_one_batch(self):
+        for i in range(3):
+            self.middleware.process_request(self.request(ip=f'10.0.0.{i}'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(len(queries.captured_queries), 1)
+
+        visit = Visit.objects.first()
+        self.assertEqual(visit.device_type, 'Desktop')
+        self.assertEqual(visit.operating_system, 'Windows')
+        self.assertEqual(Visit.objects.values('session_id').distinct().count(), 3)
+        self.assertEqual(len(self.buffer.records), 0)
+
+    def test_full_buffer_drops_new_visits(self):
+        for i in range(5):
+            self.middleware.process_request(self.request(ip=f'10.0.0.{i}'))
+
+        self.assertEqual(len(self.buffer.records), 3)
+        self.assertEqual(self.buffer.dropped, 2)
+
+    def test_session_hash_is_stable(self):
+        first = visits.visit_record(self.request())
+        second = visits.visit_record(self.request('/api/products/'))
+        self.assertEqual(first['session_id'], second['session_id'])
+
+    def test_user_agents_are_parsed_once(self):
+        visits.device_details.cache_clear()
+        for _ in range(3):
+            visits.visit_record(self.request())
+        self.assertEqual(visits.device_details.cache_info().misses, 1)
+
+
+class RequestLoggingTest(TestCase):
+    """
+    Tests that requests are logged as one JSON timing line when sampled or
+    slow, and not at all otherwise.
+    """
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_superuser(username='admin', password='testpass123', email='admin@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('order-list')
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=1, REQUEST_LOG_SLOW_MS=60000)
+    def test_sampled_request_is_one_json_line(self):
+        with self.assertLogs('core.requests', level='INFO') as logs:
+            self.client.get(self.url)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['path'], self.url)
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['user_id'], self.user.pk)
+        self.assertGreater(line['db_queries'], 0)
+        self.assertGreater(line['serialize_ms'], 0)
+        self.assertGreaterEqual(line['total_ms'], line['db_ms'])
+        self.assertFalse(line['slow'])
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=0, REQUEST_LOG_SLOW_MS=0)
+    def test_slow_requests_are_always_logged(self):
+        with self.assertLogs('core.requests', level='INFO') as logs:
+            self.client.get(self.url)
+
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertTrue(json.loads(logs.records[0].getMessage())['slow'])
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=0, REQUEST_LOG_SLOW_MS=60000)
+    def test_unsampled_requests_are_not_logged(self):
+        with self.assertNoLogs('core.requests', level='INFO'):
+            self.client.get(self.url)
+
+
+class LookupIndexTest(TestCase):
+    """
+    Tests the trigram product and customer lookup: ranking, typo tolerance,
+    incremental refresh from signals and the search endpoints that use it.
+    """
+    def setUp(self):
+        lookup_index.product_index.clear()
+        lookup_index.customer_index.clear()
+        self.addCleanup(lookup_index.product_index.clear)
+        self.addCleanup(lookup_index.customer_index.clear)
+
+        User = get_user_model()
+        self.user = User.objects.create_superuser(username='admin', password='testpass123', email='admin@example.com')
+        self.category = Category.objects.create(name='Computers')
+        accessories = Category.objects.create(name='Accessories')
+        self.laptop = Product.objects.create(
+            name='Laptop Pro 15', sku='LP-15', price=Decimal('1500.00'), stock=4, category=self.category
+        )
+        self.bag = Product.objects.create(
+            name='Laptop Bag', sku='BAG-1', price=Decimal('40.00'), stock=20, category=accessories
+        )
+        self.mouse = Product.objects.create(
+            name='Wireless Mouse', sku='MS-2', price=Decimal('25.00'), stock=50, category=accessories
+        )
+        self.customer = Customer.objects.create(first_name='Grace', last_name='Hopper', email='grace@navy.example')
+        Customer.objects.create(first_name='Alan', last_name='Turing', email='alan@bletchley.example')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pks(self, matches):
+        return [match.pk for match in matches]
+
+    def test_trigrams_pad_words(self):
+        self.assertEqual(lookup_index.trigrams('Lap'), {'  l', ' la', 'lap', 'ap '})
+        self.assertEqual(lookup_index.trigrams('  '), set())
+
+    def test_closer_names_rank_first(self):
+        self.assertEqual(self.pks(lookup_index.product_index.search('laptop pro')), [self.laptop.pk, self.bag.pk])
+        self.assertEqual(self.pks(lookup_index.product_index.search('laptop', limit=1)), [self.laptop.pk])
+
+    def test_typos_sku_barcode_and_category_match(self):
+        index = lookup_index.product_index
+        self.assertEqual(self.pks(index.search('wireles mouce'))[0], self.mouse.pk)
+        self.assertEqual(self.pks(index.search('bag-1')), [self.bag.pk])
+        self.assertEqual(self.pks(index.search(self.mouse.barcode)), [self.mouse.pk])
+        self.assertEqual(self.pks(index.search('computers')), [self.laptop.pk])
+        self.assertEqual(index.search('xyz'), [])
+
+    def test_signals_refresh_a_built_index(self):
+        index = lookup_index.product_index
+        index.search('laptop')
+        self.assertTrue(index.is_built)
+
+        tablet = Product.objects.create(name='Tablet Mini', sku='TB-1', price=Decimal('300.00'), stock=3, category=self.category)
+        self.assertEqual(self.pks(index.search('tablet')), [tablet.pk])
+
+        self.mouse.name = 'Trackball'
+        self.mouse.save()
+        self.assertEqual(self.pks(index.search('trackball')), [self.mouse.pk])
+        self.assertNotIn(self.mouse.pk, self.pks(index.search('wireless mouse')))
+
+        self.category.name = 'Notebooks'
+        self.category.save()
+        self.assertEqual(set(self.pks(index.search('notebooks'))), {self.laptop.pk, tablet.pk})
+
+        self.bag.delete()
+        self.assertEqual(self.pks(index.search('laptop bag', min_score=0.5)), [self.laptop.pk])
+
+    def test_sync_picks_up_rows_changed_elsewhere(self):
+        index = lookup_index.product_index
+        index.search('laptop')
+        # A queryset update sends no signals, like a write from another process
+        Product.objects.filter(pk=self.bag.pk).update(name='Messenger Satchel', modified_at=timezone.now())
+        self.assertEqual(index.search('satchel'), [])
+
+        index.synced_at -= index.sync_interval
+        self.assertEqual(self.pks(index.search('satchel')), [self.bag.pk])
+
+    def test_filter_orders_queryset_by_rank(self):
+        queryset = lookup_index.product_index.filter(Product.objects.filter(is_active=True), 'laptop pro')
+        self.assertEqual(list(queryset.values_list('pk', flat=True)), [self.laptop.pk, self.bag.pk])
+        self.assertFalse(lookup_index.product_index.filter(Product.objects.all(), 'xyz').exists())
+
+    def test_filter_limit_applies_after_the_queryset(self):
+        for i in range(6):
+            Product.objects.create(
+                name=f'Laptop {i}', sku=f'OLD-{i}', price=Decimal('10.00'), stock=0,
+                category=self.category, is_active=False
+            )
+        active = Product.objects.filter(is_active=True)
+        self.assertNotIn(self.bag.pk, self.pks(lookup_index.product_index.search('laptop', limit=2)))
+
+        queryset = lookup_index.product_index.filter(active, 'laptop', limit=2)
+        self.assertEqual(list(queryset.values_list('pk', flat=True)), [self.laptop.pk, self.bag.pk])
+
+    def test_product_search_endpoint_is_ranked(self):
+        response = self.client.get(reverse('product-list'), {'search': 'laptp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.laptop.pk, self.bag.pk])
+
+    def test_customer_search_endpoint(self):
+        response = self.client.get(reverse('customer-search'), {'query': 'hoper'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [self.customer.pk])
+
+        # Both emails share "example"; the full match ranks first
+        response = self.client.get(reverse('customer-search'), {'query': 'grace@navy.example'})
+        self.assertEqual(response.data[0]['id'], self.customer.pk)
+
+
+@override_settings(QR_RENDER_EXECUTOR='core.qr_pipeline.DeferredQRRenderExecutor')
+class QRPipelineTest(TestCase):
+    """
+    Tests that QR images are rendered outside save(), skipped when the
+    payload is unchanged and rendered on demand when missing.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='clerk', password='testpass123')
+        self.customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+        self.invoices = [
+            Invoice.objects.create(
+                user=self.user, customer=self.customer,
+                issue_date=date.today(), due_date=date.today(), status='draft'
+            )
+            for _ in range(3)
+        ]
+
+    def test_save_does_not_render(self):
+        self.assertFalse(self.invoices[0].qr_code)
+        self.assertFalse(Invoice.objects.exclude(qr_code='').exclude(qr_code=None).exists())
+
+    @override_settings(QR_RENDER_EXECUTOR='core.qr_pipeline.BackgroundQRRenderExecutor')
+    def test_background_executor_submits_after_commit(self):
+        with mock.patch.object(qr_pipeline.BackgroundQRRenderExecutor, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                invoice = Invoice.objects.create(
+                    user=self.user, customer=self.customer,
+                    issue_date=date.today(), due_date=date.today()
+                )
+                submit.assert_not_called()
+        submit.assert_called_once_with('invoices.Invoice', invoice.pk)
+
+    def test_unchanged_payload_is_skipped(self):
+        pks = [invoice.pk for invoice in self.invoices]
+        self.assertEqual(qr_pipeline.render_pending('invoices.Invoice', pks), (3, 0))
+        self.assertEqual(qr_pipeline.render_pending('invoices.Invoice', pks), (0, 3))
+
+        Invoice.objects.filter(pk=pks[0]).update(status='sent')
+        self.assertEqual(qr_pipeline.render_pending('invoices.Invoice', pks), (1, 2))
+
+        invoice = Invoice.objects.get(pk=pks[0])
+        self.assertEqual(invoice.qr_code_hash, qr_pipeline.payload_hash(invoice.qr_payload()))
+        self.assertTrue(invoice.qr_code.storage.exists(invoice.qr_code.name))
+
+    def test_missing_image_is_rendered_on_read(self):
+        invoice = self.invoices[0]
+        field = qr_pipeline.ensure_qr(invoice)
+
+        self.assertTrue(field.storage.exists(field.name))
+        stored = Invoice.objects.get(pk=invoice.pk)
+        self.assertEqual(stored.qr_code.name, field.name)
+        self.assertEqual(stored.qr_code_hash, invoice.qr_code_hash)
+
+        with self.assertNumQueries(0):
+            qr_pipeline.ensure_qr(stored)
+
+    def test_backfill_command_reports_progress(self):
+        out = StringIO()
+        call_command('render_qr_codes', model=['invoices.Invoice'], workers=0, batch_size=2, stdout=out)
+        self.assertIn('2/3', out.getvalue())
+        self.assertIn('3/3 (100%) rendered 3, unchanged 0', out.getvalue())
+
+        out = StringIO()
+        call_command('render_qr_codes', model=['invoices.Invoice'], workers=0, stdout=out)
+        self.assertIn('rendered 0, unchanged 3', out.getvalue())
+
+
+class QRImageEndpointTest(TestCase):
+    """
+    Tests that QR images are rendered from the payload on request and
+    revalidated with ETag / Last-Modified.
+    """
+    def setUp(self):
+        qr_images._cache.clear()
+        self.user = get_user_model().objects.create_user(username='clerk', password='testpass123')
+        role = Role.objects.create(name='Accountant')
+        role.permissions.add(Permission.objects.create(name=PermissionConstants.INVOICE_VIEW))
+        self.user.roles.add(role)
+        customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+        self.invoice = Invoice.objects.create(
+            user=self.user, customer=customer, issue_date=date.today(), due_date=date.today()
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def url(self, image_format='png', kind='invoice'):
+        return reverse('qr-image', args=[kind, self.invoice.pk, image_format])
+
+    def test_png_at_requested_size(self):
+        response = self.client.get(self.url(), {'size': 128})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(PILImage.open(BytesIO(response.content)).size, (128, 128))
+        self.assertFalse(Invoice.objects.get(pk=self.invoice.pk).qr_code)
+
+    def test_svg(self):
+        response = self.client.get(self.url('svg'), {'size': 200})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertTrue(response.content.startswith(b'<svg width="200" height="200"'))
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        etag = self.client.get(self.url())['ETag']
+        with mock.patch.object(qr_images, 'render_image') as render:
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_repeat_requests_are_served_from_memory(self):
+        first = self.client.get(self.url()).content
+        with mock.patch.object(qr_images, 'render_image') as render:
+            second = self.client.get(self.url()).content
+        render.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_payload_change_changes_etag(self):
+        etag = self.client.get(self.url())['ETag']
+        self.invoice.status = 'sent'
+        self.invoice.save()
+
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_requires_view_permission(self):
+        self.client.force_authenticate(get_user_model().objects.create_user(username='outsider', password='x'))
+        self.assertEqual(self.client.get(self.url()).status_code, 403)
+        self.assertEqual(self.client.get(self.url(kind='nothing')).status_code, 404)
+
+    def test_serialized_qr_code_falls_back_to_the_endpoint(self):
+        from invoices.serializers import InvoiceSerializer
+
+        request = RequestFactory().get('/')
+        url = InvoiceSerializer(self.invoice, context={'request': request}).data['qr_code']
+
+        self.assertEqual(url, request.build_absolute_uri(self.url()))
+        self.assertEqual(self.client.get(self.url()).status_code, 200)
+
+    def test_rows_outside_the_role_scope_are_not_found(self):
+        role = Role.objects.create(name='Sales Representative')
+        role.permissions.add(Permission.objects.create(name=PermissionConstants.TRANSACTION_VIEW))
+        rep, other_rep = (get_user_model().objects.create_user(username=name, password='x') for name in ('rep', 'other'))
+        for user in (rep, other_rep):
+            user.roles.add(role)
+
+        def transaction_for(user):
+            order = Order.objects.create(user=user, sales_rep=user, customer=self.invoice.customer, status='pending')
+            return Transaction.objects.create(
+                transaction_type='income', amount=Decimal('10.00'), date=date.today(),
+                payment_method='cash', status='completed', category='income', order=order
+            )
+
+        own, others = transaction_for(rep), transaction_for(other_rep)
+        self.client.force_authenticate(rep)
+        self.assertEqual(self.client.get(reverse('qr-image', args=['transaction', own.pk, 'png'])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('qr-image', args=['transaction', others.pk, 'png'])).status_code, 404)
@@ -0,0 +1,165 @@
+"""
+Stored order and invoice totals.
+
+``Order.total_amount`` and ``Invoice.total_amount`` are kept in step with
+their items by deltas: saving or deleting an item adds the change in its
+line total (quantity x unit price) to the parent with a single
+``UPDATE ... SET total_amount = total_amount + delta``, in the same
+transaction as the item write. Reading a total is then a column read, and
+building an N-item invoice costs N small updates instead of N aggregates
+over a growing item set.
+
+Item models mix in ``TotalTrackingItem`` and name their parent foreign key
+in ``TOTAL_PARENT``. Writes that bypass ``save()`` (``bulk_create``,
+``QuerySet.update``) must set the parent totals themselves;
+``manage.py reconcile_totals`` finds and repairs any that drifted.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+ZERO = Decimal('0.00')
+TOTAL_OUTPUT = DecimalField(max_digits=10, decimal_places=2)
+
+
+def line_total(quantity, unit_price):
+    return Decimal(quantity or 0) * Decimal(str(unit_price or 0))
+
+
+def touched(model):
+    """
+    ``auto_now`` fields of ``model`` set to now, for UPDATEs that bypass
+    ``save()``. Report and chatbot watermarks read ``modified`` to see changes.
+    """
+    now = timezone.now()
+    return {
+        field.name: now for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+    }
+
+
+def apply_total_delta(model, pk, delta):
+    """Add ``delta`` to one parent's ``total_amount`` in a single UPDATE."""
+    if not delta or pk is None:
+        return 0
+    return model.objects.filter(pk=pk).update(total_amount=F('total_amount') + delta, **touched(model))
+
+
+def fields_without_total(instance):
+    """
+    ``update_fields`` for a full save that leaves ``total_amount`` alone, so
+    a stale parent instance cannot write back a total items have since changed.
+    """
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name != 'total_amount'
+    ]
+
+
+class TotalTrackingItem:
+    """
+    Mixin for item models whose line totals are summed into
+    ``TOTAL_PARENT.total_amount``.
+    """
+    TOTAL_PARENT = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_line = instance._current_line()
+        return instance
+
+    def _current_line(self):
+        field = self._meta.get_field(self.TOTAL_PARENT)
+        loaded = self.__dict__
+        if field.attname not in loaded or 'quantity' not in loaded or 'unit_price' not in loaded:
+            return None
+        return loaded[field.attname], line_total(loaded['quantity'], loaded['unit_price'])
+
+    def _previous_line(self):
+        previous = getattr(self, '_saved_line', None)
+        if previous is None and not self._state.adding and self.pk is not None:
+            # An instance built by hand for an existing row: read what is stored
+            field = self._meta.get_field(self.TOTAL_PARENT)
+            row = type(self)._base_manager.filter(pk=self.pk).values(field.attname, 'quantity', 'unit_price').first()
+            if row:
+                previous = row[field.attname], line_total(row['quantity'], row['unit_price'])
+        return previous
+
+    def _apply_line_change(self, previous, current):
+        parent_model = self._meta.get_field(self.TOTAL_PARENT).related_model
+        deltas = {}
+        if previous:
+            deltas[previous[0]] = deltas.get(previous[0], ZERO) - previous[1]
+        if current:
+            deltas[current[0]] = deltas.get(current[0], ZERO) + current[1]
+
+        cached_parent = getattr(self, self.TOTAL_PARENT) if self._meta.get_field(self.TOTAL_PARENT).is_cached(self) else None
+        for parent_id in sorted(deltas, key=lambda pk: (pk is None, pk)):
+            delta = deltas[parent_id]
+            if apply_total_delta(parent_model, parent_id, delta) and cached_parent is not None and cached_parent.pk == parent_id:
+                # Keep the instance the caller holds in step without re-reading it
+                cached_parent.total_amount = (cached_parent.total_amount or ZERO) + delta
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._previous_line()
+            super().save(*args, **kwargs)
+            current = self._current_line()
+            if previous != current:
+                self._apply_line_change(previous, current)
+            self._saved_line = current
+
+
+def item_post_delete(sender, instance, origin=None, **kwargs):
+    parent_model = sender._meta.get_field(sender.TOTAL_PARENT).related_model
+    if isinstance(origin, parent_model) or (isinstance(origin, QuerySet) and origin.model is parent_model):
+        # The parent itself is being deleted
+        return
+    previous = getattr(instance, '_saved_line', None) or instance._current_line()
+    if previous:
+        instance._apply_line_change(previous, None)
+
+
+def connect(item_model):
+    """Subtract deleted items, including ``QuerySet.delete()``, from their parent."""
+    post_delete.connect(item_post_delete, sender=item_model, dispatch_uid=f'totals_{item_model._meta.label}')
+
+
+def items_total_subquery(item_model, parent_field):
+    """The summed line totals of a parent's items, for use in ``update()`` or ``annotate()``."""
+    line = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=TOTAL_OUTPUT)
+    summed = (
+        item_model.objects.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(total=Sum(line))
+        .values('total')
+    )
+    return Coalesce(Subquery(summed, output_field=TOTAL_OUTPUT), Value(ZERO), output_field=TOTAL_OUTPUT)
+
+
+def find_discrepancies(parent_model, item_model, parent_field):
+    """
+    Parents whose stored total differs from the sum of their items, as
+    ``(pk, stored, computed)`` tuples.
+    """
+    rows = (
+        parent_model.objects.annotate(computed_total=items_total_subquery(item_model, parent_field))
+        .exclude(total_amount=F('computed_total'))
+        .order_by('pk')
+        .values_list('pk', 'total_amount', 'computed_total')
+    )
+    return list(rows.iterator(chunk_size=2000))
+
+
+def reconcile(parent_model, item_model, parent_field, pks=None):
+    """Recompute stored totals from items with one UPDATE. Returns the rows updated."""
+    queryset = parent_model.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.update(total_amount=items_total_subquery(item_model, parent_field), **touched(parent_model))
@@ -8,6 +8,7 @@ from .views import (
     CompanyInfoViewSet,
     PromotionViewSet,
     sales_representatives_view,
+    qr_image_view,
     home
 )
 
@@ -25,4 +26,5 @@ urlpatterns = [
     path('customers/search/', CustomerViewSet.as_view({'get': 'search'}), name='customer-search'),
     path('sales-reps/', sales_representatives_view, name='sales-representatives'),
     path('orders/<int:pk>/add-scanned-item/', OrderViewSet.as_view({'post': 'add_scanned_item'}), name='order-add-scanned-item'),
+    path('qr/<slug:kind>/<int:pk>.<str:image_format>', qr_image_view, name='qr-image'),
 ]
@@ -0,0 +1,188 @@
+"""
+List pagination with an opt-in keyset (cursor) mode.
+
+Without a ``cursor`` query parameter the paginator behaves exactly like
+``PageNumberPagination`` (``?page=N``, with ``count``), which the frontend
+relies on. Sending ``?cursor=`` (empty for the first page) switches to keyset
+pagination on the view's ``cursor_ordering``: each page is fetched with
+``WHERE (date, id) < (last_date, last_id) ORDER BY date DESC, id DESC LIMIT n``
+rather than ``COUNT(*)`` plus ``OFFSET``, so page 10,000 costs the same as
+page 1 on an index over the ordering columns.
+
+Cursor pages carry no total by default. ``include_total=exact`` adds an
+exact ``count``; ``include_total=approximate`` adds the table statistics
+estimate on MySQL when the list is unfiltered and falls back to an exact
+count otherwise.
+
+``cursor_ordering`` must end with a unique column (normally ``-id``) and name
+only non-nullable fields. In cursor mode the ``ordering`` query parameter is
+ignored.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+EXACT_TOTAL = 'exact'
+APPROXIMATE_TOTAL = 'approximate'
+
+
+def encode_cursor(values, reverse=False):
+    payload = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]}
+    if reverse:
+        payload['r'] = 1
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """``(values, reverse)`` for an encoded cursor, converted with each model field."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        raw = payload['p']
+        if len(raw) != len(fields):
+            raise ValueError
+        values = [field.to_python(value) for field, value in zip(fields, raw)]
+    except (TypeError, ValueError, KeyError, binascii.Error, ValidationError) as e:
+        raise NotFound('Invalid cursor') from e
+    return values, bool(payload.get('r'))
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    ``Q`` selecting rows strictly after ``values`` in ``ordering``, or
+    strictly before them when ``reverse`` is set:
+    ``a < x OR (a = x AND b < y) OR ...`` for descending columns.
+    """
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        descending = name.startswith('-')
+        field = name.lstrip('-')
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return condition
+
+
+def estimate_count(queryset):
+    """
+    A row count estimate from MySQL table statistics for an unfiltered
+    queryset; an exact ``COUNT(*)`` for anything else.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'mysql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0]), True
+    return queryset.count(), False
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination, or keyset pagination when ``cursor`` is sent.
+    Views set ``cursor_ordering``; it defaults to newest primary key first.
+    """
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    default_cursor_ordering = ('-pk',)
+
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.display_page_controls = False
+        self.page_size_value = self.get_page_size(request)
+        self.ordering = tuple(getattr(view, 'cursor_ordering', None) or self.default_cursor_ordering)
+        fields = [self._model_field(queryset.model, name) for name in self.ordering]
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        values, reverse = decode_cursor(cursor, fields) if cursor else (None, False)
+
+        self.total = self.total_is_estimate = None
+        include_total = request.query_params.get(self.total_query_param)
+        if include_total == APPROXIMATE_TOTAL:
+            self.total, self.total_is_estimate = estimate_count(queryset)
+        elif include_total in (EXACT_TOTAL, 'true', '1'):
+            self.total = queryset.count()
+
+        ordering = [self._flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        page_queryset = queryset.order_by(*ordering)
+        if values is not None:
+            page_queryset = page_queryset.filter(keyset_filter(self.ordering, values, reverse))
+
+        rows = list(page_queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first_values = self._position(rows[0]) if rows else values
+        self.last_values = self._position(rows[-1]) if rows else values
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        body = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.total is not None:
+            body['count'] = self.total
+            if self.total_is_estimate:
+                body['count_is_estimate'] = True
+        body['results'] = data
+        return Response(body)
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or self.last_values is None:
+            return None
+        return self._cursor_link(encode_cursor(self.last_values))
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_values is None:
+            return None
+        return self._cursor_link(encode_cursor(self.first_values, reverse=True))
+
+    def _cursor_link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _position(self, obj):
+        return [getattr(obj, self._model_field(type(obj), name).attname) for name in self.ordering]
+
+    @staticmethod
+    def _model_field(model, name):
+        name = name.lstrip('-')
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
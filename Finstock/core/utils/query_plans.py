@@ -0,0 +1,44 @@
+"""
+Query plan inspection for regression tests.
+
+``full_table_scans(queryset)`` runs the database's EXPLAIN for a queryset
+and returns the tables it would read row by row. Tests use it to fail when a
+hot query stops using its index, for example after a filter or index change.
+
+Supports SQLite (``EXPLAIN QUERY PLAN``, where ``SCAN <table>`` without a
+``USING ... INDEX`` is a full scan) and MySQL (``EXPLAIN``, where access
+type ``ALL`` is a full scan).
+"""
+import re
+
+from django.db import connections
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\S+)(?P<index> USING (?:COVERING )?INDEX)?')
+
+
+def explain_rows(queryset):
+    """The raw EXPLAIN rows for ``queryset`` as dicts keyed by column name."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def full_table_scans(queryset):
+    """Names of the tables ``queryset`` would read in full."""
+    vendor = connections[queryset.db].vendor
+    scans = []
+    for row in explain_rows(queryset):
+        if vendor == 'sqlite':
+            match = _SQLITE_SCAN.match(row['detail'])
+            if match and not match.group('index'):
+                scans.append(match.group('table'))
+        elif vendor == 'mysql':
+            if row.get('type') == 'ALL':
+                scans.append(row['table'])
+        else:
+            raise NotImplementedError(f"Query plan checks are not implemented for {vendor}")
+    return scans
@@ -4,21 +4,27 @@ from django.db import transaction, connection
 from django.contrib.auth import get_user_model
 from django.shortcuts import render  # noqa
 from rest_framework import viewsets, permissions, status, filters as drf_filters
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404  # noqa
 from rest_framework.serializers import ValidationError as DRFValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet
 from django_filters import rest_framework as filters
-from rest_framework.pagination import PageNumberPagination
+from core.utils.pagination import KeysetPagination
 from django.utils import timezone
 from django.utils.timezone import make_aware, utc
 from datetime import datetime, timedelta
 from django.utils.dateparse import parse_date
+from django.utils.module_loading import import_string
+from django.http import Http404
+from rest_framework.permissions import IsAuthenticated
+from . import qr_images
+from .lookup_index import customer_index
 from .models import Customer, Order, OrderItem, Address, CompanyInfo, Promotion
 from products.models import Product
 from .signals import create_transaction_from_order
+from .bulk_orders import BULK_ORDER_MAX, ingest_orders
 from .serializers import (
     CustomerSerializer,
     OrderSerializer,
@@ -60,7 +66,7 @@ class DateRangeFilter(filters.FilterSet):
         return queryset
 
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -83,11 +89,10 @@ class CustomerViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         query = request.query_params.get('query', '')
-        customers = self.queryset.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query)
-        )[:10]  # Limit to 10 results for performance
+        if query:
+            customers = customer_index.filter(self.queryset, query, limit=10)
+        else:
+            customers = self.queryset[:10]
         serializer = self.get_serializer(customers, many=True)
         return Response(serializer.data)
 
@@ -109,11 +114,12 @@ class OrderViewSet(BaseAccessControlViewSet):
     queryset = Order.objects.prefetch_related('items__product').all()
     serializer_class = OrderSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-order_date', '-id')
     filter_backends = [DjangoFilterBackend, drf_filters.SearchFilter, drf_filters.OrderingFilter]
     filterset_class = DateRangeFilter
     filterset_fields = ['status', 'order_date', 'shipped_date', 'is_paid', 'transaction_category']
     search_fields = ['sales_rep__first_name', 'sales_rep__last_name', 'customer__user__first_name', 'customer__user__last_name', 'id']
-    ordering_fields = ['order_date', 'shipped_date', 'status', 'total_price']
+    ordering_fields = ['order_date', 'shipped_date', 'status', 'total_amount']
 
     model = Order
     model_name = 'order'
@@ -201,6 +207,36 @@ class OrderViewSet(BaseAccessControlViewSet):
             )
 
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many orders in one request. Expects a list of orders (or
+        ``{"orders": [...]}``), each with ``customer_id`` and ``items`` of
+        ``{"product", "quantity"}``. Valid orders are written in one set-based
+        pass; invalid ones are reported by their index in the request.
+        """
+        if not request.user.has_role_permission(self.create_permission):
+            logger.warning(f"Unauthorized bulk order creation attempt by user {request.user.username}")
+            return Response({"error": "You are not authorized to create orders"}, status=status.HTTP_403_FORBIDDEN)
+
+        orders_data = request.data.get('orders') if isinstance(request.data, dict) else request.data
+        if not isinstance(orders_data, list) or not orders_data:
+            return Response({"error": "Expected a non-empty list of orders"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(orders_data) > BULK_ORDER_MAX:
+            return Response(
+                {"error": f"At most {BULK_ORDER_MAX} orders can be created per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        created, errors = ingest_orders(orders_data, request.user)
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
     @transaction.atomic
     def perform_create(self, serializer):
         try:
@@ -377,23 +413,15 @@ class OrderViewSet(BaseAccessControlViewSet):
         serializer = self.get_serializer(new_order)
         return Response(serializer.data)
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        logger.info(f"Order data being returned: {data}")
-        return Response(data)
-
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            logger.info(f"Orders data being returned: {serializer.data}")
+            logger.debug(f"Returning {len(page)} orders")
             return self.get_paginated_response(serializer.data)
 
         serializer = self.get_serializer(queryset, many=True)
-        logger.info(f"Orders data being returned: {serializer.data}")
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -466,3 +494,49 @@ class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     queryset = Address.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+
+
+# kind -> (viewset scoping the rows, modification timestamp field). The
+# viewset's model, view_permission and apply_role_based_filtering decide
+# which rows a user may render, exactly as in its list and detail views.
+QR_IMAGE_KINDS = {
+    'product': ('products.views.ProductViewSet', 'modified_at'),
+    'invoice': ('invoices.views.InvoiceViewSet', 'modified'),
+    'receipt': ('receipts.views.ReceiptViewSet', 'modified'),
+    'transaction': ('transactions.views.TransactionViewSet', 'modified'),
+    'stock-adjustment': ('stock_adjustments.views.StockAdjustmentViewSet', None),
+}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def qr_image_view(request, kind, pk, image_format):
+    """
+    Render a QR image from the row's current payload. ``?size=`` sets the
+    pixel size; repeat requests are answered from memory or with a 304.
+    Rows outside the user's role scope are reported as not found.
+    """
+    if kind not in QR_IMAGE_KINDS or image_format not in qr_images.CONTENT_TYPES:
+        raise Http404
+
+    viewset_path, modified_field = QR_IMAGE_KINDS[kind]
+    viewset = import_string(viewset_path)(request=request, format_kwarg=None)
+    if not request.user.has_role_permission(viewset.view_permission):
+        return Response({"error": "You do not have permission to view this QR code"}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        size = qr_images.parse_size(request.query_params.get('size'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    model = viewset.model
+    queryset = model.objects.all() if request.user.is_superuser else viewset.apply_role_based_filtering()
+    instance = get_object_or_404(queryset.select_related(*model.QR_SELECT_RELATED), pk=pk)
+    return qr_images.qr_image_response(
+        request,
+        instance.qr_payload(),
+        image_format,
+        size,
+        last_modified=getattr(instance, modified_field) if modified_field else None,
+        filename=f"{kind}_{pk}_qr"
+    )
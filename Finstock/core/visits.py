@@ -0,0 +1,188 @@
+"""
+Buffered visit tracking.
+
+``VisitTrackingMiddleware`` no longer writes a ``Visit`` inside the request.
+It builds the row's fields and hands them to ``VisitBuffer.add``, which only
+appends to an in-process buffer. A daemon thread writes the buffer with one
+``bulk_create`` when it holds ``VISIT_FLUSH_RECORDS`` rows or every
+``VISIT_FLUSH_INTERVAL`` seconds, whichever comes first.
+
+* Sessions are identified by a hash of user agent, client IP and the
+  session key (or user id), so repeat requests hash the same and only the
+  first request of a session in each ``VISIT_DEDUP_WINDOW`` is recorded.
+  Deduplication happens in memory, without the SELECT and UPDATE the
+  synchronous path needed.
+* User agent parsing is cached per user agent string.
+* When the buffer is full, new visits are dropped and counted rather than
+  blocking the request. Tracking is best effort: rows still buffered when
+  the process is killed are lost.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, close_old_connections
+from django.utils import timezone
+from user_agents import parse as parse_user_agent
+
+logger = logging.getLogger(__name__)
+
+VISIT_BUFFER_SIZE = getattr(settings, 'VISIT_BUFFER_SIZE', 10000)
+VISIT_FLUSH_RECORDS = getattr(settings, 'VISIT_FLUSH_RECORDS', 500)
+VISIT_FLUSH_INTERVAL = getattr(settings, 'VISIT_FLUSH_INTERVAL', 5.0)
+VISIT_DEDUP_WINDOW = getattr(settings, 'VISIT_DEDUP_WINDOW', 30 * 60)
+# Sessions remembered for deduplication; the oldest are forgotten first
+VISIT_DEDUP_SESSIONS = getattr(settings, 'VISIT_DEDUP_SESSIONS', 50000)
+# Test runs flush explicitly rather than racing the test database
+VISIT_FLUSH_IN_BACKGROUND = getattr(settings, 'VISIT_FLUSH_IN_BACKGROUND', not getattr(settings, 'TESTING', False))
+URL_MAX_LENGTH = 2000
+
+
+def session_hash(user_agent, ip_address, session_key):
+    """A stable identifier for one client session."""
+    return hashlib.sha256(f"{user_agent}|{ip_address}|{session_key}".encode()).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def device_details(user_agent):
+    """``(device_type, operating_system)`` for a user agent string."""
+    parsed = parse_user_agent(user_agent or '')
+    if parsed.is_mobile:
+        device_type = 'Mobile'
+    elif parsed.is_tablet:
+        device_type = 'Tablet'
+    elif parsed.is_pc:
+        device_type = 'Desktop'
+    elif parsed.is_bot:
+        device_type = 'Bot'
+    else:
+        device_type = 'Other'
+    return device_type, parsed.os.family or 'Unknown'
+
+
+def visit_record(request):
+    """The ``Visit`` fields for ``request``, computed without database access."""
+    from .models import Visit
+
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    ip_address = Visit.get_client_ip(request)
+    session_key = getattr(getattr(request, 'session', None), 'session_key', None) or user_id or ''
+    device_type, operating_system = device_details(user_agent)
+    return {
+        'user_id': user_id,
+        'session_id': session_hash(user_agent, ip_address, session_key),
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'referrer_url': request.META.get('HTTP_REFERER', '')[:URL_MAX_LENGTH],
+        'visited_url': request.build_absolute_uri()[:URL_MAX_LENGTH],
+        'timestamp': timezone.now(),
+        'device_type': device_type,
+        'operating_system': operating_system,
+    }
+
+
+class VisitBuffer:
+    """
+    A bounded buffer of visit rows drained by a background writer thread.
+    ``add`` never blocks on the database.
+    """
+
+    def __init__(self, maxsize=VISIT_BUFFER_SIZE, flush_records=VISIT_FLUSH_RECORDS,
+                 flush_interval=VISIT_FLUSH_INTERVAL, dedup_window=VISIT_DEDUP_WINDOW):
+        self.maxsize = maxsize
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.dedup_window = dedup_window
+        self.records = deque()
+        self.recent_sessions = OrderedDict()
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def add(self, record):
+        """
+        Queue ``record`` for writing. Returns False when it was skipped as a
+        repeat of a recent session or dropped because the buffer is full.
+        """
+        now = time.monotonic()
+        session_id = record['session_id']
+        with self.lock:
+            last_seen = self.recent_sessions.get(session_id)
+            if last_seen is not None and now - last_seen < self.dedup_window:
+                return False
+            if len(self.records) >= self.maxsize:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"Visit buffer full, {self.dropped} visits dropped")
+                return False
+
+            self.records.append(record)
+            self.recent_sessions[session_id] = now
+            self.recent_sessions.move_to_end(session_id)
+            while len(self.recent_sessions) > VISIT_DEDUP_SESSIONS:
+                self.recent_sessions.popitem(last=False)
+
+            if VISIT_FLUSH_IN_BACKGROUND and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name='visit-flush', daemon=True)
+                self.thread.start()
+            full_batch = len(self.records) >= self.flush_records
+        if full_batch:
+            self.wakeup.set()
+        return True
+
+    def drain(self):
+        with self.lock:
+            records, self.records = list(self.records), deque()
+        return records
+
+    def flush(self):
+        """Write every buffered visit now. Returns the number written."""
+        from .models import Visit
+
+        records = self.drain()
+        if not records:
+            return 0
+        try:
+            try:
+                Visit.objects.bulk_create([Visit(**record) for record in records], batch_size=self.flush_records)
+            except IntegrityError:
+                # A user was deleted after their request; keep the visits anonymously
+                self._forget_deleted_users(records)
+                Visit.objects.bulk_create([Visit(**record) for record in records], batch_size=self.flush_records)
+        except Exception as e:
+            logger.error(f"Failed to write {len(records)} visits: {str(e)}")
+            return 0
+        return len(records)
+
+    @staticmethod
+    def _forget_deleted_users(records):
+        user_model = get_user_model()
+        user_ids = {record['user_id'] for record in records if record['user_id'] is not None}
+        existing = set(user_model.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        for record in records:
+            if record['user_id'] not in existing:
+                record['user_id'] = None
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+            close_old_connections()
+
+
+visit_buffer = VisitBuffer()
+if VISIT_FLUSH_IN_BACKGROUND:
+    # Without the writer thread (test runs) nothing is flushed at exit: the
+    # test database is gone by then and rows would reach the configured one
+    atexit.register(visit_buffer.flush)
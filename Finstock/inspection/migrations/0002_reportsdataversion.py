@@ -0,0 +1,25 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inspection', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportsDataversion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(max_length=32, unique=True)),
+                ('deletes', models.PositiveBigIntegerField()),
+            ],
+            options={
+                'db_table': 'reports_dataversion',
+                'managed': False,
+            },
+        ),
+    ]
@@ -307,6 +307,16 @@ class ReportsCalculatedfield(models.Model):
         db_table = 'reports_calculatedfield'
 
 
+class ReportsDataversion(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    source = models.CharField(unique=True, max_length=32)
+    deletes = models.PositiveBigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'reports_dataversion'
+
+
 class ReportsReport(models.Model):
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=255)
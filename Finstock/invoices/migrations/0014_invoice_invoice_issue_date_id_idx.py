@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0013_invoice_qr_code_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['issue_date', 'id'], name='invoice_issue_date_id_idx'),
+        ),
+    ]
@@ -1,12 +1,9 @@
 from django.db import models
 from core.models import TimeStampedModel, Customer
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, F
-import qrcode
-from io import BytesIO
-from django.core.files.base import ContentFile
 from django.utils.dateparse import parse_date
 import uuid
+from core import qr_pipeline, totals
 from products.models import Product
 
 User = get_user_model()
@@ -36,17 +33,29 @@ class Invoice(TimeStampedModel):
         default='draft'
     )
     qr_code = models.ImageField(upload_to='invoice_qr_codes/', null=True, blank=True)
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the invoice list (-issue_date, -id)
+            models.Index(fields=['issue_date', 'id'], name='invoice_issue_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"Invoice {self.invoice_number} for {self.customer or self.user.username}"
 
     def update_total_amount(self):
-        self.total_amount = self.items.aggregate(
-            total=Sum(F('quantity') * F('unit_price'))
-        )['total'] or 0
-        self.save(update_fields=['total_amount'])
+        """
+        Recompute the stored total from all items. Item saves and deletes
+        keep it current incrementally; this is for repairs.
+        """
+        totals.reconcile(Invoice, InvoiceItem, 'invoice', pks=[self.pk])
+        self.refresh_from_db(fields=['total_amount'])
 
-    def generate_qr_code(self):
+    QR_FIELD = 'qr_code'
+    QR_SELECT_RELATED = ('customer', 'user')
+
+    def qr_payload(self):
         issue_date = self.issue_date
         due_date = self.due_date
     
@@ -64,35 +73,28 @@ class Invoice(TimeStampedModel):
             'due_date': due_date.isoformat(),
             'status': self.status
         }
-    
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(str(qr_data))
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-        blob = BytesIO()
-        img.save(blob, 'PNG')
-
-        self.qr_code.save(
-            f'invoice_qr_{self.invoice_number}.png',
-            ContentFile(blob.getvalue()),
-            save=False
-        )
+        return str(qr_data)
+
+    def qr_filename(self, digest):
+        return f'invoice_qr_{self.invoice_number}.png'
+
+    def generate_qr_code(self):
+        qr_pipeline.render_instances([self], force=True)
 
     def save(self, *args, **kwargs):
-        if not self.qr_code:
-            self.generate_qr_code()
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # total_amount is maintained by item deltas; never write back a stale copy
+            kwargs['update_fields'] = totals.fields_without_total(self)
         super().save(*args, **kwargs)
+        # Rendered by the QR pipeline; unchanged details are not re-rendered
+        qr_pipeline.enqueue(self)
 
-class InvoiceItem(models.Model):
+class InvoiceItem(totals.TotalTrackingItem, models.Model):
     """
     Model representing an item within an invoice.
     """
+    TOTAL_PARENT = 'invoice'
+
     invoice = models.ForeignKey(
         Invoice, related_name='items', on_delete=models.CASCADE
     )
@@ -113,9 +115,6 @@ class InvoiceItem(models.Model):
             self.description = self.product.name
             self.unit_price = self.product.price
         super().save(*args, **kwargs)
-        self.invoice.update_total_amount()
 
-    def delete(self, *args, **kwargs):
-        invoice = self.invoice
-        super().delete(*args, **kwargs)
-        invoice.update_total_amount()
+
+totals.connect(InvoiceItem)
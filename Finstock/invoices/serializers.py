@@ -3,6 +3,7 @@ from .models import Invoice, InvoiceItem
 from core.models import Customer
 from products.models import Product
 from core.serializers import CustomerSerializer
+from core.qr_images import qr_image_url
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -39,13 +40,16 @@ class InvoiceSerializer(serializers.ModelSerializer):
         allow_null=True
     )
     status = serializers.ChoiceField(choices=Invoice.status.field.choices, required=True)
-    qr_code = serializers.ImageField(read_only=True)
+    qr_code = serializers.SerializerMethodField()
 
     class Meta:
         model = Invoice
         fields = ['id', 'user', 'customer', 'customer_id', 'invoice_number', 'issue_date', 'due_date', 'status', 'items', 'total_amount', 'qr_code']
         read_only_fields = ['total_amount', 'user', 'invoice_number', 'qr_code']
 
+    def get_qr_code(self, obj):
+        return qr_image_url(self.context.get('request'), obj, 'invoice')
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         customer = validated_data.pop('customer', None)
@@ -53,8 +57,7 @@ class InvoiceSerializer(serializers.ModelSerializer):
         
         for item_data in items_data:
             InvoiceItem.objects.create(invoice=invoice, **item_data)
-        
-        invoice.update_total_amount()
+
         return invoice
 
     def update(self, instance, validated_data):
@@ -73,8 +76,9 @@ class InvoiceSerializer(serializers.ModelSerializer):
             instance.items.all().delete()
             for item_data in items_data:
                 InvoiceItem.objects.create(invoice=instance, **item_data)
-        
-        instance.update_total_amount()
+
+        # Item deltas were applied in SQL; deletes did not touch this instance
+        instance.refresh_from_db(fields=['total_amount'])
         return instance
 
     def validate(self, data):
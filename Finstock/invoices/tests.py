@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
@@ -20,6 +20,7 @@ import json
 
 logger = logging.getLogger(__name__)
 
+@override_settings(QR_RENDER_EXECUTOR='core.qr_pipeline.SynchronousQRRenderExecutor')
 class InvoiceQRCodeTests(TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(
@@ -57,6 +58,7 @@ class InvoiceQRCodeTests(TestCase):
         self.assertEqual(original_qr_code, self.invoice.qr_code.name)
 
 
+@override_settings(QR_RENDER_EXECUTOR='core.qr_pipeline.SynchronousQRRenderExecutor')
 class InvoiceAPIQRCodeTests(TransactionTestCase):
     def setUp(self):
         logger.info("Starting test setup")
@@ -8,7 +8,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import HttpResponse, FileResponse
-from rest_framework.pagination import PageNumberPagination
+from core.utils.pagination import KeysetPagination
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter
@@ -45,7 +45,7 @@ class DecimalEncoder(json.JSONEncoder):
             return str(obj)
         return super(DecimalEncoder, self).default(obj)
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -64,6 +64,7 @@ class InvoiceViewSet(BaseAccessControlViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-issue_date', '-id')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'issue_date', 'due_date']
     search_fields = ['customer__name', 'invoice_number']
@@ -147,19 +148,9 @@ class InvoiceViewSet(BaseAccessControlViewSet):
 
         return queryset.select_related('customer').prefetch_related('items')
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.update_total_amount()  # Ensure total_amount is up to date
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        
-        # Update total_amount for all invoices in the queryset
-        for invoice in queryset:
-            invoice.update_total_amount()
-        
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_product_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'stock', 'low_stock_threshold'], name='product_active_stock_idx'),
+        ),
+    ]
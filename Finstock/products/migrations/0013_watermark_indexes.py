@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_product_active_stock_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['modified_at'], name='product_modified_idx'),
+        ),
+    ]
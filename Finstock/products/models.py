@@ -1,11 +1,8 @@
 from django.conf import settings
 from django.db import models
 from django.db.models import Sum
-import qrcode
 import uuid
-from io import BytesIO
-from django.core.files.base import ContentFile
-from PIL import Image
+from core import qr_pipeline
 
 class Category(models.Model):
     name = models.CharField(max_length=255)
@@ -39,12 +36,24 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     qr_code = models.ImageField(upload_to='product_qr_codes/', blank=True, null=True)
     qr_code_data = models.JSONField(default=dict, blank=True)
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')
     barcode = models.CharField(max_length=100, unique=True, null=True, blank=True)
     low_stock_threshold = models.PositiveIntegerField(
         default=10,
         help_text="Minimum stock level that triggers low stock alert"
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the product list (-created_at, -id)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            # Covers the low stock check (stock < low_stock_threshold among
+            # active products) without reading the table rows
+            models.Index(fields=['is_active', 'stock', 'low_stock_threshold'], name='product_active_stock_idx'),
+            # Latest change for the report and chatbot data watermarks
+            models.Index(fields=['modified_at'], name='product_modified_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} (ID: {self.id})"
 
@@ -73,9 +82,11 @@ class Product(models.Model):
             order__order_date__range=[start_date, end_date]
         ).aggregate(total_sales=Sum('quantity'))['total_sales'] or 0
 
-    def generate_qr_code(self):
-        """Generate QR code containing product information"""
-        qr_data = {
+    QR_FIELD = 'qr_code'
+    QR_SELECT_RELATED = ()
+
+    def qr_data(self):
+        return {
             'id': self.id,
             'sku': self.sku,
             'name': self.name,
@@ -83,26 +94,20 @@ class Product(models.Model):
             'stock': self.stock,
             'barcode': self.barcode  # Add barcode to QR data
         }
-        # Create QR code instance
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        # Add data
-        qr.add_data(str(qr_data))
-        qr.make(fit=True)
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-        # Save QR code image
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        filename = f'qr_code_{self.sku}.png'
-        # Save to model
-        self.qr_code.save(filename, ContentFile(buffer.getvalue()), save=False)
-        self.qr_code_data = qr_data
-        self.save()
+
+    def qr_payload(self):
+        return str(self.qr_data())
+
+    def qr_filename(self, digest):
+        return f'qr_code_{self.sku}.png'
+
+    def qr_render_updates(self):
+        self.qr_code_data = self.qr_data()
+        return {'qr_code_data': self.qr_code_data}
+
+    def generate_qr_code(self):
+        """Render the QR code containing product information now"""
+        qr_pipeline.render_instances([self], force=True)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
@@ -113,9 +118,9 @@ class Product(models.Model):
             
         super().save(*args, **kwargs)
         
-        # Generate QR code for new products or if SKU/barcode changed
+        # Render QR code for new products or if SKU/barcode changed
         if is_new or self.qr_code_data.get('sku') != self.sku or self.qr_code_data.get('barcode') != self.barcode:
-            self.generate_qr_code()
+            qr_pipeline.enqueue(self)
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
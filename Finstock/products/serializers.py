@@ -1,3 +1,4 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Product, Category, ProductImage, Review
 
@@ -53,7 +54,8 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_qr_code_url(self, obj):
         if obj.qr_code:
             return self.context['request'].build_absolute_uri(obj.qr_code.url)
-        return None
+        # Not rendered to storage; serve it from the on-the-fly endpoint
+        return self.context['request'].build_absolute_uri(reverse('qr-image', args=['product', obj.pk, 'png']))
 
     def validate_low_stock_threshold(self, value):
         """
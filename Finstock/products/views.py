@@ -4,8 +4,10 @@ from core.models import Customer, Order, OrderItem
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from django.core.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from core.lookup_index import product_index
+from core.utils.pagination import KeysetPagination
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet, DateFromToRangeFilter, NumberFilter
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
@@ -14,6 +16,7 @@ from .serializers import ProductSerializer, ProductImageSerializer, ReviewSerial
 from django.core.exceptions import PermissionDenied
 from users.constants import PermissionConstants
 from users.views import BaseAccessControlViewSet
+from core.utils.csv_export import iter_keyset, streaming_csv_response
 from users.models import CustomUser
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
@@ -54,7 +57,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -66,11 +69,12 @@ class ProductViewSet(BaseAccessControlViewSet):
     queryset = Product.objects.all().order_by('-created_at')
     serializer_class = ProductSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-created_at', '-id')
+    # ``search`` is answered by the product lookup index in get_queryset
     filter_backends = [
-        DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter
+        DjangoFilterBackend, filters.OrderingFilter
     ]
     filterset_fields = ['category', 'price', 'is_active']
-    search_fields = ['name', 'description', 'sku']
     ordering_fields = ['name', 'price', 'created_at']
     filterset_class = ProductFilter
 
@@ -119,11 +123,8 @@ class ProductViewSet(BaseAccessControlViewSet):
         queryset = super().get_queryset()
         search_query = self.request.query_params.get('search', None)
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(sku__icontains=search_query)
-            )
+            # Best matches first, unless the client asks for an ordering
+            queryset = product_index.filter(queryset, search_query)
         return queryset
 
     def perform_create(self, serializer):
@@ -344,26 +345,17 @@ class ProductViewSet(BaseAccessControlViewSet):
     def export_csv(self, request):
         queryset = self.filter_queryset(self.get_queryset())
 
-        # Create the CSV file
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow(['ID', 'Name', 'SKU', 'Price', 'Category', 'Is Active'])
-
-        # Write data
-        for product in queryset:
-            writer.writerow([
-                product.id, product.name, product.sku, product.price,
-                product.category.name if product.category else 'N/A',
-                product.is_active
-            ])
-
-        # Create the HTTP response
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=products.csv'
+        def rows():
+            for product in iter_keyset(queryset, ['pk', 'name', 'sku', 'price', 'category__name', 'is_active']):
+                yield [
+                    product['pk'], product['name'], product['sku'], product['price'],
+                    product['category__name'] or 'N/A',
+                    product['is_active']
+                ]
 
-        return response
+        return streaming_csv_response(
+            'products.csv', ['ID', 'Name', 'SKU', 'Price', 'Category', 'Is Active'], rows()
+        )
 
     @action(detail=False, methods=['get'])
     def export_pdf(self, request):
@@ -440,6 +432,9 @@ class ProductViewSet(BaseAccessControlViewSet):
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
+        except NotFound:
+            # Out-of-range pages and invalid cursors
+            raise
         except Exception as e:
             logger.error(f"Error in product list view: {str(e)}")
             return Response({
@@ -450,15 +445,6 @@ class ProductViewSet(BaseAccessControlViewSet):
                 "previous": None
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def filter_queryset(self, queryset):
-        for backend in list(self.filter_backends):
-            queryset = backend().filter_queryset(self.request, queryset, self)
-
-        if not queryset.exists():
-            return Product.objects.none()
-
-        return queryset
-
     def update(self, request, *args, **kwargs):
         try:
             logger.info(f"Received update request for product ID: {kwargs.get('pk')}")
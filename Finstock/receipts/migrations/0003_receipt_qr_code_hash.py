@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0002_alter_receipt_invoice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='qr_code_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,10 +1,8 @@
 import uuid
-from io import BytesIO
 from django.db import models
-from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
+from core import qr_pipeline
 from core.models import TimeStampedModel
-import qrcode
 from django.utils.timezone import now
 from django.utils.dateparse import parse_date
 
@@ -37,11 +35,15 @@ class Receipt(TimeStampedModel):
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
     notes = models.TextField(blank=True, null=True)
     qr_code = models.ImageField(upload_to='receipt_qr_codes/', null=True, blank=True)
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')
     
     def __str__(self):
         return f"Receipt {self.receipt_number} for Invoice {self.invoice.invoice_number}"
     
-    def generate_qr_code(self):
+    QR_FIELD = 'qr_code'
+    QR_SELECT_RELATED = ('invoice__customer', 'user')
+
+    def qr_payload(self):
         payment_date = self.payment_date
         
         if isinstance(payment_date, str):
@@ -57,37 +59,24 @@ class Receipt(TimeStampedModel):
             'payment_reference': self.payment_reference or '',
         }
         
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(str(qr_data))
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        blob = BytesIO()
-        img.save(blob, 'PNG')
-        
-        self.qr_code.save(
-            f'receipt_qr_{self.receipt_number}.png',
-            ContentFile(blob.getvalue()),
-            save=False
-        )
+        return str(qr_data)
+
+    def qr_filename(self, digest):
+        return f'receipt_qr_{self.receipt_number}.png'
+
+    def generate_qr_code(self):
+        qr_pipeline.render_instances([self], force=True)
     
     def save(self, *args, **kwargs):
         # Set amount_paid to invoice total if not specified
         if not self.amount_paid:
             self.amount_paid = self.invoice.total_amount
             
-        # Generate QR code if not present
-        if not self.qr_code:
-            self.generate_qr_code()
-            
         # Update invoice status to 'paid' if not already
         if self.invoice.status != 'paid':
             self.invoice.status = 'paid'
             self.invoice.save(update_fields=['status'])
             
         super().save(*args, **kwargs)
+        # Rendered by the QR pipeline; unchanged details are not re-rendered
+        qr_pipeline.enqueue(self)
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Receipt
 from invoices.serializers import InvoiceItemSerializer
 from invoices.models import InvoiceItem
+from core.qr_images import qr_image_url
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,7 @@ class ReceiptSerializer(serializers.ModelSerializer):
     invoice_number = serializers.SerializerMethodField()
     customer_name = serializers.SerializerMethodField()
     items = serializers.SerializerMethodField()
+    qr_code = serializers.SerializerMethodField()
     
     class Meta:
         model = Receipt
@@ -21,6 +23,9 @@ class ReceiptSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['receipt_number', 'qr_code']
     
+    def get_qr_code(self, obj):
+        return qr_image_url(self.context.get('request'), obj, 'receipt')
+
     def get_invoice_number(self, obj):
         return str(obj.invoice.invoice_number)
     
@@ -8,6 +8,8 @@ from django.db.models import Q
 from .models import Receipt
 from .serializers import ReceiptSerializer, ReceiptDetailSerializer
 from users.views import BaseAccessControlViewSet
+from core import qr_images
+from core.utils.csv_export import iter_keyset, streaming_csv_response
 from users.constants import PermissionConstants
 from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.renderers import JSONRenderer
@@ -152,6 +154,36 @@ class ReceiptViewSet(BaseAccessControlViewSet):
             "deleted_count": deleted_count
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        method_labels = dict(Receipt.PAYMENT_METHOD_CHOICES)
+        fields = [
+            'pk', 'receipt_number', 'invoice__invoice_number', 'invoice__customer__first_name',
+            'invoice__customer__last_name', 'payment_date', 'payment_method', 'payment_reference', 'amount_paid'
+        ]
+
+        def rows():
+            for receipt in iter_keyset(queryset, fields):
+                customer = f"{receipt['invoice__customer__first_name'] or ''} {receipt['invoice__customer__last_name'] or ''}"
+                yield [
+                    receipt['pk'],
+                    receipt['receipt_number'],
+                    receipt['invoice__invoice_number'] or '',
+                    customer.strip(),
+                    receipt['payment_date'],
+                    method_labels.get(receipt['payment_method'], receipt['payment_method']),
+                    receipt['payment_reference'] or '',
+                    receipt['amount_paid']
+                ]
+
+        return streaming_csv_response(
+            'receipts.csv',
+            ['ID', 'Receipt Number', 'Invoice Number', 'Customer', 'Payment Date',
+             'Payment Method', 'Payment Reference', 'Amount Paid'],
+            rows()
+        )
+
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         receipt = self.get_object()
@@ -404,15 +436,32 @@ class ReceiptViewSet(BaseAccessControlViewSet):
             notes_paragraph = Paragraph(receipt.notes, notes_style)
             elements.append(notes_paragraph)
     
-        # QR Code (if available)
-        if receipt.qr_code and receipt.qr_code.name:  # Check both that qr_code exists and has a file
-            elements.append(Spacer(1, 0.2*inch))
+        # QR Code, rendered in memory from the receipt's current payload
+        elements.append(Spacer(1, 0.2*inch))
         
-            # If we have a QR code image field, use it
+        try:
+            qr_img_io = BytesIO(qr_images.get_image(receipt.qr_payload()))
+        
+            # Create a Table with a single cell for the QR code
+            qr_table = Table([[qr_img_io]], colWidths=[2*inch])
+            qr_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER')]))
+            elements.append(qr_table)
+        except Exception as e:
+            # If rendering the payload fails, fall back to a short summary
             try:
-                qr_img = Image.open(receipt.qr_code.path)
+                qr = qrcode.QRCode(
+                    version=1,
+                    error_correction=qrcode.constants.ERROR_CORRECT_L,
+                    box_size=4,
+                    border=4,
+                )
+                qr_data = f"Receipt: {receipt.receipt_number}\nAmount: N{receipt.amount_paid}\nDate: {receipt.payment_date.strftime('%m/%d/%Y')}"
+                qr.add_data(qr_data)
+                qr.make(fit=True)
+            
+                qr_img = qr.make_image(fill_color="black", back_color="white")
                 qr_img_io = BytesIO()
-                qr_img.save(qr_img_io, format='PNG')
+                qr_img.save(qr_img_io)
                 qr_img_io.seek(0)
             
                 # Create a Table with a single cell for the QR code
@@ -420,30 +469,8 @@ class ReceiptViewSet(BaseAccessControlViewSet):
                 qr_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER')]))
                 elements.append(qr_table)
             except Exception as e:
-                # If using the stored QR code fails, generate a new one
-                try:
-                    qr = qrcode.QRCode(
-                        version=1,
-                        error_correction=qrcode.constants.ERROR_CORRECT_L,
-                        box_size=4,
-                        border=4,
-                    )
-                    qr_data = f"Receipt: {receipt.receipt_number}\nAmount: N{receipt.amount_paid}\nDate: {receipt.payment_date.strftime('%m/%d/%Y')}"
-                    qr.add_data(qr_data)
-                    qr.make(fit=True)
-                
-                    qr_img = qr.make_image(fill_color="black", back_color="white")
-                    qr_img_io = BytesIO()
-                    qr_img.save(qr_img_io)
-                    qr_img_io.seek(0)
-                
-                    # Create a Table with a single cell for the QR code
-                    qr_table = Table([[qr_img_io]], colWidths=[2*inch])
-                    qr_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER')]))
-                    elements.append(qr_table)
-                except Exception as e:
-                    # If QR code generation fails, skip it
-                    pass
+                # If QR code generation fails, skip it
+                pass
     
         # Thank You Message
         elements.append(Spacer(1, 0.3*inch))
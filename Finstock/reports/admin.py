@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Report, ReportEntry, ReportFile
+from .models import Report, ReportEntry, ReportFile, ReportJob
 
 
 class ReportFileInline(admin.TabularInline):
@@ -35,3 +35,10 @@ class ReportFileAdmin(admin.ModelAdmin):
     list_display = ('file', 'entry', 'uploaded_at')
     list_filter = ('uploaded_at',)
     search_fields = ('file',)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('report', 'format', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'format', 'created_at')
+    search_fields = ('report__name', 'dedup_key')
@@ -0,0 +1,318 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum, Count, F, DecimalField, Q
+from django.db.models.functions import TruncMonth
+
+from transactions.models import Transaction, TransactionDailyRollup
+from products.models import Product
+from core.models import Customer, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+FULFILLED_ORDER_STATUSES = ('delivered', 'shipped')
+
+LINE_TOTAL = F('quantity') * F('unit_price')
+MONEY_FIELD = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _format_number(value):
+    # Imported lazily to avoid a circular import with reports.utils
+    from .utils import format_number
+    return format_number(value)
+
+
+class ReportAggregator:
+    """
+    Batched fact loader for the comprehensive report.
+
+    Each table is read with one or two grouped queries for the requested
+    period and every report section is derived from those rows in memory,
+    so the number of round trips no longer grows with the number of sections.
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def fetch_transaction_facts(self):
+        """
+        One row per (transaction_type, category, month) for the period, read
+        from the daily rollup table rather than the raw ledger.
+        """
+        rows = list(
+            TransactionDailyRollup.objects.filter(
+                date__range=[self.start_date, self.end_date]
+            ).annotate(
+                month=TruncMonth('date')
+            ).values(
+                'transaction_type', 'category', 'month'
+            ).annotate(
+                total_amount=Sum('total_amount'),
+                transaction_count=Sum('transaction_count')
+            ).order_by()
+        )
+        for row in rows:
+            # Rollups store uncategorized transactions with an empty category
+            row['category'] = row['category'] or None
+        return rows
+
+    def fetch_order_facts(self):
+        """
+        One row per (customer, status, month) for orders placed in the period.
+
+        ``itemised_orders`` counts only orders that have at least one item, which
+        matches the AVG-over-subquery semantics of the previous implementation
+        (orders without items produced NULL totals and were ignored).
+        """
+        return list(
+            Order.objects.filter(
+                order_date__range=[self.start_date, self.end_date]
+            ).annotate(
+                month=TruncMonth('order_date')
+            ).values(
+                'customer_id', 'status', 'month'
+            ).annotate(
+                order_count=Count('id', distinct=True),
+                itemised_orders=Count('items__order', distinct=True),
+                revenue=Sum(
+                    F('items__quantity') * F('items__unit_price'),
+                    output_field=MONEY_FIELD
+                )
+            ).order_by()
+        )
+
+    def fetch_product_sales(self):
+        """
+        Units and revenue per active product from fulfilled orders in the period.
+        """
+        return list(
+            OrderItem.objects.filter(
+                order__order_date__range=[self.start_date, self.end_date],
+                order__status__in=FULFILLED_ORDER_STATUSES,
+                product__is_active=True
+            ).values(
+                'product_id', 'product__name'
+            ).annotate(
+                total_sales=Sum('quantity'),
+                total_revenue=Sum(LINE_TOTAL, output_field=MONEY_FIELD)
+            ).order_by()
+        )
+
+    def fetch_inventory_facts(self):
+        active_products = Product.objects.filter(is_active=True)
+        totals = active_products.aggregate(
+            product_count=Count('id'),
+            stock_value=Sum(F('stock') * F('price'), output_field=MONEY_FIELD)
+        )
+        low_stock = list(
+            active_products.filter(
+                stock__lt=F('low_stock_threshold')
+            ).values(
+                'id', 'name', 'stock', 'low_stock_threshold'
+            ).order_by('stock')
+        )
+        return totals, low_stock
+
+    def fetch_customer_facts(self):
+        return Customer.objects.aggregate(
+            total_customers=Count('id', distinct=True),
+            total_orders=Count('orders')
+        )
+
+    def fetch_customer_details(self, customer_ids):
+        if not customer_ids:
+            return {}
+        rows = Customer.objects.filter(
+            id__in=customer_ids
+        ).annotate(
+            total_orders=Count('orders')
+        ).values('id', 'first_name', 'last_name', 'email', 'total_orders')
+        return {row['id']: row for row in rows}
+
+    @staticmethod
+    def build_financial_overview(transaction_rows):
+        category_mapping = dict(Transaction.CATEGORY_CHOICES)
+        type_totals = defaultdict(Decimal)
+        income_by_category = defaultdict(lambda: [Decimal('0.00'), 0])
+        uncategorized_income = [Decimal('0.00'), 0]
+        expense_by_category = defaultdict(lambda: [Decimal('0.00'), 0])
+        cash_flow = defaultdict(Decimal)
+
+        for row in transaction_rows:
+            amount = row['total_amount'] or Decimal('0.00')
+            count = row['transaction_count']
+            transaction_type = row['transaction_type']
+            category = row['category']
+
+            type_totals[transaction_type] += amount
+            cash_flow[(row['month'], transaction_type)] += amount
+
+            if transaction_type == 'income':
+                bucket = uncategorized_income if not category else income_by_category[category]
+                bucket[0] += amount
+                bucket[1] += count
+            elif transaction_type in ('expense', 'cost_of_services'):
+                bucket = expense_by_category[category]
+                bucket[0] += amount
+                bucket[1] += count
+
+        income_breakdown = [{
+            'category': category_mapping[category],
+            'total_amount': _format_number(total),
+            'transaction_count': count
+        } for category, (total, count) in sorted(
+            income_by_category.items(), key=lambda item: item[1][0], reverse=True
+        ) if category in category_mapping]
+
+        if uncategorized_income[0]:
+            income_breakdown.append({
+                'category': 'Uncategorized Income',
+                'total_amount': _format_number(uncategorized_income[0]),
+                'transaction_count': uncategorized_income[1]
+            })
+
+        expense_breakdown = [{
+            'category': category,
+            'total_amount': _format_number(total),
+            'transaction_count': count
+        } for category, (total, count) in sorted(
+            expense_by_category.items(), key=lambda item: item[1][0], reverse=True
+        )]
+
+        monthly_cash_flow = [{
+            'month': month,
+            'transaction_type': transaction_type,
+            'total_amount': _format_number(total)
+        } for (month, transaction_type), total in sorted(
+            cash_flow.items(), key=lambda item: (item[0][0], item[0][1])
+        )]
+
+        revenue = type_totals['income']
+        cost_of_services = type_totals['cost_of_services']
+        operating_expenses = type_totals['expense']
+
+        return {
+            'total_revenue': _format_number(revenue),
+            'cost_of_services': _format_number(cost_of_services),
+            'operating_expenses': _format_number(operating_expenses),
+            'net_profit': _format_number(revenue - cost_of_services - operating_expenses),
+            'income_breakdown': income_breakdown,
+            'expense_breakdown': expense_breakdown,
+            'monthly_cash_flow': monthly_cash_flow
+        }
+
+    @staticmethod
+    def build_inventory_insights(inventory_totals, low_stock_rows, sales_rows):
+        sales_by_product = {row['product_id']: row for row in sales_rows}
+
+        low_stock_products = [{
+            'name': row['name'],
+            'stock': row['stock'],
+            'low_stock_threshold': row['low_stock_threshold'],
+            'total_sales': (sales_by_product.get(row['id']) or {}).get('total_sales') or 0
+        } for row in low_stock_rows]
+
+        top_selling = sorted(
+            (row for row in sales_rows if row['total_sales'] or row['total_revenue']),
+            key=lambda row: row['total_sales'] or 0,
+            reverse=True
+        )[:10]
+
+        return {
+            'total_product_count': inventory_totals['product_count'],
+            'total_stock_value': _format_number(inventory_totals['stock_value'] or Decimal('0.00')),
+            'inventory_status': {
+                'status': 'Healthy' if not low_stock_products else 'Attention Required',
+                'low_stock_count': len(low_stock_products)
+            },
+            'low_stock_products': low_stock_products,
+            'top_selling_products': [{
+                'name': row['product__name'],
+                'total_sales': row['total_sales'],
+                'total_revenue': _format_number(row['total_revenue'] or Decimal('0.00'))
+            } for row in top_selling]
+        }
+
+    def build_performance_metrics(self, order_rows, customer_totals):
+        total_orders = 0
+        itemised_orders = 0
+        total_revenue = Decimal('0.00')
+        monthly_sales = defaultdict(Decimal)
+        customer_spend = defaultdict(Decimal)
+
+        for row in order_rows:
+            revenue = row['revenue'] or Decimal('0.00')
+            total_orders += row['order_count']
+            itemised_orders += row['itemised_orders']
+            total_revenue += revenue
+            monthly_sales[row['month']] += revenue
+            if row['customer_id'] is not None and row['status'] in FULFILLED_ORDER_STATUSES:
+                customer_spend[row['customer_id']] += revenue
+
+        average_order_value = (
+            total_revenue / itemised_orders if itemised_orders else Decimal('0.00')
+        )
+
+        top_spenders = sorted(
+            ((customer_id, spend) for customer_id, spend in customer_spend.items() if spend),
+            key=lambda item: item[1],
+            reverse=True
+        )[:5]
+        details = self.fetch_customer_details([customer_id for customer_id, _ in top_spenders])
+
+        top_customers = []
+        for customer_id, spend in top_spenders:
+            customer = details.get(customer_id)
+            if customer is None:
+                continue
+            top_customers.append({
+                'id': customer['id'],
+                'first_name': customer['first_name'],
+                'last_name': customer['last_name'],
+                'email': customer['email'],
+                'total_orders': customer['total_orders'],
+                'total_spend': _format_number(spend)
+            })
+
+        total_customers = customer_totals['total_customers'] or 0
+        average_orders = (
+            customer_totals['total_orders'] / total_customers if total_customers else 0
+        )
+
+        return {
+            'customer_metrics': {
+                'total_customers': total_customers,
+                'average_orders_per_customer': float(average_orders),
+                'top_customers': top_customers
+            },
+            'order_performance': {
+                'total_orders': total_orders,
+                'average_order_value': _format_number(average_order_value),
+                'total_revenue': _format_number(total_revenue)
+            },
+            'sales_trend': [{
+                'month': month,
+                'total_sales': _format_number(total)
+            } for month, total in sorted(monthly_sales.items())]
+        }
+
+    def build(self):
+        transaction_rows = self.fetch_transaction_facts()
+        order_rows = self.fetch_order_facts()
+        sales_rows = self.fetch_product_sales()
+        inventory_totals, low_stock_rows = self.fetch_inventory_facts()
+        customer_totals = self.fetch_customer_facts()
+
+        return {
+            'report_metadata': {
+                'period_start': self.start_date.strftime('%Y-%m-%d'),
+                'period_end': self.end_date.strftime('%Y-%m-%d')
+            },
+            'financial_overview': self.build_financial_overview(transaction_rows),
+            'inventory_insights': self.build_inventory_insights(
+                inventory_totals, low_stock_rows, sales_rows
+            ),
+            'performance_metrics': self.build_performance_metrics(order_rows, customer_totals)
+        }
@@ -7,5 +7,4 @@ class ReportsConfig(AppConfig):
     verbose_name = 'Reports Management'
 
     def ready(self):
-        # This method is called when Django starts so you can perform initialization tasks here
-        pass  # No initialization tasks specified here
+        import reports.signals  # noqa: F401
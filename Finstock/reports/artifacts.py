@@ -0,0 +1,133 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.models import Order
+from products.models import Product
+from transactions.models import Transaction
+
+from .models import DataVersion, ReportArtifact
+from .signals import WATERMARK_SOURCES
+
+logger = logging.getLogger(__name__)
+
+REPORT_ARTIFACT_MAX_AGE = getattr(settings, 'REPORT_ARTIFACT_MAX_AGE', timedelta(days=7))
+REPORT_ARTIFACT_MAX_BYTES = getattr(settings, 'REPORT_ARTIFACT_MAX_BYTES', 500 * 1024 * 1024)
+
+CACHE_HEADER = 'X-Report-Cache'
+
+
+def data_watermark(report):
+    """
+    A string that changes whenever data a report is rendered from changes.
+
+    The latest ``modified`` of each source catches inserts and edits and is
+    read from an index; ``DataVersion`` counts the deletes, which leave no
+    row behind. The report's own ``updated_at`` covers edits to its metadata.
+    """
+    parts = [report.updated_at.isoformat() if report.updated_at else '']
+    for model, modified_field in ((Transaction, 'modified'), (Order, 'modified'), (Product, 'modified_at')):
+        last_modified = model.objects.order_by(f'-{modified_field}').values_list(modified_field, flat=True).first()
+        parts.append(last_modified.isoformat() if last_modified else '')
+    deletes = dict(DataVersion.objects.values_list('source', 'deletes'))
+    parts.append(','.join(f"{source}:{deletes.get(source, 0)}" for source in WATERMARK_SOURCES.values()))
+    return '|'.join(parts)
+
+
+def artifact_key(report, file_format, start_date_str, end_date_str, watermark):
+    # Open-ended ranges default to "the last 30 days", so they are only valid for today
+    if not (start_date_str and end_date_str):
+        start_date_str = start_date_str or ''
+        end_date_str = f"{end_date_str or ''}@{timezone.localdate().isoformat()}"
+    raw = '\n'.join([str(report.pk), file_format, start_date_str, end_date_str, watermark])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _file_exists(report_file):
+    try:
+        return report_file.file.storage.exists(report_file.file.name)
+    except Exception:
+        return False
+
+
+def get_or_render(report, file_format, start_date_str, end_date_str, render):
+    """
+    Return ``(report_file, hit)`` for the export. On a miss ``render()`` is
+    called to produce the file content, which is saved and indexed.
+    """
+    from .utils import save_generated_file
+
+    watermark = data_watermark(report)
+    key = artifact_key(report, file_format, start_date_str, end_date_str, watermark)
+
+    artifact = ReportArtifact.objects.select_related('report_file').filter(cache_key=key).first()
+    if artifact is not None:
+        if _file_exists(artifact.report_file):
+            ReportArtifact.objects.filter(pk=artifact.pk).update(
+                hits=F('hits') + 1, last_accessed=timezone.now()
+            )
+            logger.info(f"Report artifact cache hit for report {report.id} ({file_format})")
+            return artifact.report_file, True
+        # The file was removed from storage behind our back
+        artifact.report_file.delete()
+
+    report_file = save_generated_file(report, render(), file_format)
+    try:
+        with transaction.atomic():
+            ReportArtifact.objects.create(
+                cache_key=key,
+                report=report,
+                format=file_format,
+                start_date=start_date_str or '',
+                end_date=end_date_str or '',
+                watermark=watermark,
+                report_file=report_file,
+                size=report_file.file.size
+            )
+    except IntegrityError:
+        # A concurrent request rendered the same artifact first; ours stays an ordinary ReportFile
+        logger.info(f"Report artifact {key} was stored concurrently")
+
+    logger.info(f"Report artifact cache miss for report {report.id} ({file_format})")
+    evict_artifacts()
+    return report_file, False
+
+
+def _delete(artifact):
+    report_file = artifact.report_file
+    try:
+        report_file.file.delete(save=False)
+    except Exception as e:
+        logger.warning(f"Could not delete artifact file {report_file.file.name}: {str(e)}")
+    # Cascades to the artifact row
+    report_file.delete()
+
+
+def evict_artifacts(max_age=REPORT_ARTIFACT_MAX_AGE, max_bytes=REPORT_ARTIFACT_MAX_BYTES):
+    """
+    Delete artifacts not accessed within ``max_age``, then the least recently
+    used ones until the cache fits in ``max_bytes``. Returns the number evicted.
+    """
+    evicted = 0
+    cutoff = timezone.now() - max_age
+    for artifact in ReportArtifact.objects.select_related('report_file').filter(last_accessed__lt=cutoff):
+        _delete(artifact)
+        evicted += 1
+
+    total = ReportArtifact.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total > max_bytes:
+        for artifact in ReportArtifact.objects.select_related('report_file').order_by('last_accessed'):
+            if total <= max_bytes:
+                break
+            total -= artifact.size
+            _delete(artifact)
+            evicted += 1
+
+    if evicted:
+        logger.info(f"Evicted {evicted} report artifacts")
+    return evicted
@@ -0,0 +1,303 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Report, ReportJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPORT_JOB_EXECUTOR = 'reports.jobs.ThreadPoolJobExecutor'
+REPORT_JOB_WORKERS = getattr(settings, 'REPORT_JOB_WORKERS', 2)
+REPORT_JOB_STALE_AFTER = getattr(settings, 'REPORT_JOB_STALE_AFTER', timedelta(minutes=30))
+
+
+def build_dedup_key(report_id, file_format, start_date, end_date, params=None, user=None):
+    """
+    Identical renders share one active job. Emails are also keyed by
+    recipient, since each recipient needs its own send. Users other than
+    administrators only see their own jobs, so their requests are keyed by
+    user; the rendered file is still shared through the artifact cache.
+    """
+    parts = [
+        str(report_id),
+        file_format,
+        start_date.isoformat() if start_date else '',
+        end_date.isoformat() if end_date else '',
+    ]
+    if file_format == 'email':
+        parts.append((params or {}).get('email', ''))
+    if user is not None and not (user.is_superuser or user.is_role('Administrator')):
+        parts.append(f"user:{user.pk}")
+    return ':'.join(parts)
+
+
+def enqueue_report_job(report, file_format, start_date=None, end_date=None, user=None, params=None):
+    """
+    Queue a render job, or return the active job for the same report, format
+    and date range. Returns ``(job, created)``.
+    """
+    params = params or {}
+    dedup_key = build_dedup_key(report.id, file_format, start_date, end_date, params, user)
+
+    with transaction.atomic():
+        # Locking the report serializes enqueues for it. Locking the matching
+        # jobs alone is not enough: when there are none, nothing is locked.
+        Report.objects.select_for_update().only('pk').get(pk=report.pk)
+        expire_stale_queued_jobs(dedup_key=dedup_key)
+        existing = active_job(dedup_key)
+        if existing:
+            logger.info(f"Reusing active report job {existing.id} for {dedup_key}")
+            return existing, False
+
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    report=report,
+                    format=file_format,
+                    start_date=start_date,
+                    end_date=end_date,
+                    params=params,
+                    dedup_key=dedup_key,
+                    requested_by=user
+                )
+        except IntegrityError:
+            # The one-active-job constraint caught a concurrent insert
+            existing = active_job(dedup_key)
+            if existing is None:
+                raise
+            logger.info(f"Reusing active report job {existing.id} for {dedup_key}")
+            return existing, False
+        transaction.on_commit(lambda: get_executor().submit(job.id))
+
+    logger.info(f"Queued {file_format} job {job.id} for report {report.id}")
+    return job, True
+
+
+def active_job(dedup_key):
+    """The queued or running job for ``dedup_key``, if any. Stale queued jobs are ignored."""
+    return ReportJob.objects.filter(
+        dedup_key=dedup_key, status__in=ReportJob.ACTIVE_STATUSES
+    ).exclude(
+        status=ReportJob.STATUS_QUEUED, created_at__lt=timezone.now() - REPORT_JOB_STALE_AFTER
+    ).first()
+
+
+def expire_stale_queued_jobs(stale_after=REPORT_JOB_STALE_AFTER, dedup_key=None):
+    """
+    Fail jobs queued for longer than ``stale_after``. A thread pool
+    executor loses its queue on restart, and such a job would otherwise
+    block every identical request. Returns the number expired.
+    """
+    jobs = ReportJob.objects.filter(
+        status=ReportJob.STATUS_QUEUED,
+        created_at__lt=timezone.now() - stale_after
+    )
+    if dedup_key is not None:
+        jobs = jobs.filter(dedup_key=dedup_key)
+    return jobs.update(
+        status=ReportJob.STATUS_FAILED,
+        error='Expired before a worker picked it up',
+        finished_at=timezone.now()
+    )
+
+
+def claim_job(job_id):
+    """
+    Move a queued job to running. Returns False if another worker got it first.
+    """
+    return ReportJob.objects.filter(
+        pk=job_id, status=ReportJob.STATUS_QUEUED
+    ).update(
+        status=ReportJob.STATUS_RUNNING,
+        started_at=timezone.now()
+    ) == 1
+
+
+def claim_next_job():
+    """
+    Claim the oldest queued job, for polling workers. Returns its id or None.
+    """
+    while True:
+        job_id = ReportJob.objects.filter(
+            status=ReportJob.STATUS_QUEUED
+        ).order_by('created_at').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        if claim_job(job_id):
+            return job_id
+
+
+def requeue_stale_jobs(stale_after=REPORT_JOB_STALE_AFTER):
+    """
+    Return jobs left running by a worker that died to the queue.
+    """
+    return ReportJob.objects.filter(
+        status=ReportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - stale_after
+    ).update(status=ReportJob.STATUS_QUEUED, started_at=None)
+
+
+def render_job(job):
+    """
+    Produce the artifact for ``job``. Returns the saved ReportFile, or None
+    for email jobs.
+    """
+    from .artifacts import get_or_render
+    from .utils import (
+        EmailRecipient, export_report_to_excel, export_styled_report,
+        generate_pdf_report, send_enhanced_report_email
+    )
+
+    report = job.report
+    start_date_str = job.start_date.strftime('%Y-%m-%d') if job.start_date else None
+    end_date_str = job.end_date.strftime('%Y-%m-%d') if job.end_date else None
+
+    if job.format == 'email':
+        params = job.params
+        requester = job.requested_by
+        recipient = EmailRecipient(
+            email=params['email'],
+            full_name=params.get('recipient_name'),
+            role=requester.get_roles() if requester else [],
+            permissions=requester.get_permissions() if requester else []
+        )
+        send_enhanced_report_email(
+            report,
+            recipient,
+            start_date_str=start_date_str,
+            end_date_str=end_date_str,
+            include_summary=params.get('include_summary', True),
+            include_charts=params.get('include_charts', True)
+        )
+        return None
+
+    renderers = {
+        'pdf': generate_pdf_report,
+        'excel': export_report_to_excel,
+        'csv': export_styled_report,
+    }
+    report_file, _ = get_or_render(
+        report, job.format, start_date_str, end_date_str,
+        lambda: renderers[job.format](report, start_date_str, end_date_str)
+    )
+    return report_file
+
+
+def run_job(job_id, claimed=False):
+    """
+    Claim (unless already claimed) and execute one job, recording the outcome.
+    """
+    close_old_connections()
+    try:
+        if not claimed and not claim_job(job_id):
+            logger.info(f"Report job {job_id} already claimed, skipping")
+            return
+
+        job = ReportJob.objects.select_related('report', 'requested_by').get(pk=job_id)
+        ReportJob.objects.filter(pk=job_id).update(attempts=job.attempts + 1)
+
+        try:
+            result_file = render_job(job)
+        except Exception as e:
+            logger.error(f"Report job {job_id} failed: {str(e)}", exc_info=True)
+            ReportJob.objects.filter(pk=job_id).update(
+                status=ReportJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now()
+            )
+            return
+
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.STATUS_DONE,
+            result_file=result_file,
+            error='',
+            finished_at=timezone.now()
+        )
+        Report.objects.filter(pk=job.report_id).update(last_run=timezone.now())
+        logger.info(f"Report job {job_id} finished")
+    finally:
+        close_old_connections()
+
+
+class JobExecutor:
+    """
+    Executors decide where queued jobs run. ``submit`` is called after the
+    job row has been committed.
+    """
+
+    def submit(self, job_id):
+        raise NotImplementedError
+
+
+class SynchronousJobExecutor(JobExecutor):
+    """Runs the job inline. Intended for tests and management commands."""
+
+    def submit(self, job_id):
+        run_job(job_id)
+
+
+class ThreadPoolJobExecutor(JobExecutor):
+    """Runs jobs on a bounded thread pool inside the web process."""
+
+    def __init__(self, max_workers=REPORT_JOB_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+
+    def submit(self, job_id):
+        self.pool.submit(run_job, job_id)
+
+
+def _setup_worker_process():
+    import django
+    django.setup()
+
+
+class ProcessPoolJobExecutor(JobExecutor):
+    """
+    Runs jobs in worker processes, keeping CPU-heavy ReportLab and pandas
+    work off the web process GIL.
+    """
+
+    def __init__(self, max_workers=REPORT_JOB_WORKERS):
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_setup_worker_process)
+
+    def submit(self, job_id):
+        # Connections must not be shared with forked children
+        connections.close_all()
+        self.pool.submit(run_job, job_id)
+
+
+class DatabaseQueueExecutor(JobExecutor):
+    """
+    Leaves jobs in the table for ``manage.py run_report_jobs`` workers.
+    """
+
+    def submit(self, job_id):
+        pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    The process-wide executor named by ``settings.REPORT_JOB_EXECUTOR``.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            path = getattr(settings, 'REPORT_JOB_EXECUTOR', DEFAULT_REPORT_JOB_EXECUTOR)
+            _executor = import_string(path)()
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
@@ -0,0 +1,117 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Customer, Order, OrderItem
+from products.models import Category, Product
+from transactions.models import Transaction
+from transactions.rollups import rebuild_rollups
+from reports.aggregation import ReportAggregator
+
+User = get_user_model()
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the seeded benchmark data."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count and wall time of the comprehensive report aggregation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10000,100000,1000000',
+            help='Comma separated transaction counts to benchmark'
+        )
+        parser.add_argument('--days', type=int, default=365, help='Length of the report period')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        self.stdout.write(f"{'transactions':>14} {'queries':>8} {'seconds':>10}")
+
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    start_date, end_date = self.seed(size, options['days'], options['batch_size'])
+
+                    started = time.perf_counter()
+                    with CaptureQueriesContext(connection) as queries:
+                        ReportAggregator(start_date, end_date).build()
+                    elapsed = time.perf_counter() - started
+
+                    self.stdout.write(f"{size:>14} {len(queries):>8} {elapsed:>10.3f}")
+                    raise RollbackBenchmark()
+            except RollbackBenchmark:
+                pass
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete, seeded data rolled back'))
+
+    def seed(self, size, days, batch_size):
+        end_date = timezone.now()
+        start_date = end_date - timedelta(days=days)
+        rng = random.Random(size)
+
+        category = Category.objects.create(name='Benchmark Category')
+        Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark Product {i}',
+                sku=f'BENCH-{size}-{i}',
+                barcode=f'BENCH-{size}-{i}',
+                price=Decimal(rng.randint(100, 10000)) / 100,
+                stock=rng.randint(0, 200),
+                category=category
+            ) for i in range(200)
+        ])
+        Customer.objects.bulk_create([
+            Customer(first_name='Bench', last_name=str(i), email=f'bench-{size}-{i}@example.com')
+            for i in range(500)
+        ])
+        # Re-read the rows because bulk_create does not return primary keys on MySQL
+        products = list(Product.objects.filter(sku__startswith=f'BENCH-{size}-'))
+        customers = list(Customer.objects.filter(email__startswith=f'bench-{size}-'))
+
+        sales_rep = User.objects.create(username=f'benchmark-{size}')
+        Order.objects.bulk_create([
+            Order(
+                sales_rep=sales_rep,
+                customer=rng.choice(customers),
+                order_date=start_date + timedelta(minutes=rng.randint(0, days * 24 * 60)),
+                status=rng.choice(['pending', 'shipped', 'delivered', 'cancelled'])
+            ) for _ in range(size // 10)
+        ], batch_size=batch_size)
+        orders = Order.objects.filter(sales_rep=sales_rep).only('id')
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=product,
+                quantity=rng.randint(1, 5),
+                unit_price=product.price
+            ) for order in orders for product in rng.sample(products, 2)
+        ], batch_size=batch_size)
+
+        types = [choice[0] for choice in Transaction.TRANSACTION_TYPES]
+        categories = [choice[0] for choice in Transaction.CATEGORY_CHOICES] + [None]
+        for offset in range(0, size, batch_size):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    transaction_type=rng.choice(types),
+                    category=rng.choice(categories),
+                    amount=Decimal(rng.randint(100, 100000)) / 100,
+                    date=(start_date + timedelta(days=rng.randint(0, days))).date(),
+                    payment_method='cash',
+                    status='completed'
+                ) for _ in range(min(batch_size, size - offset))
+            ])
+        # bulk_create skips the rollup signals; build the daily rollups up front
+        rebuild_rollups()
+
+        return start_date, end_date
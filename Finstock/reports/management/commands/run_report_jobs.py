@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.jobs import claim_next_job, expire_stale_queued_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued report jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        expired = expire_stale_queued_jobs()
+        if expired:
+            self.stdout.write(self.style.WARNING(f'Expired {expired} report jobs left in the queue'))
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale report jobs'))
+
+        processed = 0
+        while True:
+            job_id = claim_next_job()
+            if job_id is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            run_job(job_id, claimed=True)
+            processed += 1
+            self.stdout.write(f'Processed report job {job_id}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} report jobs'))
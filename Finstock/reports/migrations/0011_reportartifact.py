@@ -0,0 +1,34 @@
+# Generated by Django 4.2.14 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0010_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('format', models.CharField(max_length=10)),
+                ('start_date', models.CharField(blank=True, default='', max_length=10)),
+                ('end_date', models.CharField(blank=True, default='', max_length=10)),
+                ('watermark', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed', models.DateTimeField(auto_now_add=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artifacts', to='reports.report')),
+                ('report_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='artifact', to='reports.reportfile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_accessed'], name='reports_rep_last_ac_8c526d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_reportartifact'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportaccesslog',
+            index=models.Index(fields=['report', 'accessed_at'], name='reportaccess_report_time_idx'),
+        ),
+    ]
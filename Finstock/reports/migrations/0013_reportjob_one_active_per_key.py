@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0012_reportaccesslog_reportaccess_report_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('queued', 'running'))), fields=('dedup_key',), name='reportjob_one_active_per_key'),
+        ),
+    ]
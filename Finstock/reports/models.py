@@ -205,3 +205,111 @@ class ReportAccessLog(models.Model):
 
     class Meta:
         ordering = ['-accessed_at']
+        indexes = [
+            # A report's access history, newest first
+            models.Index(fields=['report', 'accessed_at'], name='reportaccess_report_time_idx'),
+        ]
+
+class ReportJob(models.Model):
+    """
+    A queued render of a report to PDF, Excel or CSV, or an emailed report.
+
+    Jobs are claimed with a conditional UPDATE on ``status`` so any number of
+    executor threads or ``run_report_jobs`` workers can share the table as a
+    queue without a separate broker.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF Document'),
+        ('excel', 'Excel Spreadsheet'),
+        ('csv', 'CSV File'),
+        ('email', 'Email'),
+    ]
+
+    report = models.ForeignKey(Report, related_name='jobs', on_delete=models.CASCADE)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=255, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    result_file = models.ForeignKey(
+        ReportFile, related_name='jobs', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # Not enforced on MySQL (no partial indexes); enqueue_report_job also locks the report row
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=('queued', 'running')),
+                name='reportjob_one_active_per_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_format_display()} job for {self.report} ({self.status})"
+
+class ReportArtifact(models.Model):
+    """
+    A generated report file indexed by the inputs that produced it.
+
+    ``cache_key`` hashes the report, format, date range and a watermark of
+    the source data, so an export is only rendered again when one of those
+    changes. See ``reports.artifacts``.
+    """
+    cache_key = models.CharField(max_length=64, unique=True)
+    report = models.ForeignKey(Report, related_name='artifacts', on_delete=models.CASCADE)
+    format = models.CharField(max_length=10)
+    start_date = models.CharField(max_length=10, blank=True, default='')
+    end_date = models.CharField(max_length=10, blank=True, default='')
+    watermark = models.CharField(max_length=255)
+    report_file = models.OneToOneField(ReportFile, related_name='artifact', on_delete=models.CASCADE)
+    size = models.PositiveBigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_accessed']),
+        ]
+
+    def __str__(self):
+        return f"{self.format} artifact for {self.report} ({self.start_date} to {self.end_date})"
+
+
+class DataVersion(models.Model):
+    """
+    Counts deletes per source table for ``reports.artifacts.data_watermark``.
+
+    ``MAX(modified)`` sees inserts and edits but not a deleted row, so the
+    ``post_delete`` receivers in ``reports.signals`` bump ``deletes`` instead
+    of the watermark counting every table on each request.
+    """
+    source = models.CharField(max_length=32, unique=True)
+    deletes = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.source}: {self.deletes} deletes"
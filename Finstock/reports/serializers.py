@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from django.core import validators
 import re
-from .models import Report, ReportEntry, ReportFile, CalculatedField, ReportAccessLog
+from .models import Report, ReportEntry, ReportFile, CalculatedField, ReportAccessLog, ReportJob
 import logging
 from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
 
 logger = logging.getLogger(__name__)
 
@@ -121,3 +122,20 @@ class ReportAccessLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReportAccessLog
         fields = ['id', 'report', 'user', 'accessed_at', 'action']
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'format', 'start_date', 'end_date', 'status', 'error',
+            'attempts', 'requested_by', 'result_file', 'download_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.STATUS_DONE or not obj.result_file_id:
+            return None
+        return reverse('reportjob-download', args=[obj.id], request=self.context.get('request'))
@@ -0,0 +1,35 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from core.models import Order
+from products.models import Product
+from transactions.models import Transaction
+
+from .models import DataVersion
+
+# Sources tracked by reports.artifacts.data_watermark
+WATERMARK_SOURCES = {
+    Transaction: 'transaction',
+    Order: 'order',
+    Product: 'product',
+}
+
+
+def bump_delete_version(source):
+    if DataVersion.objects.filter(source=source).update(deletes=F('deletes') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(source=source, deletes=1)
+    except IntegrityError:
+        # Created by a concurrent delete in the meantime
+        DataVersion.objects.filter(source=source).update(deletes=F('deletes') + 1)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Product)
+def watermark_source_deleted(sender, instance, **kwargs):
+    bump_delete_version(WATERMARK_SOURCES[sender])
@@ -1,3 +1,359 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Customer, Order, OrderItem
+from products.models import Category, Product
+from transactions.models import Transaction
+from transactions.rollups import rebuild_rollups
+from .aggregation import ReportAggregator
+from .artifacts import evict_artifacts, get_or_render
+from . import jobs
+from .jobs import claim_job, enqueue_report_job, requeue_stale_jobs, reset_executor
+from .models import Report, ReportArtifact, ReportFile, ReportJob
+from .utils import export_styled_report, generate_comprehensive_report
+
+User = get_user_model()
+
+
+class ReportAggregatorTest(TestCase):
+    """
+    Tests that the batched aggregator derives every report section from a
+    fixed number of grouped queries.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='testpass123')
+        cls.customer = Customer.objects.create(
+            first_name='Ada', last_name='Obi', email='ada@example.com'
+        )
+        category = Category.objects.create(name='Gadgets')
+        # bulk_create skips the QR rendering done in Product.save
+        Product.objects.bulk_create([
+            Product(
+                name='Phone', sku='PHONE-1', barcode='PHONE-1', price=Decimal('50.00'),
+                stock=2, low_stock_threshold=5, category=category
+            )
+        ])
+        cls.product = Product.objects.get(sku='PHONE-1')
+
+        Order.objects.bulk_create([
+            Order(sales_rep=cls.user, customer=cls.customer, status='delivered')
+        ])
+        order = Order.objects.get(customer=cls.customer)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=cls.product, quantity=3, unit_price=Decimal('50.00'))
+        ])
+
+        today = timezone.now().date()
+        Transaction.objects.bulk_create([
+            Transaction(transaction_type='income', category='income', amount=Decimal('300.00'),
+                        date=today, payment_method='cash', status='completed'),
+            Transaction(transaction_type='income', category=None, amount=Decimal('20.00'),
+                        date=today, payment_method='cash', status='completed'),
+            Transaction(transaction_type='expense', category='utilities', amount=Decimal('40.00'),
+                        date=today, payment_method='cash', status='completed'),
+            Transaction(transaction_type='cost_of_services', category='cost_of_services',
+                        amount=Decimal('60.00'), date=today, payment_method='cash', status='completed'),
+        ])
+        # bulk_create bypasses the rollup signals
+        rebuild_rollups()
+
+    def setUp(self):
+        end_date = timezone.now()
+        self.aggregator = ReportAggregator(end_date - timedelta(days=30), end_date)
+
+    def test_financial_overview(self):
+        data = self.aggregator.build()['financial_overview']
+        self.assertEqual(data['total_revenue'], '320.00')
+        self.assertEqual(data['operating_expenses'], '40.00')
+        self.assertEqual(data['cost_of_services'], '60.00')
+        self.assertEqual(data['net_profit'], '220.00')
+        self.assertEqual(
+            [item['category'] for item in data['income_breakdown']],
+            ['Income', 'Uncategorized Income']
+        )
+        self.assertEqual(len(data['expense_breakdown']), 2)
+
+    def test_inventory_and_performance(self):
+        data = self.aggregator.build()
+        inventory = data['inventory_insights']
+        self.assertEqual(inventory['total_product_count'], 1)
+        self.assertEqual(inventory['low_stock_products'][0]['total_sales'], 3)
+        self.assertEqual(inventory['top_selling_products'][0]['total_revenue'], '150.00')
+
+        performance = data['performance_metrics']
+        self.assertEqual(performance['order_performance']['total_orders'], 1)
+        self.assertEqual(performance['order_performance']['average_order_value'], '150.00')
+        self.assertEqual(performance['customer_metrics']['top_customers'][0]['total_spend'], '150.00')
+
+    def test_query_count_is_constant(self):
+        # transactions, orders, product sales, inventory (2), customers, top customer details
+        with self.assertNumQueries(7):
+            self.aggregator.build()
+
+
+@override_settings(REPORT_JOB_EXECUTOR='reports.jobs.SynchronousJobExecutor')
+class ReportJobTest(TestCase):
+    """
+    Tests for the report job queue: deduplication, claiming and execution.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='scheduler', password='testpass123')
+        cls.report = Report.objects.create(name='Monthly Sales', created_by=cls.user)
+        cls.start = timezone.now().date() - timedelta(days=30)
+        cls.end = timezone.now().date()
+
+    def setUp(self):
+        reset_executor()
+        self.addCleanup(reset_executor)
+
+    def enqueue(self, file_format='csv', **kwargs):
+        return enqueue_report_job(
+            self.report, file_format, start_date=self.start, end_date=self.end, user=self.user, **kwargs
+        )
+
+    def test_identical_requests_share_one_active_job(self):
+        with self.captureOnCommitCallbacks():
+            first, created = self.enqueue()
+            second, created_again = self.enqueue()
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_database_allows_one_active_job_per_key(self):
+        with self.captureOnCommitCallbacks():
+            job, _ = self.enqueue()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReportJob.objects.create(report=self.report, format='csv', dedup_key=job.dedup_key)
+
+        # Finished jobs do not count
+        ReportJob.objects.create(
+            report=self.report, format='csv', dedup_key=job.dedup_key, status=ReportJob.STATUS_DONE
+        )
+
+    def test_concurrent_insert_returns_the_winning_job(self):
+        with self.captureOnCommitCallbacks():
+            winner, _ = self.enqueue()
+
+        # The lookup misses the job another request inserted after it
+        with mock.patch.object(jobs, 'active_job', side_effect=[None, winner]), \
+                self.captureOnCommitCallbacks() as callbacks:
+            job, created = self.enqueue()
+
+        self.assertFalse(created)
+        self.assertEqual(job.pk, winner.pk)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_different_email_recipients_get_separate_jobs(self):
+        with self.captureOnCommitCallbacks():
+            first, _ = self.enqueue('email', params={'email': 'a@example.com'})
+            second, created = self.enqueue('email', params={'email': 'b@example.com'})
+
+        self.assertTrue(created)
+        self.assertNotEqual(first.pk, second.pk)
+
+    def test_users_who_only_see_their_own_jobs_get_their_own_job(self):
+        other = User.objects.create_user(username='analyst', password='testpass123')
+        admin = User.objects.create_superuser(username='boss', password='testpass123')
+        with self.captureOnCommitCallbacks():
+            first, _ = self.enqueue()
+            second, created = enqueue_report_job(self.report, 'csv', self.start, self.end, user=other)
+            admin_first, _ = enqueue_report_job(self.report, 'csv', self.start, self.end, user=admin)
+            admin_second, admin_created = enqueue_report_job(self.report, 'csv', self.start, self.end, user=admin)
+
+        self.assertTrue(created)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.requested_by, other)
+        self.assertFalse(admin_created)
+        self.assertEqual(admin_first.pk, admin_second.pk)
+
+    def test_stale_queued_job_is_expired_instead_of_reused(self):
+        with self.captureOnCommitCallbacks():
+            stale, _ = self.enqueue()
+        # Queued by a thread pool that was lost on restart
+        ReportJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=2))
+
+        with self.captureOnCommitCallbacks():
+            job, created = self.enqueue()
+
+        self.assertTrue(created)
+        self.assertNotEqual(job.pk, stale.pk)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ReportJob.STATUS_FAILED)
+        self.assertTrue(stale.error)
+
+    def test_csv_job_runs_to_completion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job, _ = self.enqueue()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_DONE, job.error)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.result_file)
+        self.assertIsNotNone(job.finished_at)
+        self.report.refresh_from_db()
+        self.assertIsNotNone(self.report.last_run)
+
+        # A finished job no longer blocks a fresh render
+        with self.captureOnCommitCallbacks():
+            _, created = self.enqueue()
+        self.assertTrue(created)
+
+    def test_failed_render_is_recorded(self):
+        # Email jobs without a recipient cannot be rendered
+        with self.captureOnCommitCallbacks(execute=True):
+            job, _ = self.enqueue('email', params={})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    def test_job_can_only_be_claimed_once(self):
+        with self.captureOnCommitCallbacks():
+            job, _ = self.enqueue()
+
+        self.assertTrue(claim_job(job.pk))
+        self.assertFalse(claim_job(job.pk))
+
+    def test_stale_running_jobs_are_requeued(self):
+        with self.captureOnCommitCallbacks():
+            job, _ = self.enqueue()
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=2)
+        )
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_QUEUED)
+
+
+class ReportArtifactCacheTest(TestCase):
+    """
+    Tests that exports are only rendered again when their inputs change.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='exporter', password='testpass123')
+        cls.report = Report.objects.create(name='Quarterly Sales', created_by=cls.user)
+        cls.start = (timezone.now().date() - timedelta(days=30)).isoformat()
+        cls.end = timezone.now().date().isoformat()
+
+    def setUp(self):
+        self.renders = 0
+
+    def export(self, start=None, end=None):
+        def render():
+            self.renders += 1
+            return export_styled_report(self.report, start or self.start, end or self.end)
+        return get_or_render(self.report, 'csv', start or self.start, end or self.end, render)
+
+    def test_repeated_export_reuses_file(self):
+        first, hit = self.export()
+        self.assertFalse(hit)
+        second, hit = self.export()
+        self.assertTrue(hit)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(ReportArtifact.objects.get().hits, 1)
+
+    def test_new_data_invalidates_artifact(self):
+        first, _ = self.export()
+        Transaction.objects.bulk_create([
+            Transaction(
+                transaction_type='income', category='sale', amount=Decimal('10.00'),
+                date=timezone.now().date(), payment_method='cash', status='completed',
+                created_by=self.user
+            )
+        ])
+        second, hit = self.export()
+
+        self.assertFalse(hit)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(self.renders, 2)
+
+    def test_deleting_older_data_invalidates_artifact(self):
+        older = Transaction.objects.create(
+            transaction_type='income', category='income', amount=Decimal('10.00'),
+            date=timezone.now().date(), payment_method='cash', status='completed',
+            created_by=self.user
+        )
+        Transaction.objects.create(
+            transaction_type='income', category='income', amount=Decimal('20.00'),
+            date=timezone.now().date(), payment_method='cash', status='completed',
+            created_by=self.user
+        )
+        self.export()
+        older.delete()
+        _, hit = self.export()
+
+        self.assertFalse(hit)
+        self.assertEqual(self.renders, 2)
+
+    def test_item_edit_invalidates_artifact(self):
+        product = Product.objects.create(
+            name='Widget', sku='W-1', price=Decimal('10.00'), stock=5,
+            category=Category.objects.create(name='Hardware')
+        )
+        customer = Customer.objects.create(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+        order = Order.objects.create(user=self.user, sales_rep=self.user, customer=customer, status='pending')
+        item = OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=Decimal('10.00'))
+        self.export()
+
+        # Changes Order.total_amount with an UPDATE that bypasses Order.save()
+        item.quantity = 3
+        item.save()
+        _, hit = self.export()
+
+        self.assertFalse(hit)
+
+    def test_render_after_a_write_does_not_reuse_report_data(self):
+        cache.clear()
+        with mock.patch.object(ReportAggregator, 'build', autospec=True, return_value={}) as build:
+            generate_comprehensive_report(self.report, self.start, self.end)
+            generate_comprehensive_report(self.report, self.start, self.end)
+            self.assertEqual(build.call_count, 1)
+
+            Transaction.objects.create(
+                transaction_type='income', category='income', amount=Decimal('10.00'),
+                date=timezone.now().date(), payment_method='cash', status='completed',
+                created_by=self.user
+            )
+            generate_comprehensive_report(self.report, self.start, self.end)
+            self.assertEqual(build.call_count, 2)
+
+    def test_eviction_by_size_drops_least_recently_used(self):
+        older, _ = self.export()
+        newer, _ = self.export(start=(timezone.now().date() - timedelta(days=7)).isoformat())
+        ReportArtifact.objects.filter(report_file=older).update(
+            last_accessed=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(evict_artifacts(max_bytes=ReportArtifact.objects.get(report_file=newer).size), 1)
+        self.assertFalse(ReportFile.objects.filter(pk=older.pk).exists())
+        self.assertTrue(ReportArtifact.objects.filter(report_file=newer).exists())
+
+    def test_export_endpoint_reports_cache_status(self):
+        self.client.force_login(self.user)
+        url = f'/api/reports/reports/{self.report.pk}/export_csv/'
+        params = {'start_date': self.start, 'end_date': self.end}
+
+        first = self.client.get(url, params)
+        second = self.client.get(url, params)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['X-Report-Cache'], 'MISS')
+        self.assertEqual(second['X-Report-Cache'], 'HIT')
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from .views import ReportViewSet, ReportEntryViewSet, ReportFileViewSet, CalculatedFieldViewSet, ReportAccessLogViewSet
+from .views import ReportViewSet, ReportEntryViewSet, ReportFileViewSet, CalculatedFieldViewSet, ReportAccessLogViewSet, ReportJobViewSet
 
 router = DefaultRouter()
 router.register(r'reports', ReportViewSet)
@@ -11,6 +11,7 @@ router.register(r'report-entries', ReportEntryViewSet)
 router.register(r'report-files', ReportFileViewSet)
 router.register(r'calculated-fields', CalculatedFieldViewSet)
 router.register(r'access-logs', ReportAccessLogViewSet)
+router.register(r'report-jobs', ReportJobViewSet)
 
 @api_view(['GET'])
 def reports_api_root(request, format=None):
@@ -20,6 +21,7 @@ def reports_api_root(request, format=None):
         'report-files': reverse('reportfile-list', request=request, format=format),
         'calculated-fields': reverse('calculatedfield-list', request=request, format=format),
         'access-logs': reverse('reportaccesslog-list', request=request, format=format),
+        'report-jobs': reverse('reportjob-list', request=request, format=format),
     })
 
 urlpatterns = [
@@ -7,11 +7,13 @@ from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+import hashlib
 import io
 import logging
 from django.core.files.base import ContentFile
 import csv
 from .models import ReportEntry, ReportFile, Report, ReportAccessLog
+from .artifacts import data_watermark
 import xlsxwriter
 from django.db.models import Sum, Avg, Count, F, ExpressionWrapper, DecimalField, IntegerField, Case, When, Q, Subquery, OuterRef
 import ast
@@ -64,10 +66,16 @@ from reportlab.graphics.charts.legends import Legend
 from reportlab.graphics.charts.piecharts import Pie
 from calendar import month_name
 from core.utils.currency import currency_formatter
+from django.core.cache import cache
+from .aggregation import ReportAggregator
 
 
 logger = logging.getLogger(__name__)
 
+# Short-lived memo so the PDF, Excel, CSV and email paths share one aggregation
+# when they are requested back to back for the same period.
+REPORT_DATA_CACHE_TIMEOUT = getattr(settings, 'REPORT_DATA_CACHE_TIMEOUT', 60)
+
 
 @dataclass
 class EmailRecipient:
@@ -236,7 +244,7 @@ def send_enhanced_report_email(
         )
         
         if pdf_content is None:
-            with generate_pdf_report(report, start_date_str=start_date_str, end_date_str=end_date_str) as pdf_file:
+            with generate_pdf_report(report, report_data=report_data) as pdf_file:
                 pdf_content = pdf_file.read()
 
         attempts = send_email_with_components(email_components, recipient, pdf_content)
@@ -608,266 +616,18 @@ def generate_comprehensive_report(report, start_date_str: Optional[str], end_dat
 
         logger.info(f"Generating report for period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
 
-        def _analyze_income_breakdown(income_transactions):
-            categorized = income_transactions.exclude(
-                Q(category__isnull=True) | Q(category='')
-            ).values(
-                'category'
-            ).annotate(
-                total_amount=Sum('amount'),
-                transaction_count=Count('id')
-            ).order_by('-total_amount')
-
-            category_mapping = dict(Transaction.CATEGORY_CHOICES)
-
-            breakdown = []
-            for item in categorized:
-                category_name = category_mapping.get(item['category'])
-                if category_name:
-                    breakdown.append({
-                        'category': category_name,
-                        'total_amount': format_number(item['total_amount']),
-                        'transaction_count': item['transaction_count']
-                    })
-
-            uncategorized = income_transactions.filter(
-                Q(category__isnull=True) | Q(category='')
-            ).aggregate(
-                total_amount=Sum('amount'),
-                transaction_count=Count('id')
-            )
-
-            if uncategorized['total_amount']:
-                breakdown.append({
-                    'category': 'Uncategorized Income',
-                    'total_amount': format_number(uncategorized['total_amount']),
-                    'transaction_count': uncategorized['transaction_count']
-                })
-
-            return breakdown
-
-        def _analyze_expense_breakdown(expense_transactions):
-            expense_data = expense_transactions.values('category').annotate(
-                total_amount=Sum('amount'),
-                transaction_count=Count('id')
-            ).order_by('-total_amount')
-
-            return [{
-                'category': item['category'],
-                'total_amount': format_number(item['total_amount']),
-                'transaction_count': item['transaction_count']
-            } for item in expense_data]
-
-        def _calculate_monthly_cash_flow(transactions):
-            cash_flow = transactions.annotate(
-                month=TruncMonth('date')
-            ).values('month', 'transaction_type').annotate(
-                total_amount=Sum('amount')
-            ).order_by('month')
-
-            return [{
-                'month': item['month'],
-                'transaction_type': item['transaction_type'],
-                'total_amount': format_number(item['total_amount'])
-            } for item in cash_flow]
-
-        def generate_inventory_insights():
-            date_filter = Q(
-                order_items__order__order_date__range=[start_date, end_date],
-                order_items__order__status__in=['delivered', 'shipped']
-            )
-            inventory_data = Product.objects.filter(is_active=True).annotate(
-                total_stock=Sum('stock'),
-                total_value=ExpressionWrapper(
-                    F('stock') * F('price'),
-                    output_field=DecimalField()
-                ),
-                total_sales=Coalesce(
-                    Sum(
-                        Case(
-                            When(
-                                order_items__order__status__in=['delivered', 'shipped'],
-                                then='order_items__quantity'
-                            ),
-                            default=0,
-                            output_field=IntegerField(),
-                        ),
-                        filter=date_filter
-                    ),
-                    0,
-                    output_field=IntegerField()
-                ),
-                total_revenue=Coalesce(
-                    Sum(
-                        Case(
-                            When(
-                                order_items__order__status__in=['delivered', 'shipped'],
-                                then=F('order_items__quantity') * F('order_items__unit_price')
-                            ),
-                            default=0,
-                            output_field=DecimalField(max_digits=10, decimal_places=2)
-                        ),
-                        filter=date_filter
-                    ),
-                    0,
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
-
-            low_stock_products = inventory_data.filter(
-                stock__lt=F('low_stock_threshold')
-            ).values(
-                'name',
-                'stock',
-                'low_stock_threshold',
-                'total_sales'
-            ).order_by('stock')
-
-            total_stock_value = inventory_data.aggregate(
-                total=Sum(F('stock') * F('price'))
-            )['total'] or Decimal('0.00')
-
-            return {
-                'total_product_count': inventory_data.count(),
-                'total_stock_value': format_number(total_stock_value),
-                'inventory_status': {
-                    'status': 'Healthy' if not low_stock_products else 'Attention Required',
-                    'low_stock_count': low_stock_products.count()
-                },
-                'low_stock_products': list(low_stock_products),
-                'top_selling_products': [{
-                    'name': product['name'],
-                    'total_sales': product['total_sales'],
-                    'total_revenue': format_number(product['total_revenue'])
-                } for product in inventory_data.filter(
-                    Q(total_sales__gt=0) | Q(total_revenue__gt=0)
-                ).order_by('-total_sales')[:10].values(
-                    'name',
-                    'total_sales',
-                    'total_revenue'
-                )]
-            }
-
-        def generate_performance_metrics():
-            date_filter = Q(orders__order_date__range=[start_date, end_date])
-            customer_metrics = Customer.objects.annotate(
-                total_orders=Count('orders'),
-                total_spend=Coalesce(
-                    Sum(
-                        F('orders__items__quantity') * F('orders__items__unit_price'),
-                        filter=date_filter & Q(orders__status__in=['delivered', 'shipped'])
-                    ),
-                    Decimal('0.00'),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
-
-            order_performance = Order.objects.filter(
-                order_date__range=[start_date, end_date]
-            ).aggregate(
-                total_orders=Count('id'),
-                average_order_value=Coalesce(
-                    Avg(
-                        Subquery(
-                            Order.objects.filter(
-                                id=OuterRef('id')
-                            ).annotate(
-                                order_total=Sum(F('items__quantity') * F('items__unit_price'))
-                            ).values('order_total')[:1]
-                        )
-                    ),
-                    Decimal('0.00'),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                ),
-                total_revenue=Coalesce(
-                    Sum(F('items__quantity') * F('items__unit_price')),
-                    Decimal('0.00'),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
-
-            def _calculate_sales_trend():
-                sales_data = Order.objects.filter(
-                    order_date__range=[start_date, end_date]
-                ).annotate(
-                    month=TruncMonth('order_date')
-                ).values('month').annotate(
-                    total_sales=Coalesce(
-                        Sum(F('items__quantity') * F('items__unit_price')),
-                        Decimal('0.00'),
-                        output_field=DecimalField(max_digits=10, decimal_places=2)
-                    )
-                ).order_by('month')
-
-                return [{
-                    'month': item['month'],
-                    'total_sales': format_number(item['total_sales'])
-                } for item in sales_data]
-
-            return {
-                'customer_metrics': {
-                    'total_customers': customer_metrics.count(),
-                    'average_orders_per_customer': float(
-                        statistics.mean([c.total_orders for c in customer_metrics] or [0])
-                    ),
-                    'top_customers': [{
-                        'id': customer['id'],
-                        'first_name': customer['first_name'],
-                        'last_name': customer['last_name'],
-                        'email': customer['email'],
-                        'total_orders': customer['total_orders'],
-                        'total_spend': format_number(customer['total_spend'])
-                    } for customer in customer_metrics.order_by('-total_spend')[:5].values(
-                        'id', 'first_name', 'last_name', 'email', 'total_orders', 'total_spend'
-                    )]
-                },
-                'order_performance': {
-                    'total_orders': order_performance['total_orders'],
-                    'average_order_value': format_number(order_performance['average_order_value']),
-                    'total_revenue': format_number(order_performance['total_revenue'])
-                },
-                'sales_trend': _calculate_sales_trend()
-            }
-
-        transactions = Transaction.objects.filter(
-            date__range=[start_date, end_date]
-        )
-
-        revenue = transactions.filter(
-            transaction_type='income'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        cost_of_services = transactions.filter(
-            transaction_type='cost_of_services'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        operating_expenses = transactions.filter(
-            transaction_type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        net_profit = revenue - cost_of_services - operating_expenses
+        # Keyed by the data watermark so an export never renders rows older
+        # than the watermark its artifact is stored under
+        watermark = hashlib.sha256(data_watermark(report).encode('utf-8')).hexdigest()[:16]
+        cache_key = f"comprehensive_report:{report.id}:{start_date_str}:{end_date_str}:{watermark}"
+        report_data = cache.get(cache_key)
+        if report_data is None:
+            report_data = ReportAggregator(start_date, end_date).build()
+            cache.set(cache_key, report_data, REPORT_DATA_CACHE_TIMEOUT)
+        else:
+            logger.debug(f"Using cached report data for {cache_key}")
 
-        return {
-            'report_metadata': {
-                'period_start': start_date.strftime('%Y-%m-%d'),
-                'period_end': end_date.strftime('%Y-%m-%d')
-            },
-            'financial_overview': {
-                'total_revenue': format_number(revenue),
-                'cost_of_services': format_number(cost_of_services),
-                'operating_expenses': format_number(operating_expenses),
-                'net_profit': format_number(net_profit),
-                'income_breakdown': _analyze_income_breakdown(
-                    transactions.filter(transaction_type='income')
-                ),
-                'expense_breakdown': _analyze_expense_breakdown(
-                    transactions.filter(transaction_type__in=['expense', 'cost_of_services'])
-                ),
-                'monthly_cash_flow': _calculate_monthly_cash_flow(transactions)
-            },
-            'inventory_insights': generate_inventory_insights(),
-            'performance_metrics': generate_performance_metrics()
-        }
+        return report_data
 
     except ValueError as e:
         raise ValueError(f"Error generating report: {str(e)}")
@@ -13,9 +13,12 @@ from django.http import FileResponse
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.exceptions import ValidationError
 from django.core.exceptions import PermissionDenied
-from .models import Report, ReportEntry, ReportFile, CalculatedField, ReportAccessLog
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Report, ReportEntry, ReportFile, CalculatedField, ReportAccessLog, ReportJob
 from rest_framework.permissions import IsAuthenticated
-from .serializers import ReportSerializer, ReportEntrySerializer, ReportFileSerializer, CalculatedFieldSerializer, ReportAccessLogSerializer
+from .serializers import ReportSerializer, ReportEntrySerializer, ReportFileSerializer, CalculatedFieldSerializer, ReportAccessLogSerializer, ReportJobSerializer
+from .jobs import enqueue_report_job
+from .artifacts import CACHE_HEADER, get_or_render
 from .utils import generate_pdf_report, send_report_email, export_styled_report, export_report_to_excel, calculate_custom_field, save_generated_file, validate_date_range, EmailRecipient, ReportContentGenerator, send_enhanced_report_email, _generate_email_content
 from django.core.cache import cache
 from django.db.models import Q
@@ -281,11 +284,11 @@ class ReportViewSet(BaseAccessControlViewSet):
             logger.debug(f"Retrieved report: {report.id}")
             logger.debug(f"Date range: {start_date_str} to {end_date_str}")
         
-            # Generate PDF with date parameters
-            pdf_file = generate_pdf_report(report, start_date_str, end_date_str)
-        
-            # Save the generated file
-            report_file = save_generated_file(report, pdf_file, 'pdf')
+            # Reuse the stored PDF unless the report or its data changed
+            report_file, cache_hit = get_or_render(
+                report, 'pdf', start_date_str, end_date_str,
+                lambda: generate_pdf_report(report, start_date_str, end_date_str)
+            )
 
             # Create access log with metadata
             metadata = {}
@@ -306,12 +309,14 @@ class ReportViewSet(BaseAccessControlViewSet):
             )
         
             # Return the file
-            return FileResponse(
-                report_file.file,
+            response = FileResponse(
+                report_file.file.open('rb'),
                 as_attachment=True,
                 filename=report_file.file.name,
                 content_type='application/pdf'
             )
+            response[CACHE_HEADER] = 'HIT' if cache_hit else 'MISS'
+            return response
         
         except Report.DoesNotExist:
             logger.error(f"Report {pk} not found in queryset")
@@ -401,16 +406,17 @@ class ReportViewSet(BaseAccessControlViewSet):
             else:
                 start_date, end_date = validate_date_range(None, None)  # Will use default 30-day range
 
-            # Generate Excel with validated date range
-            excel_file = export_report_to_excel(
-                report,
-                start_date_str=start_date.strftime('%Y-%m-%d'),
-                end_date_str=end_date.strftime('%Y-%m-%d')
+            # Generate Excel with validated date range, reusing an unchanged export
+            range_start = start_date.strftime('%Y-%m-%d')
+            range_end = end_date.strftime('%Y-%m-%d')
+            report_file, cache_hit = get_or_render(
+                report, 'excel', range_start, range_end,
+                lambda: export_report_to_excel(report, start_date_str=range_start, end_date_str=range_end)
             )
-            report_file = save_generated_file(report, excel_file, 'excel')
 
             # Read the file content
-            file_content = report_file.file.read()
+            with report_file.file.open('rb') as f:
+                file_content = f.read()
 
             # Create filename with date range
             date_range = f"_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}"
@@ -422,6 +428,7 @@ class ReportViewSet(BaseAccessControlViewSet):
             )
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
             response['Content-Length'] = len(file_content)
+            response[CACHE_HEADER] = 'HIT' if cache_hit else 'MISS'
 
             # Enhanced logging with date range information
             ReportAccessLog.objects.create(
@@ -461,14 +468,13 @@ class ReportViewSet(BaseAccessControlViewSet):
                         'details': str(ve)
                     }, status=status.HTTP_400_BAD_REQUEST)
 
-            csv_file = export_styled_report(
-                report,
-                start_date.strftime('%Y-%m-%d') if start_date else None,
-                end_date.strftime('%Y-%m-%d') if end_date else None
+            range_start = start_date.strftime('%Y-%m-%d') if start_date else None
+            range_end = end_date.strftime('%Y-%m-%d') if end_date else None
+            report_file, cache_hit = get_or_render(
+                report, 'csv', range_start, range_end,
+                lambda: export_styled_report(report, range_start, range_end)
             )
 
-            report_file = save_generated_file(report, csv_file, 'csv')
-
             ReportAccessLog.objects.create(
                 report=report,
                 user=request.user,
@@ -481,12 +487,14 @@ class ReportViewSet(BaseAccessControlViewSet):
                 }
             )
 
-            return FileResponse(
-                report_file.file,
+            response = FileResponse(
+                report_file.file.open('rb'),
                 as_attachment=True,
-                filename=csv_file.name,
+                filename=report_file.file.name.rsplit('/', 1)[-1],
                 content_type='text/csv'
             )
+            response[CACHE_HEADER] = 'HIT' if cache_hit else 'MISS'
+            return response
 
         except Exception as e:
             logger.error(f"CSV export failed: {str(e)}", exc_info=True)
@@ -495,6 +503,71 @@ class ReportViewSet(BaseAccessControlViewSet):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['post'], url_path='jobs')
+    def enqueue_job(self, request, pk=None):
+        """
+        Queue a PDF/Excel/CSV render or an email send and return immediately.
+        Poll the returned job, then fetch the file from its download URL.
+        """
+        report = self.get_object()
+        file_format = request.data.get('format')
+        if file_format not in dict(ReportJob.FORMAT_CHOICES):
+            return Response({
+                'error': 'Invalid format',
+                'details': f"Choose one of: {', '.join(dict(ReportJob.FORMAT_CHOICES))}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        params = {}
+        if file_format == 'email':
+            if not request.data.get('email'):
+                return Response({'error': 'Recipient email is required.'}, status=status.HTTP_400_BAD_REQUEST)
+            params = {
+                'email': request.data.get('email'),
+                'recipient_name': request.data.get('recipient_name'),
+                'include_summary': request.data.get('include_summary', True),
+                'include_charts': request.data.get('include_charts', True),
+            }
+
+        start_date = request.data.get('start_date')
+        end_date = request.data.get('end_date')
+        if not (start_date and end_date):
+            start_date = report.start_date.strftime('%Y-%m-%d') if report.start_date else None
+            end_date = report.end_date.strftime('%Y-%m-%d') if report.end_date else None
+
+        if start_date and end_date:
+            try:
+                start_date, end_date = validate_date_range(start_date, end_date)
+            except DjangoValidationError as ve:
+                return Response({
+                    'error': 'Invalid date range',
+                    'details': str(ve)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            start_date, end_date = start_date.date(), end_date.date()
+
+        job, created = enqueue_report_job(
+            report,
+            file_format,
+            start_date=start_date,
+            end_date=end_date,
+            user=request.user,
+            params=params
+        )
+
+        ReportAccessLog.objects.create(
+            report=report,
+            user=request.user,
+            action='enqueue_job',
+            metadata={
+                'job_id': job.id,
+                'format': file_format,
+                'deduplicated': not created
+            }
+        )
+
+        data = ReportJobSerializer(job, context={'request': request}).data
+        data['deduplicated'] = not created
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['post'])
     def clone_template(self, request, pk=None):
         template = self.get_object()
@@ -602,3 +675,42 @@ class ReportAccessLogViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['report', 'user', 'action']
     ordering_fields = ['accessed_at']
+
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = ReportJob.objects.select_related('report', 'result_file')
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['report', 'format', 'status']
+    ordering_fields = ['created_at', 'finished_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_superuser or user.is_role('Administrator'):
+            return queryset
+        return queryset.filter(requested_by=user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportJob.STATUS_DONE or not job.result_file:
+            return Response({
+                'error': 'Report is not ready',
+                'status': job.status,
+                'details': job.error or None
+            }, status=status.HTTP_409_CONFLICT)
+
+        content_types = {
+            'pdf': 'application/pdf',
+            'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'csv': 'text/csv',
+        }
+        report_file = job.result_file
+        return FileResponse(
+            report_file.file.open('rb'),
+            as_attachment=True,
+            filename=report_file.file.name.rsplit('/', 1)[-1],
+            content_type=content_types.get(job.format, 'application/octet-stream')
+        )
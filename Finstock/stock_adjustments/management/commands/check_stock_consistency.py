@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.models import Product
+from stock_adjustments import ledger
+from stock_adjustments.models import StockAdjustment
+
+
+class Command(BaseCommand):
+    help = 'Compare product stock with the stock recomputed from the adjustment ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products', help='Product id; repeatable')
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            '--fix', action='store_true',
+            help='Set each mismatched product to its ledger stock'
+        )
+        action.add_argument(
+            '--record-opening-balances', action='store_true',
+            help='Record each difference as an adjustment, leaving stock as it is'
+        )
+
+    def handle(self, *args, **options):
+        discrepancies = ledger.find_discrepancies(options['products'])
+        if not discrepancies:
+            self.stdout.write(self.style.SUCCESS('Stock matches the adjustment ledger'))
+            return
+
+        for row in discrepancies:
+            self.stdout.write(
+                f"Product {row['product_id']}: stock {row['stock']}, "
+                f"ledger {row['ledger_stock']}, difference {row['difference']:+d}"
+            )
+
+        if options['fix']:
+            with transaction.atomic():
+                for row in discrepancies:
+                    Product.objects.filter(pk=row['product_id']).update(stock=row['ledger_stock'])
+            self.stdout.write(self.style.SUCCESS(f"Reset stock for {len(discrepancies)} products"))
+        elif options['record_opening_balances']:
+            # bulk_create skips the stock signal: stock is already correct,
+            # only the ledger is missing these quantities
+            StockAdjustment.objects.bulk_create([
+                StockAdjustment(
+                    product_id=row['product_id'],
+                    quantity=abs(row['difference']),
+                    adjustment_type='ADD' if row['difference'] > 0 else 'REMOVE',
+                    reason='Opening balance'
+                )
+                for row in discrepancies
+            ])
+            self.stdout.write(self.style.SUCCESS(f"Recorded opening balances for {len(discrepancies)} products"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(discrepancies)} products differ from the ledger"))
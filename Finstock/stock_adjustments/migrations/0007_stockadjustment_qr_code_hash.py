@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_adjustments', '0006_stockadjustment_qr_code_stockadjustment_qr_code_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockadjustment',
+            name='qr_code_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_adjustments', '0007_stockadjustment_qr_code_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockadjustment',
+            index=models.Index(fields=['adjustment_date', 'id'], name='stockadj_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_adjustments', '0008_stockadjustment_stockadj_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockadjustment',
+            index=models.Index(fields=['product', 'adjustment_date'], name='stockadj_product_date_idx'),
+        ),
+    ]
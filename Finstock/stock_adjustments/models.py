@@ -1,13 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-import qrcode
-from io import BytesIO
-from django.core.files import File
-from PIL import Image
 import logging
+from core import qr_pipeline
+from . import ledger
 
 logger = logging.getLogger(__name__)
 
@@ -36,28 +34,24 @@ class StockAdjustment(models.Model):
     reason = models.TextField(blank=True)
     qr_code = models.ImageField(upload_to='stock_adjustments/qr_codes/', blank=True, null=True)
     qr_code_data = models.JSONField(blank=True, null=True)
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the adjustment list (-adjustment_date, -id)
+            models.Index(fields=['adjustment_date', 'id'], name='stockadj_date_id_idx'),
+            # One product's adjustments over a period
+            models.Index(fields=['product', 'adjustment_date'], name='stockadj_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_adjustment_type_display()} {abs(self.quantity)} for {self.product.name}"
 
-    def save(self, *args, **kwargs):
-        # Track if this is a new instance
-        is_new = self.pk is None
-        
-        # Get old QR code name if it exists
-        old_qr_name = None
-        if not is_new:
-            try:
-                old_instance = StockAdjustment.objects.get(pk=self.pk)
-                old_qr_name = old_instance.qr_code.name if old_instance.qr_code else None
-            except StockAdjustment.DoesNotExist:
-                pass
-
-        # First save to ensure we have an ID
-        super().save(*args, **kwargs)
-
-        # Generate new QR code data
-        new_qr_data = {
+    QR_FIELD = 'qr_code'
+    QR_SELECT_RELATED = ('product',)
+
+    def qr_data(self):
+        return {
             'adjustment_id': str(self.id),
             'product_id': str(self.product.id),
             'product_name': self.product.name,
@@ -66,35 +60,32 @@ class StockAdjustment(models.Model):
             'adjustment_date': self.adjustment_date.strftime('%Y-%m-%d'),
         }
 
-        # Check if QR code needs to be updated
-        if is_new or self.qr_code_data != new_qr_data:
-            self.qr_code_data = new_qr_data
+    def qr_payload(self):
+        return str(self.qr_data())
 
-            # Generate new QR code image
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(str(self.qr_code_data))
-            qr.make(fit=True)
-            qr_image = qr.make_image(fill_color="black", back_color="white")
+    def qr_filename(self, digest):
+        return f'stock_adjustment_qr_{self.product_id}_{digest[:12]}.png'
+
+    def save(self, *args, **kwargs):
+        # Track if this is a new instance
+        is_new = self.pk is None
 
-            # Save QR code image
-            buffer = BytesIO()
-            qr_image.save(buffer, format='PNG')
-            filename = f'stock_adjustment_qr_{self.product.id}_{timezone.now().strftime("%Y%m%d%H%M%S")}.png'
+        # The row, its stock change (post_save) and its QR data are written
+        # together, so a failed write never leaves stock half-applied
+        with transaction.atomic():
+            # First save to ensure we have an ID
+            super().save(*args, **kwargs)
 
-            # Delete old QR code if it exists
-            if old_qr_name:
-                self.qr_code.storage.delete(old_qr_name)
+            # Generate new QR code data
+            new_qr_data = self.qr_data()
 
-            # Save new QR code
-            self.qr_code.save(filename, File(buffer), save=False)
+            # Check if QR code needs to be updated
+            if is_new or self.qr_code_data != new_qr_data:
+                self.qr_code_data = new_qr_data
+                super().save(update_fields=['qr_code_data'])
 
-            # Save again to update the QR code and data
-            super().save(update_fields=['qr_code', 'qr_code_data'])
+                # The image itself is rendered by the QR pipeline
+                qr_pipeline.enqueue(self)
 
 @receiver(post_save, sender=StockAdjustment)
 def update_product_stock(sender, instance, created, **kwargs):
@@ -103,25 +94,20 @@ def update_product_stock(sender, instance, created, **kwargs):
     Only processes new adjustments to prevent double-counting.
     """
     if created:  # Only process new adjustments
-        try:
-            product = instance.product
-            adjustment_quantity = instance.quantity
-
-            # Apply the adjustment based on the adjustment type
-            if instance.adjustment_type in ['REMOVE', 'DAMAGE']:
-                adjustment_quantity = -abs(adjustment_quantity)
-            else:
-                adjustment_quantity = abs(adjustment_quantity)
-
-            # Update the stock
-            product.stock += adjustment_quantity
-            product.stock = max(product.stock, 0)  # Ensure stock doesn't go below 0
-            product.save(update_fields=['stock'])
-
-            logger.info(
-                f"Stock updated for product {product.id}: {instance.adjustment_type} "
-                f"{abs(adjustment_quantity)} units. New stock level: {product.stock}"
-            )
-        except Exception as e:
-            logger.error(f"Error updating stock for adjustment {instance.id}: {str(e)}")
-            raise
+        # No exception handling here: a failed stock update must roll back
+        # the adjustment row saved in the same transaction
+        adjustment_quantity = ledger.signed_quantity(instance.adjustment_type, instance.quantity)
+
+        # One UPDATE evaluated against the current row, so concurrent
+        # adjustments to the same product are never lost
+        if adjustment_quantity and not ledger.apply_stock_delta(instance.product_id, adjustment_quantity):
+            raise sender.product.field.related_model.DoesNotExist(f"Product {instance.product_id} not found for stock adjustment {instance.id}")
+
+        # Keep a product instance the caller already holds in step
+        if sender.product.is_cached(instance):
+            instance.product.refresh_from_db(fields=['stock', 'modified_at'])
+
+        logger.info(
+            f"Stock updated for product {instance.product_id}: {instance.adjustment_type} "
+            f"{abs(adjustment_quantity)} units"
+        )
@@ -18,17 +18,16 @@ class StockAdjustmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'quantity', 'adjustment_type', 'adjustment_date', 'reason', 'qr_code_url', 'qr_code_data', 'qr_code']
 
     def get_qr_code(self, obj):
-        if obj.qr_code:
-            request = self.context.get('request')
-            return request.build_absolute_uri(reverse('stockadjustment-qr-code', 
-                                                    kwargs={'pk': obj.pk}))
-        return None
+        # The endpoint renders the image on request, so no stored file is needed
+        request = self.context.get('request')
+        return request.build_absolute_uri(reverse('stockadjustment-qr-code', 
+                                                kwargs={'pk': obj.pk}))
         
     def get_qr_code_url(self, obj):
+        request = self.context.get('request')
         if obj.qr_code:
-            request = self.context.get('request')
             return request.build_absolute_uri(obj.qr_code.url)
-        return None
+        return request.build_absolute_uri(reverse('qr-image', args=['stock-adjustment', obj.pk, 'png']))
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -1,13 +1,15 @@
 from rest_framework import viewsets, filters, status, permissions
 from django.core.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from core.utils.pagination import KeysetPagination
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet, DateFromToRangeFilter, NumberFilter, CharFilter
 from django.db.models import Q
 from django.http import HttpResponse
 from .models import StockAdjustment
+from core import qr_images
 from .serializers import StockAdjustmentSerializer
 from users.views import BaseAccessControlViewSet
 from users.permissions import RoleBasedPermission
@@ -38,7 +40,7 @@ class StockAdjustmentFilter(FilterSet):
         model = StockAdjustment
         fields = ['product', 'adjustment_type', 'adjustment_date', 'min_quantity', 'max_quantity']
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -50,6 +52,7 @@ class StockAdjustmentViewSet(BaseAccessControlViewSet):
     queryset = StockAdjustment.objects.all()
     serializer_class = StockAdjustmentSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-adjustment_date', '-id')
     filter_backends = [
         DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter
     ]
@@ -158,6 +161,9 @@ class StockAdjustmentViewSet(BaseAccessControlViewSet):
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
+        except NotFound:
+            # Out-of-range pages and invalid cursors
+            raise
         except Exception as e:
             logger.error(f"Error in stock adjustment list view: {str(e)}")
             return Response({
@@ -181,24 +187,11 @@ class StockAdjustmentViewSet(BaseAccessControlViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            if not instance.qr_code:
-                logger.warning(f"QR code not found for adjustment {pk}")
-                return Response(
-                    {'error': 'QR code not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            try:
-                with instance.qr_code.open('rb') as f:
-                    response = HttpResponse(f.read(), content_type='image/png')
-                    response['Content-Disposition'] = f'inline; filename="{instance.qr_code.name}"'
-                    return response
-            except IOError as e:
-                logger.error(f"Error reading QR code file for adjustment {pk}: {str(e)}", exc_info=True)
-                return Response(
-                    {'error': 'Error reading QR code file'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+            # Rendered from the current payload; no stored file is read
+            return qr_images.qr_image_response(
+                request, instance.qr_payload(), 'png', qr_images.QR_IMAGE_DEFAULT_SIZE,
+                filename=f"stock_adjustment_{instance.pk}_qr"
+            )
 
         except Exception as e:
             logger.error(f"Unexpected error serving QR code for adjustment {pk}: {str(e)}", exc_info=True)
@@ -214,13 +207,9 @@ class StockAdjustmentViewSet(BaseAccessControlViewSet):
         """
         try:
             instance = self.get_object()
-            if not instance.qr_code_data:
-                logger.warning(f"QR code data not found for adjustment {pk}")
-                return Response(
-                    {'error': 'QR code data not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            return Response(instance.qr_code_data)
+            # Adjustments recorded in bulk through the stock ledger have no
+            # stored data; it is derived from the row itself
+            return Response(instance.qr_code_data or instance.qr_data())
         except Exception as e:
             logger.error(f"Error retrieving QR code data for adjustment {pk}: {str(e)}")
             return Response(
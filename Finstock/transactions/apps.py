@@ -8,3 +8,6 @@ class TransactionsConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transactions'
+
+    def ready(self):
+        import transactions.signals  # Keeps the daily rollup table in sync
@@ -0,0 +1,67 @@
+import io
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from transactions.pdf_export import HEADERS, render_transactions_pdf
+
+
+def synthetic_rows(count):
+    start = date(2024, 1, 1)
+    for index in range(count):
+        yield [
+            str(index + 1), str(index // 3 + 1), str(index // 3 + 1), f"Customer {index % 500}",
+            'Income', 'Income', f"N{Decimal(index % 9000) + Decimal('0.50'):,.2f}",
+            (start + timedelta(days=index % 365)).strftime('%Y-%m-%d'), 'Cash', 'Completed'
+        ]
+
+
+def render_legacy(rows, output):
+    """The previous single-table layout: one Paragraph per cell and one style command per row."""
+    styles = getSampleStyleSheet()
+    data = [HEADERS] + [[Paragraph(cell, styles['Normal']) for cell in row] for row in rows]
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        *[('BACKGROUND', (0, i), (-1, i), colors.HexColor('#f5f7ff')) for i in range(2, len(data), 2)],
+    ]))
+    SimpleDocTemplate(output, pagesize=landscape(letter)).build([table])
+
+
+class Command(BaseCommand):
+    help = 'Measure transaction PDF export throughput in rows per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated row counts')
+        parser.add_argument(
+            '--legacy-max', type=int, default=10000,
+            help='Largest row count to also time with the previous single-table layout'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        for size in sizes:
+            output = io.BytesIO()
+            started = time.perf_counter()
+            render_transactions_pdf(synthetic_rows(size), output, size)
+            elapsed = time.perf_counter() - started
+            line = (
+                f'{size:>7,} rows: paged {elapsed:7.2f}s ({size / elapsed:9,.0f} rows/s, '
+                f'{len(output.getvalue()) / 1024:,.0f} KiB)'
+            )
+
+            if size <= options['legacy_max']:
+                started = time.perf_counter()
+                render_legacy(list(synthetic_rows(size)), io.BytesIO())
+                legacy = time.perf_counter() - started
+                line += f' | legacy {legacy:7.2f}s ({size / legacy:9,.0f} rows/s)'
+
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily transaction rollup table from the transaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = self._parse_date(options['start_date'])
+            end_date = self._parse_date(options['end_date'])
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date cannot be after --end-date')
+
+        written = rebuild_rollups(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows'))
+
+    @staticmethod
+    def _parse_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.14 on 2026-10-18 09:12
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionDailyRollup = apps.get_model('transactions', 'TransactionDailyRollup')
+
+    totals = defaultdict(lambda: [Decimal('0.00'), 0])
+    grouped = Transaction.objects.values(
+        'date', 'transaction_type', 'category', 'status', 'payment_method'
+    ).annotate(
+        total_amount=Sum('amount'),
+        transaction_count=Count('id')
+    ).order_by()
+
+    for row in grouped:
+        key = (row['date'], row['transaction_type'], row['category'] or '', row['status'], row['payment_method'])
+        totals[key][0] += row['total_amount'] or Decimal('0.00')
+        totals[key][1] += row['transaction_count']
+
+    TransactionDailyRollup.objects.bulk_create([
+        TransactionDailyRollup(
+            date=date,
+            transaction_type=transaction_type,
+            category=category,
+            status=status,
+            payment_method=payment_method,
+            total_amount=amount,
+            transaction_count=count
+        )
+        for (date, transaction_type, category, status, payment_method), (amount, count) in totals.items()
+    ], batch_size=1000)
+
+
+def clear_rollups(apps, schema_editor):
+    apps.get_model('transactions', 'TransactionDailyRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_transactionqrcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('cost_of_services', 'Cost of Services')], max_length=20)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('refunded', 'Refunded'), ('canceled', 'Canceled')], max_length=10)),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('credit_card', 'Credit Card'), ('bank_transfer', 'Bank Transfer'), ('paypal', 'PayPal'), ('other', 'Other')], max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('transaction_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'transaction_type'], name='transaction_date_c1c4f1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='transactiondailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'transaction_type', 'category', 'status', 'payment_method'), name='unique_transaction_daily_rollup'),
+        ),
+        migrations.RunPython(populate_rollups, clear_rollups),
+    ]
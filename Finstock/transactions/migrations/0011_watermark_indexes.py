@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_transaction_transaction_type_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['modified'], name='transaction_modified_idx'),
+        ),
+    ]
@@ -4,10 +4,11 @@ from django.utils import timezone
 from core.models import TimeStampedModel, Customer, Order
 from invoices.models import Invoice
 from django.conf import settings
-import qrcode
-from io import BytesIO
-from django.core.files.base import ContentFile
+from core import qr_pipeline
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class TransactionQRCode(models.Model):
@@ -25,9 +26,13 @@ class TransactionQRCode(models.Model):
         blank=True,
         null=True
     )
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    QR_FIELD = 'qr_image'
+    QR_SELECT_RELATED = ('transaction__order',)
+
     def generate_qr_data(self):
         """
         Generate QR code data including transaction details and any scanned items
@@ -54,27 +59,15 @@ class TransactionQRCode(models.Model):
     
         return json.dumps(transaction_data)
 
-    def generate_qr_code(self):
-        """Generate and save QR code image for the transaction"""
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(self.generate_qr_data())
-        qr.make(fit=True)
+    def qr_payload(self):
+        return self.generate_qr_data()
 
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        filename = f'transaction_{self.transaction.id}_qr.png'
-        
-        self.qr_image.save(
-            filename,
-            ContentFile(buffer.getvalue()),
-            save=False
-        )
+    def qr_filename(self, digest):
+        return f'transaction_{self.transaction_id}_qr.png'
+
+    def generate_qr_code(self):
+        """Render and save QR code image for the transaction now"""
+        qr_pipeline.render_instances([self], force=True)
 
 class Transaction(TimeStampedModel):
     """
@@ -138,6 +131,24 @@ class Transaction(TimeStampedModel):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=10, choices=TRANSACTION_STATUSES)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the transaction list (-date, -id)
+            models.Index(fields=['date', 'id'], name='transaction_date_id_idx'),
+            # Equality column first: "income in this date range" and
+            # "completed in this date range" seek straight to the range
+            models.Index(fields=['transaction_type', 'date'], name='transaction_type_date_idx'),
+            models.Index(fields=['status', 'date'], name='transaction_status_date_idx'),
+            # Latest change for the report and chatbot data watermarks
+            models.Index(fields=['modified'], name='transaction_modified_idx'),
+        ]
+
+    QR_SELECT_RELATED = ('order',)
+
+    def qr_payload(self):
+        """The payload encoded in this transaction's QR code."""
+        return TransactionQRCode(transaction=self).generate_qr_data()
+
     def clean(self):
         # Complex validations that involve database queries or business logic
         if self.order and self.invoice:
@@ -168,16 +179,17 @@ class Transaction(TimeStampedModel):
         self.full_clean()
         super().save(*args, **kwargs)
         
-        # Generate or update QR code after transaction is saved
+        # Queue a QR code render after transaction is saved; the pipeline
+        # skips it when the encoded details have not changed
         if is_new:
             qr_code = TransactionQRCode.objects.create(transaction=self)
         else:
-            qr_code = getattr(self, 'qr_code', None)
-            if not qr_code:
+            try:
+                qr_code = self.qr_code
+            except TransactionQRCode.DoesNotExist:
                 qr_code = TransactionQRCode.objects.create(transaction=self)
-        
-        qr_code.generate_qr_code()
-        qr_code.save()
+
+        qr_pipeline.enqueue(qr_code)
 
     @classmethod
     def create_from_order(cls, order):
@@ -199,3 +211,73 @@ class Transaction(TimeStampedModel):
 
     def __str__(self):
         return f"Transaction {self.id} - {self.transaction_type} - {self.amount}"
+
+
+class TransactionDailyRollup(models.Model):
+    """
+    Materialized daily totals of transactions, one row per
+    (date, transaction_type, category, status, payment_method).
+
+    Rows are maintained incrementally by the signal handlers in
+    transactions.signals and can be rebuilt with the
+    rebuild_transaction_rollups management command. Uncategorized
+    transactions are stored with an empty category so the key stays unique.
+    """
+    date = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    category = models.CharField(max_length=50, blank=True, default='')
+    status = models.CharField(max_length=10, choices=Transaction.TRANSACTION_STATUSES)
+    payment_method = models.CharField(max_length=20, choices=Transaction.PAYMENT_METHODS)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'transaction_type', 'category', 'status', 'payment_method'],
+                name='unique_transaction_daily_rollup'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['date', 'transaction_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.transaction_type}/{self.category or '-'}/{self.status}: {self.total_amount}"
+
+
+class TransactionPdfExport(models.Model):
+    """
+    A transaction list PDF rendered in the background because it was over
+    ``TRANSACTION_PDF_MAX_ROWS`` rows. The row carries the export's status
+    so a poll can land on any web worker; ``transactions.pdf_export``
+    deletes old rows together with their files.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    token = models.CharField(max_length=32, unique=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transaction_pdf_exports'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    file = models.FileField(upload_to='exports/transactions', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"Transaction PDF export {self.token} ({self.status})"
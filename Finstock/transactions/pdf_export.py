@@ -0,0 +1,233 @@
+import logging
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+from core.utils.csv_export import iter_keyset
+from .models import Transaction, TransactionPdfExport
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_PDF_MAX_ROWS = getattr(settings, 'TRANSACTION_PDF_MAX_ROWS', 20000)
+TRANSACTION_PDF_EXPORT_RETENTION = getattr(settings, 'TRANSACTION_PDF_EXPORT_RETENTION', timedelta(days=1))
+TRANSACTION_PDF_EXPORT_STALE_AFTER = getattr(settings, 'TRANSACTION_PDF_EXPORT_STALE_AFTER', timedelta(minutes=30))
+
+PAGE_SIZE = landscape(letter)
+MARGIN = 30
+ROWS_PER_PAGE = 26
+FIRST_PAGE_ROWS = 22
+
+HEADERS = ['ID', 'Order', 'Invoice', 'Customer', 'Type', 'Category',
+           'Amount', 'Date', 'Payment Method', 'Status']
+COLUMN_SHARES = [0.05, 0.10, 0.10, 0.15, 0.10, 0.12, 0.11, 0.09, 0.09, 0.09]
+# Cells are drawn as plain strings, so long customer names are clipped to the column
+CUSTOMER_MAX_CHARS = 24
+
+VALUE_FIELDS = [
+    'pk', 'order_id', 'invoice_id', 'customer__first_name', 'customer__last_name',
+    'transaction_type', 'category', 'amount', 'date', 'payment_method', 'status'
+]
+
+HEADER_BLUE = colors.HexColor('#1a237e')
+
+# Built once: the same style object applies to every page's table, and
+# ROWBACKGROUNDS replaces the per-row alternate background commands
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), HEADER_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('TOPPADDING', (0, 1), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f7ff')]),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+
+def format_row(row, labels):
+    """Turn a ``.values()`` row into the table's display strings."""
+    type_labels, category_labels, payment_labels, status_labels = labels
+    customer = f"{row['customer__first_name'] or ''} {row['customer__last_name'] or ''}".strip()
+    if len(customer) > CUSTOMER_MAX_CHARS:
+        customer = customer[:CUSTOMER_MAX_CHARS - 1] + '…'
+    amount = row['amount']
+    return [
+        str(row['pk']),
+        str(row['order_id'] or ''),
+        str(row['invoice_id'] or ''),
+        customer,
+        type_labels.get(row['transaction_type'], row['transaction_type']),
+        category_labels.get(row['category'], row['category']) if row['category'] else '',
+        f"N{amount:,.2f}" if amount is not None else '',
+        row['date'].strftime("%Y-%m-%d") if row['date'] else '',
+        payment_labels.get(row['payment_method'], row['payment_method']),
+        status_labels.get(row['status'], row['status']),
+    ]
+
+
+def iter_table_rows(queryset):
+    """Display rows for ``queryset``, read from the database in keyset chunks."""
+    labels = (
+        dict(Transaction.TRANSACTION_TYPES),
+        dict(Transaction.CATEGORY_CHOICES),
+        dict(Transaction.PAYMENT_METHODS),
+        dict(Transaction.TRANSACTION_STATUSES),
+    )
+    for row in iter_keyset(queryset, VALUE_FIELDS):
+        yield format_row(row, labels)
+
+
+def render_transactions_pdf(rows, output, total):
+    """
+    Draw ``rows`` (lists of display strings) into ``output`` as a paginated
+    transactions report.
+
+    Each page gets its own small ``Table`` that is laid out, drawn and
+    discarded before the next page's rows are pulled, so layout cost is
+    linear in the row count and only one page is ever held in memory.
+    Returns the number of rows written.
+    """
+    width, height = PAGE_SIZE
+    usable_width = width - 2 * MARGIN
+    col_widths = [usable_width * share for share in COLUMN_SHARES]
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    pdf = canvas.Canvas(output, pagesize=PAGE_SIZE, pageCompression=1)
+    pdf.setTitle('Transactions Report')
+
+    rows = iter(rows)
+    written = 0
+    page = 1
+    while True:
+        page_rows = FIRST_PAGE_ROWS if page == 1 else ROWS_PER_PAGE
+        chunk = list(islice(rows, page_rows))
+        # The first page is drawn even when empty so the report has a title
+        if not chunk and page > 1:
+            break
+
+        top = height - MARGIN
+        if page == 1:
+            pdf.setFillColor(HEADER_BLUE)
+            pdf.setFont('Helvetica-Bold', 24)
+            pdf.drawCentredString(width / 2, top - 24, 'Transactions Report')
+            pdf.setFillColor(colors.black)
+            pdf.setFont('Helvetica', 12)
+            pdf.drawCentredString(width / 2, top - 46, f"Generated on: {generated}")
+            pdf.drawCentredString(width / 2, top - 62, f"Total Transactions: {total:,}")
+            top -= 80
+
+        table = Table([HEADERS] + chunk, colWidths=col_widths, style=TABLE_STYLE)
+        _, table_height = table.wrapOn(pdf, usable_width, top - MARGIN)
+        table.drawOn(pdf, MARGIN, top - table_height)
+
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(width - MARGIN, MARGIN / 2, f"Page {page}")
+        pdf.showPage()
+
+        written += len(chunk)
+        page += 1
+        if len(chunk) < page_rows:
+            break
+
+    pdf.save()
+    return written
+
+
+def export_transactions_pdf(queryset, output, total=None):
+    """Render every transaction in ``queryset`` into ``output``."""
+    if total is None:
+        total = queryset.count()
+    return render_transactions_pdf(iter_table_rows(queryset), output, total)
+
+
+# Background exports for result sets over TRANSACTION_PDF_MAX_ROWS. Status
+# lives in TransactionPdfExport rows, so any web worker can answer a poll.
+# The queryset is rendered by the worker thread of the process that took the
+# request; an export that process lost on restart is reported as failed once
+# it has been pending for TRANSACTION_PDF_EXPORT_STALE_AFTER.
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='transaction-pdf')
+
+
+def get_export(token):
+    """The export for ``token``, or None. Lost pending exports are marked failed first."""
+    TransactionPdfExport.objects.filter(
+        token=token,
+        status=TransactionPdfExport.STATUS_PENDING,
+        created_at__lt=timezone.now() - TRANSACTION_PDF_EXPORT_STALE_AFTER
+    ).update(
+        status=TransactionPdfExport.STATUS_FAILED,
+        error='The export was interrupted; please request it again',
+        finished_at=timezone.now()
+    )
+    return TransactionPdfExport.objects.filter(token=token).first()
+
+
+def _run_export(export_id, queryset, total):
+    close_old_connections()
+    try:
+        export = TransactionPdfExport.objects.get(pk=export_id)
+        with tempfile.TemporaryFile() as output:
+            written = export_transactions_pdf(queryset, output, total)
+            output.seek(0)
+            export.file.save(f"{export.token}.pdf", File(output), save=False)
+        TransactionPdfExport.objects.filter(pk=export_id).update(
+            status=TransactionPdfExport.STATUS_DONE,
+            file=export.file.name,
+            rows=written,
+            finished_at=timezone.now()
+        )
+        logger.info(f"Background transaction PDF export {export.token} wrote {written} rows")
+    except Exception as e:
+        logger.error(f"Background transaction PDF export {export_id} failed: {str(e)}", exc_info=True)
+        TransactionPdfExport.objects.filter(pk=export_id).update(
+            status=TransactionPdfExport.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+
+
+def start_background_export(queryset, total, user):
+    """
+    Render the export on a worker thread and return a token for polling
+    ``get_export``.
+    """
+    purge_expired_exports()
+    export = TransactionPdfExport.objects.create(token=uuid.uuid4().hex, requested_by=user, total=total)
+    transaction.on_commit(lambda: _executor.submit(_run_export, export.pk, queryset, total))
+    logger.info(f"Queued background transaction PDF export {export.token} for {total} rows")
+    return export.token
+
+
+def purge_expired_exports(retention=TRANSACTION_PDF_EXPORT_RETENTION):
+    """Delete exports older than ``retention`` and their files. Returns the number deleted."""
+    expired = list(TransactionPdfExport.objects.filter(created_at__lt=timezone.now() - retention))
+    for export in expired:
+        if export.file:
+            try:
+                export.file.delete(save=False)
+            except Exception as e:
+                logger.warning(f"Could not delete export file {export.file.name}: {str(e)}")
+        export.delete()
+    if expired:
+        logger.info(f"Deleted {len(expired)} expired transaction PDF exports")
+    return len(expired)
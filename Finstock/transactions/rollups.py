@@ -0,0 +1,155 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Count, F
+
+from .models import Transaction, TransactionDailyRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY_FIELDS = ('date', 'transaction_type', 'category', 'status', 'payment_method')
+
+
+def rollup_key(values):
+    """
+    Build the rollup key from a transaction instance or a ``.values()`` row.
+    """
+    get = values.get if isinstance(values, dict) else lambda field: getattr(values, field)
+    return (
+        get('date'),
+        get('transaction_type'),
+        get('category') or '',
+        get('status'),
+        get('payment_method'),
+    )
+
+
+def apply_delta(key, amount, count):
+    """
+    Add ``amount`` and ``count`` to the rollup row for ``key`` in a single
+    UPDATE, creating the row if it does not exist yet.
+    """
+    if not count and not amount:
+        return
+
+    lookup = dict(zip(ROLLUP_KEY_FIELDS, key))
+    with transaction.atomic():
+        updated = TransactionDailyRollup.objects.filter(**lookup).update(
+            total_amount=F('total_amount') + amount,
+            transaction_count=F('transaction_count') + count
+        )
+        if updated:
+            return
+
+        try:
+            with transaction.atomic():
+                TransactionDailyRollup.objects.create(
+                    total_amount=amount, transaction_count=count, **lookup
+                )
+        except IntegrityError:
+            # Another writer created the row first; fold our delta into it
+            TransactionDailyRollup.objects.filter(**lookup).update(
+                total_amount=F('total_amount') + amount,
+                transaction_count=F('transaction_count') + count
+            )
+
+
+def apply_deltas(deltas):
+    """
+    Apply a mapping of ``key -> [amount, count]`` produced by ``collect_deltas``.
+    """
+    for key, (amount, count) in deltas.items():
+        apply_delta(key, amount, count)
+
+
+def collect_deltas(rows, sign=1, deltas=None):
+    """
+    Fold grouped ``.values()`` rows carrying ``total_amount`` and
+    ``transaction_count`` into a ``key -> [amount, count]`` mapping.
+    """
+    deltas = deltas if deltas is not None else defaultdict(lambda: [Decimal('0.00'), 0])
+    for row in rows:
+        entry = deltas[rollup_key(row)]
+        entry[0] += sign * (row['total_amount'] or Decimal('0.00'))
+        entry[1] += sign * row['transaction_count']
+    return deltas
+
+
+def grouped_transactions(queryset):
+    return queryset.values(*ROLLUP_KEY_FIELDS).annotate(
+        total_amount=Sum('amount'),
+        transaction_count=Count('id')
+    ).order_by()
+
+
+@transaction.atomic
+def bulk_update_status(queryset, new_status):
+    """
+    Update the status of every transaction in ``queryset`` and move their
+    totals between rollup rows. ``QuerySet.update`` does not send signals,
+    so the rollup deltas are computed from one grouped query instead.
+    """
+    queryset = queryset.select_for_update()
+    before = list(grouped_transactions(queryset))
+    updated = queryset.update(status=new_status)
+
+    deltas = collect_deltas(before, sign=-1)
+    collect_deltas(
+        [dict(row, status=new_status) for row in before], sign=1, deltas=deltas
+    )
+    apply_deltas(deltas)
+    return updated
+
+
+@transaction.atomic
+def rebuild_rollups(start_date=None, end_date=None):
+    """
+    Recompute rollup rows from the transaction ledger, optionally limited to
+    an inclusive date range. Returns the number of rollup rows written.
+    """
+    transactions = Transaction.objects.all()
+    rollups = TransactionDailyRollup.objects.all()
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lte=end_date)
+        rollups = rollups.filter(date__lte=end_date)
+
+    rollups.delete()
+
+    # Folding through collect_deltas merges NULL and empty categories into one key
+    deltas = collect_deltas(grouped_transactions(transactions))
+    rows = [
+        TransactionDailyRollup(
+            total_amount=amount,
+            transaction_count=count,
+            **dict(zip(ROLLUP_KEY_FIELDS, key))
+        )
+        for key, (amount, count) in deltas.items() if count
+    ]
+    TransactionDailyRollup.objects.bulk_create(rows, batch_size=1000)
+    logger.info(f"Rebuilt {len(rows)} transaction rollup rows")
+    return len(rows)
+
+
+def rollups_in_range(start_date, end_date):
+    """
+    Rollup rows for an inclusive date range, the read-side replacement for
+    scanning ``Transaction`` rows.
+    """
+    return TransactionDailyRollup.objects.filter(date__range=[start_date, end_date])
+
+
+def type_totals(start_date, end_date):
+    """
+    Sum of amounts per transaction type for the range.
+    """
+    return {
+        row['transaction_type']: row['total'] or Decimal('0.00')
+        for row in rollups_in_range(start_date, end_date).values(
+            'transaction_type'
+        ).annotate(total=Sum('total_amount')).order_by()
+    }
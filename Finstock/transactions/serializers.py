@@ -4,6 +4,7 @@ from .models import Transaction
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from transactions.models import TransactionQRCode
+from core.qr_images import qr_image_url
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,7 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     created_by_id = serializers.IntegerField(source='created_by.id', read_only=True)
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
+    qr_code = serializers.SerializerMethodField()
 
     class Meta:
         model = Transaction
@@ -29,6 +31,9 @@ class TransactionSerializer(serializers.ModelSerializer):
         ref_name = 'TransactionSerializer'
         read_only_fields = ('created_by', 'created_by_username', 'created_by_id', 'qr_code')
 
+    def get_qr_code(self, obj):
+        return qr_image_url(self.context.get('request'), obj, 'transaction')
+
     def validate(self, data):
         # Simpler checks that don't require database queries
         if data.get('transaction_type') not in dict(Transaction.TRANSACTION_TYPES):
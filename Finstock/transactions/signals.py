@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Transaction
+from .rollups import ROLLUP_KEY_FIELDS, apply_delta, rollup_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = ROLLUP_KEY_FIELDS + ('amount',)
+
+
+def _snapshot(instance):
+    # Read from __dict__ so deferred fields are never loaded just for the rollup
+    values = {field: instance.__dict__.get(field) for field in SNAPSHOT_FIELDS}
+    if any(field not in instance.__dict__ for field in SNAPSHOT_FIELDS):
+        return None
+    return values
+
+
+@receiver(post_init, sender=Transaction)
+def remember_rollup_state(sender, instance, **kwargs):
+    instance._rollup_snapshot = _snapshot(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Transaction)
+def load_missing_rollup_state(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk or getattr(instance, '_rollup_snapshot', None) is not None:
+        return
+    # Loaded with deferred fields or constructed with an explicit pk
+    instance._rollup_snapshot = Transaction.objects.filter(
+        pk=instance.pk
+    ).values(*SNAPSHOT_FIELDS).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = None if created else getattr(instance, '_rollup_snapshot', None)
+    current = _snapshot(instance) or Transaction.objects.filter(
+        pk=instance.pk
+    ).values(*SNAPSHOT_FIELDS).first()
+    with transaction.atomic():
+        if previous is not None:
+            apply_delta(rollup_key(previous), -previous['amount'], -1)
+        apply_delta(rollup_key(current), current['amount'], 1)
+
+    instance._rollup_snapshot = current
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_snapshot', None) or _snapshot(instance)
+    if previous is None:
+        return
+    apply_delta(rollup_key(previous), -previous['amount'], -1)
@@ -0,0 +1,55 @@
+# transactions/tests/test_csv_export.py
+import csv
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Customer
+from core.utils.csv_export import iter_keyset
+from ..models import Transaction
+
+User = get_user_model()
+
+
+class TransactionCsvExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            username='ledger', password='testpass123', first_name='Ada', last_name='Obi'
+        )
+        customer = Customer.objects.create(first_name='Chi', last_name='Eze', email='chi@example.com')
+        Transaction.objects.bulk_create([
+            Transaction(
+                transaction_type='income', category='income', amount=Decimal(index + 1),
+                date=timezone.now().date(), payment_method='cash', status='completed',
+                customer=customer, created_by=cls.user
+            )
+            for index in range(25)
+        ])
+
+    def test_keyset_chunks_cover_every_row_once(self):
+        # 25 rows in chunks of 10: three full/partial chunks, no trailing empty query
+        with self.assertNumQueries(3):
+            rows = list(iter_keyset(Transaction.objects.all(), ['pk', 'amount'], chunk_size=10))
+
+        self.assertEqual([row['pk'] for row in rows], sorted(Transaction.objects.values_list('pk', flat=True)))
+
+    def test_export_streams_formatted_rows(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/transactions/transactions/export_csv/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual(rows[0][0], 'Transaction ID')
+        self.assertEqual(len(rows), 26)
+        first = rows[1]
+        self.assertEqual(first[3], 'Chi Eze')
+        self.assertEqual(first[4], 'Income')
+        self.assertEqual(first[6], 'N1.00')
+        self.assertEqual(first[10], 'Ada Obi')
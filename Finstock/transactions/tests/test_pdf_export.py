@@ -0,0 +1,98 @@
+# transactions/tests/test_pdf_export.py
+import io
+import re
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import pdf_export
+from ..models import Transaction, TransactionPdfExport
+
+User = get_user_model()
+
+
+def page_count(content):
+    return len(re.findall(rb'/Type /Page[^s]', content))
+
+
+class TransactionPdfExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='auditor', password='testpass123')
+        Transaction.objects.bulk_create([
+            Transaction(
+                transaction_type='income', category='income', amount=Decimal(index + 1),
+                date=timezone.now().date(), payment_method='cash', status='completed'
+            )
+            for index in range(60)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_rows_are_split_into_page_tables(self):
+        output = io.BytesIO()
+        written = pdf_export.export_transactions_pdf(Transaction.objects.all(), output)
+
+        self.assertEqual(written, 60)
+        # 22 rows on the title page, then 26 per page
+        self.assertEqual(page_count(output.getvalue()), 3)
+
+    def test_empty_export_still_has_a_title_page(self):
+        output = io.BytesIO()
+        self.assertEqual(pdf_export.export_transactions_pdf(Transaction.objects.none(), output), 0)
+        self.assertEqual(page_count(output.getvalue()), 1)
+
+    def test_small_export_is_rendered_inline(self):
+        response = self.client.get('/api/transactions/transactions/export_pdf/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    @mock.patch.object(pdf_export, 'TRANSACTION_PDF_MAX_ROWS', 10)
+    def test_large_export_falls_back_to_background(self):
+        # Run the worker inline so it sees this test's transaction
+        with mock.patch.object(pdf_export._executor, 'submit', side_effect=lambda fn, *args: fn(*args)), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/transactions/transactions/export_pdf/')
+
+        self.assertEqual(response.status_code, 202)
+        token = response.data['token']
+        self.assertEqual(response.data['total'], 60)
+
+        download = self.client.get(f'/api/transactions/transactions/export_pdf/{token}/')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(page_count(b''.join(download.streaming_content)), 3)
+
+    def test_unknown_export_token(self):
+        response = self.client.get(f'/api/transactions/transactions/export_pdf/{"0" * 32}/')
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch.object(pdf_export, 'TRANSACTION_PDF_MAX_ROWS', 10)
+    def test_export_status_is_read_from_the_database(self):
+        with mock.patch.object(pdf_export._executor, 'submit'):
+            token = self.client.get('/api/transactions/transactions/export_pdf/').data['token']
+
+        export = TransactionPdfExport.objects.get(token=token)
+        self.assertEqual(export.status, TransactionPdfExport.STATUS_PENDING)
+        self.assertEqual(self.client.get(f'/api/transactions/transactions/export_pdf/{token}/').status_code, 202)
+
+        # A pending export whose worker was lost is reported as failed
+        TransactionPdfExport.objects.filter(pk=export.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.client.get(f'/api/transactions/transactions/export_pdf/{token}/').status_code, 500)
+
+    def test_expired_exports_are_purged_with_their_files(self):
+        export = TransactionPdfExport.objects.create(token='a' * 32, requested_by=self.user, total=1)
+        export.file.save(f"{export.token}.pdf", io.BytesIO(b'%PDF'))
+        storage, name = export.file.storage, export.file.name
+        TransactionPdfExport.objects.filter(pk=export.pk).update(created_at=timezone.now() - timedelta(days=2))
+        recent = TransactionPdfExport.objects.create(token='b' * 32, requested_by=self.user, total=1)
+
+        self.assertEqual(pdf_export.purge_expired_exports(), 1)
+        self.assertFalse(TransactionPdfExport.objects.filter(pk=export.pk).exists())
+        self.assertTrue(TransactionPdfExport.objects.filter(pk=recent.pk).exists())
+        self.assertFalse(storage.exists(name))
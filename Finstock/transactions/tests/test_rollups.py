@@ -0,0 +1,61 @@
+# transactions/tests/test_rollups.py
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Transaction, TransactionDailyRollup
+from .. import rollups
+
+
+class TransactionDailyRollupTest(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.transaction = Transaction.objects.create(
+            transaction_type='income',
+            category='income',
+            amount=Decimal('100.00'),
+            date=self.today,
+            payment_method='cash',
+            status='pending'
+        )
+
+    def rollup(self, status):
+        return TransactionDailyRollup.objects.get(
+            date=self.today, transaction_type='income', category='income',
+            status=status, payment_method='cash'
+        )
+
+    def test_create_adds_to_rollup(self):
+        row = self.rollup('pending')
+        self.assertEqual(row.total_amount, Decimal('100.00'))
+        self.assertEqual(row.transaction_count, 1)
+
+    def test_update_moves_between_rollups(self):
+        self.transaction.status = 'completed'
+        self.transaction.amount = Decimal('150.00')
+        self.transaction.save()
+
+        self.assertEqual(self.rollup('pending').transaction_count, 0)
+        self.assertEqual(self.rollup('completed').total_amount, Decimal('150.00'))
+
+    def test_delete_subtracts_from_rollup(self):
+        self.transaction.delete()
+        row = self.rollup('pending')
+        self.assertEqual(row.total_amount, Decimal('0.00'))
+        self.assertEqual(row.transaction_count, 0)
+
+    def test_bulk_update_status(self):
+        rollups.bulk_update_status(Transaction.objects.filter(pk=self.transaction.pk), 'refunded')
+        self.assertEqual(self.rollup('pending').transaction_count, 0)
+        self.assertEqual(self.rollup('refunded').total_amount, Decimal('100.00'))
+
+    def test_rebuild_matches_incremental(self):
+        incremental = list(TransactionDailyRollup.objects.filter(transaction_count__gt=0).values(
+            'date', 'transaction_type', 'category', 'status', 'payment_method',
+            'total_amount', 'transaction_count'
+        ))
+        rollups.rebuild_rollups()
+        rebuilt = list(TransactionDailyRollup.objects.values(
+            'date', 'transaction_type', 'category', 'status', 'payment_method',
+            'total_amount', 'transaction_count'
+        ))
+        self.assertEqual(incremental, rebuilt)
@@ -2,15 +2,17 @@ from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from django.core.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from core.utils.pagination import KeysetPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from .models import Transaction
+from .models import Transaction, TransactionPdfExport
+from . import pdf_export, rollups
 from .serializers import TransactionSerializer
 import csv
 from decimal import Decimal
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
@@ -21,6 +23,7 @@ from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
 from users.views import BaseAccessControlViewSet
+from core.utils.csv_export import iter_keyset, streaming_csv_response
 from users.constants import PermissionConstants
 from users.models import CustomUser
 from django.db.models import Q
@@ -31,7 +34,7 @@ logger = logging.getLogger(__name__)
 from users.permissions import CanViewResource, CanManageResource, SuperuserOrReadOnly
 
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -44,6 +47,7 @@ class TransactionViewSet(BaseAccessControlViewSet):
     queryset = Transaction.objects.all().select_related('customer', 'created_by').order_by('-date', '-id')
     serializer_class = TransactionSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-date', '-id')
     filter_backends = [
         DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter
     ]
@@ -184,6 +188,9 @@ class TransactionViewSet(BaseAccessControlViewSet):
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
+        except NotFound:
+            # Out-of-range pages and invalid cursors
+            raise
         except Exception as e:
             logger.error(f"Error in transaction list view: {str(e)}")
             return Response({
@@ -194,15 +201,6 @@ class TransactionViewSet(BaseAccessControlViewSet):
                 "previous": None
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def filter_queryset(self, queryset):
-        for backend in list(self.filter_backends):
-            queryset = backend().filter_queryset(self.request, queryset, self)
-
-        if not queryset.exists():
-            return Transaction.objects.none()
-
-        return queryset
-
     def update(self, request, *args, **kwargs):
         try:
             logger.info(f"Received update request for transaction ID: {kwargs.get('pk')}")
@@ -256,131 +254,30 @@ class TransactionViewSet(BaseAccessControlViewSet):
     @action(detail=False, methods=['get'])
     def export_pdf(self, request):
         """
-        Exports all filtered transactions to a PDF report with proper formatting
+        Exports all filtered transactions to a paginated PDF report.
+
+        Up to ``TRANSACTION_PDF_MAX_ROWS`` rows are rendered in the request.
+        Larger exports are rendered in the background and a 202 response
+        carries the token to poll at ``export_pdf_status``.
         """
         try:
-            # Get filtered transactions
             transactions = self.filter_queryset(self.get_queryset())
+            total = transactions.count()
+
+            if total > pdf_export.TRANSACTION_PDF_MAX_ROWS:
+                token = pdf_export.start_background_export(transactions, total, request.user)
+                return Response(
+                    {
+                        "status": "pending",
+                        "token": token,
+                        "total": total,
+                        "details": f"Exports over {pdf_export.TRANSACTION_PDF_MAX_ROWS:,} rows are generated in the background"
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
 
-            # Create buffer and PDF document in landscape orientation
             buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=landscape(letter),
-                rightMargin=30,
-                leftMargin=30,
-                topMargin=30,
-                bottomMargin=30
-            )
-
-            # Initialize elements list for PDF content
-            elements = []
-
-            # Enhanced custom styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Title'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor('#1a237e')  # Dark blue color for title
-            )
-
-            # Add title with date and total count
-            title_text = (
-                f"Transactions Report<br/>"
-                f"<font size=12>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>"
-                f"Total Transactions: {transactions.count():,}</font>"
-            )
-            elements.append(Paragraph(title_text, title_style))
-            elements.append(Spacer(1, 20))
-
-            # Define column widths as proportions of the page width
-            page_width = landscape(letter)[0] - 60
-            col_widths = [
-                page_width * 0.05,  # ID
-                page_width * 0.10,  # Order
-                page_width * 0.10,  # Invoice
-                page_width * 0.15,  # Customer (increased width)
-                page_width * 0.10,  # Type
-                page_width * 0.12,  # Category
-                page_width * 0.11,  # Amount
-                page_width * 0.09,  # Date
-                page_width * 0.09,  # Payment Method
-                page_width * 0.09   # Status
-            ]
-
-            # Enhanced header style
-            header_style = ParagraphStyle(
-                'HeaderStyle',
-                parent=styles['Heading2'],
-                fontSize=12,
-                textColor=colors.white,
-                alignment=TA_CENTER
-            )
-
-            headers = ['ID', 'Order', 'Invoice', 'Customer', 'Type', 'Category',
-                      'Amount', 'Date', 'Payment Method', 'Status']
-            header_rows = [[Paragraph(header, header_style) for header in headers]]
-
-            # Prepare data rows with enhanced formatting
-            data_rows = []
-            for transaction in transactions:
-                row = [
-                    Paragraph(str(transaction.id), styles['Normal']),
-                    Paragraph(str(transaction.order.id if transaction.order else ''), styles['Normal']),
-                    Paragraph(str(transaction.invoice.id if transaction.invoice else ''), styles['Normal']),
-                    Paragraph(self._get_customer_display(transaction.customer), styles['Normal']),
-                    Paragraph(transaction.get_transaction_type_display(), styles['Normal']),
-                    Paragraph(transaction.get_category_display() if transaction.category else '', styles['Normal']),
-                    Paragraph(self._format_currency(transaction.amount), styles['Normal']),
-                    Paragraph(transaction.date.strftime("%Y-%m-%d"), styles['Normal']),
-                    Paragraph(transaction.get_payment_method_display(), styles['Normal']),
-                    Paragraph(transaction.get_status_display(), styles['Normal'])
-                ]
-                data_rows.append(row)
-
-            # Combine headers and data
-            data = header_rows + data_rows
-
-            # Create table with defined column widths
-            table = Table(data, colWidths=col_widths, repeatRows=1)
-
-            # Enhanced table styles
-            table.setStyle(TableStyle([
-                # Header styles
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),  # Dark blue header
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 0), (-1, 0), 12),
-
-                # Data row styles
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('TOPPADDING', (0, 1), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-
-                # Grid styles
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-
-                # Alternate row colors - lighter blue for better readability
-                *[('BACKGROUND', (0, i), (-1, i), colors.HexColor('#f5f7ff'))
-                  for i in range(2, len(data), 2)],
-            ]))
-
-            # Add table to elements
-            elements.append(table)
-
-            # Build PDF
-            doc.build(elements)
+            pdf_export.export_transactions_pdf(transactions, buffer, total)
             buffer.seek(0)
 
             # Prepare response
@@ -397,33 +294,46 @@ class TransactionViewSet(BaseAccessControlViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], url_path='export_pdf/(?P<token>[0-9a-f]{32})')
+    def export_pdf_status(self, request, token=None):
+        """
+        Status of a background PDF export, or the file once it is ready.
+        """
+        export = pdf_export.get_export(token)
+        if export is None or (export.requested_by_id != request.user.pk and not request.user.is_superuser):
+            return Response({"error": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if export.status == TransactionPdfExport.STATUS_FAILED:
+            return Response(
+                {"error": "Failed to generate PDF report", "details": export.error},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        if export.status != TransactionPdfExport.STATUS_DONE:
+            return Response({"status": export.status, "total": export.total}, status=status.HTTP_202_ACCEPTED)
+
+        return FileResponse(
+            export.file.open('rb'),
+            as_attachment=True,
+            filename=f"transactions_report_{token[:8]}.pdf",
+            content_type='application/pdf'
+        )
+
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         """
-        Exports all filtered transactions to a CSV file with enhanced formatting.
+        Streams all filtered transactions to a CSV file.
 
-        Features:
-        - Proper formatting for all fields
-        - Meaningful file naming
-        - Error handling
-        - Progress tracking for large datasets
+        Rows are read in primary key order in keyset-paginated chunks of
+        ``.values()`` with the related columns joined in, so memory stays
+        flat and the first bytes go out before the whole ledger is read.
         """
         try:
-            # Get filtered transactions
             transactions = self.filter_queryset(self.get_queryset())
 
-            # Create the HttpResponse object with CSV header
-            response = HttpResponse(content_type='text/csv')
-
             # Generate a meaningful filename with timestamp
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"transactions_export_{timestamp}.csv"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-            # Create CSV writer
-            writer = csv.writer(response, quoting=csv.QUOTE_ALL)
 
-            # Write headers
             headers = [
                 'Transaction ID',
                 'Order ID',
@@ -439,31 +349,38 @@ class TransactionViewSet(BaseAccessControlViewSet):
                 'Created Date',
                 'Last Modified'
             ]
-            writer.writerow(headers)
-
-            # Write data rows with proper formatting
-            for transaction in transactions:
-                row = [
-                    transaction.id,
-                    self._format_related_object(transaction.order),
-                    self._format_related_object(transaction.invoice),
-                    self._get_customer_display(transaction.customer),
-                    transaction.get_transaction_type_display(),
-                    transaction.get_category_display() if transaction.category else '',
-                    self._format_currency(transaction.amount),
-                    transaction.date.strftime("%Y-%m-%d") if transaction.date else '',
-                    transaction.get_payment_method_display(),
-                    transaction.get_status_display(),
-                    transaction.created_by.get_full_name() if transaction.created_by else '',
-                    transaction.created_at.strftime("%Y-%m-%d %H:%M:%S") if hasattr(transaction, 'created_at') else '',
-                    transaction.modified_at.strftime("%Y-%m-%d %H:%M:%S") if hasattr(transaction, 'modified_at') else ''
-                ]
-                writer.writerow(row)
-
-            # Log successful export
-            logger.info(f"Successfully exported {transactions.count()} transactions to CSV")
-
-            return response
+            fields = [
+                'pk', 'order_id', 'invoice_id', 'customer__first_name', 'customer__last_name',
+                'transaction_type', 'category', 'amount', 'date', 'payment_method', 'status',
+                'created_by__first_name', 'created_by__last_name', 'created', 'modified'
+            ]
+            type_labels = dict(Transaction.TRANSACTION_TYPES)
+            category_labels = dict(Transaction.CATEGORY_CHOICES)
+            payment_labels = dict(Transaction.PAYMENT_METHODS)
+            status_labels = dict(Transaction.TRANSACTION_STATUSES)
+
+            def rows():
+                for row in iter_keyset(transactions, fields):
+                    customer = f"{row['customer__first_name'] or ''} {row['customer__last_name'] or ''}".strip()
+                    created_by = f"{row['created_by__first_name'] or ''} {row['created_by__last_name'] or ''}".strip()
+                    yield [
+                        row['pk'],
+                        row['order_id'] or '',
+                        row['invoice_id'] or '',
+                        customer,
+                        type_labels.get(row['transaction_type'], row['transaction_type']),
+                        category_labels.get(row['category'], row['category']) if row['category'] else '',
+                        self._format_currency(row['amount']),
+                        row['date'].strftime("%Y-%m-%d") if row['date'] else '',
+                        payment_labels.get(row['payment_method'], row['payment_method']),
+                        status_labels.get(row['status'], row['status']),
+                        created_by,
+                        row['created'].strftime("%Y-%m-%d %H:%M:%S") if row['created'] else '',
+                        row['modified'].strftime("%Y-%m-%d %H:%M:%S") if row['modified'] else ''
+                    ]
+
+            logger.info(f"Streaming transaction CSV export {filename}")
+            return streaming_csv_response(filename, headers, rows(), quoting=csv.QUOTE_ALL)
 
         except Exception as e:
             error_message = f"Error exporting transactions to CSV: {str(e)}"
@@ -481,11 +398,11 @@ class TransactionViewSet(BaseAccessControlViewSet):
         """
         Updates the status of multiple transactions identified by their IDs.
         """
-        status = request.data.get('status')
+        new_status = request.data.get('status')
         ids = request.data.get('ids')
-        if status and ids:
-            transactions = Transaction.objects.filter(id__in=ids)
-            transactions.update(status=status)
+        if new_status and ids:
+            # Moves the affected totals between daily rollup rows as well
+            rollups.bulk_update_status(Transaction.objects.filter(id__in=ids), new_status)
             return Response(
                 {'message': 'Transactions updated successfully'},
                 status=status.HTTP_200_OK
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from users import permission_snapshot
+from users.serializers import TransactionSerializer
+from transactions.models import Transaction
+
+User = get_user_model()
+
+PERMISSION_TABLES = ('users_permission', 'users_role')
+
+
+class Command(BaseCommand):
+    help = 'Count database queries spent on permission checks for one list page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='User to make the request as')
+        parser.add_argument('--path', default='/api/transactions/transactions/', help='List endpoint to request')
+        parser.add_argument('--page-size', type=int, default=50, help='Rows to run per-object action checks on')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        permission_snapshot.invalidate_user(user.pk)
+        self.stdout.write(f"{options['path']} as {user.username}")
+        self._report('cold list request', lambda: self._list(user, options['path']))
+        self._report('warm list request', lambda: self._list(user, options['path']))
+
+        # get_accessible_actions makes four has_perm checks per serialized row
+        rows = list(Transaction.objects.all()[:options['page_size']])
+        self._report(
+            f'accessible_actions for {len(rows)} rows',
+            lambda: self._accessible_actions(User.objects.get(pk=user.pk), rows)
+        )
+
+    def _list(self, user, path):
+        # A fresh instance per request, as the authentication middleware provides
+        request = APIRequestFactory().get(path, HTTP_HOST='localhost')
+        force_authenticate(request, user=User.objects.get(pk=user.pk))
+        match = resolve(path)
+        return match.func(request, *match.args, **match.kwargs).render()
+
+    def _accessible_actions(self, user, rows):
+        request = APIRequestFactory().get('/')
+        request.user = user
+        serializer = TransactionSerializer(context={'request': request})
+        for row in rows:
+            serializer.get_accessible_actions(row)
+
+    def _report(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        permission_queries = sum(
+            1 for query in queries.captured_queries
+            if any(table in query['sql'] for table in PERMISSION_TABLES)
+        )
+        self.stdout.write(
+            f'  {label:<32} {len(queries.captured_queries):>5} queries, '
+            f'{permission_queries:>5} on roles/permissions'
+        )
@@ -9,6 +9,8 @@ import pyotp
 import base64
 import os
 
+from .permission_snapshot import get_snapshot
+
 class Permission(models.Model):
     """
     This model represents a permission within the system.
@@ -76,30 +78,32 @@ class CustomUser(AbstractUser):
             is_active=True
         ).distinct()
 
+    @property
+    def permission_snapshot(self):
+        """
+        Roles and permission names loaded once per request.
+        See ``users.permission_snapshot``.
+        """
+        return get_snapshot(self)
+
     def get_roles(self):
         """
         Returns a list of role names for the user
         """
-        return list(self.roles.values_list('name', flat=True))
+        return sorted(self.permission_snapshot.roles)
 
     def is_role(self, role_name):
         """
         Check if user has a specific role
         """
-        return role_name in self.get_roles()
+        return role_name in self.permission_snapshot.roles
 
     def has_role_permission(self, permission_name):
         if self.is_superuser:
             return True
 
         # Check custom role-based permissions
-        has_custom_permission = Permission.objects.filter(
-            roles__users=self,
-            name=permission_name,
-            is_active=True
-        ).exists()
-
-        if has_custom_permission:
+        if permission_name in self.permission_snapshot.permissions:
             return True
 
         # Check Django permissions
@@ -115,11 +119,7 @@ class CustomUser(AbstractUser):
         """
         return self.is_active and (
             self.is_superuser or
-            Permission.objects.filter(
-                roles__users=self,
-                name__startswith=f'{app_label}.',
-                is_active=True
-            ).exists()
+            any(name.startswith(f'{app_label}.') for name in self.permission_snapshot.permissions)
         )
 
     def has_perm(self, perm, obj=None):
@@ -134,15 +134,9 @@ class CustomUser(AbstractUser):
         if self.is_superuser:
             return True
 
-        # Real-time permission check based on current roles
-        current_active_permissions = Permission.objects.filter(
-            roles__users=self,  # Permissions from current roles
-            roles__is_active=True,  # Only from active roles
-            name=perm,
-            is_active=True
-        )
-
-        return current_active_permissions.exists()
+        # Permissions from current, active roles; the snapshot is dropped
+        # whenever roles or their permissions change
+        return perm in self.permission_snapshot.active_role_permissions
 
     def add_role_permission(self, permission):
         """
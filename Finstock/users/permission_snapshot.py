@@ -0,0 +1,151 @@
+"""
+Immutable per-user view of roles and permission names.
+
+``CustomUser`` role and permission checks read from a ``PermissionSnapshot``
+instead of querying on every call. A snapshot is built with two queries,
+kept on the user instance for the rest of the request, and, when the
+default cache is shared between processes (Redis, Memcached), shared between
+requests through it.
+
+Shared entries are keyed by a global version and a per-user version. The
+m2m and save signals in ``users.signals`` replace those versions when roles
+or permissions change, so stale entries are simply never read again and
+expire after ``PERMISSION_SNAPSHOT_TTL`` seconds. A process-local cache
+(LocMemCache) would only see invalidations made in the same process, so
+with one snapshots are request-scoped and every request rebuilds its own.
+"""
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PERMISSION_SNAPSHOT_TTL = getattr(settings, 'PERMISSION_SNAPSHOT_TTL', 300)
+
+# Backends whose entries, and so whose version bumps, never leave the process
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_SNAPSHOTS = (
+    getattr(settings, 'PERMISSION_SNAPSHOT_SHARED', True)
+    and settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_CACHE_BACKENDS
+)
+
+GLOBAL_VERSION_KEY = 'perm_snapshot:version'
+USER_VERSION_KEY = 'perm_snapshot:user:{user_id}:version'
+SNAPSHOT_KEY = 'perm_snapshot:{user_id}:{joined}:{global_version}:{user_version}'
+
+# Bumped on every invalidation in this process, so snapshots already attached
+# to user instances are rebuilt without a cache round trip per check
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PermissionSnapshot:
+    """
+    ``roles``: names of every role the user holds.
+    ``permissions``: active permission names granted by any of those roles.
+    ``active_role_permissions``: the subset granted by active roles.
+    """
+    roles: frozenset = frozenset()
+    permissions: frozenset = frozenset()
+    active_role_permissions: frozenset = frozenset()
+
+
+EMPTY_SNAPSHOT = PermissionSnapshot()
+
+
+def load_snapshot(user):
+    """Build a snapshot from the database."""
+    from .models import Permission
+
+    roles = frozenset(user.roles.values_list('name', flat=True))
+    permissions = set()
+    active_role_permissions = set()
+    for name, role_is_active in Permission.objects.filter(
+        roles__users=user,
+        is_active=True
+    ).values_list('name', 'roles__is_active'):
+        permissions.add(name)
+        if role_is_active:
+            active_role_permissions.add(name)
+
+    return PermissionSnapshot(
+        roles=roles,
+        permissions=frozenset(permissions),
+        active_role_permissions=frozenset(active_role_permissions)
+    )
+
+
+def _versions(user_id):
+    keys = [GLOBAL_VERSION_KEY, USER_VERSION_KEY.format(user_id=user_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() keeps a version another process set first
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_snapshot(user):
+    """
+    The user's snapshot, from the instance, the shared cache or the database,
+    in that order. Without a shared cache the snapshot is request-scoped.
+    """
+    if user.pk is None:
+        return EMPTY_SNAPSHOT
+
+    snapshot = getattr(user, '_permission_snapshot', None)
+    if snapshot is not None and user._permission_snapshot_generation == _generation:
+        return snapshot
+
+    generation = _generation
+    if not SHARED_SNAPSHOTS:
+        user._permission_snapshot = load_snapshot(user)
+        user._permission_snapshot_generation = generation
+        return user._permission_snapshot
+
+    global_version, user_version = _versions(user.pk)
+    key = SNAPSHOT_KEY.format(
+        user_id=user.pk,
+        # Guards against a reused primary key picking up a deleted user's entry
+        joined=user.date_joined.timestamp() if user.date_joined else '',
+        global_version=global_version,
+        user_version=user_version
+    )
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = load_snapshot(user)
+        cache.set(key, snapshot, PERMISSION_SNAPSHOT_TTL)
+
+    user._permission_snapshot = snapshot
+    user._permission_snapshot_generation = generation
+    return snapshot
+
+
+def _bump_generation():
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+def invalidate_user(user_id):
+    """Drop cached snapshots for one user, e.g. after their roles change."""
+    if SHARED_SNAPSHOTS:
+        cache.set(USER_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+    _bump_generation()
+
+
+def invalidate_all():
+    """Drop every cached snapshot, e.g. after a role's permissions change."""
+    if SHARED_SNAPSHOTS:
+        cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+    _bump_generation()
+    logger.info("Invalidated all permission snapshots")
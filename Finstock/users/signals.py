@@ -1,4 +1,4 @@
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission as DjangoPermission
@@ -9,7 +9,8 @@ from django.utils.timezone import now
 from users.models import PermissionAuditLog
 import logging
 
-from users.models import Permission, CustomUser
+from users.models import Permission, CustomUser, Role
+from users import permission_snapshot
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -124,3 +125,42 @@ def reset_user_session_on_role_change(sender, instance, action, **kwargs):
             resource='User Roles',
             status='Role Change Detected'
         )
+
+
+@receiver(m2m_changed, sender=CustomUser.roles.through)
+def invalidate_permission_snapshot_on_role_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop cached permission snapshots for users whose roles changed
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        permission_snapshot.invalidate_user(instance.pk)
+    elif pk_set:
+        # role.users.add(...) / remove(...): the users are in pk_set
+        for user_id in pk_set:
+            permission_snapshot.invalidate_user(user_id)
+    else:
+        # role.users.clear() does not say which users were affected
+        permission_snapshot.invalidate_all()
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_permission_snapshots_on_role_permissions_change(sender, action, **kwargs):
+    """
+    A role's permissions changed, which affects every holder of the role
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        permission_snapshot.invalidate_all()
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_permission_snapshots_on_definition_change(sender, **kwargs):
+    """
+    Renaming or (de)activating a role or permission changes every snapshot that holds it
+    """
+    permission_snapshot.invalidate_all()
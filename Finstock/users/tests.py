@@ -1,5 +1,8 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from . import permission_snapshot
 from .models import Role, Permission
 
 
@@ -47,3 +50,83 @@ class UserTests(TestCase):
         permission = Permission.objects.create(name='can_view_all_products', description='Can view all products')
         self.assertEqual(permission.name, 'can_view_all_products')
         self.assertEqual(permission.description, 'Can view all products')
+
+
+class PermissionSnapshotTests(TestCase):
+    """
+    Tests that role and permission checks are answered from a snapshot
+    that is rebuilt when roles or permissions change.
+    """
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='clerk', password='testpass123')
+        self.role = Role.objects.create(name='Accountant')
+        self.permission = Permission.objects.create(name='transactions.view_transaction')
+        self.role.permissions.add(self.permission)
+        self.user.roles.add(self.role)
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_checks_are_answered_from_memory(self):
+        user = self.fresh_user()
+        self.assertTrue(user.has_perm('transactions.view_transaction'))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_role('Accountant'))
+            self.assertEqual(user.get_roles(), ['Accountant'])
+            self.assertTrue(user.has_role_permission('transactions.view_transaction'))
+            self.assertFalse(user.has_perm('transactions.delete_transaction'))
+            self.assertTrue(user.has_module_perms('transactions'))
+
+    @mock.patch.object(permission_snapshot, 'SHARED_SNAPSHOTS', True)
+    def test_snapshot_is_shared_between_requests(self):
+        self.fresh_user().get_roles()
+
+        # A new instance (the next request) reads the cached snapshot
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('transactions.view_transaction'))
+
+    def test_snapshot_is_request_scoped_with_a_process_local_cache(self):
+        # The test settings use LocMemCache, whose invalidations other workers never see
+        self.assertFalse(permission_snapshot.SHARED_SNAPSHOTS)
+        self.fresh_user().get_roles()
+
+        user = self.fresh_user()
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_perm('transactions.view_transaction'))
+
+    def test_inactive_role_only_grants_role_permissions(self):
+        self.role.is_active = False
+        self.role.save()
+        user = self.fresh_user()
+
+        self.assertFalse(user.has_perm('transactions.view_transaction'))
+        self.assertTrue(user.has_role_permission('transactions.view_transaction'))
+
+    @mock.patch.object(permission_snapshot, 'SHARED_SNAPSHOTS', True)
+    def test_role_changes_invalidate_snapshot(self):
+        user = self.fresh_user()
+        self.assertTrue(user.is_role('Accountant'))
+
+        user.roles.remove(self.role)
+        self.assertFalse(user.is_role('Accountant'))
+        self.assertFalse(self.fresh_user().is_role('Accountant'))
+
+        user.roles.add(self.role)
+        self.assertTrue(self.fresh_user().is_role('Accountant'))
+
+    @mock.patch.object(permission_snapshot, 'SHARED_SNAPSHOTS', True)
+    def test_role_permission_changes_invalidate_snapshot(self):
+        user = self.fresh_user()
+        self.assertTrue(user.has_perm('transactions.view_transaction'))
+
+        self.role.permissions.remove(self.permission)
+        self.assertFalse(user.has_perm('transactions.view_transaction'))
+
+        self.role.permissions.add(self.permission)
+        self.permission.is_active = False
+        self.permission.save()
+        self.assertFalse(self.fresh_user().has_perm('transactions.view_transaction'))
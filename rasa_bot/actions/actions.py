@@ -7,8 +7,11 @@ sys.path.insert(0, os.path.abspath('/home/kennyd/verifi/Finstock'))
 
 # Set the Django settings module.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+from .startup import startup_timer
+
 import django
-django.setup()
+with startup_timer.phase("django_setup"):
+    django.setup()
 from math import sqrt
 import statistics
 import logging
@@ -22,9 +25,6 @@ from django.utils import timezone
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
 from pathlib import Path
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import threading
 import queue
@@ -37,11 +37,14 @@ from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 from rasa_sdk.events import SlotSet, ActiveLoop
 from rasa.shared.utils.io import json_to_string
-from django.db.models import Sum, Avg, Count, F, Q, ExpressionWrapper, DecimalField, Value, FloatField, Case, When, IntegerField, CharField, Min, Max, DurationField
-from django.db.models.functions import TruncMonth, TruncDay, ExtractMonth, TruncMonth, TruncQuarter, Coalesce, Cast
+from django.db.models import Sum, Avg, Count, F, Q, ExpressionWrapper, DecimalField, Value, FloatField, Case, When, IntegerField, CharField, Max
+from django.db.models.functions import Coalesce
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
 from tenacity import retry, stop_after_attempt, wait_exponential
+from .semantic_cache import SemanticCache
+from . import db, forecasting, metrics, periods
+from core.lookup_index import product_index
 # Import Django models
 from inspection.models import (
     AuthGroup,
@@ -58,99 +61,164 @@ from inspection.models import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class BiChatbot:                                                                                                                            
-    def __init__(self):                                                                                                                     
-                                                                                                                                            
-        load_dotenv("../Finstock/.env", override=True)                                                                                      
-                                                                                                                                            
-        # Initialize local models                                                                                                           
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"                                                                        
-        logger.info(f"Using device: {self.device}")                                                                                         
-                                                                                                                                            
-        # Cache directory                                                                                                                   
-        self.cache_dir = Path("./cache")                                                                                                    
-        self.cache_dir.mkdir(exist_ok=True)                                                                                                 
-        self.cache_file = self.cache_dir / "summaries_cache.pkl"                                                                            
-        self.load_cache()                                                                                                                   
-                                                                                                                                            
-        # Load local summarization model (lightweight T5)                                                                                   
-        try:                                                                                                                                
-            logger.info("Loading local summarization model...")                                                                             
-            self.tokenizer = AutoTokenizer.from_pretrained("t5-small")                                                                      
-            self.model = AutoModelForSeq2SeqLM.from_pretrained("t5-small").to(self.device)                                                  
-            logger.info("Local summarization model loaded successfully")                                                                    
-            self.local_model_available = True
-        except Exception as e:                                                                                                              
-            logger.error(f"Failed to load local summarization model: {e}")                                                                  
-            self.local_model_available = False                                                                                              
-                                                                                                                                            
-        # Load sentence embedding model for semantic caching                                                                                
-        try:                                                                                                                                
-            logger.info("Loading sentence embedding model...")                                                                              
-            self.embed_model = SentenceTransformer('paraphrase-MiniLM-L6-v2').to(self.device)                                               
-            logger.info("Sentence embedding model loaded successfully")                                                                     
-            self.embedding_model_available = True                                                                                           
-        except Exception as e:                                                                                                              
-            logger.error(f"Failed to load sentence embedding model: {e}")                                                                   
-            self.embedding_model_available = False                                                                                          
-                                                                                                                                            
-        # Together AI API setup                                                                                                             
-        self.together_api_key = os.getenv("TOGETHER_API_KEY")                                                                               
-        self.together_api_url = "https://api.together.xyz/v1/completions"                                                                   
-        self.together_headers = {                                                                                                           
-            "Authorization": f"Bearer {self.together_api_key}",                                                                             
-            "Content-Type": "application/json"                                                                                              
-        }                                                                                                                                   
-                                                                                                                                            
-        # Check if Together AI API key is available                                                                                         
-        if not self.together_api_key:                                                                                                       
-            logger.warning("Together API key not found. Fallback to Together AI will not be available.")                                    
-                                                                                                                                            
-    def load_cache(self):                                                                                                                   
-        """Load cached summaries if available"""                                                                                            
-        try:                                                                                                                                
-            if self.cache_file.exists():                                                                                                    
-                with open(self.cache_file, 'rb') as f:                                                                                      
-                    self.cache = pickle.load(f)                                                                                             
-                    logger.info(f"Loaded {len(self.cache['queries'])} cached queries")                                                      
-            else:                                                                                                                           
-                self.cache = {"queries": [], "embeddings": [], "summaries": []}                                                             
-                logger.info("Created new cache")                                                                                            
+class BiChatbot:
+    """
+    Answers free-form BI questions through Together AI, with a local T5
+    summarizer and a semantic cache of previous answers.
+
+    Construction is cheap: the models and the cache index are loaded by
+    ``warm_up``, normally in a background thread started at import. Until
+    ``is_ready`` is set the chatbot skips the local model and the cache and
+    goes straight to Together AI, so the action server can serve requests
+    immediately.
+    """
+    def __init__(self):
+
+        load_dotenv("../Finstock/.env", override=True)
+
+        # Cache directory
+        self.cache_dir = Path("./cache")
+        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_file = self.cache_dir / "summaries_cache.pkl"
+
+        self.inference = None
+        self.cache = None
+        self.local_model_available = False
+        self.embedding_model_available = False
+        self.ready = threading.Event()
+        self._warm_up_lock = threading.Lock()
+        self._warm_up_started = False
+        self._warm_up_thread = None
+
+        # Together AI API setup
+        self.together_api_key = os.getenv("TOGETHER_API_KEY")
+        self.together_api_url = "https://api.together.xyz/v1/completions"
+        self.together_headers = {
+            "Authorization": f"Bearer {self.together_api_key}",
+            "Content-Type": "application/json"
+        }
+
+        # Check if Together AI API key is available
+        if not self.together_api_key:
+            logger.warning("Together API key not found. Fallback to Together AI will not be available.")
+
+    @property
+    def is_ready(self):
+        return self.ready.is_set()
+
+    def start_warm_up(self):
+        """Load the models on a daemon thread so imports return immediately"""
+        # Concurrent first queries must not start a second loader
+        with self._warm_up_lock:
+            if self._warm_up_started:
+                return
+            self._warm_up_started = True
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="bi-chatbot-warm-up", daemon=True)
+            self._warm_up_thread.start()
+
+    def wait_until_ready(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def warm_up(self):
+        """Load the inference models and the semantic cache, then mark the chatbot ready"""
+        if self.is_ready:
+            return
+        try:
+            with startup_timer.phase("torch_import"):
+                # Deferred so importing the action module does not pay for torch
+                from .inference import get_inference_worker
+                self.inference = get_inference_worker()
+            logger.info(f"Using device: {self.inference.device}")
+
+            # Load local summarization model (lightweight T5)
+            try:
+                logger.info("Loading local summarization model...")
+                with startup_timer.phase("summarizer_load"):
+                    self.inference.load_summarizer("t5-small")
+                logger.info("Local summarization model loaded successfully")
+                self.local_model_available = True
+            except Exception as e:
+                logger.error(f"Failed to load local summarization model: {e}")
+                self.local_model_available = False
+
+            # Load sentence embedding model for semantic caching
+            try:
+                logger.info("Loading sentence embedding model...")
+                with startup_timer.phase("embedder_load"):
+                    self.inference.load_embedder('paraphrase-MiniLM-L6-v2')
+                logger.info("Sentence embedding model loaded successfully")
+                self.embedding_model_available = True
+            except Exception as e:
+                logger.error(f"Failed to load sentence embedding model: {e}")
+                self.embedding_model_available = False
+
+            # Semantic cache index, sized to the embedding model output
+            with startup_timer.phase("semantic_cache_load"):
+                self.load_cache()
         except Exception as e:
-            logger.error(f"Error loading cache: {e}")                                                                                       
-            self.cache = {"queries": [], "embeddings": [], "summaries": []}                                                                 
-                                                                                                                                            
-    def save_cache(self):                                                                                                                   
-        """Save cache to disk"""                                                                                                            
-        try:                                                                                                                                
-            with open(self.cache_file, 'wb') as f:                                                                                          
-                pickle.dump(self.cache, f)                                                                                                  
-            logger.info(f"Saved {len(self.cache['queries'])} queries to cache")                                                             
-        except Exception as e:                                                                                                              
-            logger.error(f"Error saving cache: {e}")                                                                                        
-                                                                                                                                            
-    def find_in_cache(self, query, similarity_threshold=0.85):                                                                              
-        """Find similar query in cache using semantic similarity"""                                                                         
-        if not self.embedding_model_available or len(self.cache["queries"]) == 0:                                                           
-            return None                                                                                                                     
-                                                                                                                                            
-        # Embed the query                                                                                                                   
-        query_embedding = self.embed_model.encode(query, convert_to_tensor=True).cpu().numpy()                                              
-                                                                                                                                            
-        # Compare with cached embeddings                                                                                                    
-        similarities = np.array([                                                                                                           
-            np.dot(query_embedding, cached_emb) / (np.linalg.norm(query_embedding) * np.linalg.norm(cached_emb))                            
-            for cached_emb in self.cache["embeddings"]                                                                                      
-        ])                                                                                                                                  
-                                                                                                                                            
-        # Find the most similar                                                                                                             
-        max_idx = np.argmax(similarities)                                                                                                   
-        if similarities[max_idx] >= similarity_threshold:                                                                                   
-            logger.info(f"Cache hit with similarity {similarities[max_idx]:.4f} for query: {query}")                                        
-            return self.cache["summaries"][max_idx]                                                                                         
-                                                                                                                                            
-        return None                                                                                                                         
-                                                                                                                                            
+            logger.error(f"BiChatbot warm-up failed: {e}")
+        finally:
+            # Ready even on failure: callers check the *_available flags
+            self.ready.set()
+            startup_timer.log_summary("BiChatbot ready")
+
+
+    def load_cache(self):
+        """Open the semantic cache index, importing the legacy pickle cache once"""
+        dim = 384
+        if self.embedding_model_available:
+            dim = self.inference.embedding_dimension() or dim
+
+        ttl = os.getenv("SEMANTIC_CACHE_TTL")
+        self.cache = SemanticCache(
+            self.cache_dir,
+            dim,
+            capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", 20000)),
+            ttl=float(ttl) if ttl else None,
+            n_lists=int(os.getenv("SEMANTIC_CACHE_IVF_LISTS", 0)),
+            nprobe=int(os.getenv("SEMANTIC_CACHE_IVF_PROBES", 8)),
+        )
+        self.unsaved_entries = 0
+
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'rb') as f:
+                legacy = pickle.load(f)
+            if legacy["embeddings"] and len(legacy["embeddings"][0]) == dim:
+                self.cache.add_many(legacy["queries"], legacy["embeddings"], legacy["summaries"])
+                self.cache.flush()
+                logger.info(f"Imported {len(legacy['queries'])} queries from the legacy cache")
+            self.cache_file.rename(self.cache_file.with_suffix(".pkl.migrated"))
+        except Exception as e:
+            logger.error(f"Error importing legacy cache: {e}")
+
+    def save_cache(self):
+        """Save cache to disk"""
+        try:
+            self.cache.flush()
+            self.unsaved_entries = 0
+            logger.info(f"Saved {len(self.cache)} queries to cache")
+        except Exception as e:
+            logger.error(f"Error saving cache: {e}")
+
+    def embed_query(self, query):
+        """Embed a query as a unit-length float32 vector"""
+        return self.inference.encode(query)
+
+    def find_in_cache(self, query, similarity_threshold=0.85):
+        """Find similar query in cache using semantic similarity"""
+        if not self.is_ready or not self.embedding_model_available or len(self.cache) == 0:
+            return None
+
+        hit = self.cache.lookup(self.embed_query(query), similarity_threshold)
+        if hit is None:
+            return None
+
+        similarity, _, summary = hit
+        logger.info(f"Cache hit with similarity {similarity:.4f} for query: {query}")
+        return summary
+
     # Add this method to the BiChatbot class or modify the existing one                                                                     
     def add_to_cache(self, query, summary):                                                                                                 
         """Add a query and its summary to cache with validation"""
@@ -174,24 +242,19 @@ class BiChatbot:
             logger.warning(f"Not caching response with low information content: '{summary}'")                                               
             return                                                                                                                          
                                                                                                                                             
-        if not self.embedding_model_available:                                                                                              
+        if not self.is_ready or not self.embedding_model_available:
             return                                                                                                                          
                                                                                                                                             
-        # Embed the query                                                                                                                   
-        query_embedding = self.embed_model.encode(query, convert_to_tensor=True).cpu().numpy()                                              
-                                                                                                                                            
-        # Add to cache                                                                                                                      
-        self.cache["queries"].append(query)                                                                                                 
-        self.cache["embeddings"].append(query_embedding)                                                                                    
-        self.cache["summaries"].append(summary)                                                                                             
-                                                                                                                                            
-        # Save cache periodically (every 10 new entries)                                                                                    
-        if len(self.cache["queries"]) % 10 == 0:                                                                                            
-            self.save_cache()                                                                                                               
+        self.cache.add(query, self.embed_query(query), summary)
+
+        # Save cache periodically (every 10 new entries)
+        self.unsaved_entries += 1
+        if self.unsaved_entries >= 10:
+            self.save_cache()
                                                                                                                                             
     def local_summarize(self, query, max_length=150):
         """Generate summary using local model"""                                                                                            
-        if not self.local_model_available:                                                                                                  
+        if not self.is_ready or not self.local_model_available:
             return None                                                                                                                     
                                                                                                                                             
         try:                                                                                                                                
@@ -202,20 +265,13 @@ class BiChatbot:
             # Log the exact input being sent to the model                                                                                   
             logger.info(f"Sending to T5 model: '{input_text}'")                                                                             
                                                                                                                                             
-            inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True).to(self.device)                       
-                                                                                                                                            
-            # Generate summary with more diverse parameters                                                                                 
-            with torch.no_grad():                                                                                                           
-                output = self.model.generate(                                                                                               
-                    inputs.input_ids,                                                                                                       
-                    max_length=max_length,                                                                                                  
-                    num_beams=4,        # Increased from 2                                                                                  
-                    temperature=0.7,    # Added temperature for diversity                                                                   
-                    no_repeat_ngram_size=2,  # Prevent repetition                                                                           
-                    early_stopping=True                                                                                                     
-                )                                                                                                                           
-                                                                                                                                            
-            summary = self.tokenizer.decode(output[0], skip_special_tokens=True)                                                            
+            # Batched with any concurrent requests by the inference worker
+            summary = self.inference.summarize(
+                input_text,
+                max_length=max_length,
+                num_beams=4,
+                no_repeat_ngram_size=2  # Prevent repetition
+            )
                                                                                                                                             
             # Validate the summary                                                                                                          
             if summary in query or len(summary) < 30:                                                                                       
@@ -296,6 +352,9 @@ class BiChatbot:
                                                                                                                                             
     def process_query(self, query):                                                                                                         
         """Process a business intelligence query using the optimal approach"""                                                              
+        # Lazy mode: the first query triggers model loading in the background
+        self.start_warm_up()
+
         # FOR NOW: Skip local model and cache due to quality issues                                                                         
         logger.info("Temporarily bypassing local model and cache due to quality issues")                                                    
                                                                                                                                             
@@ -311,11 +370,17 @@ class BiChatbot:
                                                                                                                                             
 # Create a singleton instance                                                                                                               
 bi_chatbot = BiChatbot()                                                                                                                    
+
+# "background" loads the models right away without blocking the import,
+# "lazy" defers loading until the first AI insight query
+if os.getenv("BI_CHATBOT_WARM_UP", "background") == "background":
+    bi_chatbot.start_warm_up()
                                                                                                                                             
 class ActionAIInsight(Action):                                                                                                              
     def name(self) -> Text:                                                                                                                 
         return "action_ai_insight"                                                                                                          
                                                                                                                                             
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,                                                                                   
                   tracker: Tracker,                                                                                                         
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:                                                                        
@@ -360,7 +425,8 @@ class ActionAIInsight(Action):
         try:
             # Process the enriched query
             logger.info(f"Sending enriched query to AI: {enriched_query}")
-            response = bi_chatbot.process_query(enriched_query)
+            # Run off the event loop so concurrent conversations can share model batches
+            response = await sync_to_async(bi_chatbot.process_query, thread_sensitive=False)(enriched_query)
 
             # Final formatting of response for better presentation
             if response:
@@ -390,6 +456,7 @@ class ActionCheckAuthorization(Action):
     def name(self) -> Text:
         return "action_check_authorization"
 
+    @db.timed
     async def run(
         self,
         dispatcher: CollectingDispatcher,
@@ -416,6 +483,7 @@ class ActionGetPersonalizedData(Action):
     def name(self) -> Text:
         return "action_get_personalized_data"
 
+    @db.timed
     async def run(
         self,
         dispatcher: CollectingDispatcher,
@@ -560,359 +628,11 @@ class ActionParsePeriod(Action):
 
     def _parse_date(self, date_str: str) -> datetime:
         """Parse a date string in various formats"""
-        formats = [
-            "%Y-%m-%d",      # 2023-01-01
-            "%d/%m/%Y",      # 01/01/2023
-            "%m/%d/%Y",      # 01/01/2023
-            "%d-%m-%Y",      # 01-01-2023
-            "%B %d, %Y",     # January 01, 2023
-            "%b %d, %Y",     # Jan 01, 2023
-        ]
-
-        for date_format in formats:
-            try:
-                return datetime.strptime(date_str, date_format)
-            except ValueError:
-                continue
-
-        raise ValueError(f"Unable to parse date: '{date_str}'")
+        return datetime.combine(periods.parse_date(date_str.lower().strip()), datetime.min.time())
 
     def _parse_time_period(self, period: str) -> tuple:
-        logging.info(f"Attempting to parse time period: '{period}'")
-        now = datetime.now()
-
-        period = period.lower().strip()
-
-        # Comprehensive cross-period parsing patterns
-        cross_period_patterns = [
-            # Flexible month-to-month range parsing (handles incomplete inputs)
-            r'^([a-z]+)\s*(\d{4})\s*(?:to|and)?\s*([a-z]+)?\s*(\d{4})?$',
-        
-            # Quarter to Quarter variations
-            r'^(q[1-4])\s*(\d{4})\s*(?:to|and)?\s*(q[1-4])?\s*(\d{4})?$'
-        ]
-
-        # Month and quarter name to number mapping
-        month_names = {
-            'jan': 1, 'january': 1, 'feb': 2, 'february': 2,
-            'mar': 3, 'march': 3, 'apr': 4, 'april': 4, 
-            'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
-            'aug': 8, 'august': 8, 'sep': 9, 'september': 9,
-            'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
-            'dec': 12, 'december': 12
-        }
-    
-        quarter_start_months = {'q1': 1, 'q2': 4, 'q3': 7, 'q4': 10}
-
-        # First, try cross-period parsing
-        for pattern in cross_period_patterns:
-            match = re.match(pattern, period)
-            if match:
-                groups = list(match.groups())
-            
-                # Handle partial inputs by filling in missing information
-                if groups[2] is None:
-                    groups[2] = groups[0]  # Use first month if second is missing
-                if groups[3] is None:
-                    groups[3] = groups[1]  # Use first year if second is missing
-
-                start_month = month_names.get(groups[0]) if not groups[0].startswith('q') else quarter_start_months[groups[0]]
-                end_month = month_names.get(groups[2]) if not groups[2].startswith('q') else quarter_start_months[groups[2]] + 2
-                start_year = int(groups[1])
-                end_year = int(groups[3])
-
-                # Validate and process month/quarter ranges
-                if not start_month or not end_month:
-                    continue
-
-                # Adjust end month if it exceeds 12
-                end_month = min(end_month, 12)
-
-                # Create dates
-                start_date = datetime(start_year, start_month, 1)
-                end_date = datetime(end_year, end_month, 1) + relativedelta(months=1) - timedelta(days=1)
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-
-                return start_date, end_date
-
-        # Handle the case where period might already be in "start|end" format
-        if '|' in period:
-            parts = period.split('|')
-            if len(parts) == 2:
-                try:
-                    start_date = datetime.strptime(parts[0], "%Y-%m-%d")
-                    end_date = datetime.strptime(parts[1], "%Y-%m-%d")
-                    # Ensure end_date is end of day
-                    end_date = end_date.replace(hour=23, minute=59, second=59)
-                    return start_date, end_date
-                except ValueError:
-                    pass
-
-        # Check for date range pattern first (e.g., "2025-01-01 to 2025-02-28")
-        date_range_patterns = [
-            r'^(\d{4}-\d{1,2}-\d{1,2})\s+to\s+(\d{4}-\d{1,2}-\d{1,2})$',
-            r'^(\d{4}-\d{1,2}-\d{1,2})\s*\|\s*(\d{4}-\d{1,2}-\d{1,2})$',
-            r'^(\d{4}-\d{1,2}-\d{1,2})\s*-\s*(\d{4}-\d{1,2}-\d{1,2})$',
-            r'^from\s+(\d{4}-\d{1,2}-\d{1,2})\s+to\s+(\d{4}-\d{1,2}-\d{1,2})$',
-            r'^between\s+(\d{4}-\d{1,2}-\d{1,2})\s+and\s+(\d{4}-\d{1,2}-\d{1,2})$',
-        ]
-
-        for pattern in date_range_patterns:
-            match = re.match(pattern, period)
-            if match:
-                try:
-                    # Ensure consistent date format by padding single-digit months and days
-                    start_date_str = self._normalize_date_string(match.group(1))
-                    end_date_str = self._normalize_date_string(match.group(2))
-
-                    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-                    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-
-                    # Ensure end_date is end of day
-                    end_date = end_date.replace(hour=23, minute=59, second=59)
-
-                    return start_date, end_date
-                except ValueError as e:
-                    logging.error(f"Date parsing error in range: {str(e)}")
-                    continue
-
-        # Pre-defined period mappings
-        period_mappings = {
-            'last month': ((now.replace(day=1) - timedelta(days=1)).replace(day=1),
-                          now.replace(day=1) - timedelta(days=1)),
-            'this month': (now.replace(day=1), now),
-            'last year': (now.replace(month=1, day=1, year=now.year - 1),
-                         now.replace(month=12, day=31, year=now.year - 1)),
-            'this year': (now.replace(month=1, day=1), now),
-            'last quarter': (self._get_last_quarter_start(now),
-                            self._get_current_quarter_start(now) - timedelta(days=1)),
-            'this quarter': (self._get_current_quarter_start(now), now),
-            # Week handling
-            'last week': (now - timedelta(days=now.weekday() + 7),
-                         now - timedelta(days=now.weekday() + 1)),
-            'this week': (now - timedelta(days=now.weekday()),
-                         now),
-            'yesterday': (now - timedelta(days=1),
-                         now - timedelta(days=1)),
-            'today': (now, now),
-            # For just "last", default to last week
-            'last': (now - timedelta(days=now.weekday() + 7),
-                    now - timedelta(days=now.weekday() + 1)),
-        }
-
-        if period in period_mappings:
-            return period_mappings[period]
-
-        # Handle single date (treat as full day)
-        try:
-            single_date = self._parse_date(period)
-            return single_date.replace(hour=0, minute=0, second=0), single_date.replace(hour=23, minute=59, second=59)
-        except ValueError:
-            pass
-
-        # Handle relative time periods with regex (e.g., "last 3 weeks", "past 6 months")
-        relative_pattern = r'^(last|past|previous)\s+(\d+)\s+(day|days|week|weeks|month|months|year|years)$'
-        match = re.match(relative_pattern, period)
-        if match:
-            quantity = int(match.group(2))
-            unit = match.group(3).rstrip('s')  # Remove plural 's' if present
-
-            if unit == 'day':
-                end_date = now
-                start_date = now - timedelta(days=quantity)
-            elif unit == 'week':
-                # End of current week
-                end_date = now
-                # Start n weeks ago
-                start_date = now - timedelta(weeks=quantity)
-            elif unit == 'month':
-                end_date = now
-                start_date = now - relativedelta(months=quantity)
-            elif unit == 'year':
-                end_date = now
-                start_date = now - relativedelta(years=quantity)
-            else:
-                raise ValueError(f"Unrecognized time unit: {unit}")
-
-            return start_date, end_date
-
-        # Multi-quarter and multi-year range handling
-        multi_quarter_pattern = r'^(q[1-4])\s*(\d{4})\s*(?:to|and)\s*(q[1-4])\s*(\d{4})$'
-        match = re.match(multi_quarter_pattern, period)
-        if match:
-            start_quarter, start_year, end_quarter, end_year = match.groups()
-    
-            # Convert to lowercase for consistent processing
-            start_quarter = start_quarter.lower()
-            end_quarter = end_quarter.lower()
-    
-            quarter_start_months = {'q1': 1, 'q2': 4, 'q3': 7, 'q4': 10}
-            quarter_end_months = {'q1': 3, 'q2': 6, 'q3': 9, 'q4': 12}
-    
-            start_year = int(start_year)
-            end_year = int(end_year)
-    
-            # Calculate start date (first day of the first month of the start quarter)
-            start_date = datetime(start_year, quarter_start_months[start_quarter], 1)
-    
-            # Calculate end date (last day of the last month of the end quarter)
-            end_month = quarter_end_months[end_quarter]
-    
-            # Ensure the end date is the last day of the last month of the quarter
-            end_date = datetime(end_year, end_month, 1) + relativedelta(months=1) - timedelta(days=1)
-            end_date = end_date.replace(hour=23, minute=59, second=59)
-    
-            return start_date, end_date
-
-        flexible_quarter_pattern = r'^(?:from\s+)?(q[1-4])[\s-]*(\d{4})[\s-]*(?:to|through|till|until|and)[\s-]*(q[1-4])[\s-]*(\d{4})$'
-        match = re.match(flexible_quarter_pattern, period, re.IGNORECASE)
-        if match:
-            start_quarter, start_year, end_quarter, end_year = match.groups()
-    
-            # Convert to lowercase for consistent processing
-            start_quarter = start_quarter.lower()
-            end_quarter = end_quarter.lower()
-    
-            quarter_start_months = {'q1': 1, 'q2': 4, 'q3': 7, 'q4': 10}
-            quarter_end_months = {'q1': 3, 'q2': 6, 'q3': 9, 'q4': 12}
-    
-            start_year = int(start_year)
-            end_year = int(end_year)
-    
-            # Calculate start date (first day of the first month of the start quarter)
-            start_date = datetime(start_year, quarter_start_months[start_quarter], 1)
-    
-            # Calculate end date (last day of the last month of the end quarter)
-            end_month = quarter_end_months[end_quarter]
-    
-            # Ensure the end date is the last day of the last month of the quarter
-            end_date = datetime(end_year, end_month, 1) + relativedelta(months=1) - timedelta(days=1)
-            end_date = end_date.replace(hour=23, minute=59, second=59)
-    
-            logging.info(f"Parsed quarter range: {start_quarter} {start_year} to {end_quarter} {end_year}")
-            logging.info(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-    
-            return start_date, end_date
-
-        # Enhanced month name range parsing
-        month_range_pattern = r'^([a-z]+)\s+(\d{4})\s*(?:to|and)\s*([a-z]+)\s+(\d{4})$'
-        match = re.match(month_range_pattern, period)
-        if match:
-            start_month_name, start_year, end_month_name, end_year = match.groups()
-        
-            month_names = {
-                'jan': 1, 'january': 1,
-                'feb': 2, 'february': 2,
-                'mar': 3, 'march': 3,
-                'apr': 4, 'april': 4,
-                'may': 5,
-                'jun': 6, 'june': 6,
-                'jul': 7, 'july': 7,
-                'aug': 8, 'august': 8,
-                'sep': 9, 'september': 9,
-                'oct': 10, 'october': 10,
-                'nov': 11, 'november': 11,
-                'dec': 12, 'december': 12
-            }
-        
-            start_month = month_names.get(start_month_name)
-            end_month = month_names.get(end_month_name)
-        
-            if not start_month or not end_month:
-                logging.error(f"Invalid month name in period: {period}")
-                # Fall through to existing parsing methods
-            else:
-                start_date = datetime(int(start_year), start_month, 1)
-                end_date = datetime(int(end_year), end_month, 1) + relativedelta(months=1) - timedelta(days=1)
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-            
-                return start_date, end_date
-
-        # Handle quarters with regex pattern matching (e.g., "Q1 2024", "q3 2024", "Q4-2023")
-        quarter_pattern = r'^q([1-4])[\s-]*(\d{4})$'
-        match = re.match(quarter_pattern, period)
-        if match:
-            quarter = int(match.group(1))
-            year = int(match.group(2))
-
-            # Validate quarter number
-            if not 1 <= quarter <= 4:
-                raise ValueError(f"Invalid quarter number: {quarter}. Must be between 1 and 4.")
-
-            start_date = datetime(year, 3 * quarter - 2, 1)
-            end_date = start_date + relativedelta(months=3) - timedelta(days=1)
-            # Ensure end_date is end of day
-            end_date = end_date.replace(hour=23, minute=59, second=59)
-            return start_date, end_date
-
-        # Add month name and year range parsing
-        month_range_pattern = r'^([a-zA-Z]+)\s+(\d{4})\s*(?:to|and)\s*([a-zA-Z]+)\s+(\d{4})$'
-        match = re.match(month_range_pattern, period, re.IGNORECASE)
-        if match:
-            start_month_name, start_year, end_month_name, end_year = match.groups()
-
-            # Dictionary of month names to numbers
-            month_names = {
-                'jan': 1, 'january': 1,
-                'feb': 2, 'february': 2,
-                'mar': 3, 'march': 3,
-                'apr': 4, 'april': 4,
-                'may': 5,
-                'jun': 6, 'june': 6,
-                'jul': 7, 'july': 7,
-                'aug': 8, 'august': 8,
-                'sep': 9, 'september': 9,
-                'oct': 10, 'october': 10,
-                'nov': 11, 'november': 11,
-                'dec': 12, 'december': 12
-            }
-
-            # Convert month names to numbers
-            start_month = month_names.get(start_month_name.lower())
-            end_month = month_names.get(end_month_name.lower())
-
-            if not start_month or not end_month:
-                raise ValueError(f"Invalid month name in period: {period}")
-
-            # Create start and end dates
-            start_date = datetime(int(start_year), start_month, 1)
-
-            # For the end date, use the last day of the end month
-            end_date = datetime(int(end_year), end_month, 1) + relativedelta(months=1) - timedelta(days=1)
-
-            # Set time to end of day
-            end_date = end_date.replace(hour=23, minute=59, second=59)
-
-            return start_date, end_date
-
-        # Handle specific years (e.g., "2023")
-        if period.isdigit() and len(period) == 4:
-            year = int(period)
-
-            # Validate year is reasonable (between 2000 and current year + 10)
-            current_year = now.year
-            if not 2000 <= year <= current_year + 10:
-                raise ValueError(f"Year {year} is outside the reasonable range (2000-{current_year+10}).")
-
-            return datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59)
-
-        # Handle month-year formats (e.g., "Jan 2024", "January 2024")
-        try:
-            date_obj = datetime.strptime(period, "%b %Y")
-            return (date_obj.replace(day=1),
-                   (date_obj.replace(day=1) + relativedelta(months=1) - timedelta(days=1, seconds=1)))
-        except ValueError:
-            pass
-
-        try:
-            date_obj = datetime.strptime(period, "%B %Y")
-            return (date_obj.replace(day=1),
-                   (date_obj.replace(day=1) + relativedelta(months=1) - timedelta(days=1, seconds=1)))
-        except ValueError:
-            pass
-
-        # If we reach here, we couldn't parse the period
-        raise ValueError(f"Unable to parse time period: '{period}'. Please use formats like '2025-02-06 to 2025-03-08', 'Q1 2024', 'last month', or 'last week'.")
+        """``(start, end)`` datetimes for a period phrase; see ``periods.parse_period``."""
+        return periods.parse_period(period)
 
     def _normalize_date_string(self, date_str):
         """Ensure date string is in YYYY-MM-DD format with padded months and days"""
@@ -922,14 +642,6 @@ class ActionParsePeriod(Action):
             return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
         return date_str
 
-    def _get_last_quarter_start(self, current_date):
-        current_quarter_start = self._get_current_quarter_start(current_date)
-        return current_quarter_start - relativedelta(months=3)
-
-    def _get_current_quarter_start(self, current_date):
-        quarter_month = 3 * ((current_date.month - 1) // 3) + 1
-        return current_date.replace(month=quarter_month, day=1)
-
 class FinancialReportForm(Action):
     def name(self) -> Text:
         return "financial_report_form"
@@ -1027,6 +739,7 @@ class ActionGenerateFinancialReport(Action):
         logging.info("[DEBUG] Report type defaulting to: summary")
         return "summary"
     
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -1080,133 +793,47 @@ class ActionGenerateFinancialReport(Action):
             # Define synchronous functions for database operations
             logging.info("[DEBUG] Setting up database query functions")
             
-            @sync_to_async
+            @db.unit
             def get_total_revenue():
-                logging.info("[DEBUG] Executing get_total_revenue query")
-                try:
-                    result = TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='income'
-                    ).aggregate(total=Sum('amount'))['total'] or 0
-                    logging.info(f"[DEBUG] get_total_revenue result: {result}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_total_revenue: {str(e)}", exc_info=True)
-                    raise
+                return metrics.period_totals(start_date, end_date, 'income')['total']
             
-            @sync_to_async
+            @db.unit
             def get_total_expenses():
-                logging.info("[DEBUG] Executing get_total_expenses query")
-                try:
-                    result = TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='expense'
-                    ).aggregate(total=Sum('amount'))['total'] or 0
-                    logging.info(f"[DEBUG] get_total_expenses result: {result}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_total_expenses: {str(e)}", exc_info=True)
-                    raise
+                return metrics.period_totals(start_date, end_date, 'expense')['total']
             
-            @sync_to_async
+            @db.unit
             def get_revenue_by_category():
-                logging.info("[DEBUG] Executing get_revenue_by_category query")
-                try:
-                    result = list(TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='income'
-                    ).values('category').annotate(
-                        total=Sum('amount')
-                    ).order_by('-total'))
-                    logging.info(f"[DEBUG] get_revenue_by_category result count: {len(result)}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_revenue_by_category: {str(e)}", exc_info=True)
-                    raise
+                return metrics.amount_by_category(start_date, end_date, 'income')
             
-            @sync_to_async
+            @db.unit
             def get_expenses_by_category():
-                logging.info("[DEBUG] Executing get_expenses_by_category query")
-                try:
-                    result = list(TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='expense'
-                    ).values('category').annotate(
-                        total=Sum('amount')
-                    ).order_by('-total'))
-                    logging.info(f"[DEBUG] get_expenses_by_category result count: {len(result)}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_expenses_by_category: {str(e)}", exc_info=True)
-                    raise
+                return metrics.amount_by_category(start_date, end_date, 'expense')
             
-            @sync_to_async
+            @db.unit
             def get_monthly_revenue_trend():
-                logging.info("[DEBUG] Executing get_monthly_revenue_trend query")
-                try:
-                    result = list(TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='income'
-                    ).annotate(
-                        month=TruncMonth('date')
-                    ).values('month').annotate(
-                        total=Sum('amount')
-                    ).order_by('month'))
-                    logging.info(f"[DEBUG] get_monthly_revenue_trend result count: {len(result)}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_monthly_revenue_trend: {str(e)}", exc_info=True)
-                    raise
+                return metrics.amount_trend(start_date, end_date, 'income', granularity='month')
             
-            @sync_to_async
+            @db.unit
             def get_monthly_expense_trend():
-                logging.info("[DEBUG] Executing get_monthly_expense_trend query")
-                try:
-                    result = list(TransactionsTransaction.objects.filter(
-                        date__range=[start_date, end_date],
-                        transaction_type='expense'
-                    ).annotate(
-                        month=TruncMonth('date')
-                    ).values('month').annotate(
-                        total=Sum('amount')
-                    ).order_by('month'))
-                    logging.info(f"[DEBUG] get_monthly_expense_trend result count: {len(result)}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_monthly_expense_trend: {str(e)}", exc_info=True)
-                    raise
+                return metrics.amount_trend(start_date, end_date, 'expense', granularity='month')
             
-            @sync_to_async
+            @db.unit
             def get_previous_period_data():
-                logging.info("[DEBUG] Executing get_previous_period_data")
-                try:
-                    # Calculate the same duration for the previous period
-                    period_duration = (end_date - start_date).days
-                    prev_end_date = start_date - timedelta(days=1)
-                    prev_start_date = prev_end_date - timedelta(days=period_duration)
-                    
-                    logging.info(f"[DEBUG] Previous period: {prev_start_date.date()} to {prev_end_date.date()}")
-                    
-                    prev_revenue = TransactionsTransaction.objects.filter(
-                        date__range=[prev_start_date, prev_end_date],
-                        transaction_type='income'
-                    ).aggregate(total=Sum('amount'))['total'] or 0
-                    
-                    prev_expenses = TransactionsTransaction.objects.filter(
-                        date__range=[prev_start_date, prev_end_date],
-                        transaction_type='expense'
-                    ).aggregate(total=Sum('amount'))['total'] or 0
-                    
-                    result = {
-                        'revenue': prev_revenue,
-                        'expenses': prev_expenses,
-                        'profit': prev_revenue - prev_expenses
-                    }
-                    logging.info(f"[DEBUG] get_previous_period_data result: {result}")
-                    return result
-                except Exception as e:
-                    logging.error(f"[DEBUG] Error in get_previous_period_data: {str(e)}", exc_info=True)
-                    raise
+                # Calculate the same duration for the previous period
+                period_duration = (end_date - start_date).days
+                prev_end_date = start_date - timedelta(days=1)
+                prev_start_date = prev_end_date - timedelta(days=period_duration)
+
+                logging.info(f"[DEBUG] Previous period: {prev_start_date.date()} to {prev_end_date.date()}")
+
+                prev_revenue = metrics.period_totals(prev_start_date, prev_end_date, 'income')['total']
+                prev_expenses = metrics.period_totals(prev_start_date, prev_end_date, 'expense')['total']
+
+                return {
+                    'revenue': prev_revenue,
+                    'expenses': prev_expenses,
+                    'profit': prev_revenue - prev_expenses
+                }
             
             # Determine report type
             report_type = self._determine_report_type(user_message, detail_level)
@@ -1215,13 +842,9 @@ class ActionGenerateFinancialReport(Action):
             # Execute basic queries that are common to most reports
             logging.info("[DEBUG] Starting database queries")
             try:
-                logging.info("[DEBUG] Fetching total_revenue")
-                total_revenue = await get_total_revenue()
-                logging.info(f"[DEBUG] Total revenue fetched: {total_revenue}")
-                
-                logging.info("[DEBUG] Fetching total_expenses")
-                total_expenses = await get_total_expenses()
-                logging.info(f"[DEBUG] Total expenses fetched: {total_expenses}")
+                logging.info("[DEBUG] Fetching total_revenue and total_expenses")
+                total_revenue, total_expenses = await db.gather(get_total_revenue(), get_total_expenses())
+                logging.info(f"[DEBUG] Totals fetched: revenue {total_revenue}, expenses {total_expenses}")
                 
                 # Convert to float to ensure consistent type handling
                 total_revenue = float(total_revenue)
@@ -1324,8 +947,9 @@ Total Revenue: N{total_revenue:,.2f}
                         # Add top revenue and expense categories for detailed metrics
                         logging.info("[DEBUG] Fetching revenue and expense categories")
                         try:
-                            revenue_by_category = await get_revenue_by_category()
-                            expenses_by_category = await get_expenses_by_category()
+                            revenue_by_category, expenses_by_category = await db.gather(
+                                get_revenue_by_category(), get_expenses_by_category()
+                            )
                             
                             if revenue_by_category:
                                 top_revenue_cat = revenue_by_category[0]['category'] or 'Uncategorized'
@@ -1371,10 +995,10 @@ Total Revenue: N{total_revenue:,.2f}
                     try:
                         # More granular breakdown
                         logging.info("[DEBUG] Fetching detailed data for comprehensive report")
-                        revenue_by_category = await get_revenue_by_category()
-                        expenses_by_category = await get_expenses_by_category()
-                        previous_period = await get_previous_period_data()
-                        monthly_revenue = await get_monthly_revenue_trend()
+                        revenue_by_category, expenses_by_category, previous_period, monthly_revenue = await db.gather(
+                            get_revenue_by_category(), get_expenses_by_category(),
+                            get_previous_period_data(), get_monthly_revenue_trend()
+                        )
                         
                         logging.info(f"[DEBUG] Data fetched - revenue categories: {len(revenue_by_category)}, expense categories: {len(expenses_by_category)}, monthly data points: {len(monthly_revenue)}")
                         
@@ -1517,6 +1141,7 @@ class ActionSalesAnalytics(Action):
     def name(self) -> Text:
         return "action_sales_analytics"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -1545,98 +1170,65 @@ class ActionSalesAnalytics(Action):
                 logging.info(f"Successfully parsed time period: {start_date.date()} to {end_date.date()}")
 
             # Define synchronous functions for database operations
-            @sync_to_async
-            def get_total_sales():
-                return TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).aggregate(total=Sum('amount'))['total'] or 0
-
-            @sync_to_async
-            def get_sales_count():
-                return TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).count()
-
-            @sync_to_async
+            def get_totals():
+                return metrics.period_totals(start_date, end_date, 'income')
+
             def get_sales_by_category():
-                return list(TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).values('category').annotate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                ).order_by('-total'))
-
-            @sync_to_async
+                return metrics.amount_by_category(start_date, end_date, 'income')
+
             def get_monthly_sales_trend():
-                return list(TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).annotate(
-                    month=TruncMonth('date')
-                ).values('month').annotate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                ).order_by('month'))
-
-            @sync_to_async
+                return metrics.amount_trend(start_date, end_date, 'income', granularity='month')
+
             def get_daily_sales_trend():
-                return list(TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).annotate(
-                    day=TruncDay('date')
-                ).values('day').annotate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                ).order_by('day'))
-
-            @sync_to_async
+                return metrics.amount_trend(start_date, end_date, 'income', granularity='day')
+
             def get_previous_period_data():
                 # Calculate the same duration for the previous period
                 period_duration = (end_date - start_date).days
                 prev_end_date = start_date - timedelta(days=1)
                 prev_start_date = prev_end_date - timedelta(days=period_duration)
 
-                prev_sales = TransactionsTransaction.objects.filter(
-                    date__range=[prev_start_date, prev_end_date],
-                    transaction_type='income'
-                ).aggregate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                )
+                prev_sales = metrics.period_totals(prev_start_date, prev_end_date, 'income')
 
                 return {
-                    'total': prev_sales['total'] or 0,
-                    'count': prev_sales['count'] or 0,
+                    'total': prev_sales['total'],
+                    'count': prev_sales['count'],
                     'period': f"{prev_start_date.date()} to {prev_end_date.date()}"
                 }
 
-            @sync_to_async
             def get_top_customers():
-                # Join with CoreCustomer model to get customer information
-                # Assuming you have a customer_id field in TransactionsTransaction that links to CoreCustomer
-                return list(TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                ).values('customer_id').annotate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                ).order_by('-total')[:5])
-
-            @sync_to_async
-            def get_customer_details(customer_ids):
+                top_customers = metrics.top_customers(start_date, end_date, limit=5)
                 # Get customer names from CoreCustomer model
-                return {
+                customer_ids = [c['customer_id'] for c in top_customers if c['customer_id'] is not None]
+                names = {
                     customer.id: f"{customer.first_name} {customer.last_name}"
                     for customer in CoreCustomer.objects.filter(id__in=customer_ids)
-                }
+                } if customer_ids else {}
+                return top_customers, names
+
+            # Everything the analysis type needs runs as one unit on the DB pool
+            analysis = analysis_type.lower()
+            queries = {'totals': get_totals}
+            if analysis in ['general', 'overview']:
+                queries['previous_period'] = get_previous_period_data
+            elif analysis in ['category', 'categories']:
+                queries['sales_by_category'] = get_sales_by_category
+            elif analysis in ['trend', 'trends']:
+                queries['monthly_trend'] = get_monthly_sales_trend
+                queries['daily_trend'] = get_daily_sales_trend
+            elif analysis in ['customer', 'customers']:
+                queries['top_customers'] = get_top_customers
+            else:
+                queries.update(
+                    sales_by_category=get_sales_by_category,
+                    monthly_trend=get_monthly_sales_trend,
+                    previous_period=get_previous_period_data,
+                    top_customers=get_top_customers,
+                )
+            results = await db.batch(**queries)
 
-            # Execute database queries asynchronously
-            total_sales = await get_total_sales()
-            sales_count = await get_sales_count()
+            total_sales = results['totals']['total']
+            sales_count = results['totals']['count']
             
             # Convert to float to ensure consistent type handling
             total_sales = float(total_sales)
@@ -1647,7 +1239,7 @@ class ActionSalesAnalytics(Action):
             # Generate report based on analysis type
             if analysis_type.lower() in ['general', 'overview']:
                 # Basic sales overview
-                previous_period = await get_previous_period_data()
+                previous_period = results['previous_period']
                 prev_total = float(previous_period['total'])
                 prev_count = previous_period['count']
                 
@@ -1671,7 +1263,7 @@ class ActionSalesAnalytics(Action):
                 
             elif analysis_type.lower() in ['category', 'categories']:
                 # Sales breakdown by category
-                sales_by_category = await get_sales_by_category()
+                sales_by_category = results['sales_by_category']
                 
                 report = f"""
 # Sales by Category
@@ -1695,8 +1287,8 @@ class ActionSalesAnalytics(Action):
                 
             elif analysis_type.lower() in ['trend', 'trends']:
                 # Temporal trends analysis
-                monthly_trend = await get_monthly_sales_trend()
-                daily_trend = await get_daily_sales_trend()
+                monthly_trend = results['monthly_trend']
+                daily_trend = results['daily_trend']
                 
                 # Calculate growth metrics
                 if len(monthly_trend) >= 2:
@@ -1736,13 +1328,7 @@ class ActionSalesAnalytics(Action):
                 
             elif analysis_type.lower() in ['customer', 'customers']:
                 # Customer-focused analysis
-                top_customers_data = await get_top_customers()
-                
-                # Get customer IDs for lookup
-                customer_ids = [c['customer_id'] for c in top_customers_data if c['customer_id'] is not None]
-                
-                # Get customer details if we have IDs
-                customer_details = await get_customer_details(customer_ids) if customer_ids else {}
+                top_customers_data, customer_details = results['top_customers']
                 
                 report = f"""
 # Customer Sales Analysis
@@ -1771,16 +1357,10 @@ class ActionSalesAnalytics(Action):
                 
             else:  # comprehensive
                 # Full comprehensive report
-                sales_by_category = await get_sales_by_category()
-                monthly_trend = await get_monthly_sales_trend()
-                previous_period = await get_previous_period_data()
-                top_customers_data = await get_top_customers()
-                
-                # Get customer IDs for lookup
-                customer_ids = [c['customer_id'] for c in top_customers_data if c['customer_id'] is not None]
-                
-                # Get customer details if we have IDs
-                customer_details = await get_customer_details(customer_ids) if customer_ids else {}
+                sales_by_category = results['sales_by_category']
+                monthly_trend = results['monthly_trend']
+                previous_period = results['previous_period']
+                top_customers_data, customer_details = results['top_customers']
                 
                 # Calculate metrics
                 prev_total = float(previous_period['total'])
@@ -1906,6 +1486,7 @@ class ActionSalesByCategory(Action):
     def name(self) -> Text:
         return "action_sales_by_category"
 
+    @db.timed
     async def run(self, 
                   dispatcher: CollectingDispatcher, 
                   tracker: Tracker, 
@@ -1937,7 +1518,7 @@ class ActionSalesByCategory(Action):
             start_date, end_date = action_parser._parse_time_period(time_period)
 
             # Define synchronous database query
-            @sync_to_async
+            @db.unit
             def get_sales_by_category():
                 """
                 Retrieve and aggregate sales data by category.
@@ -2028,6 +1609,7 @@ class ActionSalesTrend(Action):
     def name(self) -> Text:                                                                                                                 
         return "action_sales_trend"                                                                                                         
                                                                                                                                             
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,                                                                                   
             tracker: Tracker,                                                                                                               
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:                                                                              
@@ -2057,58 +1639,36 @@ class ActionSalesTrend(Action):
                 logging.info(f"Successfully parsed time period: {start_date.date()} to {end_date.date()}")                                  
                                                                                                                                             
             # Define synchronous function for database operations                                                                           
-            @sync_to_async                                                                                                                  
-            def get_sales_trend():                                                                                                          
-                # Base query for sales trend using TransactionsTransaction                                                                                       
-                queryset = TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                )
-                                                                                                                                            
-                # Apply category filter if provided                                                                                        
-                if product_category:                                                                                                        
-                    # Filter by product category using the related models
-                    queryset = queryset.filter(
-                        order__coreorderitem__product__category__name__icontains=product_category
-                    ).distinct()
-                                                                                                                                            
-                # Aggregate sales data by month with product details                                                                                             
-                monthly_trend = list(queryset.annotate(                                                                                     
-                    month=TruncMonth('date')
-                ).values('month').annotate(                                                                                                 
-                    total_sales=Sum('amount'),
-                    transaction_count=Count('id'),
-                    avg_transaction=Avg('amount')
-                ).order_by('month'))                                                                                                        
-                                                                                                                                            
-                # Detailed product-level insights
-                product_insights = queryset.values(
-                    'order__coreorderitem__product__name',
-                    'order__coreorderitem__product__category__name'
-                ).annotate(
-                    product_total_sales=Sum('amount'),
-                    product_transaction_count=Count('id', distinct=True)
-                ).order_by('-product_total_sales')
-                                                                                                                                            
-                # Calculate overall trend metrics                                                                                           
-                total_sales = sum(month['total_sales'] or 0 for month in monthly_trend)                                                                
-                total_transactions = sum(month['transaction_count'] for month in monthly_trend)                                                         
-                                                                                                                                            
-                # Calculate growth rates                                                                                                    
-                growth_rates = []                                                                                                           
-                for i in range(1, len(monthly_trend)):                                                                                      
+            @db.unit                                                                                                                  
+            def get_sales_trend():
+                # Monthly trend and product breakdown, optionally limited to a product category
+                trend = metrics.category_sales_trend(start_date, end_date, product_category)
+                monthly_trend = [{
+                    'month': month['month'],
+                    'total_sales': month['total'],
+                    'transaction_count': month['count'],
+                    'avg_transaction': month['total'] / month['count'] if month['count'] else 0
+                } for month in trend['monthly']]
+
+                # Calculate overall trend metrics
+                total_sales = sum(month['total_sales'] or 0 for month in monthly_trend)
+                total_transactions = sum(month['transaction_count'] for month in monthly_trend)
+
+                # Calculate growth rates
+                growth_rates = []
+                for i in range(1, len(monthly_trend)):
                     prev_month_sales = float(monthly_trend[i-1]['total_sales'] or 0)
                     curr_month_sales = float(monthly_trend[i]['total_sales'] or 0)
-                    growth_rate = ((curr_month_sales - prev_month_sales) / prev_month_sales * 100) if prev_month_sales > 0 else 0                                   
-                    growth_rates.append(growth_rate)                                                                                        
-                                                                                                                                            
-                return {                                                                                                                    
-                    'monthly_trend': monthly_trend,                                                                                         
-                    'total_sales': total_sales,                                                                                             
-                    'total_transactions': total_transactions,                                                                               
+                    growth_rate = ((curr_month_sales - prev_month_sales) / prev_month_sales * 100) if prev_month_sales > 0 else 0
+                    growth_rates.append(growth_rate)
+
+                return {
+                    'monthly_trend': monthly_trend,
+                    'total_sales': total_sales,
+                    'total_transactions': total_transactions,
                     'growth_rates': growth_rates,
-                    'product_insights': list(product_insights)                                                                                            
-                }                                                                                                                           
+                    'product_insights': trend['products']
+                }
                                                                                                                                             
             # Execute the query
             trend_data = await get_sales_trend()
@@ -2205,183 +1765,24 @@ class ActionCustomerAnalytics(Action):
     def name(self) -> Text:
         return "action_customer_analytics"
 
+    @db.timed
     async def run(self,
                   dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        @sync_to_async
+        @db.unit
         def perform_advanced_customer_analysis():
             try:
-                # Configurable analysis parameters
                 current_year = datetime.now().year
                 start_date = datetime(current_year, 1, 1)
                 end_date = datetime.now()
 
-                # Base transaction query
-                transaction_query = TransactionsTransaction.objects.filter(
-                    date__range=[start_date, end_date],
-                    transaction_type='income'
-                )
-
-                def calculate_engagement_score(customer):
-                    """
-                    Advanced engagement scoring mechanism
-    
-                    Scoring Dimensions:
-                    1. Transaction Frequency (30%)
-                    2. Total Spend (40%)
-                    3. Recency of Transactions (30%)
-                    """
-                    # Normalization factors
-                    max_transactions = customer.get('max_transactions', 1)
-                    max_spend = customer.get('max_spend', Decimal('1'))
-    
-                    # Convert to Decimal for consistent calculations
-                    max_transactions = Decimal(str(max_transactions))
-                    max_spend = Decimal(str(max_spend))
-    
-                    # Individual score components
-                    frequency_score = Decimal(str((customer['transaction_count'] / max_transactions) * 100))
-                    spend_score = Decimal(str((customer['total_customer_spent'] / max_spend) * 100))
-    
-                    # Recency calculation (lower days since last transaction is better)
-                    recency_days = Decimal(str(customer.get('days_since_last_transaction', 365)))
-                    recency_score = max(Decimal('0'), Decimal('100') - (recency_days / Decimal('365') * Decimal('100')))
-
-                    # Weighted engagement score
-                    engagement_score = (
-                        (frequency_score * Decimal('0.3')) +
-                        (spend_score * Decimal('0.4')) +
-                        (recency_score * Decimal('0.3'))
-                    )
-
-                    return round(engagement_score, 2)
-
-                def advanced_customer_segmentation(customer_analytics):
-                    """
-                    Multi-dimensional customer segmentation strategy
-                    """
-                    # Calculate global normalization factors
-                    max_transactions = max(
-                        customer['transaction_count'] for customer in customer_analytics
-                    ) or 1
-                    max_spend = max(
-                        customer['total_customer_spent'] for customer in customer_analytics
-                    ) or Decimal('1')
-
-                    # Enrich customers with normalization and engagement scoring
-                    for customer in customer_analytics:
-                        customer['max_transactions'] = max_transactions
-                        customer['max_spend'] = max_spend
-                        customer['engagement_score'] = calculate_engagement_score(customer)
-
-                    # Sort customers by engagement score
-                    sorted_customers = sorted(
-                        customer_analytics, 
-                        key=lambda x: x['engagement_score'], 
-                        reverse=True
-                    )
-
-                    # Advanced segmentation definitions
-                    segment_definitions = [
-                        {
-                            'name': 'Strategic Customers',
-                            'description': 'High-value, frequent, and recent transactions',
-                            'criteria': lambda c: c['engagement_score'] > 75
-                        },
-                        {
-                            'name': 'Growth Potential',
-                            'description': 'Moderate engagement, opportunity for development',
-                            'criteria': lambda c: 50 <= c['engagement_score'] <= 75
-                        },
-                        {
-                            'name': 'Emerging Customers',
-                            'description': 'New or low-engagement customers',
-                            'criteria': lambda c: c['engagement_score'] < 50
-                        }
-                    ]
-
-                    # Segment customers based on engagement criteria
-                    segmented_results = []
-                    for segment in segment_definitions:
-                        segment_customers = [
-                            customer for customer in sorted_customers
-                            if segment['criteria'](customer)
-                        ]
-
-                        segment_total_sales = sum(
-                            customer['total_customer_spent'] for customer in segment_customers
-                        )
-
-                        segmented_results.append({
-                            'segment': segment['name'],
-                            'description': segment['description'],
-                            'customer_count': len(segment_customers),
-                            'total_segment_sales': segment_total_sales,
-                            'avg_customer_value': (
-                                segment_total_sales / len(segment_customers) 
-                                if segment_customers else Decimal('0')
-                            ),
-                            'avg_engagement_score': (
-                                sum(customer['engagement_score'] for customer in segment_customers) / len(segment_customers)
-                                if segment_customers else 0
-                            )
-                        })
-
-                    return segmented_results
-
-                def identify_new_customers(customer_analytics):
-                    """
-                    Comprehensive new customer identification
-                    """
-                    start_of_year = datetime(current_year, 1, 1).date()
-                    new_customers = [
-                        customer for customer in customer_analytics
-                        if customer['first_transaction_date'] >= start_of_year
-                    ]
-
-                    return {
-                        'total_new_customers': len(new_customers),
-                        'new_customer_details': new_customers,
-                        'new_customer_revenue': sum(
-                            customer['total_customer_spent'] for customer in new_customers
-                        )
-                    }
-
-                # Comprehensive customer analytics query
-                customer_analytics = list(transaction_query.values(
-                    'customer_id',
-                    'customer__first_name',
-                    'customer__last_name'
-                ).annotate(
-                    total_customer_spent=Coalesce(
-                        Sum('amount', output_field=DecimalField()),
-                        Value(Decimal('0')),
-                        output_field=DecimalField()
-                    ),
-                    transaction_count=Count('id'),
-                    avg_transaction=Avg('amount', output_field=DecimalField()),
-                    first_transaction_date=Min('date'),
-                    last_transaction_date=Max('date'),
-                    days_since_last_transaction=ExpressionWrapper(
-                        Cast(datetime.now().date() - F('last_transaction_date'), output_field=DurationField()) / 
-                        timedelta(days=1),
-                        output_field=FloatField()
-                    )
-                ).order_by('-total_customer_spent'))
-
-                # Comprehensive analytics compilation
-                return {
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'total_customers': len(customer_analytics),
-                    'total_sales': sum(customer['total_customer_spent'] for customer in customer_analytics),
-                    'total_transactions': transaction_query.count(),
-                    'customer_segments': advanced_customer_segmentation(customer_analytics),
-                    'new_customers': identify_new_customers(customer_analytics),
-                    'top_customers': customer_analytics[:5]
-                }
+                # Scored and segmented in one grouped query, cached for the day
+                customer_data = metrics.customer_rfm(start_date, end_date)
+                customer_data['start_date'] = start_date
+                customer_data['end_date'] = end_date
+                return customer_data
 
             except Exception as e:
                 logging.error(f"Comprehensive analytics error: {str(e)}", exc_info=True)
@@ -2454,6 +1855,7 @@ class ActionSalesForecasting(Action):
     def name(self) -> Text:
         return "action_sales_forecast"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -2482,142 +1884,82 @@ class ActionSalesForecasting(Action):
                 start_date, end_date = action_parser._parse_time_period(time_period)
                 logging.info(f"Successfully parsed time period for forecast: {start_date.date()} to {end_date.date()}")
             
-            # Define synchronous functions for database operations
-            @sync_to_async
-            def get_historical_sales(lookback_months=6):
-                # Calculate the start date for historical data
-                historical_start = start_date - timedelta(days=30 * lookback_months)
-                
-                # Get historical sales data
-                if product_name:
-                    # For specific product
-                    return list(TransactionsTransaction.objects.filter(
-                        date__range=[historical_start, start_date - timedelta(days=1)],
-                        transaction_type='income',
-                        category__icontains=product_name
-                    ).annotate(
-                        month=TruncMonth('date')
-                    ).values('month').annotate(
-                        total=Sum('amount'),
-                        count=Count('id')
-                    ).order_by('month'))
-                else:
-                    # For all products
-                    return list(TransactionsTransaction.objects.filter(
-                        date__range=[historical_start, start_date - timedelta(days=1)],
-                        transaction_type='income'
-                    ).annotate(
-                        month=TruncMonth('date')
-                    ).values('month').annotate(
-                        total=Sum('amount'),
-                        count=Count('id')
-                    ).order_by('month'))
-            
-            @sync_to_async
-            def get_seasonal_factors():
-                # Get last year's data to calculate seasonal factors
-                current_year = start_date.year
-                last_year_start = datetime(current_year-1, 1, 1)
-                last_year_end = datetime(current_year-1, 12, 31)
-                
-                # Query to get monthly sales for calculating seasonality
-                if product_name:
-                    monthly_data = TransactionsTransaction.objects.filter(
-                        date__range=[last_year_start, last_year_end],
-                        transaction_type='income',
-                        category__icontains=product_name
-                    )
-                else:
-                    monthly_data = TransactionsTransaction.objects.filter(
-                        date__range=[last_year_start, last_year_end],
-                        transaction_type='income'
-                    )
-                
-                monthly_data = monthly_data.annotate(
-                    month=ExtractMonth('date')
-                ).values('month').annotate(
-                    total=Sum('amount')
-                ).order_by('month')
-                
-                # Convert to dict for easier access
-                monthly_totals = {item['month']: float(item['total']) for item in monthly_data}
-                
-                # Calculate annual average if we have data
-                if monthly_totals:
-                    annual_avg = sum(monthly_totals.values()) / len(monthly_totals)
-                    # Calculate seasonal factors (monthly value / annual average)
-                    seasonal_factors = {month: (total / annual_avg if annual_avg > 0 else 1.0) 
-                                       for month, total in monthly_totals.items()}
-                    return seasonal_factors
-                else:
-                    # Default to no seasonality if no data
-                    return {month: 1.0 for month in range(1, 13)}
-            
-            @sync_to_async
-            def get_growth_trend(data_points):
-                if not data_points or len(data_points) < 2:
-                    return 1.0  # Default to no growth
-                
-                # Simple linear regression to estimate growth trend
-                x = list(range(len(data_points)))
-                y = [float(point['total']) for point in data_points]
-                
-                if all(val == 0 for val in y):
-                    return 1.0  # No growth if all values are zero
-                
-                # Calculate slope using numpy if available, otherwise use simple calculation
-                try:
-                    import numpy as np
-                    slope, _ = np.polyfit(x, y, 1)
-                    # Convert slope to monthly growth factor
-                    avg_y = np.mean(y)
-                    growth_factor = 1 + (slope / avg_y if avg_y > 0 else 0)
-                    return max(0.8, min(1.2, growth_factor))  # Limit growth factor to reasonable range
-                except:
-                    # Fallback to simple growth calculation if numpy not available
-                    if len(data_points) >= 2 and y[0] > 0:
-                        growth_rate = (y[-1] / y[0]) ** (1 / len(y)) - 1
-                        return 1 + growth_rate
-                    return 1.0
-            
-            # Execute database queries asynchronously
-            historical_data = await get_historical_sales()
-            seasonal_factors = await get_seasonal_factors()
-            growth_trend = await get_growth_trend(historical_data)
-            
-            # Generate forecast for requested period
-            forecast_months = []
-            forecast_period = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month) + 1
-            
-            # Get the last known sales amount
-            last_sales_amount = float(historical_data[-1]['total']) if historical_data else 0
-            if last_sales_amount == 0:
-                # Fallback if no historical data
-                last_sales_amount = 1000  # Placeholder value
-            
-            # Generate forecast for each month in the forecast period
-            current_date = start_date
-            total_forecast = 0
-            
-            for i in range(forecast_period):
-                forecast_month = current_date.month
-                seasonal_factor = seasonal_factors.get(forecast_month, 1.0)
-                
-                # Apply growth trend and seasonality
-                forecast_value = last_sales_amount * (growth_trend ** (i+1)) * seasonal_factor
-                
-                # Add to forecast months list
-                forecast_months.append({
-                    'month': current_date.strftime('%b %Y'),
-                    'forecast': forecast_value
-                })
-                
-                total_forecast += forecast_value
-                current_date = (current_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-            
-            # Generate forecast report
+            # Monthly history runs through the last complete month before the forecast starts
+            granularity = 'month'
+            first_forecast = forecasting.period_index(start_date.date(), granularity)
+            last_forecast = forecasting.period_index(end_date.date(), granularity)
+            history_end = min(first_forecast, forecasting.period_index(datetime.now().date(), granularity)) - 1
+            history_start = history_end - forecasting.HISTORY_MONTHS + 1
+            history_from = forecasting.period_start(history_start, granularity)
+            history_to = forecasting.period_start(history_end + 1, granularity) - timedelta(days=1)
+            horizon = last_forecast - history_end
+
+            def forecast_series(keys, rows_by_key):
+                if not keys:
+                    return None
+                values = np.vstack([
+                    forecasting.bucket(rows_by_key.get(key, []), granularity, history_start, history_end)
+                    for key in keys
+                ])
+                # Start at the first month with any sales, not at the lookback edge
+                active = np.flatnonzero(values.any(axis=0))
+                if not len(active):
+                    return None
+                return forecasting.forecaster.forecast_many(
+                    keys, granularity, history_start + active[0], values[:, active[0]:], horizon
+                )
+
+            @db.unit
+            def get_sales_forecast():
+                rows = metrics.sales_history(history_from, history_to, category=product_name)
+                key = f"category:{product_name.lower()}" if product_name else 'all'
+                forecasts = forecast_series([key], {key: [(row['date'], row['total']) for row in rows]})
+                return forecasts[key] if forecasts else None
+
+            @db.unit
+            def get_product_outlook(limit=5):
+                # Keyed by product id: two products may share a name
+                rows_by_key, names = {}, {}
+                for row in metrics.product_sales_history(history_from, history_to):
+                    key = f"product:{row['product_id']}"
+                    rows_by_key.setdefault(key, []).append((row['day'], row['revenue']))
+                    names[key] = row['name']
+                forecasts = forecast_series(sorted(rows_by_key), rows_by_key) or {}
+                totals = [
+                    (names[key], float(forecast.values[forecast.periods >= first_forecast].sum()))
+                    for key, forecast in forecasts.items()
+                ]
+                return sorted(totals, key=lambda item: item[1], reverse=True)[:limit]
+
+            # Every product is forecast in one batch when no product was asked for
+            if product_name:
+                forecast, product_outlook = await get_sales_forecast(), []
+            else:
+                forecast, product_outlook = await db.gather(get_sales_forecast(), get_product_outlook())
+
             product_text = f"for {product_name}" if product_name else ""
-            
+            if forecast is None:
+                history_text = f"sales history {product_text}" if product_name else "sales history"
+                dispatcher.utter_message(text=f"There isn't enough {history_text} to forecast {time_period}.")
+                return []
+
+            forecast_months = [
+                {
+                    'month': forecasting.period_start(int(period), granularity).strftime('%b %Y'),
+                    'forecast': float(value)
+                }
+                for period, value in zip(forecast.periods, forecast.values)
+                if period >= first_forecast
+            ]
+            forecast_period = len(forecast_months)
+            total_forecast = sum(month['forecast'] for month in forecast_months)
+            growth_trend = forecast.trend_rate * 100
+            method_text = {
+                forecasting.HOLT_WINTERS: "Holt-Winters exponential smoothing of level, trend and monthly seasonality",
+                forecasting.SEASONAL_TREND: "a linear trend with monthly seasonal effects",
+            }[forecast.method]
+
+            # Generate forecast report
             report = f"""
 # Sales Forecast {product_text}
 **Period: {start_date.date()} to {end_date.date()}**
@@ -2625,7 +1967,7 @@ class ActionSalesForecasting(Action):
 ## Forecast Summary
 - Total Forecasted Sales: N{total_forecast:,.2f}
 - Forecast Period: {forecast_period} month{'s' if forecast_period != 1 else ''}
-- Base Growth Trend: {(growth_trend-1)*100:.1f}% month-over-month
+- Current Trend: {growth_trend:.1f}% month-over-month
 
 ## Monthly Forecast:
 """
@@ -2634,14 +1976,19 @@ class ActionSalesForecasting(Action):
                 month_name = month_data['month']
                 forecast_amount = month_data['forecast']
                 report += f"- {month_name}: N{forecast_amount:,.2f}\n"
-            
+
+            if product_outlook:
+                report += "\n## Top Products by Forecast Revenue:\n"
+                for name, amount in product_outlook:
+                    report += f"- {name}: N{amount:,.2f}\n"
+
             # Add forecast methodology and disclaimer
             report += f"""
 ## Forecast Methodology
 This forecast is based on:
-- Historical sales data from the past 6 months
-- Seasonal patterns derived from last year's data
-- Current growth trajectory of {(growth_trend-1)*100:.1f}% month-over-month
+- Monthly sales from {history_from:%b %Y} to {history_to:%b %Y}
+- {method_text[0].upper() + method_text[1:]}
+- Current growth trajectory of {growth_trend:.1f}% month-over-month
 
 **Note:** This forecast is an estimate based on historical patterns and may vary from actual results due to market conditions, promotions, or other external factors.
 """
@@ -2658,6 +2005,7 @@ class ActionSalesComparison(Action):
     def name(self) -> Text:
         return "action_sales_comparison"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -2729,54 +2077,33 @@ class ActionSalesComparison(Action):
             logging.info(f"Period 2: {second_start_date.date()} to {second_end_date.date()}")                                               
                                                                                                                                             
             # Define synchronous functions for database operations                                                                          
-            @sync_to_async                                                                                                                  
-            def get_period_data(start_date, end_date):                                                                                      
-                # Get basic sales metrics                                                                                                   
-                sales_data = TransactionsTransaction.objects.filter(                                                                        
-                    date__range=[start_date, end_date],                                                                                     
-                    transaction_type='income'                                                                                               
-                ).aggregate(                                                                                                                
-                    total=Sum('amount'),                                                                                                    
-                    count=Count('id')                                                                                                       
-                )                                                                                                                           
-                                                                                                                                            
-                # Get category breakdown                                                                                                    
-                category_data = list(TransactionsTransaction.objects.filter(                                                                
-                    date__range=[start_date, end_date],                                                                                     
-                    transaction_type='income'                                                                                               
-                ).values('category').annotate(                                                                                              
-                    total=Sum('amount'),                                                                                                    
-                    count=Count('id')
-                ).order_by('-total'))
-
-                # Get daily sales
-                daily_data = list(TransactionsTransaction.objects.filter(                                                                   
-                    date__range=[start_date, end_date],                                                                                     
-                    transaction_type='income'                                                                                               
-                ).annotate(                                                                                                                 
-                    day=TruncDay('date')                                                                                                    
-                ).values('day').annotate(                                                                                                   
-                    total=Sum('amount'),                                                                                                    
-                    count=Count('id')                                                                                                       
-                ).order_by('day'))                                                                                                          
-                                                                                                                                            
-                # Calculate average daily sales                                                                                             
-                period_days = (end_date - start_date).days + 1  # Including both start and end dates                                        
-                daily_avg = (sales_data['total'] or 0) / period_days if period_days > 0 else 0                                              
-                                                                                                                                            
-                return {                                                                                                                    
-                    'total': sales_data['total'] or 0,                                                                                      
-                    'count': sales_data['count'] or 0,                                                                                      
-                    'avg_sale': (sales_data['total'] or 0) / (sales_data['count'] or 1) if sales_data['count'] else 0,                      
-                    'daily_avg': daily_avg,                                                                                                 
-                    'categories': category_data,                                                                                            
-                    'daily_data': daily_data,                                                                                               
-                    'period_days': period_days                                                                                              
-                }                                                                                                                           
+            @db.unit                                                                                                                  
+            def get_period_data(start_date, end_date):
+                # Totals are derived from the cached category breakdown, so a period
+                # already seen in this conversation costs no extra query
+                sales_data = metrics.period_totals(start_date, end_date, 'income')
+                category_data = metrics.amount_by_category(start_date, end_date, 'income')
+                daily_data = metrics.amount_trend(start_date, end_date, 'income', granularity='day')
+
+                # Calculate average daily sales
+                period_days = (end_date - start_date).days + 1  # Including both start and end dates
+                daily_avg = sales_data['total'] / period_days if period_days > 0 else 0
+
+                return {
+                    'total': sales_data['total'],
+                    'count': sales_data['count'],
+                    'avg_sale': sales_data['total'] / sales_data['count'] if sales_data['count'] else 0,
+                    'daily_avg': daily_avg,
+                    'categories': category_data,
+                    'daily_data': daily_data,
+                    'period_days': period_days
+                }
                                                                                                                                             
             # Fetch data for both periods asynchronously                                                                                    
-            first_period_data = await get_period_data(first_start_date, first_end_date)                                                     
-            second_period_data = await get_period_data(second_start_date, second_end_date)                                                  
+            first_period_data, second_period_data = await db.gather(
+                get_period_data(first_start_date, first_end_date),
+                get_period_data(second_start_date, second_end_date)
+            )
                                                                                                                                             
             # Convert to float for consistent handling                                                                                      
             first_total = float(first_period_data['total'])                                                                                 
@@ -2947,6 +2274,7 @@ class ActionTopPerformingProducts(Action):
     def name(self) -> Text:
         return "action_top_performing_products"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -2975,164 +2303,15 @@ class ActionTopPerformingProducts(Action):
                 start_date, end_date = action_parser._parse_time_period(time_period)
                 logging.info(f"Successfully parsed time period: {start_date.date()} to {end_date.date()}")
 
-            # Define synchronous functions for database operations
-            @sync_to_async
-            def get_top_products_data(limit=10):
-                from django.db import models
-                from django.db.models import Sum, F, Q, Case, When, IntegerField, DecimalField, Value
-                from django.db.models.functions import Coalesce
-
-                # Create date range filter
-                date_filters = Q(
-                    coreorderitem__order__order_date__range=[start_date, end_date],
-                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped']  # Adjust status values as needed
-                )
-
-                # Get top products filtered by date range and calculated sales
-                top_products = ProductsProduct.objects.filter(
-                    is_active=1
-                ).annotate(
-                    period_sales=Coalesce(
-                        Sum(
-                            Case(
-                                When(
-                                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped'],
-                                    then='coreorderitem__quantity'
-                                ),
-                                default=Value(0),
-                                output_field=IntegerField(),
-                            ),
-                            filter=date_filters
-                        ),
-                        Value(0),
-                        output_field=IntegerField()
-                    ),
-                    period_revenue=Coalesce(
-                        Sum(
-                            Case(
-                                When(
-                                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped'],
-                                    then=F('coreorderitem__quantity') * F('coreorderitem__unit_price')
-                                ),
-                                default=Value(0),
-                                output_field=DecimalField(max_digits=10, decimal_places=2)
-                            ),
-                            filter=date_filters
-                        ),
-                        Value(0),
-                        output_field=DecimalField(max_digits=10, decimal_places=2)
-                    )
-                ).order_by('-period_sales')[:limit]
-
-                # Create a list of dictionaries with all needed data
-                top_products_data = []
-                for product in top_products:
-                    top_products_data.append({
-                        'name': product.name,
-                        'sales': product.period_sales,  # Use period-specific sales
-                        'price': float(product.price),
-                        'revenue': float(product.period_revenue)  # Add calculated revenue
-                    })
-
-                return top_products_data
-
-            @sync_to_async
-            def get_worst_products_data(limit=5):
-                from django.db import models
-                from django.db.models import Sum, F, Q, Case, When, IntegerField, DecimalField, Value
-                from django.db.models.functions import Coalesce
-
-                # Create date range filter
-                date_filters = Q(
-                    coreorderitem__order__order_date__range=[start_date, end_date],
-                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped']  # Adjust status values as needed
-                )
+            @db.unit
+            def get_product_sales():
+                return metrics.product_sales(start_date, end_date)
 
-                # Get worst products filtered by date range and calculated sales
-                worst_products = ProductsProduct.objects.filter(
-                    is_active=1
-                ).annotate(
-                    period_sales=Coalesce(
-                        Sum(
-                            Case(
-                                When(
-                                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped'],
-                                    then='coreorderitem__quantity'
-                                ),
-                                default=Value(0),
-                                output_field=IntegerField(),
-                            ),
-                            filter=date_filters
-                        ),
-                        Value(0),
-                        output_field=IntegerField()
-                    ),
-                    period_revenue=Coalesce(
-                        Sum(
-                            Case(
-                                When(
-                                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped'],
-                                    then=F('coreorderitem__quantity') * F('coreorderitem__unit_price')
-                                ),
-                                default=Value(0),
-                                output_field=DecimalField(max_digits=10, decimal_places=2)
-                            ),
-                            filter=date_filters
-                        ),
-                        Value(0),
-                        output_field=DecimalField(max_digits=10, decimal_places=2)
-                    )
-                ).order_by('period_sales')[:limit]  # Order by ascending sales for worst products
-
-                # Create a list of dictionaries with all needed data
-                worst_products_data = []
-                for product in worst_products:
-                    worst_products_data.append({
-                        'name': product.name,
-                        'sales': product.period_sales,  # Use period-specific sales
-                        'price': float(product.price),
-                        'revenue': float(product.period_revenue)  # Add calculated revenue
-                    })
-
-                return worst_products_data
-
-            @sync_to_async
-            def get_total_sales():
-                from django.db import models
-                from django.db.models import Sum, Q, Case, When, IntegerField, Value
-                from django.db.models.functions import Coalesce
-
-                # Create date range filter
-                date_filters = Q(
-                    coreorderitem__order__order_date__range=[start_date, end_date],
-                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped']
-                )
-
-                # Calculate period-specific total sales
-                return ProductsProduct.objects.filter(
-                    is_active=1
-                ).annotate(
-                    period_sales=Coalesce(
-                        Sum(
-                            Case(
-                                When(
-                                    coreorderitem__order__status__in=['completed', 'delivered', 'shipped'],
-                                    then='coreorderitem__quantity'
-                                ),
-                                default=Value(0),
-                                output_field=IntegerField(),
-                            ),
-                            filter=date_filters
-                        ),
-                        Value(0),
-                        output_field=IntegerField()
-                    )
-                ).aggregate(total_sales=Sum('period_sales'))['total_sales'] or 0
-
-            # Execute database queries asynchronously
-            top_products_data = await get_top_products_data(10)  # Top 10 products
-            worst_products_data = await get_worst_products_data(5)  # Bottom 5 products
-            total_sales_units = await get_total_sales()
+            # Top, bottom and total all come from one product_sales fetch
+            products = await get_product_sales()
+            top_products_data = metrics.top_products(products, limit=10)
+            worst_products_data = metrics.top_products(products, limit=5, worst=True)
+            total_sales_units = sum(product['sales'] for product in products)
 
             # Calculate total revenue
             total_revenue = sum(p.get('revenue', 0) for p in top_products_data + worst_products_data)
@@ -3175,6 +2354,7 @@ class ActionProductSalesQuery(Action):
     def name(self) -> Text:
         return "action_product_sales_query"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -3208,24 +2388,20 @@ class ActionProductSalesQuery(Action):
                 start_date, end_date = action_parser._parse_time_period(time_period)
                 logging.info(f"Successfully parsed time period: {start_date.date()} to {end_date.date()}")
 
-            @sync_to_async
+            @db.unit
             def get_product_data():
                 from django.db import models
                 from django.db.models import Sum, F, Q, Case, When, IntegerField, DecimalField, Value
                 from django.db.models.functions import Coalesce
                 
-                # First find the product by name (case-insensitive partial match)
-                products = ProductsProduct.objects.filter(
-                    name__icontains=product_name,
-                    is_active=1
-                )
+                # Best match for the name from the product lookup index
+                product = product_index.filter(
+                    ProductsProduct.objects.filter(is_active=1), product_name, limit=5
+                ).first()
                 
-                if not products.exists():
+                if product is None:
                     return None
                 
-                # Get the first matching product
-                product = products.first()
-                
                 # Extract category name inside the sync context
                 category_name = product.category.name if hasattr(product, 'category') and product.category else 'N/A'
                 
@@ -3334,6 +2510,7 @@ class ActionInventoryAnalysis(Action):
     def name(self) -> Text:
         return "action_inventory_analysis"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -3422,61 +2599,34 @@ class ActionInventoryAnalysis(Action):
                             break
 
         try:                
-            @sync_to_async
+            @db.unit
             def get_current_inventory_value():
-                inventory_data = ProductsProduct.objects.filter(
-                    is_active=1
-                ).aggregate(
-                    total_products=Count('id'),
-                    total_units=Sum('stock'),
-                    total_value=Sum(F('stock') * F('price'))
-                )
-                
-                return inventory_data
+                return metrics.inventory_value()
             
-            @sync_to_async
+            @db.unit
             def get_category_inventory():
-                categories = ProductsCategory.objects.filter(is_active=1)
-                result = []
-                
-                for category in categories:
-                    cat_data = ProductsProduct.objects.filter(
-                        category=category,
-                        is_active=1
-                    ).aggregate(
-                        product_count=Count('id'),
-                        total_units=Sum('stock'),
-                        total_value=Sum(F('stock') * F('price'))
-                    )
-                    
-                    result.append({
-                        'category_name': category.name,
-                        'product_count': cat_data['product_count'] or 0,
-                        'total_units': cat_data['total_units'] or 0,
-                        'total_value': float(cat_data['total_value'] or 0)
-                    })
-                
-                return result
+                return metrics.inventory_by_category()
             
-            @sync_to_async
+            @db.unit
             def get_product_inventory(prod_name=None, prod_category=None):
                 
                 query = Q(is_active=1)
                 
-                if prod_name:
-                    query &= Q(name__icontains=prod_name)
-                
                 if prod_category:
                     query &= Q(category__name__icontains=prod_category)
                 
-                products = ProductsProduct.objects.filter(query).values(
+                products = ProductsProduct.objects.filter(query)
+                if prod_name:
+                    products = product_index.filter(products, prod_name)
+                
+                products = products.values(
                     'id', 'name', 'stock', 'price', 'category__name',
                     'sales', 'modified_at'
                 )
                 
                 return list(products)
 
-            @sync_to_async
+            @db.unit
             def get_inventory_changes(period1=None, period2=None):
                 from django.db.models import Sum
                 
@@ -3803,7 +2953,7 @@ class ActionInventoryAnalysis(Action):
 
             elif "turnover" in latest_message or "performance" in latest_message or "efficiency" in latest_message:
                 # Inventory turnover and efficiency metrics
-                @sync_to_async
+                @db.unit
                 def get_inventory_turnover(period=None):
                     from django.db.models import Sum, F, ExpressionWrapper, FloatField
 
@@ -3871,7 +3021,7 @@ class ActionInventoryAnalysis(Action):
 
             elif "status" in latest_message or "report" in latest_message or "health" in latest_message or "analysis" in latest_message:
                 # General inventory status report
-                @sync_to_async
+                @db.unit
                 def get_inventory_health():
                     from django.db.models import Sum, Count, F, Case, When, IntegerField, Q
 
@@ -3971,6 +3121,7 @@ class ActionProductInventoryCheck(Action):
     def name(self) -> Text:
         return "action_product_inventory_check"
 
+    @db.timed
     async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -4022,11 +3173,11 @@ class ActionProductInventoryCheck(Action):
         logging.info(f"Checking inventory for product: {product_name}")
         
         try:
-            @sync_to_async
+            @db.unit
             def get_product_details(product_name):
-                products = list(ProductsProduct.objects.filter(
-                    name__icontains=product_name,
-                    is_active=1
+                # Name, SKU, barcode and category matches, best first
+                products = list(product_index.filter(
+                    ProductsProduct.objects.filter(is_active=1), product_name
                 ).values(
                     'id', 'name', 'description', 'stock', 'price', 'sku',
                     'category__name', 'sales', 'created_at', 'modified_at'
@@ -4034,9 +3185,7 @@ class ActionProductInventoryCheck(Action):
 
                 if not products:
                     products = list(ProductsProduct.objects.filter(
-                        Q(name__icontains=product_name) |
-                        Q(description__icontains=product_name) |
-                        Q(category__name__icontains=product_name),
+                        description__icontains=product_name,
                         is_active=1
                     ).values(
                         'id', 'name', 'description', 'stock', 'price', 'sku',
@@ -4045,8 +3194,10 @@ class ActionProductInventoryCheck(Action):
 
                 return products
 
-            @sync_to_async
+            @db.unit
             def get_total_stock_by_product_name(product_name):
+                # Totals stay on names containing the query; fuzzy matches
+                # are for picking a product, not for summing stock
                 return ProductsProduct.objects.filter(
                     name__icontains=product_name,
                     is_active=1
@@ -4167,3 +3318,5 @@ class ActionDefaultFallback(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         dispatcher.utter_message(text="I'm sorry, I didn't understand that. Can you rephrase or try asking about financial reports, sales analytics, or inventory analysis?")
         return []
+
+startup_timer.log_summary("Action module imported")
@@ -0,0 +1,154 @@
+"""
+Database execution for the async actions.
+
+``sync_to_async`` defaults to ``thread_sensitive=True``, so every query
+helper of every conversation queues for the same single thread, and an
+action that awaits eight helpers in turn pays eight thread hops in a row.
+Actions hand their database work to this module instead:
+
+* ``run(fn, *args)``, or a helper decorated with ``@unit``, runs one sync
+  unit on a bounded pool of database threads (``BOT_DB_POOL_SIZE``). Each
+  pool thread keeps its own Django connection, so the pool size also bounds
+  the connections the action server opens.
+* ``batch(name=fn, ...)`` runs several queries as one unit, in one hop,
+  and returns their results by name.
+* ``gather(*awaitables)`` runs independent units concurrently.
+* ``@timed`` on an action's ``run`` records its wall time, the time its
+  units spent on the pool and how many it ran; ``action_stats()``
+  summarises them per action.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_SIZE = int(os.getenv("BOT_DB_POOL_SIZE", 4))
+
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix='bot-db')
+_current_timing = contextvars.ContextVar('bot_action_timing', default=None)
+
+
+class ActionTiming:
+    """Wall and database time of one action run."""
+
+    def __init__(self, action):
+        self.action = action
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.units = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class ActionStats:
+    """Running totals per action name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, timing):
+        elapsed = timing.elapsed
+        with self._lock:
+            stats = self._stats.setdefault(timing.action, {'runs': 0, 'seconds': 0.0, 'db_seconds': 0.0,
+                                                           'units': 0, 'max_seconds': 0.0})
+            stats['runs'] += 1
+            stats['seconds'] += elapsed
+            stats['db_seconds'] += timing.db_seconds
+            stats['units'] += timing.units
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        return elapsed
+
+    def summary(self):
+        with self._lock:
+            return {
+                action: {
+                    'runs': stats['runs'],
+                    'avg_ms': stats['seconds'] / stats['runs'] * 1000,
+                    'max_ms': stats['max_seconds'] * 1000,
+                    'avg_db_ms': stats['db_seconds'] / stats['runs'] * 1000,
+                    'avg_units': stats['units'] / stats['runs'],
+                }
+                for action, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+action_stats_registry = ActionStats()
+
+
+def action_stats():
+    """Per action: runs, average and max wall time, average pool time and units."""
+    return action_stats_registry.summary()
+
+
+def _call(fn, args, kwargs):
+    # Pool threads outlive requests; drop connections past CONN_MAX_AGE or broken
+    close_old_connections()
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+async def run(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the database pool."""
+    loop = asyncio.get_running_loop()
+    result, seconds = await loop.run_in_executor(_executor, _call, fn, args, kwargs)
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.db_seconds += seconds
+        timing.units += 1
+    return result
+
+
+def unit(fn):
+    """Decorator: calling ``fn`` returns an awaitable that runs it on the database pool."""
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+
+def _run_batch(calls):
+    return {name: fn() for name, fn in calls.items()}
+
+
+async def batch(**calls):
+    """Run the zero-argument callables in ``calls`` as one unit; results by name."""
+    return await run(_run_batch, calls)
+
+
+async def gather(*awaitables):
+    """Await independent units concurrently; results in argument order."""
+    return await asyncio.gather(*awaitables)
+
+
+def timed(run_method):
+    """Decorator for ``Action.run``: records the run under the action's name."""
+    @wraps(run_method)
+    async def wrapper(self, *args, **kwargs):
+        timing = ActionTiming(self.name())
+        token = _current_timing.set(timing)
+        try:
+            return await run_method(self, *args, **kwargs)
+        finally:
+            _current_timing.reset(token)
+            elapsed = action_stats_registry.record(timing)
+            logger.info(
+                f"Action {timing.action} took {elapsed * 1000:.0f}ms "
+                f"({timing.units} DB units, {timing.db_seconds * 1000:.0f}ms on the pool)"
+            )
+    return wrapper
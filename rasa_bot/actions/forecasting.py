@@ -0,0 +1,462 @@
+"""
+Sales forecasting models on NumPy arrays.
+
+``ActionSalesForecasting`` used to extrapolate the last month with a naive
+growth ratio and last year's monthly factors, rebuilt from three queries on
+every message. Forecasts now come from two fitted models:
+
+* ``HoltWinters``, additive Holt-Winters exponential smoothing. The
+  smoothing parameters are picked by one-step error over a grid, and the
+  recursion is run for every grid point (and every series, when fitting in
+  batch) at once. It needs two full seasons of history.
+* ``SeasonalTrend``, a least-squares linear trend with one dummy per
+  season slot. It keeps its normal equations, so new periods are folded in
+  without refitting. With short histories it drops the dummies, then the
+  trend.
+
+Series are dense arrays of one value per period, where a period is a month
+or a week numbered by ``period_index``. Seasonal slots follow the calendar,
+so January is always the same slot whatever month a series starts in.
+
+``forecaster`` caches fitted models per ``(key, granularity)``. When a
+later call brings the same history plus new periods, the cached model is
+updated with just the new ones, and parameters are re-estimated once a
+season of updates has accumulated. ``forecast_many`` fits every series of
+a matrix in one call, and ``backtest`` reports rolling-origin accuracy and
+fit time per method.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+import numpy as np
+
+MAX_MODELS = int(os.getenv("BOT_FORECAST_MAX_MODELS", 2048))
+HISTORY_MONTHS = int(os.getenv("BOT_FORECAST_HISTORY_MONTHS", 36))
+
+# Periods per seasonal cycle
+GRANULARITIES = {'month': 12, 'week': 52}
+
+AUTO = 'auto'
+HOLT_WINTERS = 'holt_winters'
+SEASONAL_TREND = 'seasonal_trend'
+SEASONAL_NAIVE = 'seasonal_naive'
+
+# Smoothing parameters searched when fitting Holt-Winters
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.02, 0.05, 0.1, 0.2)
+GAMMAS = (0.0, 0.05, 0.1, 0.2, 0.4)
+_GRID = np.array(np.meshgrid(ALPHAS, BETAS, GAMMAS, indexing='ij')).reshape(3, -1)
+
+# Series fitted together in one Holt-Winters pass; bounds the (series, grid, season) state
+FIT_CHUNK = 256
+
+Forecast = namedtuple('Forecast', 'periods values method trend_rate')
+
+
+# Periods
+
+def period_index(day, granularity):
+    """Period number of ``day``: months since year 0, or weeks (Monday-based) since 0001-01-01."""
+    if granularity == 'month':
+        return day.year * 12 + day.month - 1
+    if granularity == 'week':
+        return (day.toordinal() - 1) // 7
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def period_start(index, granularity):
+    """First day of period ``index``."""
+    if granularity == 'month':
+        return date(index // 12, index % 12 + 1, 1)
+    if granularity == 'week':
+        return date.fromordinal(index * 7 + 1)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def bucket(rows, granularity, first, last):
+    """
+    Dense array of amounts per period from ``first`` to ``last`` (period
+    indexes, inclusive), summed from ``(day, amount)`` rows. Rows outside
+    the range are ignored.
+    """
+    size = last - first + 1
+    if size <= 0:
+        return np.zeros(0)
+    rows = list(rows)
+    indexes = np.fromiter((period_index(day, granularity) - first for day, _ in rows), dtype=np.int64, count=len(rows))
+    amounts = np.fromiter((float(amount or 0) for _, amount in rows), dtype=float, count=len(rows))
+    inside = (indexes >= 0) & (indexes < size)
+    return np.bincount(indexes[inside], weights=amounts[inside], minlength=size)
+
+
+# Models
+
+class HoltWinters:
+    """Additive Holt-Winters state after the last observed period."""
+
+    method = HOLT_WINTERS
+
+    def __init__(self, season, params, level, trend, seasonal, end):
+        self.season = season
+        self.alpha, self.beta, self.gamma = params
+        self.level = level
+        self.trend = trend
+        self.seasonal = seasonal
+        self.end = end
+
+    @property
+    def spec(self):
+        return self.method
+
+    @classmethod
+    def fit_many(cls, start, values, season):
+        """One model per row of ``values``, all starting at period ``start``."""
+        models = []
+        for offset in range(0, len(values), FIT_CHUNK):
+            models.extend(cls._fit_chunk(start, values[offset:offset + FIT_CHUNK], season))
+        return models
+
+    @classmethod
+    def _fit_chunk(cls, start, values, season):
+        n_series, n = values.shape
+        if n < 2 * season:
+            raise ValueError(f"Holt-Winters needs {2 * season} periods, got {n}")
+        alphas, betas, gammas = _GRID
+        n_grid = len(alphas)
+
+        # Initial state at the end of the first season, from the first two, the same for every grid point
+        first = values[:, :season].mean(axis=1)
+        slope = (values[:, season:2 * season].mean(axis=1) - first) / season
+        offsets = np.arange(season) - (season - 1) / 2
+        level = np.repeat((first + slope * (season - 1) / 2)[:, None], n_grid, axis=1)
+        trend = np.repeat(slope[:, None], n_grid, axis=1)
+        slots = (start + np.arange(season)) % season
+        seasonal = np.empty((n_series, season))
+        seasonal[:, slots] = values[:, :season] - (first[:, None] + slope[:, None] * offsets)
+        seasonal = np.repeat(seasonal[:, None, :], n_grid, axis=1)
+
+        sse = np.zeros((n_series, n_grid))
+        for t in range(season, n):
+            slot = (start + t) % season
+            y = values[:, t:t + 1]
+            level, trend, error = _step(y, level, trend, seasonal, slot, alphas, betas, gammas)
+            sse += error ** 2
+
+        best = sse.argmin(axis=1)
+        return [
+            cls(season, tuple(_GRID[:, best[i]]), float(level[i, best[i]]), float(trend[i, best[i]]),
+                seasonal[i, best[i]].copy(), start + n - 1)
+            for i in range(n_series)
+        ]
+
+    def update(self, values):
+        """Advance the state over ``values``, the periods following ``end``."""
+        level = np.array([[self.level]])
+        trend = np.array([[self.trend]])
+        seasonal = self.seasonal[None, None, :]
+        params = [np.array([p]) for p in (self.alpha, self.beta, self.gamma)]
+        for value in values:
+            self.end += 1
+            level, trend, _ = _step(np.array([[value]]), level, trend, seasonal, self.end % self.season, *params)
+        self.level, self.trend = float(level[0, 0]), float(trend[0, 0])
+
+    def forecast(self, horizon):
+        steps = np.arange(1, horizon + 1)
+        return self.level + steps * self.trend + self.seasonal[(self.end + steps) % self.season]
+
+    @property
+    def trend_rate(self):
+        return self.trend / self.level if self.level > 0 else 0.0
+
+
+def _step(y, level, trend, seasonal, slot, alphas, betas, gammas):
+    """
+    One Holt-Winters update for ``y`` of shape ``(series, 1)`` against
+    states of shape ``(series, grid)``. Updates ``seasonal[..., slot]`` in
+    place and returns the new level, trend and the one-step error.
+    """
+    season_value = seasonal[:, :, slot]
+    error = y - (level + trend + season_value)
+    new_level = alphas * (y - season_value) + (1 - alphas) * (level + trend)
+    new_trend = betas * (new_level - level) + (1 - betas) * trend
+    seasonal[:, :, slot] = gammas * (y - new_level) + (1 - gammas) * season_value
+    return new_level, new_trend, error
+
+
+class SeasonalTrend:
+    """
+    Least-squares fit of ``intercept + slope * t + dummy[season slot]``,
+    held as running normal equations so periods can be added one at a time.
+    ``terms`` is 1 (mean only), 2 (linear trend) or 3 (trend and dummies).
+    """
+
+    method = SEASONAL_TREND
+
+    def __init__(self, season, start, terms, xtx, xty):
+        self.season = season
+        self.start = start
+        self.terms = terms
+        self.xtx = xtx
+        self.xty = xty
+        self.end = start - 1
+        self.coef = None
+
+    @property
+    def spec(self):
+        return (self.method, self.terms)
+
+    @staticmethod
+    def terms_for(n, season):
+        if n < 3:
+            return 1
+        if n < season + season // 2:
+            return 2
+        return 3
+
+    def _design(self, indexes):
+        columns = [np.ones(len(indexes))]
+        if self.terms >= 2:
+            columns.append((indexes - self.start).astype(float))
+        if self.terms >= 3:
+            slots = indexes % self.season
+            # Slot of the first period is the baseline; one dummy for every other slot
+            baseline = self.start % self.season
+            others = [slot for slot in range(self.season) if slot != baseline]
+            columns.extend((slots == slot).astype(float) for slot in others)
+        return np.column_stack(columns)
+
+    @classmethod
+    def fit_many(cls, start, values, season, terms=None):
+        """One model per row of ``values``; every row shares the design matrix."""
+        n_series, n = values.shape
+        terms = cls.terms_for(n, season) if terms is None else terms
+        template = cls(season, start, terms, None, None)
+        x = template._design(start + np.arange(n))
+        xtx = x.T @ x
+        xty = x.T @ values.T
+        coef = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+        models = []
+        for i in range(n_series):
+            model = cls(season, start, terms, xtx.copy(), xty[:, i].copy())
+            model.end = start + n - 1
+            model.coef = coef[:, i]
+            models.append(model)
+        return models
+
+    def update(self, values):
+        """Add ``values``, the periods following ``end``, and re-solve."""
+        values = np.asarray(values, dtype=float)
+        x = self._design(self.end + 1 + np.arange(len(values)))
+        self.xtx = self.xtx + x.T @ x
+        self.xty = self.xty + x.T @ values
+        self.end += len(values)
+        self.coef = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    def forecast(self, horizon):
+        return self._design(self.end + 1 + np.arange(horizon)) @ self.coef
+
+    @property
+    def trend_rate(self):
+        if self.terms < 2:
+            return 0.0
+        level = self._design(np.array([self.end])) @ self.coef
+        return float(self.coef[1] / level[0]) if level[0] > 0 else 0.0
+
+
+MODELS = {HOLT_WINTERS: HoltWinters, SEASONAL_TREND: SeasonalTrend}
+
+
+def method_for(n, season, method=AUTO):
+    """The model ``method`` resolves to for ``n`` periods of history."""
+    if method == AUTO:
+        return HOLT_WINTERS if n >= 2 * season else SEASONAL_TREND
+    if method not in MODELS:
+        raise ValueError(f"Unknown forecasting method: {method}")
+    return method
+
+
+def spec_for(n, season, method=AUTO):
+    """Identifies the model a fit of ``n`` periods would produce."""
+    method = method_for(n, season, method)
+    if method == SEASONAL_TREND:
+        return (method, SeasonalTrend.terms_for(n, season))
+    return method
+
+
+def fit_many(start, values, season, method=AUTO):
+    """Fit one model per row of the ``(series, periods)`` array ``values``."""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    return MODELS[method_for(values.shape[1], season, method)].fit_many(start, values, season)
+
+
+# Cache
+
+class _Entry:
+
+    def __init__(self, model, start, values):
+        self.model = model
+        self.start = start
+        self.values = values
+        self.updates = 0
+
+
+class Forecaster:
+    """
+    Thread-safe LRU of fitted models per ``(key, granularity)``. A call
+    whose history agrees with the cached one where they overlap and adds
+    later periods updates the model with those periods; anything else
+    refits.
+    """
+
+    def __init__(self, max_entries=MAX_MODELS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.updates = 0
+        self.fits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forecast(self, key, granularity, start, values, horizon, method=AUTO):
+        """
+        Forecast the ``horizon`` periods after ``values``, a dense series
+        whose first period is ``start``.
+        """
+        values = np.asarray(values, dtype=float)
+        return self.forecast_many([key], granularity, start, values[None, :], horizon, method)[key]
+
+    def forecast_many(self, keys, granularity, start, values, horizon, method=AUTO):
+        """
+        Forecast every row of ``values`` (one per key, all starting at period
+        ``start``) in one call. Series that need a fresh fit are fitted
+        together. Returns ``{key: Forecast}``.
+        """
+        season = GRANULARITIES[granularity]
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        n = values.shape[1]
+        end = start + n - 1
+        spec = spec_for(n, season, method)
+
+        with self._lock:
+            entries = {}
+            to_fit = []
+            for row, key in enumerate(keys):
+                entry = self._entries.get((key, granularity))
+                if entry is not None and self._advance(entry, start, values[row], spec, season):
+                    entries[key] = entry
+                else:
+                    to_fit.append(row)
+
+            if to_fit:
+                models = fit_many(start, values[to_fit], season, method)
+                self.fits += len(to_fit)
+                for row, model in zip(to_fit, models):
+                    entries[keys[row]] = _Entry(model, start, values[row])
+
+            for key, entry in entries.items():
+                self._entries[(key, granularity)] = entry
+                self._entries.move_to_end((key, granularity))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            # Models are updated in place, so forecast before another call can advance them
+            periods = end + 1 + np.arange(horizon)
+            forecasts = {}
+            for key in keys:
+                model = entries[key].model
+                forecasts[key] = Forecast(periods, np.maximum(model.forecast(horizon), 0.0), model.method, model.trend_rate)
+        return forecasts
+
+    def _advance(self, entry, start, values, spec, season):
+        """Bring ``entry`` up to ``values``; False when it has to be refitted."""
+        cached_end = entry.start + len(entry.values) - 1
+        end = start + len(values) - 1
+        if entry.model.spec != spec or start < entry.start or end < cached_end:
+            return False
+        overlap = cached_end - start + 1
+        if overlap <= 0 or not np.array_equal(values[:overlap], entry.values[start - entry.start:]):
+            return False
+        new = values[overlap:]
+        if len(new):
+            # Re-estimate the smoothing parameters or design once a season of updates has built up
+            if entry.updates + len(new) >= season:
+                return False
+            entry.model.update(new)
+            entry.updates += len(new)
+            self.updates += 1
+        else:
+            self.hits += 1
+        entry.start, entry.values = start, values
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.updates = self.fits = 0
+
+    def cache_info(self):
+        with self._lock:
+            return {'models': len(self._entries), 'hits': self.hits, 'updates': self.updates, 'fits': self.fits}
+
+
+forecaster = Forecaster()
+
+
+# Backtesting
+
+def _seasonal_naive(history, horizon, season):
+    if len(history) < season:
+        return np.repeat(history[-1], horizon)
+    return np.resize(history[-season:], horizon)
+
+
+def backtest(values, granularity='month', horizon=3, min_train=None, start=0,
+             methods=(HOLT_WINTERS, SEASONAL_TREND, SEASONAL_NAIVE)):
+    """
+    Rolling-origin evaluation: for every origin from ``min_train`` (two
+    seasons by default) to the end of ``values``, fit on the history before
+    it and forecast the next ``horizon`` periods. Returns per method the
+    number of origins, MAE, RMSE, sMAPE (percent) and mean fit time in ms.
+    ``seasonal_naive`` repeats the last season and serves as the baseline.
+    A method may also be a callable ``fn(history, start, horizon)``,
+    reported under its ``__name__``.
+    """
+    season = GRANULARITIES[granularity]
+    values = np.asarray(values, dtype=float)
+    min_train = 2 * season if min_train is None else min_train
+    origins = range(min_train, len(values) - horizon + 1)
+
+    results = {}
+    for method in methods:
+        label = method if isinstance(method, str) else method.__name__
+        errors, actuals, predictions, fit_seconds = [], [], [], 0.0
+        for origin in origins:
+            history = values[:origin]
+            started = time.perf_counter()
+            if callable(method):
+                predicted = np.asarray(method(history, start, horizon), dtype=float)
+            elif method == SEASONAL_NAIVE:
+                predicted = _seasonal_naive(history, horizon, season)
+            else:
+                predicted = np.maximum(fit_many(start, history, season, method)[0].forecast(horizon), 0.0)
+            fit_seconds += time.perf_counter() - started
+            actual = values[origin:origin + horizon]
+            errors.append(actual - predicted)
+            actuals.append(actual)
+            predictions.append(predicted)
+        if not errors:
+            results[label] = {'origins': 0, 'mae': None, 'rmse': None, 'smape': None, 'fit_ms': None}
+            continue
+        errors, actuals, predictions = np.concatenate(errors), np.concatenate(actuals), np.concatenate(predictions)
+        denominator = np.abs(actuals) + np.abs(predictions)
+        ratios = np.divide(2 * np.abs(errors), denominator, out=np.zeros_like(errors), where=denominator > 0)
+        results[label] = {
+            'origins': len(origins),
+            'mae': float(np.abs(errors).mean()),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'smape': float(ratios.mean() * 100),
+            'fit_ms': fit_seconds / len(origins) * 1000,
+        }
+    return results
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZE = "summarize"
+ENCODE = "encode"
+
+# Queued by ``stop``; the worker finishes the requests ahead of it and exits
+_STOP = object()
+
+
+class InferenceRequest:
+    __slots__ = ("kind", "text", "options", "future")
+
+    def __init__(self, kind, text, options):
+        self.kind = kind
+        self.text = text
+        self.options = options
+        self.future = Future()
+
+    @property
+    def group(self):
+        # Requests can only share a forward pass when their generation options match
+        return (self.kind, tuple(sorted(self.options.items())))
+
+
+class InferenceWorker:
+    """
+    In-process micro-batching worker for the chatbot models.
+
+    Callers enqueue single summarize/encode requests and wait on a future.
+    One background thread drains the queue, collecting up to
+    ``max_batch_size`` requests or waiting at most ``max_wait_ms`` after the
+    first one arrives, and runs each group of compatible requests as one
+    batched forward pass under ``torch.inference_mode``.
+
+    The process holds a single worker (see ``get_inference_worker``), so every
+    action and thread shares one copy of each model.
+    """
+
+    def __init__(self, device="cpu", max_batch_size=16, max_wait_ms=10, quantize=False):
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.quantize = quantize and device == "cpu"
+
+        self.tokenizer = None
+        self.summarizer = None
+        self.embedder = None
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # Model loading
+
+    def load_summarizer(self, name="t5-small"):
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+        self.tokenizer = AutoTokenizer.from_pretrained(name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(name).to(self.device).eval()
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info(f"Applied dynamic int8 quantization to {name}")
+        self.summarizer = model
+
+    def load_embedder(self, name="paraphrase-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(name).to(self.device).eval()
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info(f"Applied dynamic int8 quantization to {name}")
+        self.embedder = model
+
+    def embedding_dimension(self):
+        return self.embedder.get_sentence_embedding_dimension() if self.embedder else None
+
+    # Public API
+
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="inference-worker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Finish the queued requests, then stop the worker thread."""
+        # Holding the lock keeps new requests from queueing behind the stop marker
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def submit(self, kind, text, **options):
+        request = InferenceRequest(kind, text, options)
+        with self._lock:
+            self._start()
+            self._queue.put(request)
+        return request.future
+
+    def summarize(self, text, timeout=None, **options):
+        """Blocking summary for one input, batched with concurrent callers."""
+        return self.submit(SUMMARIZE, text, **options).result(timeout)
+
+    def encode(self, text, timeout=None):
+        """Blocking unit-length embedding for one input."""
+        return self.submit(ENCODE, text).result(timeout)
+
+    async def asummarize(self, text, **options):
+        return await asyncio.wrap_future(self.submit(SUMMARIZE, text, **options))
+
+    async def aencode(self, text):
+        return await asyncio.wrap_future(self.submit(ENCODE, text))
+
+    # Worker loop
+
+    def _collect(self):
+        """Up to ``max_batch_size`` requests, and whether ``stop`` was queued."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            groups = {}
+            for request in batch:
+                # Skips requests whose caller gave up (a cancelled asyncio
+                # wrapper cancels the future); running futures can no longer
+                # be cancelled, so setting their result below cannot fail
+                if request.future.set_running_or_notify_cancel():
+                    groups.setdefault(request.group, []).append(request)
+
+            for (kind, _), requests in groups.items():
+                try:
+                    if kind == SUMMARIZE:
+                        results = self._summarize_batch(
+                            [request.text for request in requests], **requests[0].options
+                        )
+                    else:
+                        results = self._encode_batch([request.text for request in requests])
+                except Exception as e:
+                    logger.error(f"Batched {kind} of {len(requests)} requests failed: {e}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
+
+    def _summarize_batch(self, texts, max_length=150, num_beams=4, no_repeat_ngram_size=2):
+        if self.summarizer is None:
+            raise RuntimeError("Summarization model is not loaded")
+        inputs = self.tokenizer(
+            texts, return_tensors="pt", max_length=512, truncation=True, padding=True
+        ).to(self.device)
+        with torch.inference_mode():
+            output = self.summarizer.generate(
+                inputs.input_ids,
+                attention_mask=inputs.attention_mask,
+                max_length=max_length,
+                num_beams=num_beams,
+                no_repeat_ngram_size=no_repeat_ngram_size,
+                early_stopping=True
+            )
+        return self.tokenizer.batch_decode(output, skip_special_tokens=True)
+
+    def _encode_batch(self, texts):
+        if self.embedder is None:
+            raise RuntimeError("Sentence embedding model is not loaded")
+        with torch.inference_mode():
+            embeddings = self.embedder.encode(
+                texts,
+                batch_size=len(texts),
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+        return list(embeddings)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_inference_worker():
+    """Process-wide inference worker configured from the environment."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = InferenceWorker(
+                device="cuda" if torch.cuda.is_available() else "cpu",
+                max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 16)),
+                max_wait_ms=float(os.getenv("INFERENCE_MAX_WAIT_MS", 10)),
+                quantize=os.getenv("INFERENCE_QUANTIZE", "false").lower() in ("1", "true", "yes"),
+            )
+        return _worker
@@ -0,0 +1,481 @@
+"""
+Shared query layer for the analytics actions.
+
+Every metric is a plain synchronous function over the ``inspection`` models,
+memoized by ``(metric, arguments)`` for ``BOT_METRICS_TTL`` seconds. Derived
+metrics (period totals, monthly trends, top/bottom N) are computed in Python
+from a cached base fact, so a conversation that asks for "sales this month",
+then "by category", then "compare to last month" runs one grouped query per
+distinct period instead of one per helper.
+
+Cached results are dropped early when the underlying tables change. A
+watermark per source table (the latest id and modification time, both read
+from an index, and the delete counter Finstock keeps in
+``reports_dataversion``) is read at most once every
+``BOT_METRICS_WATERMARK_INTERVAL`` seconds, without holding the cache lock.
+
+Call the functions from async actions through ``sync_to_async``.
+"""
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay
+from django.utils import timezone
+
+from inspection.models import (
+    CoreCustomer, CoreOrder, CoreOrderitem, ProductsCategory, ProductsProduct, ReportsDataversion,
+    TransactionsTransaction
+)
+
+from . import segmentation
+
+logger = logging.getLogger(__name__)
+
+METRICS_TTL = float(os.getenv("BOT_METRICS_TTL", 300))
+WATERMARK_INTERVAL = float(os.getenv("BOT_METRICS_WATERMARK_INTERVAL", 5))
+MAX_ENTRIES = int(os.getenv("BOT_METRICS_MAX_ENTRIES", 1024))
+
+FULFILLED_ORDER_STATUSES = ('completed', 'delivered', 'shipped')
+MONEY_FIELD = DecimalField(max_digits=15, decimal_places=2)
+
+TRANSACTIONS = 'transactions'
+ORDERS = 'orders'
+PRODUCTS = 'products'
+
+
+def _watermark(model, modified_field, data_version_source):
+    """
+    Index seeks only, no table scan. Deletes leave the latest id and
+    modification time unchanged; Finstock counts them per source in
+    ``reports_dataversion`` (see ``reports.signals``).
+    """
+    def query():
+        return {
+            'last_id': model.objects.order_by('-id').values_list('id', flat=True).first(),
+            'last_modified': model.objects.order_by(f'-{modified_field}').values_list(
+                modified_field, flat=True
+            ).first(),
+            'deletes': ReportsDataversion.objects.filter(source=data_version_source).values_list(
+                'deletes', flat=True
+            ).first() or 0,
+        }
+    return query
+
+
+WATERMARK_QUERIES = {
+    TRANSACTIONS: _watermark(TransactionsTransaction, 'modified', 'transaction'),
+    ORDERS: _watermark(CoreOrder, 'modified', 'order'),
+    PRODUCTS: _watermark(ProductsProduct, 'modified_at', 'product'),
+}
+
+
+class MetricsCache:
+    """
+    Thread-safe TTL + LRU store whose entries are tagged with the source
+    tables they were computed from. Each source has a generation, bumped on
+    invalidation, so a value computed before an invalidation is not stored
+    after it.
+    """
+
+    def __init__(self, ttl=METRICS_TTL, max_entries=MAX_ENTRIES, watermark_interval=WATERMARK_INTERVAL,
+                 watermark_queries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.watermark_interval = watermark_interval
+        self.watermark_queries = WATERMARK_QUERIES if watermark_queries is None else watermark_queries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._watermarks = {}
+        self._checked_at = {}
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, source):
+        with self._lock:
+            return self._generations[source]
+
+    def set(self, key, source, value, generation=None):
+        """Store ``value``, unless ``source`` was invalidated since ``generation`` was read."""
+        with self._lock:
+            if generation is not None and generation != self._generations[source]:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, source, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source=None):
+        """Drop every entry, or only those computed from ``source``."""
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+                self._watermarks.clear()
+                self._checked_at.clear()
+                for name in list(self._generations):
+                    self._generations[name] += 1
+                return
+            self._drop(source)
+
+    def _drop(self, source):
+        self._generations[source] += 1
+        for key in [key for key, entry in self._entries.items() if entry[1] == source]:
+            del self._entries[key]
+
+    def check_watermark(self, source):
+        """Invalidate ``source`` entries if its table changed since the last check."""
+        # One caller per interval claims the check; the query runs outside
+        # the lock so metric reads never wait on the database
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at.get(source, float('-inf')) < self.watermark_interval:
+                return
+            self._checked_at[source] = now
+
+        watermark = self.watermark_queries[source]()
+
+        with self._lock:
+            if self._checked_at.get(source) != now:
+                # A later check (or an invalidate) superseded this one
+                return
+            previous = self._watermarks.get(source)
+            self._watermarks[source] = watermark
+            if previous is not None and previous != watermark:
+                logger.info(f"{source} changed, dropping cached bot metrics")
+                self._drop(source)
+
+
+metrics_cache = MetricsCache()
+
+
+def invalidate(source=None):
+    metrics_cache.invalidate(source)
+
+
+def _as_date(value):
+    # Mirrors DateField.to_python so date-keyed entries match what the query sees
+    if isinstance(value, datetime):
+        if settings.USE_TZ and timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.get_default_timezone())
+        return value.date()
+    return value
+
+
+def metric(source):
+    """
+    Memoize a metric by its name and arguments. Results are deep-copied on
+    the way out so callers can annotate rows freely.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics_cache.check_watermark(source)
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            entry = metrics_cache.get(key)
+            if entry is None:
+                generation = metrics_cache.generation(source)
+                value = func(*args, **kwargs)
+                metrics_cache.set(key, source, value, generation)
+            else:
+                value = entry[2]
+            return copy.deepcopy(value)
+        return wrapper
+    return decorator
+
+
+# Transactions
+
+def amount_by_category(start_date, end_date, transaction_type: str = 'income') -> List[Dict[str, Any]]:
+    """``[{'category', 'total', 'count'}]`` for the period, largest total first."""
+    return _amount_by_category(_as_date(start_date), _as_date(end_date), transaction_type)
+
+
+@metric(TRANSACTIONS)
+def _amount_by_category(start_date: date, end_date: date, transaction_type: str):
+    return list(TransactionsTransaction.objects.filter(
+        date__range=[start_date, end_date],
+        transaction_type=transaction_type
+    ).values('category').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('-total'))
+
+
+def period_totals(start_date, end_date, transaction_type: str = 'income') -> Dict[str, Any]:
+    """``{'total', 'count'}`` for the period, derived from the category breakdown."""
+    rows = amount_by_category(start_date, end_date, transaction_type)
+    return {
+        'total': sum((row['total'] or Decimal('0') for row in rows), Decimal('0')),
+        'count': sum(row['count'] for row in rows),
+    }
+
+
+def amount_trend(start_date, end_date, transaction_type: str = 'income',
+                 granularity: str = 'month') -> List[Dict[str, Any]]:
+    """
+    ``[{granularity, 'total', 'count'}]`` ordered by period, where
+    ``granularity`` is ``'day'`` or ``'month'``. Monthly buckets are folded
+    from the cached daily series.
+    """
+    daily = _daily_amounts(_as_date(start_date), _as_date(end_date), transaction_type)
+    if granularity == 'day':
+        return daily
+    if granularity != 'month':
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    return _fold_months(daily)
+
+
+def _fold_months(daily):
+    months = defaultdict(lambda: {'total': Decimal('0'), 'count': 0})
+    for row in daily:
+        bucket = months[row['day'].replace(day=1)]
+        bucket['total'] += row['total'] or Decimal('0')
+        bucket['count'] += row['count']
+    return [dict(month=month, **months[month]) for month in sorted(months)]
+
+
+@metric(TRANSACTIONS)
+def _daily_amounts(start_date: date, end_date: date, transaction_type: str):
+    return list(TransactionsTransaction.objects.filter(
+        date__range=[start_date, end_date],
+        transaction_type=transaction_type
+    ).annotate(
+        day=TruncDay('date')
+    ).values('day').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('day'))
+
+
+def top_customers(start_date, end_date, limit: int = 5) -> List[Dict[str, Any]]:
+    """``[{'customer_id', 'total', 'count'}]`` for income transactions, highest spend first."""
+    return _top_customers(_as_date(start_date), _as_date(end_date), limit)
+
+
+@metric(TRANSACTIONS)
+def _top_customers(start_date: date, end_date: date, limit: int):
+    return list(TransactionsTransaction.objects.filter(
+        date__range=[start_date, end_date],
+        transaction_type='income'
+    ).values('customer_id').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('-total')[:limit])
+
+
+def customer_rfm(start_date, end_date) -> Dict[str, Any]:
+    """
+    Customer engagement report for income transactions in the period:
+    totals, engagement segments, new customers (first purchase ever inside
+    the period) and the top five spenders with their names.
+    """
+    report = _customer_rfm(_as_date(start_date), _as_date(end_date))
+    top = report.pop('top_customers')
+    names = {
+        customer['id']: customer
+        for customer in CoreCustomer.objects.filter(
+            id__in=[customer_id for customer_id, *_ in top if customer_id is not None]
+        ).values('id', 'first_name', 'last_name')
+    }
+    report['top_customers'] = [{
+        'customer_id': customer_id,
+        'customer__first_name': names.get(customer_id, {}).get('first_name'),
+        'customer__last_name': names.get(customer_id, {}).get('last_name'),
+        'total_customer_spent': total,
+        'transaction_count': count,
+        'avg_transaction': average,
+    } for customer_id, total, count, average in top]
+    return report
+
+
+@metric(TRANSACTIONS)
+def _customer_rfm(start_date: date, end_date: date):
+    in_period = Q(date__gte=start_date)
+    rows = TransactionsTransaction.objects.filter(
+        date__lte=end_date,
+        transaction_type='income'
+    ).values('customer_id').annotate(
+        count=Count('id', filter=in_period),
+        total=Sum('amount', filter=in_period),
+        first=Min('date'),
+        last=Max('date', filter=in_period)
+    ).filter(count__gt=0).order_by('customer_id').values_list('customer_id', 'count', 'total', 'first', 'last')
+    return segmentation.summarize(
+        segmentation.CustomerArrays.from_rows(rows), today=end_date, new_since=start_date
+    )
+
+
+def sales_history(start_date, end_date, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    ``[{'date', 'total'}]`` of income per day, limited to transactions whose
+    category contains ``category`` when given. Feeds the sales forecasts.
+    """
+    return _sales_history(_as_date(start_date), _as_date(end_date), category)
+
+
+@metric(TRANSACTIONS)
+def _sales_history(start_date: date, end_date: date, category: Optional[str]):
+    queryset = TransactionsTransaction.objects.filter(
+        date__range=[start_date, end_date],
+        transaction_type='income'
+    )
+    if category:
+        queryset = queryset.filter(category__icontains=category)
+    return list(queryset.values('date').annotate(
+        total=Sum('amount')
+    ).order_by('date'))
+
+
+def category_sales_trend(start_date, end_date, product_category: Optional[str] = None) -> Dict[str, Any]:
+    """
+    ``{'monthly': [{'month', 'total', 'count'}], 'products': [...]}`` for
+    income transactions, limited to orders containing products in a matching
+    category when ``product_category`` is given.
+    """
+    data = _category_sales_trend(_as_date(start_date), _as_date(end_date), product_category)
+    return {'monthly': _fold_months(data['daily']), 'products': data['products']}
+
+
+@metric(TRANSACTIONS)
+def _category_sales_trend(start_date: date, end_date: date, product_category: Optional[str]):
+    queryset = TransactionsTransaction.objects.filter(
+        date__range=[start_date, end_date],
+        transaction_type='income'
+    )
+    if product_category:
+        queryset = queryset.filter(
+            order__coreorderitem__product__category__name__icontains=product_category
+        ).distinct()
+
+    daily = list(queryset.annotate(
+        day=TruncDay('date')
+    ).values('day').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('day'))
+    products = list(queryset.values(
+        'order__coreorderitem__product__name',
+        'order__coreorderitem__product__category__name'
+    ).annotate(
+        product_total_sales=Sum('amount'),
+        product_transaction_count=Count('id', distinct=True)
+    ).order_by('-product_total_sales'))
+    return {'daily': daily, 'products': products}
+
+
+# Products and inventory
+
+def product_sales(start_date, end_date) -> List[Dict[str, Any]]:
+    """
+    ``[{'name', 'sales', 'price', 'revenue'}]`` for every active product over
+    fulfilled orders placed in the period, best selling first.
+    """
+    return _product_sales(start_date, end_date)
+
+
+@metric(ORDERS)
+def _product_sales(start_date, end_date):
+    order_filter = Q(
+        coreorderitem__order__order_date__range=[start_date, end_date],
+        coreorderitem__order__status__in=FULFILLED_ORDER_STATUSES
+    )
+    rows = ProductsProduct.objects.filter(is_active=1).values('id', 'name', 'price').annotate(
+        sales=Sum('coreorderitem__quantity', filter=order_filter),
+        revenue=Sum(
+            F('coreorderitem__quantity') * F('coreorderitem__unit_price'),
+            filter=order_filter,
+            output_field=MONEY_FIELD
+        )
+    ).order_by('id')
+    products = [{
+        'name': row['name'],
+        'sales': row['sales'] or 0,
+        'price': float(row['price']),
+        'revenue': float(row['revenue'] or 0),
+    } for row in rows]
+    products.sort(key=lambda product: product['sales'], reverse=True)
+    return products
+
+
+def product_sales_history(start_date, end_date) -> List[Dict[str, Any]]:
+    """
+    ``[{'product_id', 'name', 'day', 'revenue'}]`` per active product and
+    day over fulfilled orders, for forecasting every product in one batch.
+    """
+    return _product_sales_history(_as_date(start_date), _as_date(end_date))
+
+
+@metric(ORDERS)
+def _product_sales_history(start_date: date, end_date: date):
+    return list(CoreOrderitem.objects.filter(
+        order__order_date__date__range=[start_date, end_date],
+        order__status__in=FULFILLED_ORDER_STATUSES,
+        product__is_active=1
+    ).annotate(
+        day=TruncDate('order__order_date')
+    ).values('day', 'product_id', name=F('product__name')).annotate(
+        revenue=Sum(F('quantity') * F('unit_price'), output_field=MONEY_FIELD)
+    ).order_by('product_id', 'day'))
+
+
+def top_products(products: List[Dict[str, Any]], limit: int = 10, worst: bool = False) -> List[Dict[str, Any]]:
+    """
+    Top (or, with ``worst``, bottom) ``limit`` of ``product_sales`` rows by
+    units sold. Callers fetch ``product_sales`` once and rank it both ways.
+    """
+    if worst:
+        products = sorted(products, key=lambda product: product['sales'])
+    return products[:limit]
+
+
+@metric(PRODUCTS)
+def inventory_value() -> Dict[str, Any]:
+    """``{'total_products', 'total_units', 'total_value'}`` for active products."""
+    return ProductsProduct.objects.filter(is_active=1).aggregate(
+        total_products=Count('id'),
+        total_units=Sum('stock'),
+        total_value=Sum(F('stock') * F('price'), output_field=MONEY_FIELD)
+    )
+
+
+@metric(PRODUCTS)
+def inventory_by_category() -> List[Dict[str, Any]]:
+    """Active product count, units and stock value per category, in one grouped query."""
+    active = Q(productsproduct__is_active=1)
+    rows = ProductsCategory.objects.values('name').annotate(
+        product_count=Count('productsproduct', filter=active),
+        total_units=Sum('productsproduct__stock', filter=active),
+        total_value=Sum(
+            F('productsproduct__stock') * F('productsproduct__price'),
+            filter=active,
+            output_field=MONEY_FIELD
+        )
+    ).order_by('name')
+    return [{
+        'category_name': row['name'],
+        'product_count': row['product_count'] or 0,
+        'total_units': row['total_units'] or 0,
+        'total_value': float(row['total_value'] or 0),
+    } for row in rows]
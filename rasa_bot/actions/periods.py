@@ -0,0 +1,276 @@
+"""
+Time period resolution for the analytics actions.
+
+``parse_period(phrase)`` turns a time period phrase into an inclusive
+``(start, end)`` pair of naive datetimes, from midnight on the first day to
+23:59:59 on the last. Nearly every analytics action resolves one or more
+periods per message, so:
+
+* The grammar is compiled once at import.
+* Relative expressions ("last quarter", "ytd", "past 3 weeks") are resolved
+  from tables of anchors and units rather than one branch per phrase.
+* Results are memoized by ``(normalized phrase, today)``. Repeated phrases
+  cost a dictionary lookup, and memoized answers roll over at midnight.
+  Relative periods are therefore resolved to whole days: "this month" ends
+  at 23:59:59 today, not at the current time.
+
+Understood phrases:
+
+* ``today``, ``yesterday``
+* ``this``/``current``/``last``/``previous``/``past`` + ``week``, ``month``,
+  ``quarter`` or ``year``; ``last`` alone is last week
+* ``ytd``, ``qtd``, ``mtd``, ``wtd`` and ``year to date`` etc.
+* ``last``/``past``/``previous`` + N + ``days``, ``weeks``, ``months``,
+  ``quarters`` or ``years``
+* ``q2 2024``, ``q2-2024``, ``2024 q2``, ``jan 2024``, ``january 2024``,
+  ``2024``, and a quarter or month alone for the current year
+* single dates in the ``DATE_FORMATS`` below
+* ranges of any two of the above: ``A to B`` (or ``through``, ``till``,
+  ``until``, ``and``, `` - ``, ``|``), ``from A to B`` and
+  ``between A and B``. A quarter or month without a year takes the other
+  side's year, so ``q2 to q3 2024`` and ``march 2024 to may`` work.
+
+Anything else raises ``ValueError``.
+"""
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from dateutil.relativedelta import relativedelta
+
+PERIOD_CACHE_SIZE = int(os.getenv("BOT_PERIOD_CACHE_SIZE", 4096))
+MIN_YEAR = 2000
+MAX_YEARS_AHEAD = 10
+
+END_OF_DAY = time(23, 59, 59)
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+
+# Offset of the named period from the one containing today
+ANCHORS = {'this': 0, 'current': 0, 'last': -1, 'previous': -1, 'past': -1}
+
+# Calendar units longer than a week, in months
+UNIT_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+TO_DATE = {
+    'ytd': 'year', 'year to date': 'year',
+    'qtd': 'quarter', 'quarter to date': 'quarter',
+    'mtd': 'month', 'month to date': 'month',
+    'wtd': 'week', 'week to date': 'week',
+}
+
+# Day offsets from today; "last" alone has always meant last week
+DAYS = {'today': 0, 'yesterday': -1}
+ALIASES = {'last': 'last week'}
+
+DATE_FORMATS = (
+    "%d/%m/%Y",      # 01/01/2023
+    "%m/%d/%Y",      # 01/01/2023
+    "%d-%m-%Y",      # 01-01-2023
+    "%B %d, %Y",     # January 01, 2023
+    "%b %d, %Y",     # Jan 01, 2023
+)
+
+_UNIT = r'(day|week|month|quarter|year)'
+ANCHORED = re.compile(r'^(this|current|last|previous|past)\s+' + _UNIT + r'$')
+ROLLING = re.compile(r'^(?:last|past|previous)\s+(\d+)\s+' + _UNIT + r's?$')
+
+ISO_DATE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+YEAR = re.compile(r'^(\d{4})$')
+QUARTER = re.compile(r'^q([1-4])(?:[\s-]*(\d{4}))?$')
+YEAR_QUARTER = re.compile(r'^(\d{4})[\s-]*q([1-4])$')
+MONTH = re.compile(r'^([a-z]+)\.?(?:[\s,-]*(\d{4}))?$')
+
+ISO_RANGE = re.compile(r'^(\d{4}-\d{1,2}-\d{1,2})\s*-\s*(\d{4}-\d{1,2}-\d{1,2})$')
+RANGE = re.compile(
+    r'^(?:from\s+|between\s+)?(?P<left>.+?)\s*'
+    r'(?:\s(?:to|through|till|until|and)\s|\s-\s|\|)'
+    r'\s*(?P<right>.+)$'
+)
+
+
+def normalize(phrase):
+    """Lower case with runs of whitespace collapsed."""
+    return ' '.join(str(phrase).lower().split())
+
+
+def parse_period(phrase, today=None):
+    """
+    ``(start, end)`` datetimes for ``phrase``, relative to ``today``
+    (``date.today()`` by default). Raises ``ValueError`` when the phrase is
+    not understood.
+    """
+    return _parse_cached(normalize(phrase), today or date.today())
+
+
+@lru_cache(maxsize=PERIOD_CACHE_SIZE)
+def _parse_cached(phrase, today):
+    start, end = resolve_period(phrase, today)
+    return datetime.combine(start, time.min), datetime.combine(end, END_OF_DAY)
+
+
+def cache_clear():
+    _parse_cached.cache_clear()
+
+
+def cache_info():
+    return _parse_cached.cache_info()
+
+
+def resolve_period(phrase, today):
+    """Inclusive ``(first day, last day)`` for a normalized phrase. Not memoized."""
+    try:
+        span = _relative(phrase, today)
+        if span is None:
+            term = _term(phrase)
+            span = _complete(term, None, today) if term else _range(phrase, today)
+    except OverflowError:
+        # "last 5000 years" and the like
+        span = None
+    if span is None:
+        raise ValueError(
+            f"Unable to parse time period: '{phrase}'. Please use formats like "
+            f"'2025-02-06 to 2025-03-08', 'Q1 2024', 'last month', or 'last week'."
+        )
+    return span
+
+
+def parse_date(text):
+    """A date in ISO form or one of ``DATE_FORMATS``."""
+    match = ISO_DATE.match(text)
+    if match:
+        return date(*map(int, match.groups()))
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unable to parse date: '{text}'")
+
+
+def unit_start(unit, day):
+    """The first day of the ``unit`` containing ``day``."""
+    if unit == 'day':
+        return day
+    if unit == 'week':
+        return day - timedelta(days=day.weekday())
+    months = UNIT_MONTHS[unit]
+    return day.replace(month=months * ((day.month - 1) // months) + 1, day=1)
+
+
+def shift(unit, day, count):
+    """``day`` moved by ``count`` units."""
+    if unit == 'day':
+        return day + timedelta(days=count)
+    if unit == 'week':
+        return day + timedelta(weeks=count)
+    return day + relativedelta(months=UNIT_MONTHS[unit] * count)
+
+
+def unit_bounds(unit, day, offset=0):
+    """First and last day of the ``unit`` ``offset`` units from the one containing ``day``."""
+    start = shift(unit, unit_start(unit, day), offset)
+    return start, shift(unit, start, 1) - timedelta(days=1)
+
+
+def _relative(phrase, today):
+    phrase = ALIASES.get(phrase, phrase)
+    if phrase in DAYS:
+        day = today + timedelta(days=DAYS[phrase])
+        return day, day
+    if phrase in TO_DATE:
+        return unit_start(TO_DATE[phrase], today), today
+
+    match = ANCHORED.match(phrase)
+    if match:
+        offset, unit = ANCHORS[match.group(1)], match.group(2)
+        if offset == 0:
+            # The current period so far
+            return unit_start(unit, today), today
+        return unit_bounds(unit, today, offset)
+
+    match = ROLLING.match(phrase)
+    if match:
+        return shift(match.group(2), today, -int(match.group(1))), today
+    return None
+
+
+def _term(text):
+    """
+    One absolute period as ``(kind, value, year)``, with ``year`` None when
+    the phrase leaves it out; ``None`` when ``text`` is not one.
+    """
+    match = QUARTER.match(text)
+    if match:
+        return 'quarter', int(match.group(1)), _year(match.group(2))
+    match = YEAR_QUARTER.match(text)
+    if match:
+        return 'quarter', int(match.group(2)), int(match.group(1))
+    match = YEAR.match(text)
+    if match:
+        return 'year', None, int(match.group(1))
+    match = MONTH.match(text)
+    if match and match.group(1) in MONTHS:
+        return 'month', MONTHS[match.group(1)], _year(match.group(2))
+    try:
+        day = parse_date(text)
+    except ValueError:
+        return None
+    return 'date', day, day.year
+
+
+def _year(text):
+    return int(text) if text else None
+
+
+def _complete(term, year, today):
+    """The span of a term, using ``year`` (or this year) when it has none."""
+    kind, value, own_year = term
+    year = own_year or year or today.year
+    if kind == 'date':
+        return value, value
+    if kind == 'year':
+        if own_year is not None and not MIN_YEAR <= year <= today.year + MAX_YEARS_AHEAD:
+            raise ValueError(f"Year {year} is outside the reasonable range ({MIN_YEAR}-{today.year + MAX_YEARS_AHEAD}).")
+        return date(year, 1, 1), date(year, 12, 31)
+    if kind == 'quarter':
+        return unit_bounds('quarter', date(year, 3 * value - 2, 1))
+    return unit_bounds('month', date(year, value, 1))
+
+
+def _side(text, today):
+    """A range endpoint: an absolute term, or the span of a relative phrase."""
+    term = _term(text)
+    if term is not None:
+        return term, None
+    return None, _relative(text, today)
+
+
+def _range(phrase, today):
+    match = ISO_RANGE.match(phrase) or RANGE.match(phrase)
+    if not match:
+        return None
+    (left_term, left_span), (right_term, right_span) = _side(match.group(1), today), _side(match.group(2), today)
+    if (left_term or left_span) is None or (right_term or right_span) is None:
+        return None
+
+    left_year = left_term[2] if left_term else None
+    right_year = right_term[2] if right_term else None
+    if left_term:
+        left_span = _complete(left_term, right_year, today)
+    if right_term:
+        right_span = _complete(right_term, left_year, today)
+
+    start, end = left_span[0], right_span[1]
+    if start > end and left_term and left_year is None and right_year is not None:
+        # "december to january 2025" starts in the previous year
+        start = _complete(left_term, right_year - 1, today)[0]
+    if start > end:
+        raise ValueError(f"Time period '{phrase}' ends before it starts.")
+    return start, end
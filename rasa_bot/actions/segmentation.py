@@ -0,0 +1,139 @@
+"""
+Customer engagement scoring and segmentation on NumPy arrays.
+
+``ActionCustomerAnalytics`` scored customers with per-customer ``Decimal``
+arithmetic, then re-scanned the sorted list once per segment. Here one
+grouped query row per customer, ``(customer_id, count, total, first_date,
+last_date)``, becomes a set of column arrays:
+
+* Scores are computed for every customer at once. Frequency and spend are
+  normalized by their maxima and recency falls linearly to zero over a
+  year; the weights are 30% frequency, 40% spend and 30% recency.
+* Segments are assigned with one ``np.digitize`` over the scores, and the
+  per-segment sums use ``np.bincount``.
+* Money is held as integer cents, so totals add up exactly.
+
+``summarize`` returns the report structure the action formats. Only small
+summaries leave this module, so ``metrics.customer_rfm`` can cache them.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+FREQUENCY_WEIGHT = 0.3
+SPEND_WEIGHT = 0.4
+RECENCY_WEIGHT = 0.3
+RECENCY_DAYS = 365
+
+# (name, description, lowest score); a score of exactly 75 is Growth Potential
+SEGMENTS = (
+    ('Emerging Customers', 'New or low-engagement customers', None),
+    ('Growth Potential', 'Moderate engagement, opportunity for development', 50.0),
+    ('Strategic Customers', 'High-value, frequent, and recent transactions', np.nextafter(75.0, np.inf)),
+)
+SEGMENT_EDGES = np.array([lowest for _, _, lowest in SEGMENTS[1:]])
+# Report order, best segment first
+REPORT_ORDER = (2, 1, 0)
+
+
+class CustomerArrays:
+    """Column arrays with one entry per customer."""
+
+    def __init__(self, customer_ids, counts, cents, first_days, last_days):
+        self.customer_ids = customer_ids
+        self.counts = counts
+        self.cents = cents
+        self.first_days = first_days
+        self.last_days = last_days
+
+    def __len__(self):
+        return len(self.counts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from ``(customer_id, count, total, first_date, last_date)`` rows.
+        A missing customer id (transactions without a customer) becomes -1.
+        """
+        rows = list(rows)
+        customer_ids = np.fromiter((-1 if row[0] is None else row[0] for row in rows), dtype=np.int64, count=len(rows))
+        counts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        cents = np.fromiter((round((row[2] or 0) * 100) for row in rows), dtype=np.int64, count=len(rows))
+        first_days = np.fromiter((row[3].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        last_days = np.fromiter((row[4].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        return cls(customer_ids, counts, cents, first_days, last_days)
+
+
+def engagement_scores(counts, cents, days_since_last):
+    """Scores from 0 to 100, rounded to two decimals."""
+    max_count = counts.max() if len(counts) and counts.max() else 1
+    max_cents = cents.max() if len(cents) and cents.max() else 1
+    frequency = counts / max_count * 100
+    spend = cents / max_cents * 100
+    recency = np.maximum(0.0, 100 - days_since_last / RECENCY_DAYS * 100)
+    return np.round(FREQUENCY_WEIGHT * frequency + SPEND_WEIGHT * spend + RECENCY_WEIGHT * recency, 2)
+
+
+def segment_indexes(scores):
+    """Index into ``SEGMENTS`` for each score."""
+    return np.digitize(scores, SEGMENT_EDGES)
+
+
+def money(cents):
+    return Decimal(int(round(cents))) / 100
+
+
+def summarize(customers, today, new_since, top=5):
+    """
+    The analytics report for ``customers``: totals, segments, customers
+    whose first transaction is on or after ``new_since``, and the ``top``
+    spenders as ``(customer_id, total, count, average)`` tuples.
+    """
+    days_since_last = today.toordinal() - customers.last_days
+    scores = engagement_scores(customers.counts, customers.cents, days_since_last)
+    segments = segment_indexes(scores)
+
+    n_segments = len(SEGMENTS)
+    sizes = np.bincount(segments, minlength=n_segments)
+    segment_cents = np.bincount(segments, weights=customers.cents, minlength=n_segments)
+    segment_scores = np.bincount(segments, weights=scores, minlength=n_segments)
+
+    customer_segments = []
+    for index in REPORT_ORDER:
+        name, description, _ = SEGMENTS[index]
+        size = int(sizes[index])
+        total = money(segment_cents[index])
+        customer_segments.append({
+            'segment': name,
+            'description': description,
+            'customer_count': size,
+            'total_segment_sales': total,
+            'avg_customer_value': (total / size).quantize(Decimal('0.01')) if size else Decimal('0'),
+            'avg_engagement_score': float(segment_scores[index] / size) if size else 0,
+        })
+
+    new = customers.first_days >= new_since.toordinal()
+
+    # Highest spend first; ties keep query order
+    top_indexes = np.argsort(-customers.cents, kind='stable')[:top]
+    top_customers = [
+        (
+            None if customers.customer_ids[i] == -1 else int(customers.customer_ids[i]),
+            money(customers.cents[i]),
+            int(customers.counts[i]),
+            (money(customers.cents[i]) / int(customers.counts[i])).quantize(Decimal('0.01')),
+        )
+        for i in top_indexes.tolist()
+    ]
+
+    return {
+        'total_customers': len(customers),
+        'total_sales': money(customers.cents.sum()),
+        'total_transactions': int(customers.counts.sum()),
+        'customer_segments': customer_segments,
+        'new_customers': {
+            'total_new_customers': int(new.sum()),
+            'new_customer_revenue': money(customers.cents[new].sum()),
+        },
+        'top_customers': top_customers,
+    }
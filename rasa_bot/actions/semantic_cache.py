@@ -0,0 +1,318 @@
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(vectors):
+    """Return float32 rows scaled to unit length (zero rows are left as zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SemanticCache:
+    """
+    Fixed-capacity embedding index for cached query summaries.
+
+    Embeddings are L2-normalized on insert and stored as rows of a float32
+    matrix, so cosine similarity for every cached query is a single
+    matrix-vector product. Query and summary text plus the bookkeeping
+    arrays live in a small pickle that names the matrix file it belongs to.
+
+    Several action server processes share ``cache_dir``. Each maps the
+    committed matrix copy-on-write and changes only its own copy; ``flush``
+    writes a snapshot to a new matrix file and then replaces the metadata,
+    which is the single commit point. A crash or a concurrent flush
+    therefore leaves the previous, consistent pair in place (the last flush
+    wins).
+
+    When ``n_lists`` is set and the cache holds at least ``ivf_min_entries``
+    rows, an inverted-file index is trained with spherical k-means and
+    lookups only score the rows in the ``nprobe`` closest lists.
+
+    Entries older than ``ttl`` seconds are expired on lookup, and the least
+    recently used entry is evicted when the matrix is full.
+    """
+
+    # Matrix name used before flushes wrote one file per snapshot
+    MATRIX_FILE = "embeddings.f32"
+    MATRIX_PATTERN = "embeddings-*.f32"
+    META_FILE = "embeddings_meta.pkl"
+    # Unreferenced snapshots older than this are left over from other processes
+    STALE_SNAPSHOT_SECONDS = 3600
+
+    def __init__(self, cache_dir, dim, capacity=20000, ttl=None,
+                 n_lists=0, nprobe=8, ivf_min_entries=4096):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.capacity = capacity
+        self.ttl = ttl
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.ivf_min_entries = ivf_min_entries
+        self._lock = threading.RLock()
+        self._load()
+
+    # Storage
+
+    def _reset(self):
+        self.queries = [None] * self.capacity
+        self.summaries = [None] * self.capacity
+        self.valid = np.zeros(self.capacity, dtype=bool)
+        self.created = np.zeros(self.capacity, dtype=np.float64)
+        self.last_used = np.zeros(self.capacity, dtype=np.float64)
+        self.assignments = np.full(self.capacity, -1, dtype=np.int32)
+        self.centroids = None
+        self.trained_size = 0
+        self.slots = {}
+
+    def _load(self):
+        meta_path = self.cache_dir / self.META_FILE
+        expected_bytes = self.capacity * self.dim * np.dtype(np.float32).itemsize
+
+        self._reset()
+        self.matrix_file = None
+        meta = None
+        if meta_path.exists():
+            try:
+                with open(meta_path, 'rb') as f:
+                    meta = pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading semantic cache metadata: {e}")
+
+        matrix_path = self.cache_dir / meta.get('matrix_file', self.MATRIX_FILE) if meta else None
+        reusable = (
+            meta is not None
+            and meta.get('dim') == self.dim
+            and meta.get('capacity') == self.capacity
+            and matrix_path.exists()
+            and matrix_path.stat().st_size == expected_bytes
+        )
+        if not reusable:
+            self.matrix = np.zeros((self.capacity, self.dim), dtype=np.float32)
+            if meta is not None:
+                logger.info("Semantic cache layout changed, starting with an empty index")
+            return
+
+        # Copy-on-write: writes stay in this process until the next flush
+        self.matrix = np.memmap(matrix_path, dtype=np.float32, mode='c', shape=(self.capacity, self.dim))
+        self.matrix_file = matrix_path.name
+        for name in ('queries', 'summaries', 'valid', 'created', 'last_used',
+                     'assignments', 'centroids', 'trained_size'):
+            setattr(self, name, meta[name])
+        self.slots = {
+            query: slot for slot, query in enumerate(self.queries)
+            if self.valid[slot]
+        }
+        logger.info(f"Loaded {len(self)} cached queries into the semantic index")
+
+    def flush(self):
+        """Persist a snapshot of the matrix and metadata to disk."""
+        with self._lock:
+            matrix_file = f"embeddings-{uuid.uuid4().hex}.f32"
+            with open(self.cache_dir / matrix_file, 'wb') as f:
+                f.write(np.ascontiguousarray(self.matrix).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            meta = {
+                'dim': self.dim,
+                'capacity': self.capacity,
+                'matrix_file': matrix_file,
+                'queries': self.queries,
+                'summaries': self.summaries,
+                'valid': self.valid,
+                'created': self.created,
+                'last_used': self.last_used,
+                'assignments': self.assignments,
+                'centroids': self.centroids,
+                'trained_size': self.trained_size,
+            }
+            meta_path = self.cache_dir / self.META_FILE
+            tmp_path = meta_path.with_name(f"{self.META_FILE}.{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, meta_path)
+            self._remove_snapshots(keep=matrix_file, previous=self.matrix_file)
+            self.matrix_file = matrix_file
+
+    def _remove_snapshots(self, keep, previous):
+        # Open maps of a removed file stay valid, so other processes are unaffected
+        stale_before = time.time() - self.STALE_SNAPSHOT_SECONDS
+        for path in [*self.cache_dir.glob(self.MATRIX_PATTERN), self.cache_dir / self.MATRIX_FILE]:
+            if path.name == keep:
+                continue
+            try:
+                if path.name == previous or path.stat().st_mtime < stale_before:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __len__(self):
+        return len(self.slots)
+
+    # Writes
+
+    def _free_slot(self):
+        free = np.flatnonzero(~self.valid)
+        if free.size:
+            return int(free[0])
+        # Full: evict the least recently used entry
+        slot = int(np.argmin(self.last_used))
+        self._discard(slot)
+        return slot
+
+    def _discard(self, slot):
+        self.slots.pop(self.queries[slot], None)
+        self.queries[slot] = None
+        self.summaries[slot] = None
+        self.valid[slot] = False
+        self.assignments[slot] = -1
+        self.last_used[slot] = 0.0
+
+    def add(self, query, embedding, summary):
+        """Insert or replace the entry for ``query``."""
+        vector = normalize(embedding).reshape(self.dim)
+        now = time.time()
+        with self._lock:
+            slot = self.slots.get(query)
+            if slot is None:
+                slot = self._free_slot()
+            self.matrix[slot] = vector
+            self.queries[slot] = query
+            self.summaries[slot] = summary
+            self.valid[slot] = True
+            self.created[slot] = now
+            self.last_used[slot] = now
+            self.slots[query] = slot
+
+            if self.centroids is not None:
+                self.assignments[slot] = int(np.argmax(self.centroids @ vector))
+            self._maybe_train()
+            return slot
+
+    def add_many(self, queries, embeddings, summaries):
+        embeddings = normalize(embeddings)
+        for query, embedding, summary in zip(queries, embeddings, summaries):
+            self.add(query, embedding, summary)
+
+    def expire(self, now=None):
+        """Drop entries older than the TTL. Returns the number removed."""
+        if not self.ttl:
+            return 0
+        now = now or time.time()
+        with self._lock:
+            expired = np.flatnonzero(self.valid & (self.created < now - self.ttl))
+            for slot in expired:
+                self._discard(int(slot))
+            return len(expired)
+
+    # IVF
+
+    def _maybe_train(self):
+        size = len(self)
+        if not self.n_lists or size < max(self.ivf_min_entries, self.n_lists):
+            return
+        # Retrain when the index has doubled since the last training run
+        if self.centroids is not None and size < 2 * self.trained_size:
+            return
+        self.train()
+
+    def train(self, iterations=10, sample_size=50000, seed=0):
+        """Fit ``n_lists`` centroids with spherical k-means and assign every row."""
+        with self._lock:
+            rows = np.flatnonzero(self.valid)
+            if rows.size < self.n_lists:
+                return
+            rng = np.random.default_rng(seed)
+            sample = rows if rows.size <= sample_size else rng.choice(rows, sample_size, replace=False)
+            data = np.asarray(self.matrix[np.sort(sample)])
+
+            centroids = data[rng.choice(len(data), self.n_lists, replace=False)]
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, data)
+                empty = np.bincount(labels, minlength=self.n_lists) == 0
+                # Keep the previous centroid for lists that lost every member
+                sums[empty] = centroids[empty]
+                centroids = normalize(sums)
+
+            self.centroids = centroids
+            self.assignments[:] = -1
+            for start in range(0, rows.size, 16384):
+                chunk = rows[start:start + 16384]
+                self.assignments[chunk] = np.argmax(self.matrix[chunk] @ centroids.T, axis=1)
+            self.trained_size = rows.size
+            logger.info(f"Trained semantic cache IVF index with {self.n_lists} lists over {rows.size} entries")
+
+    # Reads
+
+    def _candidates(self, vector):
+        if self.centroids is None:
+            return None
+        probes = np.argpartition(-(self.centroids @ vector), min(self.nprobe, self.n_lists) - 1)[:self.nprobe]
+        return np.flatnonzero(np.isin(self.assignments, probes))
+
+    def _search(self, vector, k):
+        candidates = self._candidates(vector)
+        if candidates is None:
+            # Only score the used prefix of the matrix
+            used = int(np.flatnonzero(self.valid)[-1]) + 1
+            scores = self.matrix[:used] @ vector
+            scores[~self.valid[:used]] = -np.inf
+            candidates = np.arange(used)
+        elif candidates.size:
+            scores = self.matrix[candidates] @ vector
+        else:
+            return []
+
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[index]), int(candidates[index]))
+            for index in top if np.isfinite(scores[index])
+        ]
+
+    def search(self, embedding, k=1):
+        """
+        Return up to ``k`` ``(similarity, query, summary)`` tuples, best first.
+        """
+        vector = normalize(embedding).reshape(self.dim)
+        with self._lock:
+            self.expire()
+            if not self.slots:
+                return []
+            return [
+                (score, self.queries[slot], self.summaries[slot])
+                for score, slot in self._search(vector, k)
+            ]
+
+    def lookup(self, embedding, threshold):
+        """
+        Return the best ``(similarity, query, summary)`` at or above
+        ``threshold`` and mark it as recently used.
+        """
+        vector = normalize(embedding).reshape(self.dim)
+        with self._lock:
+            self.expire()
+            if not self.slots:
+                return None
+            results = self._search(vector, 1)
+            if not results or results[0][0] < threshold:
+                return None
+            score, slot = results[0]
+            self.last_used[slot] = time.time()
+            return score, self.queries[slot], self.summaries[slot]
@@ -0,0 +1,40 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Records how long each action server startup phase takes so slow cold
+    starts can be attributed to Django setup, imports or model loading.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases.append((name, elapsed))
+            logger.info(f"Startup phase '{name}' took {elapsed:.2f}s")
+
+    def summary(self):
+        with self._lock:
+            phases = ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in self.phases)
+        return f"{phases} (total {time.perf_counter() - self.started:.2f}s since import)"
+
+    def log_summary(self, label):
+        logger.info(f"{label}: {self.summary()}")
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,73 @@
+"""
+Action latency under concurrent chat sessions.
+
+Each simulated action runs the eight queries of ActionSalesAnalytics, with
+a sleep standing in for database time. Compares the previous sequential
+``sync_to_async`` helpers (all sessions share one thread) with one
+``db.batch`` unit per action and with ``db.gather`` over the queries, on
+the bounded database pool. Run from the rasa_bot directory:
+
+    python benchmarks/action_db_benchmark.py --sessions 1,8,32 --query-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not settings.configured:
+    settings.configure(DATABASES={})
+
+from actions import db  # noqa: E402
+
+QUERIES = 8
+
+
+async def legacy_action(query):
+    helper = sync_to_async(query)
+    for _ in range(QUERIES):
+        await helper()
+
+
+async def batched_action(query):
+    await db.batch(**{f'query_{i}': query for i in range(QUERIES)})
+
+
+async def gathered_action(query):
+    await db.gather(*[db.run(query) for _ in range(QUERIES)])
+
+
+async def run_sessions(action, sessions, query):
+    async def timed():
+        started = time.perf_counter()
+        await action(query)
+        return (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*[timed() for _ in range(sessions)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', default='1,8,32')
+    parser.add_argument('--query-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    def query():
+        time.sleep(args.query_ms / 1000)
+
+    print(f"{QUERIES} queries of {args.query_ms:g}ms per action, pool of {db.DB_POOL_SIZE} threads")
+    print(f"{'sessions':>8} {'variant':<10} {'median ms':>10} {'max ms':>8}")
+    for sessions in [int(size) for size in args.sessions.split(',') if size.strip()]:
+        for label, action in (('legacy', legacy_action), ('batch', batched_action), ('gather', gathered_action)):
+            latencies = asyncio.run(run_sessions(action, sessions, query))
+            print(f"{sessions:>8} {label:<10} {statistics.median(latencies):>10.1f} {max(latencies):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Customer engagement scoring: previous ``Decimal`` loop vs NumPy arrays.
+
+Builds synthetic per-customer rows, as the grouped query returns them, and
+times the report computed by the previous ActionCustomerAnalytics code
+(dict per customer, ``Decimal`` scoring, a sort and one scan per segment)
+against ``segmentation.summarize``. Segment counts are checked to agree.
+Run from the rasa_bot directory:
+
+    python benchmarks/customer_segmentation_benchmark.py --customers 10000,100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from actions import segmentation  # noqa: E402
+
+TODAY = date(2025, 6, 30)
+NEW_SINCE = date(2025, 1, 1)
+
+
+def synthetic_rows(size, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for customer_id in range(1, size + 1):
+        last = NEW_SINCE + timedelta(days=rng.randrange((TODAY - NEW_SINCE).days + 1))
+        first = last - timedelta(days=rng.randrange(900))
+        rows.append((customer_id, rng.randint(1, 60), Decimal(rng.randrange(100, 5_000_000)) / 100, first, last))
+    return rows
+
+
+def legacy_report(rows):
+    """The scoring and segmentation ActionCustomerAnalytics used to run."""
+    customers = [{
+        'customer_id': customer_id,
+        'transaction_count': count,
+        'total_customer_spent': total,
+        'first_transaction_date': first,
+        'days_since_last_transaction': float((TODAY - last).days),
+    } for customer_id, count, total, first, last in rows]
+
+    max_transactions = Decimal(str(max(c['transaction_count'] for c in customers) or 1))
+    max_spend = Decimal(str(max(c['total_customer_spent'] for c in customers) or Decimal('1')))
+    for customer in customers:
+        frequency = Decimal(str((customer['transaction_count'] / max_transactions) * 100))
+        spend = Decimal(str((customer['total_customer_spent'] / max_spend) * 100))
+        recency_days = Decimal(str(customer['days_since_last_transaction']))
+        recency = max(Decimal('0'), Decimal('100') - (recency_days / Decimal('365') * Decimal('100')))
+        customer['engagement_score'] = round(frequency * Decimal('0.3') + spend * Decimal('0.4') + recency * Decimal('0.3'), 2)
+    ranked = sorted(customers, key=lambda c: c['engagement_score'], reverse=True)
+
+    segments = []
+    for name, criteria in (
+        ('Strategic Customers', lambda c: c['engagement_score'] > 75),
+        ('Growth Potential', lambda c: 50 <= c['engagement_score'] <= 75),
+        ('Emerging Customers', lambda c: c['engagement_score'] < 50),
+    ):
+        members = [c for c in ranked if criteria(c)]
+        total = sum(c['total_customer_spent'] for c in members)
+        segments.append({
+            'segment': name,
+            'customer_count': len(members),
+            'total_segment_sales': total,
+            'avg_engagement_score': sum(c['engagement_score'] for c in members) / len(members) if members else 0,
+        })
+    new = [c for c in customers if c['first_transaction_date'] >= NEW_SINCE]
+    top = sorted(customers, key=lambda c: c['total_customer_spent'], reverse=True)[:5]
+    return {'customer_segments': segments, 'new_customers': len(new), 'top_customers': top}
+
+
+def vectorized_report(rows):
+    return segmentation.summarize(segmentation.CustomerArrays.from_rows(rows), TODAY, NEW_SINCE)
+
+
+def best_of(fn, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(rows)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', default='10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'customers':>10} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8}  segments")
+    for size in [int(size) for size in args.customers.split(',') if size.strip()]:
+        rows = synthetic_rows(size)
+        legacy_ms, legacy = best_of(legacy_report, rows, args.repeat)
+        numpy_ms, vectorized = best_of(vectorized_report, rows, args.repeat)
+        counts = [s['customer_count'] for s in vectorized['customer_segments']]
+        agree = counts == [s['customer_count'] for s in legacy['customer_segments']]
+        print(f"{size:>10} {legacy_ms:>10.1f} {numpy_ms:>10.1f} {legacy_ms / numpy_ms:>7.1f}x  "
+              f"{counts} {'match' if agree else 'MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Throughput of the time period parser.
+
+Times a mix of the phrases the analytics actions resolve, both through the
+compiled grammar alone (``resolve_period``, no memo) and through the
+memoized ``parse_period`` the actions call. Run from the rasa_bot directory:
+
+    python benchmarks/period_parser_benchmark.py --seconds 2
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from actions import periods  # noqa: E402
+
+PHRASES = [
+    'today', 'last week', 'this month', 'last month', 'last quarter', 'ytd', 'last 30 days', 'past 6 months',
+    'Q2 2024', 'q2 2024 to q3 2024', 'q1 to q4 2025', 'january 2025', 'march 2024 to may 2024', '2024',
+    '2025-02-06 to 2025-03-08', 'between 2025-01-01 and 2025-01-31', '2025-02-06|2025-03-08', 'March 5, 2024',
+]
+
+
+def parses_per_second(fn, seconds):
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for phrase in PHRASES:
+            fn(phrase)
+        count += len(PHRASES)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time spent on each variant')
+    args = parser.parse_args()
+
+    today = date.today()
+    uncached = parses_per_second(lambda phrase: periods.resolve_period(periods.normalize(phrase), today), args.seconds)
+    periods.cache_clear()
+    memoized = parses_per_second(periods.parse_period, args.seconds)
+
+    print(f"{len(PHRASES)} distinct phrases")
+    print(f"{'grammar only':<14} {uncached:>12,.0f} parses/s")
+    print(f"{'memoized':<14} {memoized:>12,.0f} parses/s  {periods.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
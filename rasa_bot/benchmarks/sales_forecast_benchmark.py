@@ -0,0 +1,115 @@
+"""
+Sales forecasting accuracy and fit time.
+
+Generates synthetic monthly sales per product (level, trend, seasonality
+and noise drawn per product) and reports:
+
+* rolling-origin backtest accuracy of the previous ActionSalesForecasting
+  method (last month x growth ratio x last year's monthly factors), both
+  fitted models and the seasonal naive baseline;
+* fitting every product in one ``forecast_many`` call against one
+  ``fit_many`` per product;
+* cached forecasts when nothing changed, and when the window slides one
+  month forward.
+
+Run from the rasa_bot directory:
+
+    python benchmarks/sales_forecast_benchmark.py --products 1000 --months 48
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from actions import forecasting  # noqa: E402
+
+START = forecasting.period_index(date(2021, 1, 1), 'month')
+
+
+def synthetic_sales(products, months, seed=11):
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    level = rng.uniform(200, 20000, (products, 1))
+    slope = level * rng.uniform(-0.01, 0.03, (products, 1))
+    amplitude = level * rng.uniform(0.0, 0.4, (products, 1))
+    phase = rng.uniform(0, 2 * np.pi, (products, 1))
+    seasonal = amplitude * np.sin(2 * np.pi * (START + t) / 12 + phase)
+    noise = level * rng.uniform(0.02, 0.15, (products, 1)) * rng.standard_normal((products, months))
+    return np.maximum(level + slope * t + seasonal + noise, 0.0)
+
+
+def legacy(history, start, horizon):
+    """The previous ActionSalesForecasting estimate."""
+    recent = history[-6:]
+    growth = 1.0
+    if len(recent) >= 2 and recent.any():
+        slope = np.polyfit(np.arange(len(recent)), recent, 1)[0]
+        average = recent.mean()
+        growth = max(0.8, min(1.2, 1 + (slope / average if average > 0 else 0)))
+    last = recent[-1] or 1000
+
+    first = start + len(history)
+    last_year = np.arange((first // 12 - 1) * 12, (first // 12) * 12)
+    known = last_year[(last_year >= start) & (last_year < first)]
+    factors = np.ones(12)
+    if len(known):
+        totals = history[known - start]
+        average = totals.mean()
+        factors[known % 12] = totals / average if average > 0 else 1.0
+    steps = np.arange(horizon)
+    return last * growth ** (steps + 1) * factors[(first + steps) % 12]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=48)
+    parser.add_argument('--horizon', type=int, default=3)
+    parser.add_argument('--backtest-products', type=int, default=100)
+    args = parser.parse_args()
+
+    sales = synthetic_sales(args.products, args.months)
+
+    methods = (legacy, forecasting.HOLT_WINTERS, forecasting.SEASONAL_TREND, forecasting.SEASONAL_NAIVE)
+    totals = {}
+    for series in sales[:args.backtest_products]:
+        for label, result in forecasting.backtest(series, horizon=args.horizon, start=START, methods=methods).items():
+            bucket = totals.setdefault(label, {'smape': [], 'mae': [], 'fit_ms': []})
+            for measure in bucket:
+                bucket[measure].append(result[measure])
+    print(f"Backtest over {min(args.products, args.backtest_products)} products, "
+          f"{args.months} months, {args.horizon}-month horizon")
+    print(f"{'method':<16} {'sMAPE %':>8} {'MAE':>10} {'fit ms':>8}")
+    for label, bucket in totals.items():
+        print(f"{label:<16} {np.mean(bucket['smape']):>8.2f} {np.mean(bucket['mae']):>10.1f} "
+              f"{np.mean(bucket['fit_ms']):>8.3f}")
+
+    keys = [f"product:{i}" for i in range(args.products)]
+    history = sales[:, :-1]
+    loop_ms, _ = timed(lambda: [forecasting.fit_many(START, row, 12) for row in history])
+    forecaster = forecasting.Forecaster(max_entries=args.products)
+    batch_ms, _ = timed(lambda: forecaster.forecast_many(keys, 'month', START, history, args.horizon))
+    hit_ms, _ = timed(lambda: forecaster.forecast_many(keys, 'month', START, history, args.horizon))
+    slide_ms, _ = timed(lambda: forecaster.forecast_many(keys, 'month', START + 1, sales[:, 1:], args.horizon))
+
+    print()
+    print(f"{args.products} products, {history.shape[1]} months")
+    print(f"{'fit one by one':<26} {loop_ms:>10.1f} ms")
+    print(f"{'forecast_many, cold':<26} {batch_ms:>10.1f} ms")
+    print(f"{'forecast_many, cached':<26} {hit_ms:>10.1f} ms")
+    print(f"{'forecast_many, +1 month':<26} {slide_ms:>10.1f} ms  {forecaster.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
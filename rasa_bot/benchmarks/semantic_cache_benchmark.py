@@ -0,0 +1,95 @@
+"""
+Lookup latency of the BiChatbot semantic cache.
+
+Compares the previous per-entry Python loop with the flat matmul index and
+the IVF index at several cache sizes, using random unit vectors of the
+MiniLM embedding width. Run from the rasa_bot directory:
+
+    python benchmarks/semantic_cache_benchmark.py --sizes 1000,10000,100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from actions.semantic_cache import SemanticCache, normalize  # noqa: E402
+
+
+def legacy_lookup(query_embedding, embeddings):
+    similarities = np.array([
+        np.dot(query_embedding, cached_emb) / (np.linalg.norm(query_embedding) * np.linalg.norm(cached_emb))
+        for cached_emb in embeddings
+    ])
+    return int(np.argmax(similarities))
+
+
+def time_per_call(fn, queries):
+    started = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def build_cache(directory, embeddings, n_lists, nprobe):
+    cache = SemanticCache(
+        directory, embeddings.shape[1], capacity=len(embeddings),
+        n_lists=n_lists, nprobe=nprobe, ivf_min_entries=n_lists
+    )
+    for i, embedding in enumerate(embeddings):
+        cache.slots[f"query {i}"] = i
+        cache.queries[i] = f"query {i}"
+        cache.summaries[i] = f"summary {i}"
+    # Bulk load the matrix directly; ``add`` would retrain the IVF lists as it grows
+    cache.matrix[:] = embeddings
+    cache.valid[:] = True
+    cache.created[:] = cache.last_used[:] = time.time()
+    if n_lists:
+        cache.train()
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--legacy-queries', type=int, default=5,
+                        help='The legacy loop is slow; time fewer queries for it')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'entries':>8} {'legacy ms':>10} {'flat ms':>9} {'ivf ms':>8} {'ivf recall':>11}")
+
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        embeddings = normalize(rng.standard_normal((size, args.dim)))
+        # Uniform random vectors have no cluster structure, so IVF recall here is a
+        # lower bound; real query embeddings cluster by topic.
+        # Queries are noisy copies of cached entries, like paraphrased questions
+        targets = rng.integers(0, size, args.queries)
+        queries = normalize(embeddings[targets] + 0.05 * rng.standard_normal((args.queries, args.dim)))
+        n_lists = max(1, int(np.sqrt(size)))
+
+        with tempfile.TemporaryDirectory() as flat_dir, tempfile.TemporaryDirectory() as ivf_dir:
+            flat = build_cache(flat_dir, embeddings, 0, args.nprobe)
+            ivf = build_cache(ivf_dir, embeddings, n_lists, args.nprobe)
+
+            rows = list(embeddings)
+            legacy_ms = time_per_call(lambda query: legacy_lookup(query, rows), queries[:args.legacy_queries])
+            flat_ms = time_per_call(lambda query: flat.lookup(query, 0.85), queries)
+            ivf_ms = time_per_call(lambda query: ivf.lookup(query, 0.85), queries)
+
+            hits = sum(
+                1 for query, target in zip(queries, targets)
+                if (ivf.lookup(query, 0.0) or (0, None))[1] == f"query {target}"
+            )
+            print(f"{size:>8} {legacy_ms:>10.2f} {flat_ms:>9.3f} {ivf_ms:>8.3f} {hits / len(queries):>11.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""
+Django setup shared by the action tests. The ``inspection`` models are
+registered so ``actions.metrics`` imports; no database is configured, and
+tests that need query results replace the query functions.
+"""
+import os
+import sys
+
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'Finstock')))
+
+if not settings.configured:
+    settings.configure(DATABASES={}, INSTALLED_APPS=['inspection'])
+    django.setup()
@@ -0,0 +1,80 @@
+"""
+Tests for the action database execution layer. Run from the rasa_bot
+directory:
+
+    python -m unittest tests.test_db
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from actions import db
+
+
+class FakeAction:
+
+    def name(self):
+        return 'action_fake'
+
+    @db.timed
+    async def run(self, delay):
+        @db.unit
+        def query():
+            time.sleep(delay)
+            return threading.current_thread().name
+
+        first = await query()
+        second, third = await db.gather(query(), query())
+        return [first, second, third]
+
+
+class ExecutionLayerTest(unittest.TestCase):
+
+    def setUp(self):
+        db.action_stats_registry.reset()
+
+    def test_batch_runs_every_call_in_one_pool_thread(self):
+        def thread_name():
+            return threading.current_thread().name
+
+        results = asyncio.run(db.batch(a=thread_name, b=thread_name, c=lambda: 3))
+        self.assertEqual(results['a'], results['b'])
+        self.assertTrue(results['a'].startswith('bot-db'))
+        self.assertEqual(results['c'], 3)
+
+    def test_gather_overlaps_independent_units(self):
+        async def two_units():
+            return await db.gather(db.run(time.sleep, 0.2), db.run(time.sleep, 0.2))
+
+        started = time.perf_counter()
+        asyncio.run(two_units())
+        self.assertLess(time.perf_counter() - started, 0.35)
+
+    def test_pool_is_bounded(self):
+        async def many_units():
+            return await db.gather(*[
+                db.run(lambda: time.sleep(0.02) or threading.current_thread().name)
+                for _ in range(db.DB_POOL_SIZE * 3)
+            ])
+
+        self.assertLessEqual(len(set(asyncio.run(many_units()))), db.DB_POOL_SIZE)
+
+    def test_timed_records_units_per_action(self):
+        with self.assertLogs('actions.db', level='INFO'):
+            threads = asyncio.run(FakeAction().run(0.01))
+
+        self.assertTrue(all(name.startswith('bot-db') for name in threads))
+        stats = db.action_stats()['action_fake']
+        self.assertEqual(stats['runs'], 1)
+        self.assertEqual(stats['avg_units'], 3)
+        self.assertGreaterEqual(stats['avg_db_ms'], 30)
+        self.assertGreaterEqual(stats['max_ms'], 20)
+
+    def test_units_outside_an_action_are_not_recorded(self):
+        asyncio.run(db.run(lambda: None))
+        self.assertEqual(db.action_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
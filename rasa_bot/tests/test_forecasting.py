@@ -0,0 +1,193 @@
+"""
+Tests for the sales forecasting models and their cache. Series are built
+from a known trend and seasonal pattern, plus seeded noise where the test
+needs it. Run from the rasa_bot directory:
+
+    python -m unittest tests.test_forecasting
+"""
+import unittest
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from actions import forecasting
+
+SEED = 20250301
+START = forecasting.period_index(date(2022, 1, 1), 'month')
+PATTERN = np.array([-120, -80, -20, 0, 40, 90, 130, 110, 30, -30, -70, -80], dtype=float)
+
+
+def seasonal_series(n, start=START, level=1000.0, slope=15.0, noise=0.0, seed=SEED):
+    t = np.arange(n)
+    values = level + slope * t + PATTERN[(start + t) % 12]
+    if noise:
+        values = values + np.random.default_rng(seed).normal(0, noise, n)
+    return values
+
+
+class PeriodTest(unittest.TestCase):
+
+    def test_period_round_trip(self):
+        for day in (date(2024, 1, 1), date(2024, 2, 29), date(2025, 12, 31)):
+            for granularity in forecasting.GRANULARITIES:
+                index = forecasting.period_index(day, granularity)
+                first = forecasting.period_start(index, granularity)
+                self.assertLessEqual(first, day)
+                self.assertEqual(forecasting.period_index(first, granularity), index)
+        self.assertEqual(forecasting.period_start(forecasting.period_index(date(2025, 3, 6), 'week'), 'week'),
+                         date(2025, 3, 3))
+
+    def test_bucket_sums_per_period_and_drops_outside_rows(self):
+        rows = [
+            (date(2024, 12, 31), Decimal('5.00')),
+            (date(2025, 1, 3), Decimal('10.50')),
+            (date(2025, 1, 20), Decimal('4.50')),
+            (date(2025, 3, 1), None),
+            (date(2025, 3, 2), Decimal('7.00')),
+            (date(2025, 4, 1), Decimal('99.00')),
+        ]
+        first = forecasting.period_index(date(2025, 1, 1), 'month')
+        values = forecasting.bucket(rows, 'month', first, first + 2)
+        self.assertEqual(values.tolist(), [15.0, 0.0, 7.0])
+
+
+class ModelTest(unittest.TestCase):
+
+    def test_seasonal_trend_recovers_exact_series(self):
+        values = seasonal_series(48)
+        model = forecasting.fit_many(START, values[:36], 12, forecasting.SEASONAL_TREND)[0]
+        np.testing.assert_allclose(model.forecast(12), values[36:], atol=1e-6)
+        self.assertAlmostEqual(model.trend_rate, 15.0 / (1000 + 15 * 35 + PATTERN[(START + 35) % 12]))
+
+    def test_seasonal_trend_update_matches_full_fit(self):
+        values = seasonal_series(40, noise=25)
+        updated = forecasting.fit_many(START, values[:30], 12, forecasting.SEASONAL_TREND)[0]
+        updated.update(values[30:34])
+        updated.update(values[34:])
+        full = forecasting.fit_many(START, values, 12, forecasting.SEASONAL_TREND)[0]
+        np.testing.assert_allclose(updated.forecast(6), full.forecast(6))
+
+    def test_short_histories_drop_terms(self):
+        self.assertEqual(forecasting.spec_for(2, 12), (forecasting.SEASONAL_TREND, 1))
+        self.assertEqual(forecasting.spec_for(10, 12), (forecasting.SEASONAL_TREND, 2))
+        self.assertEqual(forecasting.spec_for(20, 12), (forecasting.SEASONAL_TREND, 3))
+        self.assertEqual(forecasting.spec_for(24, 12), forecasting.HOLT_WINTERS)
+
+        model = forecasting.fit_many(START, [300.0, 500.0], 12)[0]
+        np.testing.assert_allclose(model.forecast(2), [400.0, 400.0])
+
+    def test_holt_winters_follows_trend_and_season(self):
+        values = seasonal_series(60, noise=10)
+        model = forecasting.fit_many(START, values[:48], 12, forecasting.HOLT_WINTERS)[0]
+        expected = seasonal_series(60)[48:]
+        self.assertLess(np.abs(model.forecast(12) - expected).mean(), 40)
+
+    def test_batch_fit_matches_single_fits(self):
+        rng = np.random.default_rng(SEED)
+        matrix = np.vstack([seasonal_series(36, level=level, noise=30, seed=i)
+                            for i, level in enumerate(rng.uniform(500, 5000, 5))])
+        for method in (forecasting.HOLT_WINTERS, forecasting.SEASONAL_TREND):
+            batch = forecasting.fit_many(START, matrix, 12, method)
+            for row, model in zip(matrix, batch):
+                single = forecasting.fit_many(START, row, 12, method)[0]
+                np.testing.assert_allclose(model.forecast(6), single.forecast(6))
+
+    def test_holt_winters_update_continues_the_recursion(self):
+        values = seasonal_series(40, noise=20)
+        model = forecasting.fit_many(START, values[:30], 12, forecasting.HOLT_WINTERS)[0]
+        model.update(values[30:])
+        self.assertEqual(model.end, START + 39)
+        self.assertLess(np.abs(model.forecast(3) - seasonal_series(43)[40:]).mean(), 80)
+
+
+class ForecasterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.forecaster = forecasting.Forecaster(max_entries=8)
+
+    def test_new_periods_update_the_cached_model(self):
+        values = seasonal_series(30, noise=20)
+        first = self.forecaster.forecast('all', 'month', START, values[:28], 3)
+        again = self.forecaster.forecast('all', 'month', START, values[:28], 3)
+        np.testing.assert_array_equal(first.values, again.values)
+
+        # The lookback window slides forward by one month as a new one lands
+        self.forecaster.forecast('all', 'month', START + 1, values[1:29], 3)
+        self.assertEqual(self.forecaster.cache_info(), {'models': 1, 'hits': 1, 'updates': 1, 'fits': 1})
+
+    def test_revised_history_refits(self):
+        values = seasonal_series(30, noise=20)
+        self.forecaster.forecast('all', 'month', START, values[:28], 3)
+        revised = values[:29].copy()
+        revised[5] += 100
+        self.forecaster.forecast('all', 'month', START, revised, 3)
+        self.assertEqual(self.forecaster.cache_info()['fits'], 2)
+
+    def test_refits_after_a_season_of_updates(self):
+        values = seasonal_series(48, noise=20)
+        for end in range(30, 43):
+            self.forecaster.forecast('all', 'month', START, values[:end], 1)
+        info = self.forecaster.cache_info()
+        self.assertEqual(info['fits'], 2)
+        self.assertEqual(info['updates'], 11)
+
+    def test_forecast_many_fits_only_missing_series(self):
+        matrix = np.vstack([seasonal_series(30, level=level) for level in (800, 1600, 2400)])
+        self.forecaster.forecast('b', 'month', START, matrix[1], 2)
+        forecasts = self.forecaster.forecast_many(['a', 'b', 'c'], 'month', START, matrix, 2)
+        self.assertEqual(self.forecaster.cache_info()['fits'], 3)
+        self.assertEqual(list(forecasts), ['a', 'b', 'c'])
+        self.assertEqual(forecasts['a'].periods.tolist(), [START + 30, START + 31])
+        self.assertTrue(forecasts['a'].values[0] < forecasts['b'].values[0] < forecasts['c'].values[0])
+
+    def test_models_forecast_under_the_lock(self):
+        values = seasonal_series(30)
+        self.forecaster.forecast('all', 'month', START, values[:28], 3)
+        model = self.forecaster._entries[('all', 'month')].model
+        forecast, held = model.forecast, []
+
+        def forecast_under_lock(horizon):
+            # A concurrent call may update this model in place
+            held.append(self.forecaster._lock.locked())
+            return forecast(horizon)
+
+        model.forecast = forecast_under_lock
+        self.forecaster.forecast('all', 'month', START, values[:29], 3)
+        self.assertEqual(held, [True])
+
+    def test_forecasts_are_not_negative(self):
+        values = np.array([900.0, 700.0, 500.0, 300.0, 100.0])
+        forecast = self.forecaster.forecast('falling', 'month', START, values, 4)
+        self.assertTrue((forecast.values >= 0).all())
+
+    def test_entries_are_bounded(self):
+        values = seasonal_series(12)
+        for key in range(12):
+            self.forecaster.forecast(key, 'month', START, values, 1)
+        self.assertEqual(self.forecaster.cache_info()['models'], 8)
+
+
+class BacktestTest(unittest.TestCase):
+
+    def test_reports_accuracy_per_method(self):
+        def last_value(history, start, horizon):
+            return np.repeat(history[-1], horizon)
+
+        results = forecasting.backtest(seasonal_series(40), horizon=3, start=START,
+                                       methods=(forecasting.SEASONAL_TREND, forecasting.SEASONAL_NAIVE, last_value))
+        self.assertEqual(set(results), {forecasting.SEASONAL_TREND, forecasting.SEASONAL_NAIVE, 'last_value'})
+        self.assertEqual(results[forecasting.SEASONAL_TREND]['origins'], 40 - 24 - 3 + 1)
+        self.assertLess(results[forecasting.SEASONAL_TREND]['mae'], 1e-6)
+        # The baseline lags a season of trend behind
+        self.assertAlmostEqual(results[forecasting.SEASONAL_NAIVE]['mae'], 15.0 * 12)
+        self.assertGreaterEqual(results['last_value']['fit_ms'], 0)
+
+    def test_too_short_for_any_origin(self):
+        results = forecasting.backtest(seasonal_series(20), methods=(forecasting.SEASONAL_TREND,))
+        self.assertEqual(results[forecasting.SEASONAL_TREND]['origins'], 0)
+        self.assertIsNone(results[forecasting.SEASONAL_TREND]['mae'])
+
+
+if __name__ == '__main__':
+    unittest.main()
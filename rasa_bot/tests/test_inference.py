@@ -0,0 +1,141 @@
+"""
+Tests for the batched inference worker. The model calls are replaced by
+recording fakes, so only the queueing, batching and shutdown logic runs.
+Needs torch, as the action server does. Run from the rasa_bot directory:
+
+    python -m unittest tests.test_inference
+"""
+import importlib.util
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError
+
+if importlib.util.find_spec('torch') is not None:
+    from actions.inference import ENCODE, SUMMARIZE, InferenceWorker
+else:
+    InferenceWorker = object
+
+
+class RecordingWorker(InferenceWorker):
+    """Worker whose batch calls record their inputs instead of running models."""
+
+    def __init__(self, delay=0.0, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def _summarize_batch(self, texts, **options):
+        return self._record(SUMMARIZE, texts, options, [f"summary of {text}" for text in texts])
+
+    def _encode_batch(self, texts):
+        return self._record(ENCODE, texts, {}, [len(text) for text in texts])
+
+    def _record(self, kind, texts, options, results):
+        self.calls.append((kind, list(texts), options))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model failed")
+        return results
+
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), "torch is not installed")
+class InferenceWorkerTest(unittest.TestCase):
+
+    def worker(self, **kwargs):
+        worker = RecordingWorker(**kwargs)
+        self.addCleanup(worker.stop, 1)
+        return worker
+
+    def submit_concurrently(self, worker, texts, **options):
+        futures = [None] * len(texts)
+
+        def submit(i):
+            futures[i] = worker.submit(SUMMARIZE, texts[i], **options)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [future.result(1) for future in futures]
+
+    def test_concurrent_requests_share_one_batch(self):
+        worker = self.worker(max_wait_ms=200)
+        results = self.submit_concurrently(worker, ['a', 'b', 'c', 'd'])
+
+        self.assertEqual(sorted(results), ['summary of a', 'summary of b', 'summary of c', 'summary of d'])
+        self.assertEqual(len(worker.calls), 1)
+        self.assertEqual(sorted(worker.calls[0][1]), ['a', 'b', 'c', 'd'])
+
+    def test_batches_are_capped_at_max_batch_size(self):
+        worker = self.worker(max_batch_size=2, max_wait_ms=200)
+        self.submit_concurrently(worker, ['a', 'b', 'c', 'd', 'e'])
+
+        self.assertEqual(sorted(len(texts) for _, texts, _ in worker.calls), [1, 2, 2])
+
+    def test_requests_with_different_options_run_separately(self):
+        worker = self.worker(max_wait_ms=200)
+        short = worker.submit(SUMMARIZE, 'a', max_length=20)
+        long = worker.submit(SUMMARIZE, 'b', max_length=80)
+        vector = worker.submit(ENCODE, 'abc')
+
+        self.assertEqual(short.result(1), 'summary of a')
+        self.assertEqual(long.result(1), 'summary of b')
+        self.assertEqual(vector.result(1), 3)
+        self.assertEqual(
+            sorted((kind, texts, options.get('max_length')) for kind, texts, options in worker.calls),
+            [(ENCODE, ['abc'], None), (SUMMARIZE, ['a'], 20), (SUMMARIZE, ['b'], 80)],
+        )
+
+    def test_max_wait_bounds_latency_of_a_lone_request(self):
+        worker = self.worker(max_wait_ms=20)
+        started = time.perf_counter()
+        self.assertEqual(worker.encode('abcd', timeout=1), 4)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_caller_timeout(self):
+        worker = self.worker(delay=0.3)
+        with self.assertRaises(TimeoutError):
+            worker.summarize('slow', timeout=0.05)
+
+    def test_batch_failure_reaches_every_caller(self):
+        worker = self.worker(fail=True, max_wait_ms=100)
+        futures = [worker.submit(ENCODE, text) for text in ('a', 'b')]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, 'model failed'):
+                future.result(1)
+
+        # The worker keeps serving after a failed batch
+        worker.fail = False
+        self.assertEqual(worker.encode('xyz', timeout=1), 3)
+
+    def test_cancelled_requests_are_skipped(self):
+        worker = self.worker(delay=0.1, max_batch_size=1)
+        busy = worker.submit(ENCODE, 'busy')
+        cancelled = worker.submit(ENCODE, 'gone')
+        self.assertTrue(cancelled.cancel())
+
+        self.assertEqual(busy.result(1), 4)
+        self.assertEqual(worker.encode('next', timeout=1), 4)
+        self.assertNotIn((ENCODE, ['gone'], {}), worker.calls)
+
+    def test_stop_finishes_queued_requests_and_restarts_on_submit(self):
+        worker = self.worker(delay=0.05, max_batch_size=1)
+        futures = [worker.submit(ENCODE, text) for text in ('a', 'bb', 'ccc')]
+        thread = worker._thread
+
+        worker.stop(timeout=2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([future.result(0) for future in futures], [1, 2, 3])
+
+        self.assertEqual(worker.encode('dddd', timeout=1), 4)
+        self.assertIsNot(worker._thread, thread)
+
+    def test_stop_without_a_thread_is_a_no_op(self):
+        self.worker().stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the metrics memo and its watermark invalidation. The watermark
+queries are replaced by counters, so no database is needed. Run from the
+rasa_bot directory:
+
+    python -m unittest tests.test_metrics
+"""
+import threading
+import time
+import unittest
+
+from actions import metrics
+
+
+class FakeTable:
+    """Stands in for a watermark query; ``calls`` counts how often it ran."""
+
+    def __init__(self):
+        self.watermark = {'last_id': 10, 'last_modified': 1, 'deletes': 0}
+        self.calls = 0
+        self.delay = 0.0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return dict(self.watermark)
+
+
+class MetricsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeTable()
+        self.cache = metrics.MetricsCache(
+            ttl=60, max_entries=4, watermark_interval=0,
+            watermark_queries={metrics.TRANSACTIONS: self.table}
+        )
+        self.cache.check_watermark(metrics.TRANSACTIONS)
+        self.cache.set('key', metrics.TRANSACTIONS, 'value')
+
+    def test_unchanged_watermark_keeps_entries(self):
+        self.cache.check_watermark(metrics.TRANSACTIONS)
+        self.assertEqual(self.cache.get('key')[2], 'value')
+
+    def test_new_or_modified_rows_invalidate(self):
+        for field in ('last_id', 'last_modified'):
+            self.cache.set('key', metrics.TRANSACTIONS, 'value')
+            self.table.watermark[field] += 1
+            self.cache.check_watermark(metrics.TRANSACTIONS)
+            self.assertIsNone(self.cache.get('key'), field)
+
+    def test_deleting_an_older_row_invalidates(self):
+        self.table.watermark['deletes'] += 1
+        self.cache.check_watermark(metrics.TRANSACTIONS)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_other_sources_are_kept(self):
+        self.cache.set('orders', metrics.ORDERS, 'kept')
+        self.table.watermark['deletes'] += 1
+        self.cache.check_watermark(metrics.TRANSACTIONS)
+        self.assertEqual(self.cache.get('orders')[2], 'kept')
+
+    def test_checks_are_rate_limited(self):
+        self.cache.watermark_interval = 60
+        calls = self.table.calls
+        self.table.watermark['deletes'] += 1
+        self.cache.check_watermark(metrics.TRANSACTIONS)
+        self.assertEqual(self.table.calls, calls)
+        self.assertEqual(self.cache.get('key')[2], 'value')
+
+    def test_concurrent_checks_query_once_per_interval(self):
+        self.cache.watermark_interval = 60
+        self.cache._checked_at.clear()
+        self.table.delay = 0.05
+        calls = self.table.calls
+        threads = [threading.Thread(target=self.cache.check_watermark, args=(metrics.TRANSACTIONS,))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.table.calls, calls + 1)
+
+    def test_reads_do_not_wait_for_the_watermark_query(self):
+        self.table.delay = 0.3
+        self.table.watermark['deletes'] += 1
+        checker = threading.Thread(target=self.cache.check_watermark, args=(metrics.TRANSACTIONS,))
+        checker.start()
+        time.sleep(0.05)
+
+        started = time.perf_counter()
+        self.assertEqual(self.cache.get('key')[2], 'value')
+        self.assertLess(time.perf_counter() - started, 0.1)
+
+        checker.join()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_value_computed_before_an_invalidation_is_not_stored(self):
+        generation = self.cache.generation(metrics.TRANSACTIONS)
+        self.cache.invalidate(metrics.TRANSACTIONS)
+        self.cache.set('late', metrics.TRANSACTIONS, 'stale', generation)
+        self.assertIsNone(self.cache.get('late'))
+
+    def test_entries_expire_and_are_bounded(self):
+        for i in range(6):
+            self.cache.set(i, metrics.TRANSACTIONS, i)
+        self.assertIsNone(self.cache.get(0))
+        self.assertEqual(self.cache.get(5)[2], 5)
+
+        self.cache.ttl = -1
+        self.cache.set('expired', metrics.TRANSACTIONS, 'x')
+        self.assertIsNone(self.cache.get('expired'))
+
+
+class MetricDecoratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeTable()
+        self.original = metrics.metrics_cache
+        metrics.metrics_cache = metrics.MetricsCache(
+            ttl=60, watermark_interval=0, watermark_queries={metrics.TRANSACTIONS: self.table}
+        )
+        self.addCleanup(setattr, metrics, 'metrics_cache', self.original)
+        self.runs = 0
+
+        @metrics.metric(metrics.TRANSACTIONS)
+        def rows(day):
+            self.runs += 1
+            return [{'day': day, 'total': self.runs}]
+
+        self.rows = rows
+
+    def test_memoized_until_the_table_changes(self):
+        self.assertEqual(self.rows(1), [{'day': 1, 'total': 1}])
+        self.assertEqual(self.rows(1), [{'day': 1, 'total': 1}])
+        self.assertEqual(self.runs, 1)
+
+        self.table.watermark['deletes'] += 1
+        self.assertEqual(self.rows(1), [{'day': 1, 'total': 2}])
+
+    def test_results_are_copies(self):
+        self.rows(1)[0]['total'] = 'changed'
+        self.assertEqual(self.rows(1)[0]['total'], 1)
+
+
+class TopProductsTest(unittest.TestCase):
+
+    def test_ranks_one_product_sales_result_both_ways(self):
+        products = [{'name': name, 'sales': sales} for name, sales in (('a', 9), ('b', 5), ('c', 0), ('d', 2))]
+        self.assertEqual([p['name'] for p in metrics.top_products(products, limit=2)], ['a', 'b'])
+        self.assertEqual([p['name'] for p in metrics.top_products(products, limit=2, worst=True)], ['c', 'd'])
+        self.assertEqual([p['name'] for p in products], ['a', 'b', 'c', 'd'])
+
+
+if __name__ == '__main__':
+    unittest.main()
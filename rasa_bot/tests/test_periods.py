@@ -0,0 +1,166 @@
+"""
+Property tests for the period parser. Each property is checked against
+randomly drawn dates and phrases from a seeded generator, so failures
+reproduce. Run from the rasa_bot directory:
+
+    python -m unittest tests.test_periods
+"""
+import calendar
+import random
+import unittest
+from datetime import date, time, timedelta
+
+from actions import periods
+
+SEED = 20240401
+EXAMPLES = 300
+
+UNITS = ('week', 'month', 'quarter', 'year')
+
+
+def random_day(rng, first=date(2000, 1, 1)):
+    return first + timedelta(days=rng.randrange(365 * 40))
+
+
+def random_spacing(rng, phrase):
+    """``phrase`` with random letter case and runs of whitespace."""
+    words = [''.join(c.upper() if rng.random() < 0.5 else c for c in word) for word in phrase.split()]
+    return ' ' * rng.randrange(3) + (' ' * rng.randint(1, 3)).join(words) + '\t' * rng.randrange(2)
+
+
+def quarter_bounds(quarter, year):
+    last_month = 3 * quarter
+    return date(year, last_month - 2, 1), date(year, last_month, calendar.monthrange(year, last_month)[1])
+
+
+class PeriodPropertyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(SEED)
+        periods.cache_clear()
+
+    def days(self, phrase, today):
+        start, end = periods.parse_period(phrase, today)
+        self.assertEqual(start.time(), time.min, phrase)
+        self.assertEqual(end.time(), periods.END_OF_DAY, phrase)
+        return start.date(), end.date()
+
+    def test_current_periods_run_from_their_start_to_today(self):
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            unit = self.rng.choice(UNITS)
+            start, end = self.days(f'this {unit}', today)
+            self.assertEqual(end, today)
+            self.assertEqual(start, periods.unit_start(unit, today))
+            self.assertEqual(self.days(f'{unit} to date', today), (start, end))
+
+    def test_previous_period_ends_the_day_before_the_current_one(self):
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            unit = self.rng.choice(UNITS)
+            last_start, last_end = self.days(f'last {unit}', today)
+            this_start, _ = self.days(f'this {unit}', today)
+            self.assertEqual(last_end + timedelta(days=1), this_start)
+            self.assertEqual(periods.unit_start(unit, last_start), last_start)
+            self.assertEqual(self.days(f'previous {unit}', today), (last_start, last_end))
+
+    def test_last_quarter_is_a_whole_calendar_quarter(self):
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            start, end = self.days('last quarter', today)
+            self.assertEqual((start.month - 1) % 3, 0)
+            self.assertEqual(start.day, 1)
+            self.assertEqual((end + timedelta(days=1)).day, 1)
+            self.assertEqual(end.month - start.month, 2)
+            self.assertLess(end, today)
+
+    def test_rolling_periods_end_today(self):
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            count = self.rng.randint(1, 24)
+            unit = self.rng.choice(('day',) + UNITS)
+            start, end = self.days(f'{self.rng.choice(("last", "past", "previous"))} {count} {unit}s', today)
+            self.assertEqual(end, today)
+            self.assertEqual(start, periods.shift(unit, today, -count))
+
+    def test_ytd_starts_on_the_first_of_january(self):
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            self.assertEqual(self.days('ytd', today), (date(today.year, 1, 1), today))
+
+    def test_quarters_and_quarter_ranges(self):
+        today = date(2026, 1, 15)
+        for _ in range(EXAMPLES):
+            year = self.rng.randint(2000, 2030)
+            first, last = sorted(self.rng.sample(range(1, 5), 2)) if self.rng.random() < 0.8 else [self.rng.randint(1, 4)] * 2
+            self.assertEqual(self.days(f'q{first} {year}', today), quarter_bounds(first, year))
+            self.assertEqual(self.days(f'{year} q{first}', today), quarter_bounds(first, year))
+
+            expected = (quarter_bounds(first, year)[0], quarter_bounds(last, year)[1])
+            self.assertEqual(self.days(f'q{first} {year} to q{last} {year}', today), expected)
+            self.assertEqual(self.days(f'q{first} to q{last} {year}', today), expected)
+            self.assertEqual(self.days(f'from q{first}-{year} through q{last}-{year}', today), expected)
+
+    def test_quarters_span_years(self):
+        today = date(2026, 1, 15)
+        for _ in range(EXAMPLES):
+            year = self.rng.randint(2000, 2029)
+            start, end = self.days(f'q{self.rng.randint(1, 4)} {year} to q{self.rng.randint(1, 4)} {year + 1}', today)
+            self.assertEqual(start.year, year)
+            self.assertEqual(end.year, year + 1)
+
+    def test_months_cover_every_day_of_the_month(self):
+        names = list(periods.MONTHS)
+        today = date(2026, 1, 15)
+        for _ in range(EXAMPLES):
+            name = self.rng.choice(names)
+            year = self.rng.randint(2000, 2030)
+            month = periods.MONTHS[name]
+            start, end = self.days(f'{name} {year}', today)
+            self.assertEqual(start, date(year, month, 1))
+            self.assertEqual(end, date(year, month, calendar.monthrange(year, month)[1]))
+
+    def test_date_ranges_round_trip(self):
+        today = date(2026, 1, 15)
+        for _ in range(EXAMPLES):
+            first = random_day(self.rng)
+            last = first + timedelta(days=self.rng.randrange(400))
+            iso = f'{first.year}-{first.month}-{first.day}', last.isoformat()
+            template = self.rng.choice(('{} to {}', 'from {} to {}', 'between {} and {}', '{}|{}', '{} - {}'))
+            self.assertEqual(self.days(template.format(*iso), today), (first, last))
+            self.assertEqual(self.days(first.strftime('%B %d, %Y'), today), (first, first))
+
+    def test_spacing_and_case_do_not_matter(self):
+        phrases = ['last quarter', 'Q2 2024 to Q3 2024', 'year to date', 'past 3 months', 'march 2024 to may 2024']
+        for _ in range(EXAMPLES):
+            today = random_day(self.rng)
+            phrase = self.rng.choice(phrases)
+            self.assertEqual(periods.parse_period(random_spacing(self.rng, phrase), today),
+                             periods.parse_period(phrase, today))
+
+    def test_every_period_starts_before_it_ends(self):
+        phrases = ['today', 'yesterday', 'last', 'this week', 'last month', 'this quarter', 'mtd', 'qtd', 'wtd',
+                   'last 7 days', 'q4 2023', '2024', 'december to january 2025', 'last month to this month']
+        for _ in range(EXAMPLES):
+            # Bare years are only accepted up to ten years ahead
+            today = random_day(self.rng, first=date(2015, 1, 1))
+            phrase = self.rng.choice(phrases)
+            start, end = periods.parse_period(phrase, today)
+            self.assertLessEqual(start, end, phrase)
+
+    def test_unknown_phrases_raise_value_error(self):
+        for phrase in ['', 'sometime', 'q5 2024', '2024-02-30', 'q3 2024 to q1 2024', 'last fortnight',
+                       '1999', 'last 100000 years', 'to q3 2024']:
+            with self.assertRaises(ValueError, msg=phrase):
+                periods.parse_period(phrase, date(2026, 1, 15))
+
+    def test_results_are_memoized_per_day(self):
+        today = date(2026, 1, 15)
+        first = periods.parse_period('Last Month', today)
+        self.assertIs(periods.parse_period('  last   month ', today), first)
+        self.assertEqual(periods.cache_info().hits, 1)
+        self.assertNotEqual(periods.parse_period('last month', today + timedelta(days=31)), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
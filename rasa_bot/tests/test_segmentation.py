@@ -0,0 +1,104 @@
+"""
+Tests for customer engagement scoring and segmentation. The vectorized
+report is checked against the per-customer ``Decimal`` scoring it replaced,
+on seeded random customers. Run from the rasa_bot directory:
+
+    python -m unittest tests.test_segmentation
+"""
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from actions import segmentation
+
+SEED = 20250117
+TODAY = date(2025, 6, 30)
+NEW_SINCE = date(2025, 1, 1)
+
+
+def random_rows(rng, size):
+    rows = []
+    for customer_id in range(1, size + 1):
+        last = NEW_SINCE + timedelta(days=rng.randrange((TODAY - NEW_SINCE).days + 1))
+        first = last - timedelta(days=rng.randrange(900))
+        total = Decimal(rng.randrange(100, 5_000_000)) / 100
+        rows.append((customer_id, rng.randint(1, 60), total, first, last))
+    return rows
+
+
+def reference_report(rows):
+    """The previous per-customer ``Decimal`` scoring and segment scans."""
+    max_count = Decimal(str(max(row[1] for row in rows)))
+    max_spend = max(row[2] for row in rows)
+    scored = []
+    for customer_id, count, total, first, last in rows:
+        frequency = Decimal(str((count / max_count) * 100))
+        spend = Decimal(str((total / max_spend) * 100))
+        recency = max(Decimal('0'), Decimal('100') - (Decimal((TODAY - last).days) / Decimal('365') * Decimal('100')))
+        score = round(frequency * Decimal('0.3') + spend * Decimal('0.4') + recency * Decimal('0.3'), 2)
+        scored.append((score, total))
+    criteria = {
+        'Strategic Customers': lambda score: score > 75,
+        'Growth Potential': lambda score: 50 <= score <= 75,
+        'Emerging Customers': lambda score: score < 50,
+    }
+    return {
+        name: (len([s for s, _ in scored if test(s)]), sum((t for s, t in scored if test(s)), Decimal('0')))
+        for name, test in criteria.items()
+    }
+
+
+class SegmentationTest(unittest.TestCase):
+
+    def test_matches_decimal_reference(self):
+        rng = random.Random(SEED)
+        rows = random_rows(rng, 2000)
+        report = segmentation.summarize(segmentation.CustomerArrays.from_rows(rows), TODAY, NEW_SINCE)
+
+        expected = reference_report(rows)
+        for segment in report['customer_segments']:
+            count, total = expected[segment['segment']]
+            self.assertEqual(segment['customer_count'], count, segment['segment'])
+            self.assertEqual(segment['total_segment_sales'], total, segment['segment'])
+
+        self.assertEqual(report['total_customers'], len(rows))
+        self.assertEqual(report['total_sales'], sum(row[2] for row in rows))
+        self.assertEqual(report['total_transactions'], sum(row[1] for row in rows))
+
+    def test_segment_boundaries(self):
+        scores = np.array([0.0, 49.99, 50.0, 62.5, 75.0, 75.01, 100.0])
+        names = [segmentation.SEGMENTS[i][0] for i in segmentation.segment_indexes(scores)]
+        self.assertEqual(names, [
+            'Emerging Customers', 'Emerging Customers', 'Growth Potential', 'Growth Potential',
+            'Growth Potential', 'Strategic Customers', 'Strategic Customers',
+        ])
+
+    def test_new_customers_and_top_spenders(self):
+        rows = [
+            (1, 3, Decimal('300.00'), date(2024, 11, 2), date(2025, 3, 1)),
+            (2, 1, Decimal('50.10'), date(2025, 2, 14), date(2025, 2, 14)),
+            (None, 4, Decimal('80.00'), date(2023, 5, 5), date(2025, 6, 1)),
+        ]
+        report = segmentation.summarize(segmentation.CustomerArrays.from_rows(rows), TODAY, NEW_SINCE, top=2)
+
+        self.assertEqual(report['new_customers'], {'total_new_customers': 1, 'new_customer_revenue': Decimal('50.10')})
+        self.assertEqual(report['top_customers'], [
+            (1, Decimal('300.00'), 3, Decimal('100.00')),
+            (None, Decimal('80.00'), 4, Decimal('20.00')),
+        ])
+
+    def test_empty_period(self):
+        report = segmentation.summarize(segmentation.CustomerArrays.from_rows([]), TODAY, NEW_SINCE)
+
+        self.assertEqual(report['total_customers'], 0)
+        self.assertEqual(report['total_sales'], Decimal('0'))
+        self.assertEqual([segment['customer_count'] for segment in report['customer_segments']], [0, 0, 0])
+        self.assertEqual(report['new_customers']['total_new_customers'], 0)
+        self.assertEqual(report['top_customers'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the BiChatbot semantic cache index. Run from the rasa_bot
+directory:
+
+    python -m unittest tests.test_semantic_cache
+"""
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from actions.semantic_cache import SemanticCache
+
+DIM = 8
+
+
+def unit(*components):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector
+
+
+class SemanticCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def open(self, **kwargs):
+        kwargs.setdefault('capacity', 4)
+        return SemanticCache(self.directory.name, DIM, **kwargs)
+
+    def test_lookup_hits_at_or_above_threshold(self):
+        cache = self.open()
+        cache.add('sales today', unit(1, 0), 'summary')
+
+        # cos(similar, stored) is 0.8
+        similar = unit(0.8, 0.6)
+        self.assertEqual(cache.lookup(similar, 0.8)[1:], ('sales today', 'summary'))
+        self.assertAlmostEqual(cache.lookup(similar, 0.8)[0], 0.8, places=5)
+        self.assertIsNone(cache.lookup(similar, 0.81))
+        self.assertIsNone(cache.lookup(unit(0, 1), 0.1))
+
+    def test_empty_cache_misses(self):
+        self.assertIsNone(self.open().lookup(unit(1), 0.0))
+
+    def test_full_cache_evicts_least_recently_used(self):
+        cache = self.open(capacity=2)
+        cache.add('first', unit(1, 0), 'a')
+        cache.add('second', unit(0, 1), 'b')
+        cache.last_used[cache.slots['first']] = 1.0
+        cache.last_used[cache.slots['second']] = 2.0
+
+        cache.add('third', unit(0, 0, 1), 'c')
+        self.assertEqual(set(cache.slots), {'second', 'third'})
+        self.assertIsNone(cache.lookup(unit(1, 0), 0.99))
+
+    def test_replacing_a_query_keeps_one_entry(self):
+        cache = self.open()
+        cache.add('q', unit(1, 0), 'old')
+        cache.add('q', unit(0, 1), 'new')
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.lookup(unit(0, 1), 0.99)[2], 'new')
+
+    def test_expired_entries_are_dropped(self):
+        cache = self.open(ttl=60)
+        cache.add('q', unit(1, 0), 'summary')
+        cache.created[cache.slots['q']] -= 120
+        self.assertIsNone(cache.lookup(unit(1, 0), 0.5))
+        self.assertEqual(len(cache), 0)
+
+    def test_reload_after_flush(self):
+        cache = self.open()
+        cache.add('q1', unit(1, 0), 's1')
+        cache.add('q2', unit(0, 1), 's2')
+        cache.flush()
+
+        reloaded = self.open()
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.lookup(unit(0, 1), 0.99)[1:], ('q2', 's2'))
+
+    def test_unflushed_writes_stay_in_the_process(self):
+        cache = self.open()
+        cache.add('q1', unit(1, 0), 's1')
+        cache.flush()
+
+        other = self.open()
+        other.add('q2', unit(0, 1), 's2')
+        self.assertEqual(len(self.open()), 1)
+        self.assertIsNone(self.open().lookup(unit(0, 1), 0.99))
+
+    def test_last_flush_wins_with_matching_rows(self):
+        first, second = self.open(), self.open()
+        first.add('a', unit(1, 0), 'from first')
+        second.add('b', unit(1, 0), 'from second')
+        second.add('c', unit(0, 1), 'also second')
+        first.flush()
+        second.flush()
+
+        reloaded = self.open()
+        self.assertEqual(set(reloaded.slots), {'b', 'c'})
+        self.assertEqual(reloaded.lookup(unit(0, 1), 0.99)[1:], ('c', 'also second'))
+
+    def test_metadata_pointing_at_a_missing_matrix_starts_empty(self):
+        cache = self.open()
+        cache.add('q', unit(1, 0), 's')
+        cache.flush()
+        (cache.cache_dir / cache.matrix_file).unlink()
+
+        self.assertEqual(len(self.open()), 0)
+
+    def test_flush_removes_the_previous_snapshot(self):
+        cache = self.open()
+        cache.add('q', unit(1, 0), 's')
+        cache.flush()
+        cache.flush()
+
+        snapshots = sorted(path.name for path in cache.cache_dir.glob(SemanticCache.MATRIX_PATTERN))
+        self.assertEqual(snapshots, [cache.matrix_file])
+        with open(cache.cache_dir / SemanticCache.META_FILE, 'rb') as f:
+            self.assertEqual(pickle.load(f)['matrix_file'], cache.matrix_file)
+
+
+if __name__ == '__main__':
+    unittest.main()